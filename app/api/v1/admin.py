@@ -0,0 +1,36 @@
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from app.core.config import ADMIN_TOKEN, PROFILE_MAX_SECONDS
+from app.core.profiling import ProfileInProgress, capture_profile
+from app.core.responses import success_response
+from app.schemas.response import SuccessResponse
+
+log = logging.getLogger("admin_api")
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None, alias="X-Admin-Token")):
+    """Admin endpoints need X-Admin-Token = ADMIN_TOKEN; without a configured token they do not exist."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+@router.post("/profile", response_model=SuccessResponse, dependencies=[Depends(require_admin)])
+async def profile_process(seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS)):
+    """
+    Samples this API worker's event loop for 'seconds' and writes a collapsed-stack
+    (flamegraph) file under PROFILE_DIR on the worker's host. Requests keep being served
+    while it runs; with several workers, the one that received the request is profiled.
+    """
+    try:
+        result = await capture_profile(seconds, "api")
+    except ProfileInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    log.warning("Profile written to %s (%s samples over %ss)", result["path"], result["samples"], seconds)
+    return success_response(result)
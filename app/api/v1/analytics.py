@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.config import ANALYTICS_DEFAULT_RANGE_HOURS, ANALYTICS_MAX_RANGE_DAYS
+from app.core.db import read_connection, use_shard
+from app.core.responses import success_response
+from app.schemas.response import SuccessResponse
+from app.services.sales_service import default_window, item_popularity, restaurant_sales
+from app.services.shard_directory import shard_directory
+
+log = logging.getLogger("analytics_api")
+router = APIRouter()
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]):
+    start, end = default_window(start, end, ANALYTICS_DEFAULT_RANGE_HOURS)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'start' must be before 'end'.")
+    if end - start > timedelta(days=ANALYTICS_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"At most {ANALYTICS_MAX_RANGE_DAYS} days per request.")
+    return start, end
+
+
+@router.get("/restaurants/{restaurant_id}/sales", response_model=SuccessResponse)
+async def get_restaurant_sales(
+    restaurant_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Literal["hour", "day"] = "hour",
+):
+    """
+    Orders, units and revenue of a restaurant per hour (or UTC day) in [start, end), with
+    cancellations and net figures. Read from the hourly rollups (replica when configured);
+    defaults to the last ANALYTICS_DEFAULT_RANGE_HOURS hours.
+    """
+    start, end = _window(start, end)
+    try:
+        with use_shard(await shard_directory.shard_for(restaurant_id)):
+            conn = read_connection()
+            data = await restaurant_sales(restaurant_id, start, end, granularity, conn)
+        return success_response(data)
+    except Exception as e:
+        log.error(f"Error fetching sales for restaurant {restaurant_id}: {e}")
+        raise HTTPException(status_code=500, detail="Server failed to fetch sales.")
+
+
+@router.get("/restaurants/{restaurant_id}/items", response_model=SuccessResponse)
+async def get_item_popularity(
+    restaurant_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=500),
+):
+    """The restaurant's best-selling menu items in [start, end), ranked by net units."""
+    start, end = _window(start, end)
+    try:
+        with use_shard(await shard_directory.shard_for(restaurant_id)):
+            conn = read_connection()
+            items = await item_popularity(restaurant_id, start, end, limit, conn)
+        return success_response({"restaurant_id": restaurant_id, "start": start, "end": end, "items": items})
+    except Exception as e:
+        log.error(f"Error fetching item popularity for restaurant {restaurant_id}: {e}")
+        raise HTTPException(status_code=500, detail="Server failed to fetch item popularity.")
@@ -1,84 +1,142 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
 from app.models.inventory import Inventory
 from app.models.order import MenuItem, Restaurant
 from app.schemas.inventory import InventoryItemRequest, InventoryResponse, RestaurantRequest
 from uuid import UUID
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from app.schemas.response import SuccessResponse
+from app.core.responses import success_response
+from app.core.db import mark_written, read_connection, use_shard
+from app.core.hot_queries import fetch_stock_for_items
+from app.services.menu_cache import menu_cache
+from app.services.stock_snapshot import stock_snapshot, read_stock_for_restaurant, read_stock_for_items
+from app.core.config import INVENTORY_MULTI_GET_MAX
+from app.services.inventory_service import IMPORT_FORMATS, iter_lines, iter_records, import_catalog, apply_restock, create_restaurant
+from app.services.shard_directory import group_by_shard, shard_directory, shard_of, shard_uuid
 
-log = logging.getLogger("uvicorn")
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
+log = logging.getLogger("inventory_api")
 router = APIRouter()
 
+@router.get("", response_model=SuccessResponse)
+async def get_inventory_stock_multi(
+    restaurant_id: Optional[UUID] = None,
+    menu_item_ids: Optional[List[UUID]] = Query(default=None),
+    consistent: bool = False
+):
+    """
+    Fetches stock for a whole restaurant menu (?restaurant_id=) or a set of items
+    (?menu_item_ids=a&menu_item_ids=b). Served from the in-process stock snapshot
+    (at most STOCK_SNAPSHOT_MAX_STALENESS seconds old) unless ?consistent=true.
+    """
+    try:
+        if (restaurant_id is None) == (not menu_item_ids):
+            raise HTTPException(status_code=400, detail="Pass exactly one of restaurant_id or menu_item_ids.")
+        if menu_item_ids and len(menu_item_ids) > INVENTORY_MULTI_GET_MAX:
+            raise HTTPException(status_code=400, detail=f"At most {INVENTORY_MULTI_GET_MAX} menu_item_ids per request.")
+
+        if restaurant_id is not None:
+            with use_shard(await shard_directory.shard_for(restaurant_id)):
+                items = await (read_stock_for_restaurant(restaurant_id) if consistent else stock_snapshot.for_restaurant(restaurant_id))
+        else:
+            items = []
+            for alias, ids in group_by_shard(menu_item_ids).items():
+                with use_shard(alias):
+                    items.extend(await (read_stock_for_items(ids) if consistent else stock_snapshot.for_items(ids)))
+
+        # Snapshot entries are already shaped like InventoryResponse
+        data = {
+            "items": items,
+            "consistent": consistent,
+        }
+        return success_response(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("Error fetching inventory snapshot: %s", e)
+        raise HTTPException(status_code=500, detail="Server failed to fetch inventory.")
+
+
 @router.get("/{menu_item_id}", response_model=SuccessResponse)
-async def get_inventory_stock(menu_item_id: UUID):
-    """Fetches the available stock for a specific menu item."""
+async def get_inventory_stock(menu_item_id: UUID, consistent: bool = False):
+    """
+    Fetches the available stock for a specific menu item.
+    Served from the read replica when one is configured; ?consistent=true reads the primary.
+    """
     try:
         # FastAPI path converter ensures menu_item_id is a valid UUID
-        inventory = await Inventory.get_or_none(menu_item_id=menu_item_id)
-        if not inventory:
+        with use_shard(shard_of(menu_item_id)):
+            conn = read_connection(f"inventory:{menu_item_id}", consistent=consistent)
+            # Snapshot row plus uncompacted ledger movements, in one statement
+            rows = await fetch_stock_for_items([menu_item_id], conn)
+        if not rows:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inventory not found for item.")
         
         data= InventoryResponse(
-            menu_item_id=inventory.menu_item_id,
-            available_qty=inventory.available_qty,
-            updated_at=str(inventory.updated_at)
-        ).model_dump()
-        return SuccessResponse(data=data)
+            menu_item_id=rows[0].menu_item_id,
+            available_qty=rows[0].available_qty,
+            updated_at=str(rows[0].updated_at)
+        )
+        return success_response(data)
     except HTTPException as he:
         # Re-raise explicit HTTP exceptions (like 404)
         raise he
     except Exception as e:
-        log.error(f"Error fetching inventory: {e}")
+        log.error("Error fetching inventory: %s", e)
         raise HTTPException(status_code=500, detail="Server failed to fetch inventory.")
 
 
 @router.post("/add/{restaurant_id}/item", status_code=status.HTTP_201_CREATED)
-async def add_inventory_item(restaurant_id: UUID, item_data: SuccessResponse):
+async def add_inventory_item(restaurant_id: UUID, item_data: InventoryItemRequest):
     """
     Adds a new menu item and its initial inventory to a specified restaurant. 
     This is the user-friendly way to add data via the API.
     """
     try:
-        # 1. Validate Restaurant Exists
-        try:
-            restaurant = await Restaurant.get(id=restaurant_id)
-        except Exception:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Restaurant with ID {restaurant_id} not found."
+        with use_shard(await shard_directory.shard_for(restaurant_id)):
+            # 1. Validate Restaurant Exists
+            try:
+                restaurant = await Restaurant.get(id=restaurant_id)
+            except Exception:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Restaurant with ID {restaurant_id} not found."
+                )
+
+            # 2. Create the Menu Item (its id carries the shard)
+            menu_item = await MenuItem.create(
+                id=shard_uuid(),
+                restaurant=restaurant,
+                name=item_data.name,
+                price=item_data.price,
+                is_active=item_data.is_active
             )
 
-        # 2. Create the Menu Item
-        menu_item = await MenuItem.create(
-            restaurant=restaurant,
-            name=item_data.name,
-            price=item_data.price,
-            is_active=item_data.is_active
-        )
-        
-        # 3. Create the Initial Inventory Record
-        inventory = await Inventory.create(
-            menu_item=menu_item,
-            available_qty=item_data.initial_qty,
-            threshold_qty=item_data.threshold_qty
-        )
+            # 3. Create the Initial Inventory Record
+            inventory = await Inventory.create(
+                menu_item=menu_item,
+                available_qty=item_data.initial_qty,
+                threshold_qty=item_data.threshold_qty
+            )
+
+        # Make the new item visible to the menu and stock snapshot right away
+        menu_cache.invalidate(restaurant.id)
+        stock_snapshot.invalidate()
+        mark_written(f"inventory:{menu_item.id}")
 
         data= {
             "message": f"Successfully added '{item_data.name}' to {restaurant.name}.",
             "menu_item_id": str(menu_item.id),
             "initial_stock": inventory.available_qty
         }
-        return SuccessResponse(data=data)
+        return success_response(data, status_code=status.HTTP_201_CREATED)
 
     except HTTPException:
         # Re-raise explicit HTTP exceptions (like 404)
         raise
     except Exception as e:
-        log.error(f"Error adding inventory item: {e}")
+        log.error("Error adding inventory item: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal error processing request: {e}"
@@ -87,21 +145,80 @@ async def add_inventory_item(restaurant_id: UUID, item_data: SuccessResponse):
 @router.post("/add/restaurant", status_code=status.HTTP_201_CREATED)
 async def add_restaurant(restaurant_data: RestaurantRequest):
     """
-    Creates a new restaurant record.
+    Creates a new restaurant record (on the shard the directory places it on).
     """
     try:
-        restaurant = await Restaurant.create(
-            name=restaurant_data.name,
-            is_active=restaurant_data.is_active
-        )
+        restaurant = await create_restaurant(restaurant_data.name, restaurant_data.is_active)
         data= {
             "message": f"Restaurant '{restaurant.name}' created successfully.",
             "restaurant_id": str(restaurant.id)
         }
-        return SuccessResponse(data=data)
+        return success_response(data, status_code=status.HTTP_201_CREATED)
+    except Exception as e:
+        log.error("Error creating restaurant: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error processing request: {e}"
+        )
+
+
+def _import_format(request: Request, fmt: Optional[str]) -> str:
+    """Resolves the import format from the ?format= override or the Content-Type header."""
+    if fmt:
+        if fmt not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(IMPORT_FORMATS)}.")
+        return fmt
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson.")
+
+
+@router.post("/import/{restaurant_id}/catalog", response_model=SuccessResponse)
+async def import_catalog_endpoint(restaurant_id: UUID, request: Request, format: Optional[str] = None):
+    """
+    Streams a CSV/NDJSON catalog (name, price, initial_qty, threshold_qty, is_active and an
+    optional menu_item_id upsert key) into menu items and stock using chunked multi-row upserts.
+    """
+    try:
+        fmt = _import_format(request, format)
+        records = iter_records(iter_lines(request.stream()), fmt)
+        data = await import_catalog(restaurant_id, records)
+        menu_cache.invalidate(restaurant_id)
+        stock_snapshot.invalidate()
+        log.info("Catalog import for restaurant %s: %s upserted, %s rejected.", restaurant_id, data['upserted'], data['rejected'])
+        return success_response(data)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
-        log.error(f"Error creating restaurant: {e}")
+        log.error("Error importing catalog: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal error processing request: {e}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/restock", response_model=SuccessResponse)
+async def restock_endpoint(request: Request, format: Optional[str] = None):
+    """
+    Streams CSV/NDJSON stock deltas (menu_item_id, delta) and applies them in chunked
+    bulk updates. Each affected item gets exactly one 'inventory.restocked.v1' event.
+    """
+    try:
+        fmt = _import_format(request, format)
+        records = iter_records(iter_lines(request.stream()), fmt)
+        data = await apply_restock(records)
+        log.info("Restock applied: %s items restocked, %s rejected.", data['restocked'], data['rejected'])
+        return success_response(data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("Error applying restock: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error processing request: {e}"
+        )
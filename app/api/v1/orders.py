@@ -1,21 +1,35 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, status
 from app.schemas.response import SuccessResponse
-from app.services.order_service import place_order, get_order_by_id, update_order_status, cancel_order
+from app.core.responses import ORJSONResponse, envelope, success_response
+from app.core.db import read_connection, use_shard
+from app.services.shard_directory import shard_of
+from app.services.order_service import place_order, place_orders_batch, get_order_by_id, update_order_status, update_order_statuses_bulk, cancel_order
 from app.models.order import OrderStatus
-from app.schemas.order import OrderRequest, OrderPlacementResponse, OrderStatusUpdate, OrderDetailResponse
-from typing import Dict, Any
+from app.schemas.order import (
+    OrderRequest, OrderPlacementResponse, OrderStatusUpdate, OrderDetailResponse, BatchOrderResponse,
+    OrderStatusBulkItem, BulkStatusUpdateResponse
+)
+from app.services.idempotency_service import idempotency_store, request_fingerprint, IdempotencyError
+from app.services.admission_service import admission, AdmissionRejected
+from app.core.config import ORDER_BATCH_MAX_SIZE, STATUS_BATCH_MAX_SIZE
+from typing import Dict, Any, List, Optional
 from uuid import UUID
 
 router = APIRouter()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-log = logging.getLogger("uvicorn")
+log = logging.getLogger("orders_api")
 
 
 @router.post("/", status_code=status.HTTP_202_ACCEPTED, response_model=SuccessResponse)
-async def create_order_endpoint(request_data: OrderRequest, user_id: str = "user-12345"):
+async def create_order_endpoint(
+    request_data: OrderRequest,
+    user_id: str = "user-12345",
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=200)
+):
     """
     Places a new order. Returns 202 Accepted because inventory check is async.
+    With an 'Idempotency-Key' header, retries replay the original response instead of placing a new order.
+    Under overload (or past the user/restaurant rate limits) returns 429 with 'Retry-After'.
     """
     try:
         # We must explicitly convert UUIDs to strings before passing them to the service layer 
@@ -31,36 +45,135 @@ async def create_order_endpoint(request_data: OrderRequest, user_id: str = "user
         if not items_data:
             raise HTTPException(status_code=400, detail="Order must contain items.")
 
-        order = await place_order(
-            user_id=user_id,
-            restaurant_id=str(request_data.restaurant_id),
-            items=items_data
+        async def _place() -> Dict[str, Any]:
+            # Only real placements are admitted; idempotent replays are served regardless
+            async with admission.admit(user_id=user_id, restaurant_id=str(request_data.restaurant_id)):
+                order = await place_order(
+                    user_id=user_id,
+                    restaurant_id=str(request_data.restaurant_id),
+                    items=items_data
+                )
+            log.info("Order %s placed successfully for user %s.", order.id, user_id)
+            return envelope(OrderPlacementResponse(
+                order_id=order.id,
+                status=order.status,
+                total_amount=order.total_amount,
+                message="Order Accepted and is being processed."
+            ))
+
+        if not idempotency_key:
+            return ORJSONResponse(await _place(), status_code=status.HTTP_202_ACCEPTED)
+
+        body, replayed = await idempotency_store.run(
+            key=f"{user_id}:{idempotency_key}",
+            request_hash=request_fingerprint(request_data.model_dump(mode="json")),
+            operation=_place
         )
-        log.info(f"Order {order.id} placed successfully for user {user_id}.")
-        data=OrderPlacementResponse(
-            order_id=order.id,
-            status=order.status,
-            total_amount=order.total_amount,
-            message="Order Accepted and is being processed."
-        ).model_dump()
-        return SuccessResponse(data=data)
+        if replayed:
+            log.info("Idempotency: replayed stored response for key %s (user %s).", idempotency_key, user_id)
+        return ORJSONResponse(body, status_code=status.HTTP_202_ACCEPTED)
+    except AdmissionRejected as e:
+        # Per-rejection line, sampled like INFO (ADMISSION_REJECTIONS counts every one)
+        log.info("Admission: rejected order for user %s (%s), retry after %ss.", user_id, e.reason, e.retry_after_header)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=e.message, headers={"Retry-After": e.retry_after_header})
+    except IdempotencyError as e:
+        log.error("Idempotency error placing order: %s", e.message)
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except ValueError as e:
-        log.error(f"Value error placing order: {e}")
+        log.error("Value error placing order: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException as he:
-        log.error(f"HTTP error placing order: {he.detail}")
+        log.error("HTTP error placing order: %s", he.detail)
         raise he
     except Exception as e:
-        log.error(f"Error placing order: {e}")
+        log.error("Error placing order: %s", e)
         raise HTTPException(status_code=500, detail="Server failed to place order.")
 
 
+@router.post(":batch", status_code=status.HTTP_202_ACCEPTED, response_model=SuccessResponse)
+async def create_orders_batch_endpoint(request_data: List[OrderRequest], user_id: str = "user-12345"):
+    """
+    Places many orders in a single call (aggregator partners). Returns 202 Accepted with a
+    per-order result; invalid orders are rejected individually without failing the batch.
+    """
+    try:
+        if not request_data:
+            raise HTTPException(status_code=400, detail="Batch must contain at least one order.")
+        if len(request_data) > ORDER_BATCH_MAX_SIZE:
+            raise HTTPException(status_code=400, detail=f"Batch exceeds the maximum of {ORDER_BATCH_MAX_SIZE} orders.")
+
+        orders_data = [
+            {
+                "restaurant_id": str(order.restaurant_id),
+                "items": [
+                    {"menu_item_id": str(item.menu_item_id), "quantity": item.quantity}
+                    for item in order.items
+                ],
+            }
+            for order in request_data
+        ]
+
+        # Partner batches are subject to the global overload checks only
+        async with admission.admit():
+            results = await place_orders_batch(user_id=user_id, orders=orders_data)
+        accepted = sum(1 for r in results if r["success"])
+        log.info("Batch placed for user %s: %d accepted, %d rejected.", user_id, accepted, len(results) - accepted)
+        data=BatchOrderResponse(
+            accepted=accepted,
+            rejected=len(results) - accepted,
+            results=results
+        )
+        return success_response(data, status_code=status.HTTP_202_ACCEPTED)
+    except AdmissionRejected as e:
+        log.info("Admission: rejected order batch for user %s (%s), retry after %ss.", user_id, e.reason, e.retry_after_header)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=e.message, headers={"Retry-After": e.retry_after_header})
+    except HTTPException as he:
+        log.error("HTTP error placing order batch: %s", he.detail)
+        raise he
+    except Exception as e:
+        log.error("Error placing order batch: %s", e)
+        raise HTTPException(status_code=500, detail="Server failed to place order batch.")
+
+
+@router.patch("/status:batch", response_model=SuccessResponse)
+async def update_status_bulk_endpoint(payload: List[OrderStatusBulkItem]):
+    """
+    Applies many status transitions in one transaction (rider apps, kitchen displays).
+    Each transition is accepted or rejected individually with a reason.
+    """
+    try:
+        if not payload:
+            raise HTTPException(status_code=400, detail="Bulk update must contain at least one transition.")
+        if len(payload) > STATUS_BATCH_MAX_SIZE:
+            raise HTTPException(status_code=400, detail=f"Bulk update exceeds the maximum of {STATUS_BATCH_MAX_SIZE} transitions.")
+
+        results = await update_order_statuses_bulk([(item.order_id, item.status) for item in payload])
+        accepted = sum(1 for r in results if r["accepted"])
+        data=BulkStatusUpdateResponse(
+            accepted=accepted,
+            rejected=len(results) - accepted,
+            results=results
+        )
+        return success_response(data)
+    except HTTPException as he:
+        log.error("HTTP error in bulk status update: %s", he.detail)
+        raise he
+    except Exception as e:
+        log.error("Error in bulk status update: %s", e)
+        raise HTTPException(status_code=500, detail="Server failed to update order statuses.")
+
+
 @router.get("/{order_id}", response_model=SuccessResponse)
-async def get_order_endpoint(order_id: UUID):
-    """Fetches details for a specific order."""
+async def get_order_endpoint(order_id: UUID, consistent: bool = False):
+    """
+    Fetches details for a specific order.
+    Served from the read replica when one is configured, except right after this process
+    wrote the order; ?consistent=true always reads the primary.
+    """
     try:
-        
-        order = await get_order_by_id(order_id)
+        with use_shard(shard_of(order_id)):
+            conn = read_connection(f"order:{order_id}", consistent=consistent)
+            order = await get_order_by_id(order_id, conn=conn)
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
@@ -80,10 +193,10 @@ async def get_order_endpoint(order_id: UUID):
             total_amount=order.total_amount,
             items=items,
             created_at=str(order.created_at)
-        ).model_dump()
-        return SuccessResponse(data=data)
+        )
+        return success_response(data)
     except Exception as e:
-        log.error(f"Error fetching order {order_id}: {e}")
+        log.error("Error fetching order %s: %s", order_id, e)
         raise HTTPException(status_code=500, detail="Server failed to fetch order details.")
 
 
@@ -100,13 +213,13 @@ async def update_status_endpoint(order_id: UUID, payload: OrderStatusUpdate):
             status=order.status,
             total_amount=order.total_amount,
             message=f"Order status successfully updated to {order.status}"
-        ).model_dump()
-        return SuccessResponse(data=data)
+        )
+        return success_response(data)
     except ValueError as e:
-        log.error(f"Value error updating order status: {e}")
+        log.error("Value error updating order status: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log.error(f"Error updating order status: {e}")
+        log.error("Error updating order status: %s", e)
         raise HTTPException(status_code=500, detail="Server failed to update order status.")
 
 @router.post("/{order_id}/cancel", response_model=SuccessResponse)
@@ -122,10 +235,10 @@ async def cancel_order_endpoint(order_id: UUID):
             total_amount=order.total_amount,
             message="Order cancelled. Inventory restoration queued."
         )
-        return SuccessResponse(data=data)
+        return success_response(data)
     except ValueError as e:
-        log.error(f"Value error cancelling order: {e}")
+        log.error("Value error cancelling order: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log.error(f"Error cancelling order: {e}")
+        log.error("Error cancelling order: %s", e)
         raise HTTPException(status_code=500, detail="Server failed to cancel order.")
\ No newline at end of file
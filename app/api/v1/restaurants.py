@@ -0,0 +1,46 @@
+import logging
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from uuid import UUID
+
+from app.core.db import use_shard
+from app.services.menu_cache import menu_cache, etag_matches
+from app.services.shard_directory import shard_directory
+from app.schemas.response import _rid
+
+log = logging.getLogger("restaurants_api")
+
+router = APIRouter()
+
+
+@router.get("/{restaurant_id}/menu")
+async def get_restaurant_menu(restaurant_id: UUID, request: Request):
+    """
+    Returns the restaurant's active menu items with prices and availability.
+
+    The body is pre-serialized per restaurant and only rebuilt when its catalog or stock
+    bucket changes. Supports ETag / If-None-Match (304) and gzip. Because the body is
+    shared between requests, the request id is sent in the 'X-Request-ID' header.
+    """
+    try:
+        with use_shard(await shard_directory.shard_for(restaurant_id)):
+            blob = await menu_cache.get(restaurant_id)
+    except Exception as e:
+        log.error("Error building menu for restaurant %s: %s", restaurant_id, e)
+        raise HTTPException(status_code=500, detail="Server failed to fetch menu.")
+
+    if blob is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Restaurant not found or is inactive.")
+
+    headers = {
+        "ETag": blob.etag,
+        "Cache-Control": "no-cache",  # Clients may cache but must revalidate
+        "Vary": "Accept-Encoding",
+        "X-Request-ID": _rid(),
+    }
+    if etag_matches(request.headers.get("if-none-match"), blob.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if blob.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=blob.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=blob.body, media_type="application/json", headers=headers)
@@ -0,0 +1,60 @@
+"""
+Bulk inventory import CLI.
+
+    python -m app.cli.inventory_import catalog --restaurant-id <uuid> menu.csv
+    python -m app.cli.inventory_import restock morning_restock.ndjson
+
+The format is taken from the file extension (.csv / .ndjson / .jsonl) unless --format is given.
+"""
+import argparse
+import asyncio
+import json
+from typing import AsyncIterator
+from uuid import UUID
+
+from app.core.config import INVENTORY_IMPORT_CHUNK_SIZE
+from app.core.db import init_db, close_db
+from app.services.inventory_service import IMPORT_FORMATS, iter_records, import_catalog, apply_restock
+
+
+async def _file_lines(path: str) -> AsyncIterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def _detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+async def main(args: argparse.Namespace):
+    fmt = args.format or _detect_format(args.path)
+    records = iter_records(_file_lines(args.path), fmt)
+
+    await init_db()
+    try:
+        if args.command == "catalog":
+            summary = await import_catalog(UUID(args.restaurant_id), records, chunk_size=args.chunk_size)
+        else:
+            summary = await apply_restock(records, chunk_size=args.chunk_size)
+    finally:
+        await close_db()
+
+    print(json.dumps(summary, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk import menu items or stock deltas from CSV/NDJSON.")
+    parser.add_argument("command", choices=["catalog", "restock"])
+    parser.add_argument("path", help="CSV or NDJSON file to import.")
+    parser.add_argument("--restaurant-id", help="Target restaurant (required for 'catalog').")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Override format detection.")
+    parser.add_argument("--chunk-size", type=int, default=INVENTORY_IMPORT_CHUNK_SIZE, help="Rows per multi-row upsert transaction.")
+    args = parser.parse_args()
+    if args.command == "catalog" and not args.restaurant_id:
+        parser.error("--restaurant-id is required for 'catalog'.")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,47 @@
+"""
+Applies versioned schema migrations (one-shot, run before starting the API or consumers).
+With DATABASE_SHARD_URLS set, every shard is migrated, shard 0 first.
+
+    python -m app.cli.migrate              # apply all pending migrations
+    python -m app.cli.migrate --status     # show applied / latest version
+    python -m app.cli.migrate --target 3   # apply up to version 3
+"""
+import argparse
+import asyncio
+
+from tortoise import connections
+
+from app.core.db import init_db, close_db, shard_aliases
+from app.core.migrations import available_migrations, current_version, latest_version, migrate
+
+
+async def main(args: argparse.Namespace):
+    await init_db(check_schema=False)
+    try:
+        for alias in shard_aliases():
+            label = f"[{alias}] " if len(shard_aliases()) > 1 else ""
+            if args.status:
+                applied = await current_version(connections.get(alias))
+                print(f"{label}Schema version: {applied} (latest available: {latest_version()})")
+                for version, name in available_migrations():
+                    print(f"  [{'x' if version <= applied else ' '}] {version:04d}_{name}")
+                continue
+
+            versions = await migrate(target=args.target, connection_name=alias)
+            if versions:
+                print(f"{label}Applied migrations: {', '.join(f'{v:04d}' for v in versions)}")
+            else:
+                print(f"{label}Schema is up to date.")
+    finally:
+        await close_db()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply versioned database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="Show the applied and latest versions only.")
+    parser.add_argument("--target", type=int, help="Apply migrations up to this version.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
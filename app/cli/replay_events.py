@@ -0,0 +1,97 @@
+"""
+Outbox event replay / backfill CLI.
+
+    python -m app.cli.replay_events --since 2024-05-01T00:00 --until 2024-05-02T00:00 \
+        --event-type order.placed.v1 --checkpoint replay.json [--parallelism 16] [--rate 500] [--dry-run]
+    python -m app.cli.replay_events --unpublished-only --aggregate-id <order uuid>
+    python -m app.cli.replay_events --checkpoint replay.json    # Resume an interrupted run
+
+Without --until, events created before the run started are replayed. Times without an
+offset are UTC. An existing --checkpoint file is resumed with the selection stored in it,
+so selection options cannot be combined with it. SIGINT / SIGTERM stop the run once the
+dispatches in progress finish and save the checkpoint.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+from datetime import datetime, timezone
+from uuid import UUID
+
+from app.consumers.event_replay import ReplayCheckpoint, ReplaySelection, replay_events
+from app.core.config import REPLAY_FETCH_SIZE, REPLAY_PARALLELISM
+from app.core.db import close_db, init_db
+
+_SELECTION_OPTIONS = ("since", "until", "event_type", "aggregate_id", "unpublished_only")
+
+
+def _timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _selection(args: argparse.Namespace) -> ReplaySelection:
+    return ReplaySelection(
+        until=args.until or datetime.now(timezone.utc),
+        since=args.since,
+        event_types=tuple(args.event_type),
+        aggregate_ids=tuple(args.aggregate_id),
+        unpublished_only=args.unpublished_only,
+    )
+
+
+async def main(args: argparse.Namespace):
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        checkpoint = ReplayCheckpoint.load(args.checkpoint)
+        selection = checkpoint.selection
+    else:
+        selection = _selection(args)
+        checkpoint = ReplayCheckpoint(args.checkpoint, selection) if args.checkpoint else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_db()
+    try:
+        summary = await replay_events(
+            selection, parallelism=args.parallelism, rate=args.rate, dry_run=args.dry_run,
+            checkpoint=checkpoint, fetch_size=args.fetch_size, stop=stop,
+        )
+    finally:
+        await close_db()
+
+    summary["selection"] = selection.to_json()
+    summary["interrupted"] = stop.is_set()
+    print(json.dumps(summary, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-dispatch outbox events through the consumer handlers.")
+    parser.add_argument("--since", type=_timestamp, help="Replay events created at or after this ISO time.")
+    parser.add_argument("--until", type=_timestamp, help="Replay events created before this ISO time (default: now).")
+    parser.add_argument("--event-type", action="append", default=[], help="Only this event type (repeatable).")
+    parser.add_argument("--aggregate-id", action="append", default=[], type=UUID, help="Only events of this aggregate (repeatable).")
+    parser.add_argument("--unpublished-only", action="store_true", help="Only events never published (e.g. out of attempts).")
+    parser.add_argument("--parallelism", type=int, default=REPLAY_PARALLELISM, help="Concurrent lanes per shard; one aggregate stays in one lane.")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max events dispatched per second over all shards (0 = unlimited).")
+    parser.add_argument("--fetch-size", type=int, default=REPLAY_FETCH_SIZE, help="Events read per cursor fetch.")
+    parser.add_argument("--checkpoint", help="JSON file recording progress; an existing one is resumed.")
+    parser.add_argument("--dry-run", action="store_true", help="Count the matching events per type without dispatching.")
+    args = parser.parse_args()
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        given = [f"--{name.replace('_', '-')}" for name in _SELECTION_OPTIONS if getattr(args, name)]
+        if given:
+            parser.error(f"{', '.join(given)} cannot be used when resuming {args.checkpoint} (its selection is stored in it).")
+    if args.parallelism < 1:
+        parser.error("--parallelism must be at least 1.")
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("event_replay").setLevel(logging.INFO)  # Progress lines
+    asyncio.run(main(parse_args()))
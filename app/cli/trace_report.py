@@ -0,0 +1,112 @@
+"""
+Stage-by-stage latency report over the span export written by app.core.tracing.
+
+    python -m app.cli.trace_report traces/api.jsonl traces/poller.jsonl
+    python -m app.cli.trace_report traces/*.jsonl --trace <request_id>
+
+Prints p50/p95/p99 per stage (HTTP request, queue wait per event type, handler per event
+type, and the DB time inside each), plus time-to-PREPARING: from the start of the request
+that placed the order to the end of the 'inventory.deducted.success.v1' handler.
+"""
+import argparse
+import json
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+PREPARING_STAGE = "handle inventory.deducted.success.v1"
+END_TO_END_STAGE = "order placed -> PREPARING"
+
+
+def load_spans(paths: List[str]) -> List[Dict[str, Any]]:
+    """Reads span files from every process (API, poller) into one list."""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    spans.append(json.loads(line))
+    return spans
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Groups spans by stage name and returns count, p50/p95/p99 duration and mean DB time per
+    stage, plus the END_TO_END_STAGE row for traces that reached PREPARING. Times in ms.
+    """
+    durations: Dict[str, List[float]] = defaultdict(list)
+    db_times: Dict[str, List[float]] = defaultdict(list)
+    roots: Dict[str, float] = {}
+    preparing_end: Dict[str, float] = {}
+
+    for s in spans:
+        durations[s["name"]].append(s["duration"])
+        if "db_seconds" in s:
+            db_times[s["name"]].append(s["db_seconds"])
+        if s.get("parent_id") is None and s["name"].startswith("http "):
+            roots[s["trace_id"]] = min(s["start"], roots.get(s["trace_id"], s["start"]))
+        if s["name"] == PREPARING_STAGE:
+            preparing_end[s["trace_id"]] = s["start"] + s["duration"]
+
+    for trace_id, end in preparing_end.items():
+        if trace_id in roots:
+            durations[END_TO_END_STAGE].append(end - roots[trace_id])
+
+    report = {}
+    for name, values in durations.items():
+        db = db_times.get(name)
+        report[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "db_mean_ms": (sum(db) / len(db) * 1000) if db else 0.0,
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]]):
+    print(f"{'stage':<55} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'db ms':>8}")
+    for name in sorted(report, key=lambda n: (n == END_TO_END_STAGE, n)):
+        r = report[name]
+        print(f"{name:<55} {r['count']:>7} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['db_mean_ms']:>8.2f}")
+
+
+def print_trace(spans: List[Dict[str, Any]], trace_id: str):
+    """Prints one trace's spans in start order, offset from the first span."""
+    own = sorted((s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start"])
+    if not own:
+        print(f"No spans for trace {trace_id}.")
+        return
+    t0 = own[0]["start"]
+    for s in own:
+        print(f"+{(s['start'] - t0) * 1000:>9.2f} ms  {s['duration'] * 1000:>9.2f} ms  "
+              f"db {s.get('db_seconds', 0.0) * 1000:>7.2f} ms  {s['name']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarize exported trace spans by stage.")
+    parser.add_argument("paths", nargs="+", help="JSON-lines span files (each process's TRACE_EXPORT_PATH).")
+    parser.add_argument("--trace", help="Print the timeline of a single trace / request_id instead.")
+    parser.add_argument("--json", action="store_true", help="Print the stage summary as JSON.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    spans = load_spans(args.paths)
+    if args.trace:
+        print_trace(spans, args.trace)
+    elif args.json:
+        print(json.dumps(summarize(spans), indent=2))
+    else:
+        print_report(summarize(spans))
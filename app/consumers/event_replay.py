@@ -0,0 +1,257 @@
+"""
+Event replay: re-dispatches selected outbox events through the consumers' handlers, for
+recovery after a consumer bug is fixed or to backfill a new consumer.
+
+- Selection by creation time, event type and aggregate (optionally only events that were
+  never published, e.g. those that exhausted MAX_ATTEMPTS), streamed in (created_at, id)
+  order (see hot_queries.stream_replay_events).
+- Events are spread over 'parallelism' lanes by aggregate_id: events of one order are
+  dispatched one after the other, in creation order, while different orders run
+  concurrently. A shared rate limit caps dispatches per second across lanes and shards.
+- Each shard is replayed concurrently, with its own lanes.
+- A checkpoint stores, per shard, the position before which every event has been handled,
+  so an interrupted run resumes without skipping any. Events finished ahead of that
+  position are dispatched again on resume; the handlers are idempotent.
+
+Replayed events are marked published on success; failures are reported and left as they
+were. Follow-up events emitted by the handlers go through the regular pollers.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from app.consumers.outbox_poller import mock_dispatch_event
+from app.core.config import REPLAY_CHECKPOINT_INTERVAL, REPLAY_FETCH_SIZE, REPLAY_PARALLELISM
+from app.core.db import shard_aliases, use_shard
+from app.core.hot_queries import PendingEvent, mark_event_published, stream_replay_events
+from app.events.outbox_utility import partition_key
+
+log = logging.getLogger("event_replay")
+
+Position = Tuple[datetime, UUID]
+
+# Failed event ids listed in the summary (the count is always complete)
+_MAX_REPORTED_FAILURES = 100
+
+
+@dataclass(frozen=True)
+class ReplaySelection:
+    """Which outbox events to replay: created in [since, until), narrowed by type and aggregate."""
+    until: datetime
+    since: Optional[datetime] = None
+    event_types: Tuple[str, ...] = ()
+    aggregate_ids: Tuple[UUID, ...] = ()
+    unpublished_only: bool = False
+
+    def to_json(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["until"] = self.until.isoformat()
+        data["since"] = self.since.isoformat() if self.since else None
+        data["event_types"] = list(self.event_types)
+        data["aggregate_ids"] = [str(a) for a in self.aggregate_ids]
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "ReplaySelection":
+        return cls(
+            until=datetime.fromisoformat(data["until"]),
+            since=datetime.fromisoformat(data["since"]) if data["since"] else None,
+            event_types=tuple(data["event_types"]),
+            aggregate_ids=tuple(UUID(a) for a in data["aggregate_ids"]),
+            unpublished_only=data["unpublished_only"],
+        )
+
+
+class ReplayCheckpoint:
+    """
+    Resume position of each shard for one selection, kept in a JSON file. The file is
+    written to a temporary name and renamed, so a crash never leaves it half written.
+    """
+
+    def __init__(self, path: str, selection: ReplaySelection, positions: Optional[Dict[str, Position]] = None):
+        self.path = path
+        self.selection = selection
+        self.positions: Dict[str, Position] = positions or {}
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayCheckpoint":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        positions = {
+            alias: (datetime.fromisoformat(p["created_at"]), UUID(p["id"]))
+            for alias, p in data["positions"].items()
+        }
+        return cls(path, ReplaySelection.from_json(data["selection"]), positions)
+
+    def save(self):
+        data = {
+            "selection": self.selection.to_json(),
+            "positions": {
+                alias: {"created_at": created_at.isoformat(), "id": str(event_id)}
+                for alias, (created_at, event_id) in self.positions.items()
+            },
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class _RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart (rate <= 0: no limit)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class _Watermark:
+    """
+    Tracks events in stream order and moves 'positions[alias]' to the last event before
+    which every event has finished (lanes finish out of order).
+    """
+
+    def __init__(self, alias: str, positions: Dict[str, Position]):
+        self.alias = alias
+        self.positions = positions
+        self._in_flight: Deque[PendingEvent] = deque()
+        self._finished: Set[UUID] = set()
+
+    def started(self, event: PendingEvent):
+        self._in_flight.append(event)
+
+    def finished(self, event: PendingEvent):
+        self._finished.add(event.id)
+        while self._in_flight and self._in_flight[0].id in self._finished:
+            head = self._in_flight.popleft()
+            self._finished.discard(head.id)
+            self.positions[self.alias] = (head.created_at, head.id)
+
+
+def _new_summary(dry_run: bool) -> Dict[str, Any]:
+    return {"dry_run": dry_run, "matched": 0, "replayed": 0, "failed": 0, "by_type": {}, "failed_event_ids": []}
+
+
+async def _lane(
+    queue: "asyncio.Queue[Optional[PendingEvent]]",
+    limiter: _RateLimiter,
+    watermark: _Watermark,
+    stop: asyncio.Event,
+    summary: Dict[str, Any],
+):
+    """
+    Dispatches the events of its aggregates in order until it receives None. Once 'stop'
+    is set, queued events are dropped (the checkpoint stays before them).
+    """
+    while (event := await queue.get()) is not None:
+        if stop.is_set():
+            continue
+        await limiter.wait()
+        try:
+            await mock_dispatch_event(event)
+            await mark_event_published(event.id)
+            summary["replayed"] += 1
+        except Exception as e:
+            summary["failed"] += 1
+            if len(summary["failed_event_ids"]) < _MAX_REPORTED_FAILURES:
+                summary["failed_event_ids"].append(str(event.id))
+            log.error("Replay of %s (%s) failed: %s", event.id, event.event_type, e)
+        watermark.finished(event)
+
+
+async def _replay_shard(
+    alias: str,
+    selection: ReplaySelection,
+    positions: Dict[str, Position],
+    parallelism: int,
+    limiter: _RateLimiter,
+    dry_run: bool,
+    fetch_size: int,
+    stop: asyncio.Event,
+    summary: Dict[str, Any],
+):
+    with use_shard(alias):
+        watermark = _Watermark(alias, positions)
+        # Bounded queues: the stream is read no further ahead than the lanes can absorb
+        queues = [asyncio.Queue(maxsize=fetch_size) for _ in range(parallelism)]
+        lanes = [asyncio.create_task(_lane(q, limiter, watermark, stop, summary)) for q in queues]
+        try:
+            stream = stream_replay_events(
+                selection.until, selection.since, selection.event_types, selection.aggregate_ids,
+                selection.unpublished_only, positions.get(alias), fetch_size,
+            )
+            async for events in stream:
+                for event in events:
+                    summary["matched"] += 1
+                    summary["by_type"][event.event_type] = summary["by_type"].get(event.event_type, 0) + 1
+                    if dry_run:
+                        continue
+                    watermark.started(event)
+                    # Same aggregate, same lane: its events are dispatched in creation order
+                    await queues[partition_key(event.aggregate_id or event.id) % parallelism].put(event)
+                if stop.is_set():
+                    await stream.aclose()
+                    break
+        finally:
+            for q in queues:
+                await q.put(None)
+            await asyncio.gather(*lanes)
+
+
+async def replay_events(
+    selection: ReplaySelection,
+    parallelism: int = REPLAY_PARALLELISM,
+    rate: float = 0.0,
+    dry_run: bool = False,
+    checkpoint: Optional[ReplayCheckpoint] = None,
+    fetch_size: int = REPLAY_FETCH_SIZE,
+    stop: Optional[asyncio.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Replays the selected events on every shard, resuming from 'checkpoint' (saved every
+    REPLAY_CHECKPOINT_INTERVAL seconds and at the end). Setting 'stop' ends the run once the
+    dispatches in progress finish; a dry run only counts what would be replayed.
+    Returns a summary: matched, replayed and failed counts, matches per event type and
+    the ids of failed events.
+    """
+    stop = stop or asyncio.Event()
+    positions = checkpoint.positions if checkpoint else {}
+    limiter = _RateLimiter(rate)
+    summary = _new_summary(dry_run)
+    started = time.perf_counter()
+
+    async def save_periodically():
+        while True:
+            await asyncio.sleep(REPLAY_CHECKPOINT_INTERVAL)
+            checkpoint.save()
+            log.info("Replay progress: %s replayed, %s failed (%.0f/s)", summary["replayed"], summary["failed"],
+                     summary["replayed"] / (time.perf_counter() - started))
+
+    saver = asyncio.create_task(save_periodically()) if checkpoint and not dry_run else None
+    try:
+        await asyncio.gather(*(
+            _replay_shard(alias, selection, positions, parallelism, limiter, dry_run, fetch_size, stop, summary)
+            for alias in shard_aliases()
+        ))
+    finally:
+        if saver is not None:
+            saver.cancel()
+            checkpoint.save()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
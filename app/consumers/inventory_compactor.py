@@ -0,0 +1,71 @@
+"""
+Inventory compactor: folds the ledger's uncompacted movements into the inventory rows.
+
+Deductions and restorations only append to inventory_movements, so an item's stock is its
+inventory row plus the sum of its uncompacted movements. Each pass moves that sum into the
+row and marks the movements compacted, keeping the pending set (and with it every stock
+read and deduction check) small. Compacted movements stay in the ledger as history.
+
+Runs as a background task of outbox poller worker 0.
+"""
+import asyncio
+import logging
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+from app.core.db import current_shard
+from app.core.config import INVENTORY_COMPACT_BATCH_SIZE, INVENTORY_COMPACT_INTERVAL
+from app.core.hot_queries import claim_movements, fetch_pending_items, lock_inventory, save_inventory_levels
+
+log = logging.getLogger("inventory_compactor")
+
+
+async def compact_batch(batch_size: int = INVENTORY_COMPACT_BATCH_SIZE) -> int:
+    """
+    Folds the pending movements of up to 'batch_size' items into their inventory rows in one
+    short transaction. Returns the number of items compacted.
+    """
+    async with in_transaction(current_shard()) as conn:
+        menu_item_ids = await fetch_pending_items(batch_size, conn)
+        if not menu_item_ids:
+            return 0
+
+        # Same rows and lock order as deductions: a deduction never sees a movement both in
+        # the snapshot and in the pending sum
+        inv_map = await lock_inventory(menu_item_ids, conn)
+        claimed = await claim_movements(menu_item_ids, conn)
+
+        compacted = []
+        for mid, qty in claimed.items():
+            inv = inv_map.get(mid)
+            if inv:  # Movements of an item without an inventory row have nothing to fold into
+                inv.available_qty += qty
+                compacted.append(inv)
+        await save_inventory_levels(compacted, timezone.now(), conn)
+
+    return len(menu_item_ids)
+
+
+async def compact_inventory(batch_size: int = INVENTORY_COMPACT_BATCH_SIZE) -> int:
+    """Compacts batch by batch until no movements are pending. Returns the number of items compacted."""
+    total = 0
+    while True:
+        compacted = await compact_batch(batch_size)
+        total += compacted
+        if compacted < batch_size:
+            return total
+
+
+async def run_inventory_compactor(stop: asyncio.Event, interval: float = INVENTORY_COMPACT_INTERVAL):
+    """Compaction loop; returns once 'stop' is set (never in the middle of a batch)."""
+    log.info("Inventory compactor started (every %ss).", interval)
+    while not stop.is_set():
+        try:
+            compacted = await compact_inventory()
+            if compacted:
+                log.debug("Compacted ledger movements of %s items.", compacted)
+        except Exception as e:
+            log.error(f"Inventory compactor encountered an error: {e}.")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -1,19 +1,22 @@
 import asyncio
 import logging
+import time
+from tortoise import timezone
 from tortoise.transactions import in_transaction
-from app.models.inventory import Inventory
-from app.models.processed_event import ProcessedEvent
+from app.core.db import current_shard, is_lock_conflict, retry_on_lock_conflict
+from app.core.metrics import INVENTORY_LOCK_WAIT
+from app.core.hot_queries import InventoryRow, lock_inventory, movements_recorded, order_cancelled, order_deducted, pending_movements, record_movements
 from app.events.outbox_utility import create_outbox_event
-from typing import Dict, Any
+from app.services.sales_service import record_order_cancellation, record_order_sale
+from typing import Any, Dict, List
 from uuid import UUID
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 log = logging.getLogger("inventory_consumer")
 
-async def check_for_low_stock(inventory: Inventory, order_id: UUID, conn: Any):
+async def check_for_low_stock(inventory: InventoryRow, order_id: UUID, conn: Any):
     """Checks if current stock is below threshold and emits an alert if so."""
     if inventory.available_qty <= inventory.threshold_qty:
-        log.warning(f"ALERT: Low stock detected for Item {inventory.menu_item_id}! Qty: {inventory.available_qty}")
+        log.warning("ALERT: Low stock detected for Item %s! Qty: %s", inventory.menu_item_id, inventory.available_qty)
         # Emit a low stock event (e.g., for notification service)
         await create_outbox_event(
             aggregate_type="inventory", 
@@ -29,96 +32,131 @@ async def check_for_low_stock(inventory: Inventory, order_id: UUID, conn: Any):
         )
 
 
+async def _deduct_inventory(order_id: UUID, event_payload: Dict[str, Any], event_id_str: str):
+    """One deduction transaction; re-run from scratch when aborted by a lock conflict."""
+    items = event_payload.get("items", [])
+    async with in_transaction(current_shard()) as conn:
+        menu_item_ids = [UUID(item["menu_item_id"]) for item in items]
+
+        # CRITICAL: Lock rows for atomicity and consistency
+        # This prevents two concurrent consumers from checking the same stock level before
+        # recording their deductions. Rows are always locked in menu_item_id order, so orders
+        # with overlapping items queue behind each other instead of deadlocking.
+        started = time.perf_counter()
+        inv_map = await lock_inventory(menu_item_ids, conn)
+        INVENTORY_LOCK_WAIT.observe(time.perf_counter() - started, "deduct")
+
+        # Idempotency Check (under the lock, so a concurrent redelivery sees our movements)
+        if await movements_recorded(event_id_str, conn):
+            return False
+        # Cancelled before this (possibly retried) deduction ran: the cancellation restored nothing
+        if await order_cancelled(order_id, conn):
+            log.info("Order %s was cancelled before its deduction; no stock taken", order_id)
+            return False
+
+        # Stock is the locked snapshot plus the movements not compacted into it yet
+        pending = await pending_movements(menu_item_ids, conn)
+        deltas: Dict[str, int] = {}
+        for item in items:
+            mid = item["menu_item_id"]
+            qty = item["quantity"]
+            inv = inv_map.get(mid)
+            available = inv.available_qty + pending.get(mid, 0) - deltas.get(mid, 0) if inv else 0
+
+            # Check for item existence and quantity
+            if not inv or available < qty:
+                raise ValueError(f"Insufficient inventory: {mid}. Requested: {qty}, Available: {available}")
+            deltas[mid] = deltas.get(mid, 0) + qty
+
+        # One batched INSERT of the ledger rows (the inventory rows themselves are not rewritten)
+        await record_movements(event_id_str, order_id, {mid: -qty for mid, qty in deltas.items()}, "order.placed.v1", timezone.now(), conn)
+        for mid, qty in deltas.items():
+            inv = inv_map[mid]
+            inv.available_qty += pending.get(mid, 0) - qty
+            await check_for_low_stock(inv, order_id, conn)
+
+        # Count the sale in the hourly rollups (last, so their row locks are held briefly)
+        await record_order_sale(event_payload, conn)
+
+        # Emit Success Event
+        await create_outbox_event(
+            aggregate_type="order", aggregate_id=order_id,
+            event_type="inventory.deducted.success.v1", payload={"order_id": str(order_id)},
+            conn=conn
+        )
+    return True
+
+
 async def handle_order_placed(event_payload: Dict[str, Any], event_id: UUID):
     """
     Consumer logic for 'order.placed.v1'. Attempts to deduct inventory.
-    (Slow Path: Ensures ACID compliance with row locking).
+    (Slow Path: Ensures ACID compliance with row locking; the deduction itself is a ledger insert).
     """
     order_id = UUID(event_payload.get("order_id"))
-    items = event_payload.get("items", [])
     event_id_str = str(event_id)
     
-    log.info(f"\n--- Worker: DEDUCTING for Order {order_id} ---")
+    log.info("Worker: DEDUCTING for Order %s", order_id)
 
     try:
-        # Idempotency Check
-        if await ProcessedEvent.filter(event_id=event_id_str).exists():
-            return
-
-        async with in_transaction() as conn:
-            menu_item_ids = [UUID(item["menu_item_id"]) for item in items]
-            
-            # CRITICAL: Lock rows for atomicity and consistency
-            # This prevents two concurrent consumers from reading the same stock level
-            # before writing the updated level.
-            
-            locked_inventories = await Inventory.filter(menu_item_id__in=menu_item_ids).using_db(conn).select_for_update()
-            inv_map = {str(inv.menu_item_id): inv for inv in locked_inventories}
-            
-            for item in items:
-                mid = item["menu_item_id"]
-                qty = item["quantity"]
-                inv = inv_map.get(mid)
-                
-                # Check for item existence and quantity
-                if not inv or inv.available_qty < qty:
-                    raise ValueError(f"Insufficient inventory: {mid}. Requested: {qty}, Available: {inv.available_qty if inv else 0}")
-                
-                inv.available_qty -= qty
-                await inv.save(update_fields=['available_qty', 'updated_at'], using_db=conn)
-                await check_for_low_stock(inv, order_id, conn)
-
-            await ProcessedEvent.create(event_id=event_id_str, using_db=conn)
-            
-            # Emit Success Event
-            await create_outbox_event(
-                aggregate_type="order", aggregate_id=order_id,
-                event_type="inventory.deducted.success.v1", payload={"order_id": str(order_id)},
-                conn=conn
-            )
-            log.info(f"SUCCESS: Inventory deducted for Order {order_id}")
+        if await retry_on_lock_conflict("inventory_deduct", lambda: _deduct_inventory(order_id, event_payload, event_id_str)):
+            log.info("SUCCESS: Inventory deducted for Order %s", order_id)
 
     except Exception as e:
+        if is_lock_conflict(e):
+            # Still contended after the retries: the order is valid, so leave the event
+            # to the poller's retry instead of cancelling it
+            log.warning("Inventory deduction for Order %s kept hitting lock conflicts; event will be retried.", order_id)
+            raise
         # Emit Failure Event (requires order cancellation)
         await create_outbox_event(
             aggregate_type="order", aggregate_id=order_id,
             event_type="order.cancellation.required.v1", payload={"order_id": str(order_id), "reason": str(e)},
         )
-        log.error(f"FAILURE: Inventory deduction failed for Order {order_id}. Reason: {e}")
+        log.error("FAILURE: Inventory deduction failed for Order %s. Reason: %s", order_id, e)
+
+
+async def _restore_inventory(order_id: UUID, event_payload: Dict[str, Any], event_id_str: str):
+    """
+    Appends the restoring movements in one statement, then corrects the sales rollups. The
+    ledger's unique (event_id, menu_item_id) makes a redelivered event insert nothing (and
+    correct nothing).
+
+    An order whose deduction failed (or has not run yet) took no stock and was never counted
+    as a sale, so its cancellation appends zero-quantity movements instead: they restore
+    nothing, and tell a retried deduction to skip the order. The items' inventory rows are
+    locked as in the deduction, so the two serialize and each sees the other's movements.
+    """
+    deltas: Dict[str, int] = {}
+    for item in event_payload.get("items", []):
+        deltas[item["menu_item_id"]] = deltas.get(item["menu_item_id"], 0) + item["quantity"]
+    async with in_transaction(current_shard()) as conn:
+        started = time.perf_counter()
+        await lock_inventory([UUID(mid) for mid in deltas], conn)
+        INVENTORY_LOCK_WAIT.observe(time.perf_counter() - started, "restore")
+        deducted = await order_deducted(order_id, conn)
+        if not deducted:
+            log.info("Order %s never took stock; nothing to restore", order_id)
+            deltas = {mid: 0 for mid in deltas}
+        if await record_movements(event_id_str, order_id, deltas, "order.cancelled.v1", timezone.now(), conn) and deducted:
+            await record_order_cancellation(event_payload, conn)
+
 
 async def handle_order_cancelled(event_payload: Dict[str, Any], event_id: UUID):
     """
-    Consumer logic for 'order.cancelled.v1'. Restores inventory.
-    (Slow Path: Ensures ACID compliance with row locking).
+    Consumer logic for 'order.cancelled.v1'. Restores inventory by appending to the ledger.
     """
     order_id = UUID(event_payload.get("order_id"))
-    items = event_payload.get("items", [])
     event_id_str = str(event_id)
 
-    log.info(f"\n--- Worker: RESTORING for Order {order_id} ---")
+    log.info("Worker: RESTORING for Order %s", order_id)
 
     try:
-        # Idempotency Check
-        if await ProcessedEvent.filter(event_id=event_id_str).exists():
-            return
-
-        async with in_transaction() as conn:
-            menu_item_ids = [UUID(item["menu_item_id"]) for item in items]
-            
-            # CRITICAL: Lock rows to ensure consistent increment
-            locked_inventories = await Inventory.filter(menu_item_id__in=menu_item_ids).using_db(conn).select_for_update()
-            inv_map = {str(inv.menu_item_id): inv for inv in locked_inventories}
-
-            for item in items:
-                mid = item["menu_item_id"]
-                qty = item["quantity"]
-                inv = inv_map.get(mid)
-                if inv:
-                    inv.available_qty += qty
-                    await inv.save(update_fields=['available_qty', 'updated_at'], using_db=conn)
-
-            await ProcessedEvent.create(event_id=event_id_str, using_db=conn)
-            log.info(f"SUCCESS: Inventory restored for Order {order_id}")
+        await retry_on_lock_conflict("inventory_restore", lambda: _restore_inventory(order_id, event_payload, event_id_str))
+        log.info("SUCCESS: Inventory restored for Order %s", order_id)
 
     except Exception as e:
-        log.error(f"CRITICAL ERROR: Failed to restore inventory for {order_id}: {e}")
\ No newline at end of file
+        if is_lock_conflict(e):
+            # Re-raised so the poller retries the event; swallowing it would lose the stock
+            log.warning("Inventory restoration for Order %s kept hitting lock conflicts; event will be retried.", order_id)
+            raise
+        log.error("CRITICAL ERROR: Failed to restore inventory for %s: %s", order_id, e)
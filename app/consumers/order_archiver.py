@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from datetime import timedelta
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.archive import ArchivedOrder, ArchivedOrderItem
+from app.core.db import current_shard, init_db, shard_aliases, use_shard
+from app.core.config import ARCHIVE_AFTER_DAYS, ARCHIVE_CHUNK_SIZE, ARCHIVE_CHUNK_PAUSE, ARCHIVE_INTERVAL
+from app.core.logs import setup_logging
+
+log = logging.getLogger("order_archiver")
+
+FINALIZED_STATUSES = [OrderStatus.DELIVERED, OrderStatus.CANCELLED]
+
+
+async def archive_chunk(cutoff, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+    """
+    Moves one bounded chunk of finalized orders (and their items) older than 'cutoff'
+    into the archive tables. Returns the number of orders moved.
+    (Short transaction: rows locked by live traffic are skipped, not waited on.)
+    """
+    async with in_transaction(current_shard()) as conn:
+        orders = await (
+            Order.filter(status__in=FINALIZED_STATUSES, updated_at__lt=cutoff)
+            .order_by("updated_at")
+            .limit(chunk_size)
+            .using_db(conn)
+            .select_for_update(skip_locked=True)
+        )
+        if not orders:
+            return 0
+
+        order_ids = [o.id for o in orders]
+        items = await OrderItem.filter(order_id__in=order_ids).using_db(conn)
+
+        # 1. Copy into cold storage with multi-row INSERTs
+        await ArchivedOrder.bulk_create(
+            [
+                ArchivedOrder(
+                    id=o.id,
+                    user_id=o.user_id,
+                    restaurant_id=o.restaurant_id,
+                    status=o.status,
+                    total_amount=o.total_amount,
+                    created_at=o.created_at,
+                    updated_at=o.updated_at
+                )
+                for o in orders
+            ],
+            using_db=conn
+        )
+        await ArchivedOrderItem.bulk_create(
+            [
+                ArchivedOrderItem(
+                    id=i.id,
+                    order_id=i.order_id,
+                    menu_item_id=i.menu_item_id,
+                    quantity=i.quantity,
+                    unit_price=i.unit_price,
+                    line_total=i.line_total
+                )
+                for i in items
+            ],
+            using_db=conn
+        )
+
+        # 2. Remove from the hot tables (children first)
+        await OrderItem.filter(order_id__in=order_ids).using_db(conn).delete()
+        await Order.filter(id__in=order_ids).using_db(conn).delete()
+
+    return len(order_ids)
+
+
+async def archive_finalized_orders(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    chunk_size: int = ARCHIVE_CHUNK_SIZE,
+    pause: float = ARCHIVE_CHUNK_PAUSE
+) -> int:
+    """Archives all eligible orders chunk by chunk. Returns the total number of orders moved."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    total = 0
+
+    while True:
+        moved = await archive_chunk(cutoff, chunk_size)
+        total += moved
+        if moved < chunk_size:
+            break
+        await asyncio.sleep(pause)
+
+    return total
+
+
+async def start_order_archiver():
+    """Main loop for the archiver service."""
+    setup_logging()
+    await init_db()
+    log.info("--- Order Archiver Service Started ---")
+
+    while True:
+        # One archiver for all shards, one shard after the other
+        for shard in shard_aliases():
+            try:
+                with use_shard(shard):
+                    moved = await archive_finalized_orders()
+                if moved:
+                    log.info("Archived %s finalized orders older than %s days on shard %s.", moved, ARCHIVE_AFTER_DAYS, shard)
+            except Exception as e:
+                log.error("Archiver encountered an error on shard %s: %s.", shard, e)
+
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(start_order_archiver())
+    except KeyboardInterrupt:
+        log.error("Archiver service stopped.")
@@ -1,13 +1,14 @@
 import asyncio
 import logging
+from tortoise import timezone
 from tortoise.transactions import in_transaction
+from app.core.db import current_shard
+from app.core.hot_queries import event_processed, record_processed_event
 from app.models.order import Order, OrderStatus
-from app.models.processed_event import ProcessedEvent
 from app.events.outbox_utility import create_outbox_event
 from typing import Dict, Any
 from uuid import UUID
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 log = logging.getLogger("order_status_consumer")
 
 async def handle_inventory_success(event_payload: Dict[str, Any], event_id: UUID):
@@ -18,30 +19,30 @@ async def handle_inventory_success(event_payload: Dict[str, Any], event_id: UUID
     order_id = UUID(event_payload.get("order_id"))
     event_id_str = str(event_id)
 
-    log.info(f"\n--- Worker: UPDATING STATUS for Order {order_id} to PREPARING ---")
+    log.info("Worker: UPDATING STATUS for Order %s to PREPARING", order_id)
     
     try:
         # Idempotency Check
-        if await ProcessedEvent.filter(event_id=event_id_str).exists():
-            log.info(f"Idempotency: Event {event_id_str} already processed.")
+        if await event_processed(event_id_str):
+            log.info("Idempotency: Event %s already processed.", event_id_str)
             return
 
-        async with in_transaction() as conn:
+        async with in_transaction(current_shard()) as conn:
             order = await Order.get_or_none(id=order_id).using_db(conn)
             if not order:
-                log.info(f"Order {order_id} not found.")
+                log.info("Order %s not found.", order_id)
                 return
 
             # Only update if still in the initial PLACED state
             if order.status == OrderStatus.PLACED:
                 order.status = OrderStatus.PREPARING
                 await order.save(update_fields=['status', 'updated_at'], using_db=conn)
-                log.info(f"Status UPDATE: Order {order_id} moved to PREPARING.")
+                log.info("Status UPDATE: Order %s moved to PREPARING.", order_id)
                 
-            await ProcessedEvent.create(event_id=event_id_str, using_db=conn)
-            log.info(f"Event {event_id_str} marked as processed.")
+            await record_processed_event(event_id_str, timezone.now(), conn)
+            log.info("Event %s marked as processed.", event_id_str)
     except Exception as e:
-        log.error(f"Error handling Inventory Success for Order {order_id}: {e}")
+        log.error("Error handling Inventory Success for Order %s: %s", order_id, e)
 
 async def handle_cancellation_required(event_payload: Dict[str, Any], event_id: UUID):
     """
@@ -51,27 +52,27 @@ async def handle_cancellation_required(event_payload: Dict[str, Any], event_id:
     order_id = UUID(event_payload.get("order_id"))
     event_id_str = str(event_id)
     reason = event_payload.get("reason", "Inventory check failed.")
-    log.info(f"\n--- Worker: CANCELLING Order {order_id} ---")
+    log.info("Worker: CANCELLING Order %s", order_id)
     
     try:
         # Idempotency Check
-        if await ProcessedEvent.filter(event_id=event_id_str).exists():
-            log.info(f"Idempotency: Event {event_id_str} already processed.")
+        if await event_processed(event_id_str):
+            log.info("Idempotency: Event %s already processed.", event_id_str)
             return
 
-        async with in_transaction() as conn:
+        async with in_transaction(current_shard()) as conn:
             order = await Order.get_or_none(id=order_id).using_db(conn)
             if not order:
-                log.error(f"Order {order_id} not found.")
+                log.error("Order %s not found.", order_id)
                 return
             
             # Only update if the order isn't already finalized or cancelled
             if order.status in [OrderStatus.PLACED, OrderStatus.PREPARING]:
                 order.status = OrderStatus.CANCELLED
                 await order.save(update_fields=['status', 'updated_at'], using_db=conn)
-                log.error(f"Status UPDATE: Order {order_id} automatically CANCELLED due to: {reason}")
+                log.error("Status UPDATE: Order %s automatically CANCELLED due to: %s", order_id, reason)
                 
-            await ProcessedEvent.create(event_id=event_id_str, using_db=conn)
+            await record_processed_event(event_id_str, timezone.now(), conn)
             
     except Exception as e:
-        log.error(f"Error handling Cancellation for Order {order_id}: {e}")
\ No newline at end of file
+        log.error("Error handling Cancellation for Order %s: %s", order_id, e)
\ No newline at end of file
@@ -1,18 +1,33 @@
 import asyncio
 import logging
+import signal
+from contextlib import suppress
 from app.models.outbox import OutboxEvent
 # Import all handler functions
 from app.consumers.inventory_consumer import handle_order_placed, handle_order_cancelled
 from app.consumers.order_status_consumer import handle_inventory_success, handle_cancellation_required
-from app.core.db import init_db
-from app.core.config import POLLING_INTERVAL, MAX_ATTEMPTS, BATCH_SIZE
+from app.consumers.inventory_compactor import run_inventory_compactor
+from app.core.db import init_db, close_db, shard_aliases, use_shard
+from app.core.hot_queries import PendingEvent, fetch_pending_events, increment_event_attempts, mark_event_published
+from app.core.config import (
+    POLLING_INTERVAL, MAX_ATTEMPTS, BATCH_SIZE, OUTBOX_STATS_INTERVAL, POLLER_METRICS_PORT,
+    OUTBOX_PARTITIONS, POLLER_WORKER_INDEX, POLLER_WORKER_COUNT, POLLER_SHARD_INDEX, INVENTORY_COMPACT_INTERVAL
+)
+from app.core.metrics import (
+    POLL_BATCH_SIZE, DISPATCH_LATENCY, DISPATCH_FAILURES, OUTBOX_BACKLOG, OUTBOX_OLDEST_AGE, serve_metrics
+)
+from app.core.logs import setup_logging, shutdown_logging
+from app.core.tracing import consume_event, run_trace_exporter
+from app.core.profiling import install_profile_signal, run_loop_monitor
+from app.events.outbox_utility import partition_range
+from tortoise import timezone
+import time
 import traceback
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from typing import Tuple
 
 log = logging.getLogger("outbox_poller")
 
-async def mock_dispatch_event(event: OutboxEvent):
+async def mock_dispatch_event(event: PendingEvent):
     """
     Routes an OutboxEvent to the correct business logic handler.
     This simulates a message broker (like Kafka/RabbitMQ) dispatcher.
@@ -21,7 +36,7 @@ async def mock_dispatch_event(event: OutboxEvent):
     event_id = event.id
     payload = event.payload
     
-    log.info(f"Poller DISPATCHING: {event_type} (ID: {event_id.hex[:8]}...)")
+    log.info("Poller DISPATCHING: %s (ID: %s)", event_type, event_id)
 
     # Routing based on event type
     if event_type == "order.placed.v1":
@@ -42,55 +57,118 @@ async def mock_dispatch_event(event: OutboxEvent):
         
     elif event_type == "order.status_changed.v1":
         # Consumer N: Notification/Analytics/External System (Simulated here)
-        log.info(f"EXTERNAL NOTIFICATION: Order {payload.get('order_id')} status updated to {payload.get('new_status')}")
+        log.info("EXTERNAL NOTIFICATION: Order %s status updated to %s", payload.get('order_id'), payload.get('new_status'))
 
     elif event_type == "inventory.low_stock_alert.v1":
         # Consumer N: Alerting System (Simulated here)
-        log.info(f"!!! SYSTEM ALERT !!! Item {payload.get('menu_item_id')} has low stock ({payload.get('available_qty')} remaining).")
+        log.info("!!! SYSTEM ALERT !!! Item %s has low stock (%s remaining).", payload.get('menu_item_id'), payload.get('available_qty'))
+
+    elif event_type == "inventory.restocked.v1":
+        # Consumer N: Catalog/Storefront sync (Simulated here)
+        log.info("RESTOCK: Item %s now has %s available (%s).", payload.get('menu_item_id'), payload.get('available_qty'), payload.get('source'))
         
     else:
-        log.info(f"WARNING: No handler found for event type: {event_type}")
+        log.info("WARNING: No handler found for event type: %s", event_type)
 
-async def poll_outbox_for_new_events():
+async def poll_outbox_for_new_events(partitions: Tuple[int, int] = (0, OUTBOX_PARTITIONS)) -> int:
     """
     Queries the Outbox table for unpublished events and attempts to dispatch them.
+    Only events whose partition_key is in this poller's [start, end) range are taken.
+    Returns the number of events fetched.
     """
     # Select events that haven't been published and haven't exceeded max attempts
-    events = await OutboxEvent.filter(published=False, attempts__lt=MAX_ATTEMPTS).limit(BATCH_SIZE).order_by('created_at')
+    events = await fetch_pending_events(MAX_ATTEMPTS, BATCH_SIZE, partitions)
+    POLL_BATCH_SIZE.observe(len(events))
     
     if not events:
-        return
+        return 0
 
     for event in events:
+        started = time.perf_counter()
         try:
-            # 1. Dispatch the event (calls the business logic handler)
-            await mock_dispatch_event(event)
+            # 1. Dispatch the event (calls the business logic handler) inside the producer's trace
+            with consume_event(event.event_type, event.id, event.trace_context, event.created_at.timestamp()):
+                await mock_dispatch_event(event)
+            DISPATCH_LATENCY.observe(time.perf_counter() - started, event.event_type)
             
             # 2. Mark the event as published on success
-            event.published = True
-            await event.save(update_fields=['published'])
+            await mark_event_published(event.id)
 
         except Exception:
             # 3. Increment attempts on failure and save
-            event.attempts += 1
-            await event.save(update_fields=['attempts'])
+            DISPATCH_FAILURES.inc(event.event_type)
+            await increment_event_attempts(event.id)
             traceback.print_exc()
+    return len(events)
+
+async def update_backlog_metrics(partitions: Tuple[int, int] = (0, OUTBOX_PARTITIONS)):
+    """Refreshes the outbox backlog depth and the age of the oldest unpublished event (own partitions)."""
+    pending = OutboxEvent.filter(
+        published=False, attempts__lt=MAX_ATTEMPTS, partition_key__gte=partitions[0], partition_key__lt=partitions[1]
+    )
+    OUTBOX_BACKLOG.set(await pending.count())
+    oldest = await pending.order_by('created_at').first().values_list('created_at', flat=True)
+    OUTBOX_OLDEST_AGE.set((timezone.now() - oldest).total_seconds() if oldest else 0.0)
             
 async def start_outbox_poller():
-    """Main loop for the poller service."""
+    """
+    Main loop for the poller service, draining the outbox of shard POLLER_SHARD_INDEX. On
+    SIGTERM / SIGINT the batch in flight is finished (no event is left dispatched but
+    unmarked), spans are flushed and the process exits.
+    """
+    setup_logging() # Records are written off the event loop
+    partitions = partition_range(POLLER_WORKER_INDEX, POLLER_WORKER_COUNT)
     await init_db()
-    log.info("--- Outbox Poller Service Started ---")
+    shard = shard_aliases()[POLLER_SHARD_INDEX]
+    # Handlers and the compactor started below inherit this poller's shard
+    with use_shard(shard):
+        if POLLER_METRICS_PORT:
+            await serve_metrics("0.0.0.0", POLLER_METRICS_PORT)
+            log.info("Poller metrics exposed on :%s/metrics", POLLER_METRICS_PORT)
+        exporter_task = asyncio.create_task(run_trace_exporter()) # Flush spans to TRACE_EXPORT_PATH
+        monitor_task = asyncio.create_task(run_loop_monitor()) # Event-loop lag; logs the stack of stalls
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        install_profile_signal(f"poller-{POLLER_SHARD_INDEX}-{POLLER_WORKER_INDEX}") # kill -USR1 <pid>: profile into PROFILE_DIR
+        # One compactor per shard's fleet: folds the inventory ledger into the stock rows
+        compactor_task = None
+        if POLLER_WORKER_INDEX == 0 and INVENTORY_COMPACT_INTERVAL > 0:
+            compactor_task = asyncio.create_task(run_inventory_compactor(stop))
+        log.info("--- Outbox Poller Service Started (shard %s, worker %s/%s, partitions %s-%s) ---", shard, POLLER_WORKER_INDEX + 1, POLLER_WORKER_COUNT, partitions[0], partitions[1] - 1)
     
-    while True:
-        try:
-            await poll_outbox_for_new_events()
-        except Exception as e:
-            log.error(f"Poller encountered a critical DB error: {e}.")
-            
-        await asyncio.sleep(POLLING_INTERVAL)
+        stats_due = 0.0
+        while not stop.is_set():
+            fetched = 0
+            try:
+                fetched = await poll_outbox_for_new_events(partitions)
+                if time.monotonic() >= stats_due:
+                    await update_backlog_metrics(partitions)
+                    stats_due = time.monotonic() + OUTBOX_STATS_INTERVAL
+            except Exception as e:
+                log.error("Poller encountered a critical DB error: %s.", e)
+
+            if fetched >= BATCH_SIZE:
+                continue # Backlog: fetch the next batch right away
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=POLLING_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+        log.info("Poller draining: in-flight batch finished, shutting down.")
+        if compactor_task is not None:
+            await compactor_task # Returns after its current batch
+        monitor_task.cancel()
+        exporter_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await monitor_task
+        with suppress(asyncio.CancelledError):
+            await exporter_task # Flushes the remaining spans
+    await close_db()
+    log.info("Poller service stopped.")
+    shutdown_logging()
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(start_outbox_poller())
-    except KeyboardInterrupt:
-        log.error("Poller service stopped.")
\ No newline at end of file
+    asyncio.run(start_outbox_poller())
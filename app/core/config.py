@@ -3,6 +3,21 @@ import os
 # Database Configuration
 # Uses default credentials for local Docker Compose setup
 DB_URL = os.getenv("DATABASE_URL", "postgres://user:password@db:5432/eatclub_db")
+DB_READ_URL = os.getenv("DATABASE_READ_URL", "") # Read-only replica for hot GETs (empty = read from the primary)
+
+# Horizontal Sharding by restaurant_id (DATABASE_URL is shard 0 and holds the shard directory)
+DB_SHARD_URLS = [url.strip() for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()] # Shards 1..N-1, comma-separated (empty = one database)
+SHARD_DIRECTORY_CACHE_SIZE = int(os.getenv("SHARD_DIRECTORY_CACHE_SIZE", 100000)) # Restaurant -> shard entries kept in process (LRU)
+
+# Connection Pool Configuration (Postgres; query parameters in the URL take precedence)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2)) # Connections opened at startup per process and alias
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20)) # Upper bound per process and alias (keep above ADMISSION_MAX_INFLIGHT / workers)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256)) # Prepared statements cached per connection
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 10)) # Seconds before a single statement is abandoned
+DB_POOL_MAX_IDLE_LIFETIME = float(os.getenv("DB_POOL_MAX_IDLE_LIFETIME", 300)) # Idle connections closed after N seconds
+DB_READ_AFTER_WRITE_WINDOW = float(os.getenv("DB_READ_AFTER_WRITE_WINDOW", 5)) # Seconds reads of a just-written entity stay on the primary
+DB_CONFLICT_RETRIES = int(os.getenv("DB_CONFLICT_RETRIES", 3)) # Re-runs of a transaction aborted by a deadlock or lock conflict
+DB_CONFLICT_BACKOFF = float(os.getenv("DB_CONFLICT_BACKOFF", 0.02)) # Base seconds of the jittered exponential backoff between re-runs
 
 # Application Metadata
 PROJECT_NAME = "Realtime Order Management System"
@@ -11,4 +26,92 @@ VERSION = "1.0.0"
 # Outbox Poller Configuration (Simulates the Consumer/Worker)
 POLLING_INTERVAL = int(os.getenv("POLLING_INTERVAL", 1)) # Poller checks for new events every N seconds
 MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", 5)) # Max retries for an event
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", 50)) # How many events to fetch per poll
\ No newline at end of file
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 50)) # How many events to fetch per poll
+OUTBOX_STATS_INTERVAL = float(os.getenv("OUTBOX_STATS_INTERVAL", 5)) # Seconds between outbox backlog/lag metric refreshes
+POLLER_METRICS_PORT = int(os.getenv("POLLER_METRICS_PORT", 9100)) # Poller /metrics port (0 disables)
+OUTBOX_PARTITIONS = 1024 # Fixed hash buckets of aggregate_id stored on each outbox event (do not change on a live DB)
+POLLER_WORKER_INDEX = int(os.getenv("POLLER_WORKER_INDEX", 0)) # This poller's slot (0-based) among POLLER_WORKER_COUNT
+POLLER_WORKER_COUNT = int(os.getenv("POLLER_WORKER_COUNT", 1)) # Pollers splitting the partition range between them
+POLLER_SHARD_INDEX = int(os.getenv("POLLER_SHARD_INDEX", 0)) # Database shard whose outbox this poller drains
+OUTBOX_PAYLOAD_ENCODING = os.getenv("OUTBOX_PAYLOAD_ENCODING", "binary") # "binary" (compact, payload_bin) or "json" (readable, payload); readers handle both
+OUTBOX_PAYLOAD_COMPRESS_THRESHOLD = int(os.getenv("OUTBOX_PAYLOAD_COMPRESS_THRESHOLD", 512)) # Binary payloads above N bytes are zlib-compressed (0 disables)
+
+# Event Replay / Backfill Configuration (python -m app.cli.replay_events)
+REPLAY_PARALLELISM = int(os.getenv("REPLAY_PARALLELISM", 16)) # Concurrent dispatch lanes per shard (events of one aggregate share a lane)
+REPLAY_FETCH_SIZE = int(os.getenv("REPLAY_FETCH_SIZE", 1000)) # Events read per cursor fetch / page
+REPLAY_CHECKPOINT_INTERVAL = float(os.getenv("REPLAY_CHECKPOINT_INTERVAL", 2.0)) # Seconds between checkpoint file writes
+
+# Process Supervisor Configuration (python -m app.serve)
+SERVE_API_WORKERS = int(os.getenv("SERVE_API_WORKERS", os.cpu_count() or 1)) # API worker processes sharing the listening socket
+SERVE_POLLER_WORKERS = int(os.getenv("SERVE_POLLER_WORKERS", 1)) # Outbox poller processes per shard, each owning a partition range
+SERVE_DRAIN_TIMEOUT = float(os.getenv("SERVE_DRAIN_TIMEOUT", 30)) # Seconds children get to finish in-flight work after SIGTERM
+SERVE_RESTART_BACKOFF_MAX = float(os.getenv("SERVE_RESTART_BACKOFF_MAX", 30)) # Max seconds between restarts of a crash-looping worker
+
+# Batch Ingestion Configuration (Aggregator Partners)
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", 500)) # Max orders accepted per POST /orders:batch call
+STATUS_BATCH_MAX_SIZE = int(os.getenv("STATUS_BATCH_MAX_SIZE", 1000)) # Max transitions accepted per PATCH /orders/status:batch call
+
+# Idempotency-Key Configuration (Order Placement Retries)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400)) # How long a stored response can be replayed
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000)) # Entries kept in the in-process LRU
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10)) # Max wait on a duplicate held by another process
+IDEMPOTENCY_CLAIM_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_CLAIM_LEASE_SECONDS", 60)) # A claim with no response after N seconds is stale (its holder died) and may be taken over
+IDEMPOTENCY_CLEANUP_INTERVAL = int(os.getenv("IDEMPOTENCY_CLEANUP_INTERVAL", 300)) # Seconds between expired-key purges
+
+# Order Archival Configuration (Cold Storage)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 30)) # Finalized orders untouched for N days are archived
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", 500)) # Orders moved per short transaction
+ARCHIVE_CHUNK_PAUSE = float(os.getenv("ARCHIVE_CHUNK_PAUSE", 0.1)) # Seconds between chunks to yield to live traffic
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", 3600)) # Seconds between archival runs
+
+# Inventory Ledger Compaction (runs in outbox poller worker 0)
+INVENTORY_COMPACT_INTERVAL = float(os.getenv("INVENTORY_COMPACT_INTERVAL", 1.0)) # Seconds between compaction passes (0 disables)
+INVENTORY_COMPACT_BATCH_SIZE = int(os.getenv("INVENTORY_COMPACT_BATCH_SIZE", 200)) # Items folded into their snapshot per short transaction
+
+# Bulk Inventory Import Configuration
+INVENTORY_IMPORT_CHUNK_SIZE = int(os.getenv("INVENTORY_IMPORT_CHUNK_SIZE", 1000)) # Rows written per multi-row upsert transaction
+
+# Stock Snapshot Configuration (Multi-item Inventory Reads)
+STOCK_SNAPSHOT_MAX_STALENESS = float(os.getenv("STOCK_SNAPSHOT_MAX_STALENESS", 1.0)) # Max age (seconds) of snapshot data served to readers
+STOCK_SNAPSHOT_OVERLAP = float(os.getenv("STOCK_SNAPSHOT_OVERLAP", 5.0)) # Seconds re-read behind the watermark to catch late commits
+INVENTORY_MULTI_GET_MAX = int(os.getenv("INVENTORY_MULTI_GET_MAX", 500)) # Max menu_item_ids per multi-get request
+
+# Restaurant Menu Cache Configuration
+MENU_CATALOG_TTL = float(os.getenv("MENU_CATALOG_TTL", 30)) # Max seconds a cached menu is served before re-reading the catalog
+MENU_GZIP_MIN_BYTES = int(os.getenv("MENU_GZIP_MIN_BYTES", 1024)) # Menus at least this large also get a pre-compressed copy
+
+# Sales Analytics Configuration (Hourly Rollups)
+ANALYTICS_DEFAULT_RANGE_HOURS = int(os.getenv("ANALYTICS_DEFAULT_RANGE_HOURS", 24)) # Window reported when no 'start' is given
+ANALYTICS_MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", 92)) # Longest window one analytics request may cover
+
+# End-to-end Tracing Configuration
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "") # JSON-lines file spans are appended to (empty disables export)
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", 2.0)) # Seconds between span buffer flushes
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0)) # Fraction of new traces whose spans are exported
+
+# Admission Control Configuration (Order Placement Overload Protection, 0 disables a limit)
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", 1.0)) # Sustained orders/second allowed per user
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", 5)) # Orders a user may place back to back
+ADMISSION_RESTAURANT_RATE = float(os.getenv("ADMISSION_RESTAURANT_RATE", 20.0)) # Sustained orders/second allowed per restaurant
+ADMISSION_RESTAURANT_BURST = float(os.getenv("ADMISSION_RESTAURANT_BURST", 100)) # Orders a restaurant may receive back to back
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", 64)) # Concurrent placement transactions per API process
+ADMISSION_BACKLOG_HIGH_WATERMARK = int(os.getenv("ADMISSION_BACKLOG_HIGH_WATERMARK", 5000)) # Shed new orders above this outbox backlog
+ADMISSION_BACKLOG_REFRESH = float(os.getenv("ADMISSION_BACKLOG_REFRESH", 1.0)) # Seconds between outbox backlog reads
+ADMISSION_SHARED_LIMITS = os.getenv("ADMISSION_SHARED_LIMITS", "false").lower() == "true" # Keep token buckets in the DB (shared by all API processes)
+ADMISSION_BUCKET_CACHE_SIZE = int(os.getenv("ADMISSION_BUCKET_CACHE_SIZE", 100000)) # In-process buckets kept (LRU)
+
+# Logging Configuration (app.core.logs)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO") # Root log level
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json") # 'json' (one object per line) or 'text'
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "") # Per-logger INFO/DEBUG sample rates, e.g. 'outbox_poller=0.1,orders_api=0.1'
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", 200)) # Max INFO/DEBUG records per second per logger (0 disables)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000)) # Records buffered for the writer thread before new ones are dropped
+
+# Event-loop Monitoring & Profiling (app.core.profiling, API and poller)
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", 0.1)) # Seconds between event-loop heartbeats (0 disables the lag monitor)
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", 0.25)) # Loop blocked this many seconds: the running stack is logged
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles") # Directory sampling profiles (collapsed stacks) are written to
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005)) # Seconds between stack samples while profiling
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60)) # Longest profile one request may capture
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", 10)) # Profile length captured on SIGUSR1 (poller)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "") # X-Admin-Token required by /api/v1/admin endpoints (empty disables them)
@@ -1,5 +1,31 @@
-from tortoise import Tortoise
-from app.core.config import DB_URL
+import asyncio
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from tortoise import Tortoise, connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.backends.base.config_generator import expand_db_url
+from tortoise.transactions import in_transaction
+from app.core.config import (
+    DB_URL,
+    DB_READ_URL,
+    DB_SHARD_URLS,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_COMMAND_TIMEOUT,
+    DB_POOL_MAX_IDLE_LIFETIME,
+    DB_READ_AFTER_WRITE_WINDOW,
+    DB_CONFLICT_RETRIES,
+    DB_CONFLICT_BACKOFF,
+)
+from app.core.metrics import DB_LOCK_CONFLICTS, install_db_instrumentation
+from app.core.migrations import check_schema_version
 import logging
 from logging import INFO
 
@@ -12,18 +38,75 @@ MODELS_MODULES = [
     "app.models.inventory",
     "app.models.outbox",
     "app.models.processed_event",
+    "app.models.idempotency",
+    "app.models.archive",
+    "app.models.rate_limit",
+    "app.models.sales",
+    "app.models.shard",
 ]
 
-async def init_db():
-    """Initializes the Tortoise ORM connection and generates schemas."""
+# Connection aliases: all writes go to the primary, hot GETs may use the replica. With
+# sharding, the primary is shard 0 and shards 1..N-1 are 'shard1', 'shard2', ...
+PRIMARY = "default"
+REPLICA = "replica"
+SHARD_PREFIX = "shard"
+
+# Tables that stay on shard 0 whatever shard is current: the shard directory and state
+# keyed by user or request rather than by restaurant
+GLOBAL_TABLES = {"restaurant_shards", "idempotency_keys", "rate_limit_buckets"}
+
+_POSTGRES_ENGINES = ("tortoise.backends.asyncpg", "tortoise.backends.psycopg")
+
+
+def _connection_config(db_url: str) -> Dict[str, Any]:
+    """Expands a DB URL and applies the configured pool settings (Postgres only)."""
+    config = expand_db_url(db_url)
+    if config["engine"] in _POSTGRES_ENGINES:
+        credentials = config["credentials"]
+        # Explicit query parameters in the URL win over the environment defaults
+        credentials.setdefault("minsize", DB_POOL_MIN_SIZE)
+        credentials.setdefault("maxsize", DB_POOL_MAX_SIZE)
+        credentials.setdefault("statement_cache_size", DB_STATEMENT_CACHE_SIZE)
+        credentials.setdefault("command_timeout", DB_COMMAND_TIMEOUT)
+        credentials.setdefault("max_inactive_connection_lifetime", DB_POOL_MAX_IDLE_LIFETIME)
+    return config
+
+
+def tortoise_config(db_url: str = DB_URL, read_url: str = DB_READ_URL, shard_urls: Sequence[str] = DB_SHARD_URLS) -> Dict[str, Any]:
+    """
+    Tortoise config with the primary and, when configured, a read-only replica alias and
+    one alias per additional shard (routed by ShardRouter).
+    """
+    db_connections = {PRIMARY: _connection_config(db_url)}
+    if read_url:
+        db_connections[REPLICA] = _connection_config(read_url)
+    for index, url in enumerate(shard_urls, start=1):
+        db_connections[f"{SHARD_PREFIX}{index}"] = _connection_config(url)
+    config = {
+        "connections": db_connections,
+        "apps": {"models": {"models": MODELS_MODULES, "default_connection": PRIMARY}},
+    }
+    if shard_urls:
+        config["routers"] = ["app.core.db.ShardRouter"]
+    return config
+
+
+async def init_db(check_schema: bool = True):
+    """
+    Initializes the Tortoise ORM connections and verifies the schema version.
+    Schema changes are applied separately by 'python -m app.cli.migrate'.
+    """
     try:
-        await Tortoise.init(
-            db_url=DB_URL,
-            modules={"models": MODELS_MODULES},
-        )
-        # Generate the database schema (create tables)
-        await Tortoise.generate_schemas()
-        print("Database connection established and schemas generated.")
+        # Global fallback: uvicorn runs the lifespan in its own task, so request tasks
+        # would not see a context bound only there
+        await Tortoise.init(config=tortoise_config(), _enable_global_fallback=True)
+        # Count and time every statement for /metrics
+        install_db_instrumentation()
+        if check_schema:
+            # One SELECT per shard instead of DDL introspection on every worker boot
+            for alias in shard_aliases():
+                await check_schema_version(connections.get(alias))
+        print("Database connection established.")
     except Exception as e:
         print(f"FATAL ERROR: Could not connect to database at {DB_URL}. Error: {e}")
         # Re-raise to prevent the application from starting without a database
@@ -32,4 +115,166 @@ async def init_db():
 async def close_db():
     """Closes all database connections."""
     await Tortoise.close_connections()
-    print("Database connections closed.")
\ No newline at end of file
+    print("Database connections closed.")
+
+# ----------- Read routing (replica with read-after-write on the primary) -----------
+
+# Entity key -> monotonic deadline until which reads of it stay on the primary
+_recent_writes: "OrderedDict[str, float]" = OrderedDict()
+
+
+def mark_written(*keys: str):
+    """
+    Records that this process just wrote the given entities (e.g. 'order:<id>'), so reads of
+    them use the primary for DB_READ_AFTER_WRITE_WINDOW seconds, until the replica caught up.
+    """
+    if not keys or not DB_READ_AFTER_WRITE_WINDOW:
+        return
+    now = time.monotonic()
+    deadline = now + DB_READ_AFTER_WRITE_WINDOW
+    for key in keys:
+        _recent_writes[key] = deadline
+        _recent_writes.move_to_end(key)
+    # Deadlines are in insertion order, so expired entries are at the front
+    while _recent_writes and next(iter(_recent_writes.values())) <= now:
+        _recent_writes.popitem(last=False)
+
+
+def _replica_configured() -> bool:
+    try:
+        return REPLICA in connections.db_config
+    except RuntimeError:
+        return False  # ORM not initialized
+
+
+def read_connection(key: Optional[str] = None, consistent: bool = False) -> Optional[BaseDBAsyncClient]:
+    """
+    Connection for a read-only query: the replica when one is configured, unless the caller
+    asks for a consistent read or 'key' was written by this process moments ago. None means
+    the primary (of the current shard; only shard 0 has a replica).
+    """
+    if consistent or current_shard() != PRIMARY or not _replica_configured():
+        return None
+    deadline = _recent_writes.get(key) if key else None
+    if deadline is not None and deadline > time.monotonic():
+        return None
+    return connections.get(REPLICA)
+
+
+# ----------- Shard routing (restaurant-scoped data on one of N databases) -----------
+
+# Shard of the request or event being handled; PRIMARY (shard 0) unless set by use_shard
+_current_shard: ContextVar[str] = ContextVar("db_shard", default=PRIMARY)
+
+
+def shard_aliases() -> List[str]:
+    """Connection aliases of all shards in index order: [PRIMARY, 'shard1', ...]."""
+    try:
+        configured = connections.db_config
+    except RuntimeError:
+        return [PRIMARY]  # ORM not initialized
+    shards = [alias for alias in configured if alias.startswith(SHARD_PREFIX) and alias[len(SHARD_PREFIX):].isdigit()]
+    return [PRIMARY, *sorted(shards, key=lambda alias: int(alias[len(SHARD_PREFIX):]))]
+
+
+def current_shard() -> str:
+    """Alias of the shard this task works on (PRIMARY outside any use_shard block)."""
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(alias: str) -> Iterator[str]:
+    """
+    Runs the block against one shard: ORM queries without an explicit connection, the hot
+    queries and 'in_transaction(current_shard())' all go to 'alias'. Tasks started inside
+    the block inherit it.
+    """
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+@asynccontextmanager
+async def shard_transaction(alias: str) -> AsyncIterator[BaseDBAsyncClient]:
+    """A transaction on shard 'alias', with the block running under use_shard(alias)."""
+    with use_shard(alias):
+        async with in_transaction(alias) as conn:
+            yield conn
+
+
+class ShardRouter:
+    """
+    Tortoise router (installed when shards are configured): sends ORM queries that do not
+    pass a connection to the current shard, except for GLOBAL_TABLES, which stay on shard 0.
+    """
+
+    def _route(self, model) -> Optional[str]:
+        alias = _current_shard.get()
+        if alias == PRIMARY or model._meta.db_table in GLOBAL_TABLES:
+            return None  # The models' default connection
+        return alias
+
+    def db_for_read(self, model) -> Optional[str]:
+        return self._route(model)
+
+    def db_for_write(self, model) -> Optional[str]:
+        return self._route(model)
+
+
+# ----------- Lock conflicts (deadlocks, serialization failures) -----------
+
+T = TypeVar("T")
+
+# Postgres SQLSTATEs of a transaction aborted over locks: deadlock, serialization failure, lock timeout
+_CONFLICT_SQLSTATES = {"40P01", "40001", "55P03"}
+
+
+def is_lock_conflict(exc: Optional[BaseException]) -> bool:
+    """
+    True when 'exc' aborted a transaction because of lock contention: a Postgres deadlock,
+    serialization failure or lock timeout, or SQLite's 'database is locked'. Tortoise wraps
+    driver errors, so the wrapped exception (args / __cause__ / __context__) is checked too.
+    """
+    seen = set()
+    pending = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if getattr(current, "sqlstate", None) in _CONFLICT_SQLSTATES:
+            return True
+        if isinstance(current, sqlite3.OperationalError) and "locked" in str(current):
+            return True
+        pending.extend(arg for arg in current.args if isinstance(arg, BaseException))
+        pending.extend((current.__cause__, current.__context__))
+    return False
+
+
+async def retry_on_lock_conflict(
+    operation: str,
+    run: Callable[[], Awaitable[T]],
+    retries: int = DB_CONFLICT_RETRIES,
+    backoff: float = DB_CONFLICT_BACKOFF,
+) -> T:
+    """
+    Awaits 'run()' (which must open its own transaction, so a re-run starts clean) and re-runs
+    it when the transaction is aborted by a lock conflict, at most 'retries' more times with
+    jittered exponential backoff. Any other error, and the last conflict, propagate.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await run()
+        except Exception as e:
+            if not is_lock_conflict(e):
+                raise
+            if attempt >= retries:
+                DB_LOCK_CONFLICTS.inc(operation, "exhausted")
+                raise
+            DB_LOCK_CONFLICTS.inc(operation, "retried")
+            # Jitter keeps the transactions that just collided from colliding again
+            await asyncio.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
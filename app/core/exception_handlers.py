@@ -1,14 +1,15 @@
 import uuid
 import traceback
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from app.core.responses import ORJSONResponse
+from app.core.tracing import current_trace_id
 from fastapi.exceptions import RequestValidationError
 
 
 # Generate a clean request id for every response
 def _rid():
-    """Generates a unique request ID for tracing."""
-    return uuid.uuid4().hex
+    """Generates a unique request ID for tracing (the current trace id when there is one)."""
+    return current_trace_id() or uuid.uuid4().hex
 
 
 # ----------- Exception Handlers (called by FastAPI) -----------
@@ -24,7 +25,8 @@ def http_exception_handler(request: Request, exc: HTTPException):
         "request_id": _rid(),
     }
     # Note: No need for 'async' since no awaitable operations are performed inside.
-    return JSONResponse(status_code=exc.status_code, content=body)
+    # Headers such as Retry-After (429) are passed through
+    return ORJSONResponse(status_code=exc.status_code, content=body, headers=getattr(exc, "headers", None))
 
 
 def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -39,7 +41,7 @@ def validation_exception_handler(request: Request, exc: RequestValidationError):
         "request_id": _rid(),
     }
     # Note: No need for 'async' since no awaitable operations are performed inside.
-    return JSONResponse(status_code=422, content=body)
+    return ORJSONResponse(status_code=422, content=body)
 
 
 def generic_exception_handler(request: Request, exc: Exception):
@@ -58,7 +60,7 @@ def generic_exception_handler(request: Request, exc: Exception):
         },
         "request_id": _rid(),
     }
-    return JSONResponse(status_code=500, content=body)
+    return ORJSONResponse(status_code=500, content=body)
 
 
 # ----------- Registration Function -----------
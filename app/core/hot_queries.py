@@ -0,0 +1,536 @@
+"""
+Raw-SQL fast path for the hottest statements.
+
+The menu lookup in place_order, the inventory lock and ledger writes in the inventory
+consumer, the processed-event check and insert in the order status consumer and the
+outbox poll run on every order. Going through Tortoise costs
+query building and a full model instance per row on each call; here each statement is
+fixed SQL text run straight on the driver connection and rows come back as small
+'__slots__' records.
+
+On Postgres the SQL text is constant (id lists are bound as one array parameter), so
+asyncpg's per-connection statement cache (DB_STATEMENT_CACHE_SIZE) prepares each statement
+once per connection and reuses it. SQLite (tests, benchmarks) runs the equivalent SQL.
+Statements are still counted and timed for /metrics and tracing.
+"""
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.core.config import OUTBOX_PARTITIONS
+from app.core.db import current_shard
+from app.core.metrics import observe_query
+from app.events.payload_codec import LazyPayload
+
+
+# ----------- Records -----------
+
+class MenuRow:
+    __slots__ = ("id", "price")
+
+    def __init__(self, id: UUID, price: Decimal):
+        self.id = id
+        self.price = price
+
+
+class InventoryRow:
+    __slots__ = ("id", "menu_item_id", "available_qty", "threshold_qty")
+
+    def __init__(self, id: UUID, menu_item_id: UUID, available_qty: int, threshold_qty: int):
+        self.id = id
+        self.menu_item_id = menu_item_id
+        self.available_qty = available_qty
+        self.threshold_qty = threshold_qty
+
+
+class StockRow:
+    """Effective stock of an item: its inventory snapshot plus the uncompacted ledger movements."""
+    __slots__ = ("menu_item_id", "restaurant_id", "available_qty", "threshold_qty", "updated_at")
+
+    def __init__(self, menu_item_id: UUID, restaurant_id: UUID, available_qty: int, threshold_qty: int, updated_at: datetime):
+        self.menu_item_id = menu_item_id
+        self.restaurant_id = restaurant_id
+        self.available_qty = available_qty
+        self.threshold_qty = threshold_qty
+        self.updated_at = updated_at
+
+
+class PendingEvent:
+    """
+    An OutboxEvent as read by the poller (or the replay, which also needs its aggregate).
+    The payload is only decoded when a handler reads it.
+    """
+    __slots__ = ("id", "event_type", "payload", "attempts", "created_at", "trace_context", "aggregate_id")
+
+    def __init__(
+        self,
+        id: UUID,
+        event_type: str,
+        payload: Mapping[str, Any],
+        attempts: int,
+        created_at: datetime,
+        trace_context: Optional[Dict[str, Any]],
+        aggregate_id: Optional[UUID] = None,
+    ):
+        self.id = id
+        self.event_type = event_type
+        self.payload = payload
+        self.attempts = attempts
+        self.created_at = created_at
+        self.trace_context = trace_context
+        self.aggregate_id = aggregate_id
+
+
+# ----------- Statements -----------
+
+@dataclass(frozen=True)
+class _Statement:
+    postgres: str
+    sqlite: str  # Numbered '?N' parameters; id lists are bound as a JSON array
+
+
+MENU_FOR_ORDER = _Statement(
+    "SELECT r.is_active, m.id, m.price FROM restaurants r "
+    "LEFT JOIN menu_items m ON m.restaurant_id = r.id AND m.is_active AND m.id = ANY($2::uuid[]) "
+    "WHERE r.id = $1",
+    "SELECT r.is_active, m.id, m.price FROM restaurants r "
+    "LEFT JOIN menu_items m ON m.restaurant_id = r.id AND m.is_active AND m.id IN (SELECT value FROM json_each(?2)) "
+    "WHERE r.id = ?1",
+)
+LOCK_INVENTORY = _Statement(
+    "SELECT id, menu_item_id, available_qty, threshold_qty FROM inventory "
+    "WHERE menu_item_id = ANY($1::uuid[]) ORDER BY menu_item_id FOR UPDATE",
+    "SELECT id, menu_item_id, available_qty, threshold_qty FROM inventory "
+    "WHERE menu_item_id IN (SELECT value FROM json_each(?1)) ORDER BY menu_item_id",
+)
+SAVE_INVENTORY_LEVEL = _Statement(
+    "UPDATE inventory SET available_qty = $2, updated_at = $3 WHERE id = $1",
+    "UPDATE inventory SET available_qty = ?2, updated_at = ?3 WHERE id = ?1",
+)
+PENDING_EVENTS = _Statement(
+    "SELECT id, event_type, payload, payload_bin, attempts, created_at, trace_context FROM outbox_events "
+    "WHERE published = FALSE AND attempts < $1 AND partition_key >= $3 AND partition_key < $4 "
+    "ORDER BY created_at LIMIT $2",
+    "SELECT id, event_type, payload, payload_bin, attempts, created_at, trace_context FROM outbox_events "
+    "WHERE published = 0 AND attempts < ?1 AND partition_key >= ?3 AND partition_key < ?4 "
+    "ORDER BY created_at LIMIT ?2",
+)
+MARK_PUBLISHED = _Statement(
+    "UPDATE outbox_events SET published = TRUE WHERE id = $1",
+    "UPDATE outbox_events SET published = 1 WHERE id = ?1",
+)
+INCREMENT_ATTEMPTS = _Statement(
+    "UPDATE outbox_events SET attempts = attempts + 1 WHERE id = $1",
+    "UPDATE outbox_events SET attempts = attempts + 1 WHERE id = ?1",
+)
+# Replay selection in (created_at, id) order, resumable after a position. NULL parameters
+# disable their filter; SQLite reads it in pages of LIMIT rows, Postgres through a cursor.
+REPLAY_EVENTS = _Statement(
+    "SELECT id, event_type, payload, payload_bin, attempts, created_at, trace_context, aggregate_id FROM outbox_events "
+    "WHERE ($1::timestamptz IS NULL OR created_at >= $1) AND created_at < $2 "
+    "AND ($3::text[] IS NULL OR event_type = ANY($3)) AND ($4::uuid[] IS NULL OR aggregate_id = ANY($4)) "
+    "AND (NOT $5::boolean OR published = FALSE) "
+    "AND ($6::timestamptz IS NULL OR (created_at, id) > ($6, $7::uuid)) "
+    "ORDER BY created_at, id LIMIT $8",
+    "SELECT id, event_type, payload, payload_bin, attempts, created_at, trace_context, aggregate_id FROM outbox_events "
+    "WHERE (?1 IS NULL OR created_at >= ?1) AND created_at < ?2 "
+    "AND (?3 IS NULL OR event_type IN (SELECT value FROM json_each(?3))) "
+    "AND (?4 IS NULL OR aggregate_id IN (SELECT value FROM json_each(?4))) "
+    "AND (NOT ?5 OR published = 0) "
+    "AND (?6 IS NULL OR (created_at, id) > (?6, ?7)) "
+    "ORDER BY created_at, id LIMIT ?8",
+)
+
+# Inventory ledger. Uncompacted movements are always filtered with 'compacted = FALSE', the
+# predicate of the partial index idx_inventory_movements_pending.
+MOVEMENTS_RECORDED = _Statement(
+    "SELECT 1 FROM inventory_movements WHERE event_id = $1 LIMIT 1",
+    "SELECT 1 FROM inventory_movements WHERE event_id = ?1 LIMIT 1",
+)
+ORDER_DEDUCTED = _Statement(
+    "SELECT 1 FROM inventory_movements WHERE order_id = $1 AND reason = 'order.placed.v1' LIMIT 1",
+    "SELECT 1 FROM inventory_movements WHERE order_id = ?1 AND reason = 'order.placed.v1' LIMIT 1",
+)
+ORDER_CANCELLED = _Statement(
+    "SELECT 1 FROM inventory_movements WHERE order_id = $1 AND reason = 'order.cancelled.v1' LIMIT 1",
+    "SELECT 1 FROM inventory_movements WHERE order_id = ?1 AND reason = 'order.cancelled.v1' LIMIT 1",
+)
+PENDING_MOVEMENTS = _Statement(
+    "SELECT menu_item_id, SUM(qty) FROM inventory_movements "
+    "WHERE compacted = FALSE AND menu_item_id = ANY($1::uuid[]) GROUP BY menu_item_id",
+    "SELECT menu_item_id, SUM(qty) FROM inventory_movements "
+    "WHERE compacted = FALSE AND menu_item_id IN (SELECT value FROM json_each(?1)) GROUP BY menu_item_id",
+)
+ALL_PENDING_MOVEMENTS = _Statement(
+    "SELECT menu_item_id, SUM(qty), MAX(created_at) FROM inventory_movements "
+    "WHERE compacted = FALSE GROUP BY menu_item_id",
+    "SELECT menu_item_id, SUM(qty), MAX(created_at) FROM inventory_movements "
+    "WHERE compacted = FALSE GROUP BY menu_item_id",
+)
+RECORD_MOVEMENTS = _Statement(
+    "INSERT INTO inventory_movements (event_id, menu_item_id, order_id, qty, reason, compacted, created_at) "
+    "SELECT $1, m.menu_item_id, $2, m.qty, $3, FALSE, $4 FROM unnest($5::uuid[], $6::int[]) AS m(menu_item_id, qty) "
+    "ON CONFLICT (event_id, menu_item_id) DO NOTHING RETURNING menu_item_id",
+    # 'WHERE true' lets SQLite parse ON CONFLICT after INSERT ... SELECT
+    "INSERT INTO inventory_movements (event_id, menu_item_id, order_id, qty, reason, compacted, created_at) "
+    "SELECT ?1, i.value, ?2, CAST(q.value AS INTEGER), ?3, FALSE, ?4 FROM json_each(?5) i JOIN json_each(?6) q ON q.key = i.key "
+    "WHERE true ON CONFLICT (event_id, menu_item_id) DO NOTHING RETURNING menu_item_id",
+)
+PENDING_ITEMS = _Statement(
+    "SELECT DISTINCT menu_item_id FROM inventory_movements WHERE compacted = FALSE LIMIT $1",
+    "SELECT DISTINCT menu_item_id FROM inventory_movements WHERE compacted = FALSE LIMIT ?1",
+)
+CLAIM_MOVEMENTS = _Statement(
+    "UPDATE inventory_movements SET compacted = TRUE "
+    "WHERE compacted = FALSE AND menu_item_id = ANY($1::uuid[]) RETURNING menu_item_id, qty",
+    "UPDATE inventory_movements SET compacted = TRUE "
+    "WHERE compacted = FALSE AND menu_item_id IN (SELECT value FROM json_each(?1)) RETURNING menu_item_id, qty",
+)
+
+# Consumer idempotency of the order status handlers
+EVENT_PROCESSED = _Statement(
+    "SELECT 1 FROM processed_events WHERE event_id = $1 LIMIT 1",
+    "SELECT 1 FROM processed_events WHERE event_id = ?1 LIMIT 1",
+)
+RECORD_PROCESSED_EVENT = _Statement(
+    "INSERT INTO processed_events (id, event_id, created_at) VALUES ($1, $2, $3)",
+    "INSERT INTO processed_events (id, event_id, created_at) VALUES (?1, ?2, ?3)",
+)
+
+# Sales rollups: counters are added to the row of their (restaurant | item, hour)
+_ADD_COUNTERS = (
+    "orders = {t}.orders + EXCLUDED.orders, units = {t}.units + EXCLUDED.units, "
+    "revenue = {money}({t}.revenue + EXCLUDED.revenue{places}), "
+    "cancelled_orders = {t}.cancelled_orders + EXCLUDED.cancelled_orders, "
+    "cancelled_units = {t}.cancelled_units + EXCLUDED.cancelled_units, "
+    "cancelled_revenue = {money}({t}.cancelled_revenue + EXCLUDED.cancelled_revenue{places})"
+)
+# SQLite keeps decimals as text and adds them as floats: round back to cents
+_PG_COUNTERS = dict(money="", places="")
+_SQLITE_COUNTERS = dict(money="ROUND", places=", 2")
+UPSERT_RESTAURANT_SALES = _Statement(
+    "INSERT INTO sales_hourly_restaurants (restaurant_id, hour, orders, units, revenue, cancelled_orders, cancelled_units, cancelled_revenue) "
+    "VALUES ($1, $2, $3, $4, $5, $6, $7, $8) ON CONFLICT (restaurant_id, hour) DO UPDATE SET "
+    + _ADD_COUNTERS.format(t="sales_hourly_restaurants", **_PG_COUNTERS),
+    "INSERT INTO sales_hourly_restaurants (restaurant_id, hour, orders, units, revenue, cancelled_orders, cancelled_units, cancelled_revenue) "
+    "VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8) ON CONFLICT (restaurant_id, hour) DO UPDATE SET "
+    + _ADD_COUNTERS.format(t="sales_hourly_restaurants", **_SQLITE_COUNTERS),
+)
+UPSERT_MENU_ITEM_SALES = _Statement(
+    "INSERT INTO sales_hourly_menu_items (menu_item_id, restaurant_id, hour, orders, units, revenue, cancelled_orders, cancelled_units, cancelled_revenue) "
+    "VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) ON CONFLICT (menu_item_id, hour) DO UPDATE SET "
+    + _ADD_COUNTERS.format(t="sales_hourly_menu_items", **_PG_COUNTERS),
+    "INSERT INTO sales_hourly_menu_items (menu_item_id, restaurant_id, hour, orders, units, revenue, cancelled_orders, cancelled_units, cancelled_revenue) "
+    "VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9) ON CONFLICT (menu_item_id, hour) DO UPDATE SET "
+    + _ADD_COUNTERS.format(t="sales_hourly_menu_items", **_SQLITE_COUNTERS),
+)
+
+# Effective stock in one statement, so a concurrent compaction is seen entirely or not at all
+_STOCK_COLUMNS = (
+    "SELECT i.menu_item_id, m.restaurant_id, i.available_qty, i.threshold_qty, i.updated_at, "
+    "(SELECT SUM(v.qty) FROM inventory_movements v WHERE v.menu_item_id = i.menu_item_id AND v.compacted = FALSE), "
+    "(SELECT MAX(v.created_at) FROM inventory_movements v WHERE v.menu_item_id = i.menu_item_id AND v.compacted = FALSE) "
+    "FROM inventory i JOIN menu_items m ON m.id = i.menu_item_id "
+)
+STOCK_FOR_ITEMS = _Statement(
+    _STOCK_COLUMNS + "WHERE i.menu_item_id = ANY($1::uuid[])",
+    _STOCK_COLUMNS + "WHERE i.menu_item_id IN (SELECT value FROM json_each(?1))",
+)
+STOCK_FOR_RESTAURANT = _Statement(
+    _STOCK_COLUMNS + "WHERE m.restaurant_id = $1",
+    _STOCK_COLUMNS + "WHERE m.restaurant_id = ?1",
+)
+
+
+# ----------- Execution -----------
+
+def _client(conn: Optional[BaseDBAsyncClient]) -> BaseDBAsyncClient:
+    return conn if conn is not None else connections.get(current_shard())
+
+
+def _is_postgres(client: BaseDBAsyncClient) -> bool:
+    return client.capabilities.dialect == "postgres"
+
+
+def _sqlite_param(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return json.dumps([str(v) for v in value])
+    if isinstance(value, (UUID, datetime, Decimal)):
+        return str(value)  # Same text forms Tortoise writes
+    return value
+
+
+async def _fetch(statement: _Statement, args: Sequence[Any], conn: Optional[BaseDBAsyncClient]) -> List[Sequence[Any]]:
+    client = _client(conn)
+    postgres = _is_postgres(client)
+    start = time.perf_counter()
+    try:
+        async with client.acquire_connection() as raw:
+            if postgres:
+                return await raw.fetch(statement.postgres, *args)
+            return await raw.execute_fetchall(statement.sqlite, [_sqlite_param(a) for a in args])
+    finally:
+        observe_query("query", time.perf_counter() - start, statement.postgres if postgres else statement.sqlite)
+
+
+async def _execute_many(statement: _Statement, rows: List[Sequence[Any]], conn: Optional[BaseDBAsyncClient]):
+    if not rows:
+        return
+    client = _client(conn)
+    postgres = _is_postgres(client)
+    start = time.perf_counter()
+    try:
+        async with client.acquire_connection() as raw:
+            if postgres:
+                await raw.executemany(statement.postgres, rows)
+            else:
+                await raw.executemany(statement.sqlite, [[_sqlite_param(a) for a in row] for row in rows])
+    finally:
+        observe_query("many", time.perf_counter() - start, statement.postgres if postgres else statement.sqlite)
+
+
+def _uuid(value: Any) -> UUID:
+    return value if isinstance(value, UUID) else UUID(value)
+
+
+def _json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def _datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+# ----------- Queries -----------
+
+async def fetch_order_menu(
+    restaurant_id: UUID,
+    menu_item_ids: Iterable[UUID],
+    conn: Optional[BaseDBAsyncClient] = None
+) -> Tuple[Optional[bool], Dict[str, MenuRow]]:
+    """
+    One round trip for place_order: whether the restaurant is active (None if it does not
+    exist) and its active menu items among 'menu_item_ids', keyed by id string.
+    """
+    rows = await _fetch(MENU_FOR_ORDER, (restaurant_id, list(menu_item_ids)), conn)
+    if not rows:
+        return None, {}
+    menu = {}
+    for _, menu_item_id, price in rows:
+        if menu_item_id is not None:
+            menu_id = _uuid(menu_item_id)
+            menu[str(menu_id)] = MenuRow(menu_id, Decimal(str(price)))
+    return bool(rows[0][0]), menu
+
+
+async def lock_inventory(menu_item_ids: Iterable[UUID], conn: BaseDBAsyncClient) -> Dict[str, InventoryRow]:
+    """
+    Locks the inventory rows of the given items, keyed by menu item id string. Rows are locked
+    in menu_item_id order, so transactions over overlapping items wait instead of deadlocking.
+    """
+    rows = await _fetch(LOCK_INVENTORY, (list(menu_item_ids),), conn)
+    locked = {}
+    for id, menu_item_id, available_qty, threshold_qty in rows:
+        inv = InventoryRow(_uuid(id), _uuid(menu_item_id), available_qty, threshold_qty)
+        locked[str(inv.menu_item_id)] = inv
+    return locked
+
+
+async def save_inventory_levels(rows: List[InventoryRow], updated_at: datetime, conn: BaseDBAsyncClient):
+    """Writes the new available_qty of each (locked) row in one batched statement."""
+    await _execute_many(SAVE_INVENTORY_LEVEL, [(r.id, r.available_qty, updated_at) for r in rows], conn)
+
+
+async def fetch_pending_events(
+    max_attempts: int,
+    limit: int,
+    partitions: Tuple[int, int] = (0, OUTBOX_PARTITIONS),
+    conn: Optional[BaseDBAsyncClient] = None
+) -> List[PendingEvent]:
+    """Oldest unpublished outbox events still under 'max_attempts' in the [start, end) partition range."""
+    rows = await _fetch(PENDING_EVENTS, (max_attempts, limit, partitions[0], partitions[1]), conn)
+    return [
+        PendingEvent(_uuid(id), event_type, LazyPayload(payload, payload_bin), attempts, _datetime(created_at), _json(trace_context))
+        for id, event_type, payload, payload_bin, attempts, created_at, trace_context in rows
+    ]
+
+
+async def mark_event_published(event_id: UUID, conn: Optional[BaseDBAsyncClient] = None):
+    await _execute_many(MARK_PUBLISHED, [(event_id,)], conn)
+
+
+async def increment_event_attempts(event_id: UUID, conn: Optional[BaseDBAsyncClient] = None):
+    await _execute_many(INCREMENT_ATTEMPTS, [(event_id,)], conn)
+
+
+
+def _pending_event(row: Sequence[Any]) -> PendingEvent:
+    id, event_type, payload, payload_bin, attempts, created_at, trace_context, aggregate_id = row
+    return PendingEvent(
+        _uuid(id), event_type, LazyPayload(payload, payload_bin), attempts, _datetime(created_at), _json(trace_context),
+        _uuid(aggregate_id) if aggregate_id is not None else None,
+    )
+
+
+async def stream_replay_events(
+    until: datetime,
+    since: Optional[datetime] = None,
+    event_types: Sequence[str] = (),
+    aggregate_ids: Sequence[UUID] = (),
+    unpublished_only: bool = False,
+    after: Optional[Tuple[datetime, UUID]] = None,
+    fetch_size: int = 1000,
+    conn: Optional[BaseDBAsyncClient] = None,
+) -> AsyncIterator[List[PendingEvent]]:
+    """
+    Outbox events created in [since, until) matching the filters, strictly after the
+    (created_at, id) position 'after', in that order and in lists of up to 'fetch_size'.
+
+    On Postgres the selection is one statement read through a server-side cursor (one
+    snapshot, no re-planning per page), on a connection of its own held until the stream
+    ends. SQLite has no cursor across awaits on its single connection, so it reads keyset
+    pages instead.
+    """
+    args = [
+        since, until, list(event_types) or None, list(aggregate_ids) or None, unpublished_only,
+        after[0] if after else None, after[1] if after else None,
+    ]
+    client = _client(conn)
+    if not _is_postgres(client):
+        while True:
+            rows = await _fetch(REPLAY_EVENTS, args + [fetch_size], client)
+            if not rows:
+                return
+            events = [_pending_event(row) for row in rows]
+            yield events
+            args[5], args[6] = events[-1].created_at, events[-1].id
+
+    async with client.acquire_connection() as raw:
+        # asyncpg cursors live inside a transaction; read-only, it blocks no writer
+        async with raw.transaction(readonly=True):
+            start = time.perf_counter()
+            cursor = await raw.cursor(REPLAY_EVENTS.postgres, *args, None)
+            observe_query("query", time.perf_counter() - start, REPLAY_EVENTS.postgres)
+            while True:
+                rows = await cursor.fetch(fetch_size)
+                if not rows:
+                    return
+                yield [_pending_event(row) for row in rows]
+
+
+# ----------- Inventory ledger -----------
+
+async def movements_recorded(event_id: str, conn: Optional[BaseDBAsyncClient] = None) -> bool:
+    """Inventory consumer idempotency check: has this event already moved any stock?"""
+    return bool(await _fetch(MOVEMENTS_RECORDED, (event_id,), conn))
+
+
+async def order_deducted(order_id: UUID, conn: Optional[BaseDBAsyncClient] = None) -> bool:
+    """Did the order's placement take stock? (False when its deduction failed or has not run yet.)"""
+    return bool(await _fetch(ORDER_DEDUCTED, (order_id,), conn))
+
+
+async def order_cancelled(order_id: UUID, conn: Optional[BaseDBAsyncClient] = None) -> bool:
+    """Has the order's cancellation been applied to the ledger? (Its placement must then take no stock.)"""
+    return bool(await _fetch(ORDER_CANCELLED, (order_id,), conn))
+
+
+async def pending_movements(menu_item_ids: Iterable[UUID], conn: BaseDBAsyncClient) -> Dict[str, int]:
+    """
+    Sum of the uncompacted movements per item, keyed by menu item id string (items without
+    any are absent). Run after lock_inventory, as its own statement: on Postgres a statement
+    sees the rows committed before it started, so only a read issued once the locks are held
+    includes the movements of the transactions it waited for.
+    """
+    rows = await _fetch(PENDING_MOVEMENTS, (list(menu_item_ids),), conn)
+    return {str(_uuid(menu_item_id)): int(qty) for menu_item_id, qty in rows}
+
+
+async def all_pending_movements(conn: Optional[BaseDBAsyncClient] = None) -> Dict[UUID, Tuple[int, datetime]]:
+    """(sum, latest created_at) of the uncompacted movements of every item that has any."""
+    rows = await _fetch(ALL_PENDING_MOVEMENTS, (), conn)
+    return {_uuid(menu_item_id): (int(qty), _datetime(moved_at)) for menu_item_id, qty, moved_at in rows}
+
+
+async def record_movements(
+    event_id: str,
+    order_id: Optional[UUID],
+    deltas: Dict[str, int],
+    reason: str,
+    created_at: datetime,
+    conn: Optional[BaseDBAsyncClient] = None
+) -> int:
+    """
+    Appends one signed movement per item ('deltas' by menu item id string) in one statement.
+    Rows already recorded for (event_id, item) are left as they are, so re-applying an event
+    is a no-op. Returns the number of rows inserted (0 for a redelivered event).
+    """
+    ids = [UUID(mid) for mid in deltas]
+    rows = await _fetch(RECORD_MOVEMENTS, (event_id, order_id, reason, created_at, ids, list(deltas.values())), conn)
+    return len(rows)
+
+
+async def fetch_pending_items(limit: int, conn: BaseDBAsyncClient) -> List[UUID]:
+    """Up to 'limit' items with uncompacted movements."""
+    return [_uuid(menu_item_id) for (menu_item_id,) in await _fetch(PENDING_ITEMS, (limit,), conn)]
+
+
+async def claim_movements(menu_item_ids: Iterable[UUID], conn: BaseDBAsyncClient) -> Dict[str, int]:
+    """
+    Marks the uncompacted movements of the given (locked) items compacted and returns their
+    sum per item, keyed by menu item id string. The caller folds the sums into the snapshot
+    in the same transaction.
+    """
+    claimed: Dict[str, int] = {}
+    for menu_item_id, qty in await _fetch(CLAIM_MOVEMENTS, (list(menu_item_ids),), conn):
+        key = str(_uuid(menu_item_id))
+        claimed[key] = claimed.get(key, 0) + qty
+    return claimed
+
+
+async def event_processed(event_id: str, conn: Optional[BaseDBAsyncClient] = None) -> bool:
+    """Order status consumer idempotency check: has this event already been handled?"""
+    return bool(await _fetch(EVENT_PROCESSED, (event_id,), conn))
+
+
+async def record_processed_event(event_id: str, created_at: datetime, conn: BaseDBAsyncClient):
+    """Marks the event handled, in the handler's transaction (a concurrent duplicate fails on the unique event_id)."""
+    await _fetch(RECORD_PROCESSED_EVENT, (uuid4(), event_id, created_at), conn)
+
+
+async def add_sales(
+    restaurant_rows: List[Tuple[UUID, datetime, int, int, Decimal, int, int, Decimal]],
+    item_rows: List[Tuple[UUID, UUID, datetime, int, int, Decimal, int, int, Decimal]],
+    conn: BaseDBAsyncClient
+):
+    """
+    Adds counters to the hourly rollups: one batched upsert per table. Rows are
+    (restaurant_id, hour, orders, units, revenue, cancelled_orders, cancelled_units,
+    cancelled_revenue), item rows prefixed with the menu item id. The restaurant row is
+    written first and items in id order, so concurrent writers take the row locks in one order.
+    """
+    await _execute_many(UPSERT_RESTAURANT_SALES, sorted(restaurant_rows), conn)
+    await _execute_many(UPSERT_MENU_ITEM_SALES, sorted(item_rows), conn)
+
+
+def _stock_row(row: Sequence[Any]) -> StockRow:
+    menu_item_id, restaurant_id, available_qty, threshold_qty, updated_at, pending, moved_at = row
+    updated_at = _datetime(updated_at)
+    if moved_at is not None:
+        updated_at = max(updated_at, _datetime(moved_at))
+    return StockRow(_uuid(menu_item_id), _uuid(restaurant_id), available_qty + int(pending or 0), threshold_qty, updated_at)
+
+
+async def fetch_stock_for_items(menu_item_ids: Iterable[UUID], conn: Optional[BaseDBAsyncClient] = None) -> List[StockRow]:
+    return [_stock_row(row) for row in await _fetch(STOCK_FOR_ITEMS, (list(menu_item_ids),), conn)]
+
+
+async def fetch_stock_for_restaurant(restaurant_id: UUID, conn: Optional[BaseDBAsyncClient] = None) -> List[StockRow]:
+    return [_stock_row(row) for row in await _fetch(STOCK_FOR_RESTAURANT, (restaurant_id,), conn)]
@@ -0,0 +1,174 @@
+"""
+Process-wide logging setup (API, poller, archiver, supervisor).
+
+Handlers never write on the event-loop thread: every record goes into a queue
+(QueueHandler) and a background QueueListener thread formats it (JSON by default) and
+writes it to stdout. Before queueing, high-volume INFO/DEBUG lines can be sampled per
+logger (LOG_SAMPLING) and are rate limited per logger (LOG_RATE_LIMIT); warnings and
+errors always pass. Dropped records are counted in 'log_records_dropped_total'.
+
+Hot paths log with %-style arguments (log.info("... %s", x)), so a record that is
+filtered out by level, sampling or the rate limit is never formatted at all.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from app.core.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_RATE_LIMIT, LOG_SAMPLING
+from app.core.metrics import LOG_RECORDS_DROPPED
+from app.core.tracing import current_trace_id
+
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Loggers that uvicorn configures with its own (synchronous) handlers
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """'outbox_poller=0.1,orders_api=0.5' -> {'outbox_poller': 0.1, 'orders_api': 0.5}."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, trace_id and the exception if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every record at WARNING and above. Below that, a logger with a sample rate keeps
+    one record in every 1/rate (deterministic, no RNG per record), and every logger passes
+    at most 'rate_limit' records per second (0 disables).
+    """
+
+    def __init__(self, sampling: Dict[str, float], rate_limit: float):
+        super().__init__()
+        self.sampling = sampling
+        self.rate_limit = rate_limit
+        self._seen: Dict[str, int] = {}
+        self._windows: Dict[str, list] = {}  # logger -> [window second, records passed in it]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        name = record.name
+        rate = self.sampling.get(name)
+        if rate is not None and rate < 1.0:
+            seen = self._seen.get(name, 0)
+            self._seen[name] = seen + 1
+            if rate <= 0 or seen % round(1 / rate):
+                LOG_RECORDS_DROPPED.inc(name, "sampled")
+                return False
+        if self.rate_limit:
+            second = int(time.monotonic())
+            window = self._windows.get(name)
+            if window is None or window[0] != second:
+                window = self._windows[name] = [second, 0]
+            if window[1] >= self.rate_limit:
+                LOG_RECORDS_DROPPED.inc(name, "rate_limited")
+                return False
+            window[1] += 1
+        return True
+
+
+class _LoopSafeQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread. Only the %-interpolation (needed before the
+    caller's arguments can change) and the trace id lookup happen on the caller's thread;
+    JSON/text formatting and the write happen in the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        record.trace_id = current_trace_id()
+        if record.exc_info:
+            # Traceback objects are not safe to keep around; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(record.name, "queue_full")
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    sampling: str = LOG_SAMPLING,
+    rate_limit: float = LOG_RATE_LIMIT,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """
+    Routes the root logger (and uvicorn's loggers) through one queue to a background writer.
+    Safe to call more than once: the previous listener is stopped and replaced.
+    """
+    global _listener, _handler
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(_TEXT_FORMAT))
+
+    handler = _LoopSafeQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(SamplingFilter(parse_sampling(sampling), rate_limit))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    _handler = handler
+    root.setLevel(level.upper())
+    for name in _UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Writes out everything still queued and stops the writer thread."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)  # Later records fall back to stderr
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,338 @@
+"""
+Low-overhead in-process metrics exposed in Prometheus text format.
+
+All updates happen on the event-loop thread, so counters and histograms are plain
+attribute/list increments with no locks. Each process (API, poller) has its own registry.
+"""
+import asyncio
+import functools
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets for "how many" style observations (queries per request, events per poll)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250, 500)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. backlog depth)."""
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; observe() is a bisect plus two increments."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, n) in self._series.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ----------- HTTP metrics (API process) -----------
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+HTTP_DB_QUERIES = REGISTRY.histogram("http_request_db_queries", "DB statements issued per HTTP request.", ("method", "route"), buckets=COUNT_BUCKETS)
+HTTP_DB_TIME = REGISTRY.histogram("http_request_db_seconds", "Total DB time per HTTP request.", ("method", "route"))
+
+ADMISSION_REJECTIONS = REGISTRY.counter("admission_rejections_total", "Order placements shed with 429 by reason.", ("reason",))
+ADMISSION_INFLIGHT = REGISTRY.gauge("admission_inflight_placements", "Order placement transactions in flight in this process.")
+
+# ----------- DB metrics (all processes) -----------
+
+DB_QUERIES = REGISTRY.counter("db_queries_total", "DB statements issued (Tortoise and raw hot-path queries).", ("operation",))
+DB_QUERY_TIME = REGISTRY.histogram("db_query_duration_seconds", "Latency of individual DB statements.", ("operation",))
+DB_LOCK_CONFLICTS = REGISTRY.counter("db_lock_conflicts_total", "Transactions aborted by a deadlock or lock conflict, by operation and outcome (retried/exhausted).", ("operation", "outcome"))
+
+LOG_RECORDS_DROPPED = REGISTRY.counter("log_records_dropped_total", "Log records dropped by sampling, rate limit or a full queue.", ("logger", "reason"))
+
+EVENT_LOOP_LAG = REGISTRY.histogram("event_loop_lag_seconds", "Delay of the event-loop heartbeat past its scheduled time.", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+EVENT_LOOP_STALLS = REGISTRY.counter("event_loop_stalls_total", "Times the event loop stayed blocked past LOOP_STALL_THRESHOLD.")
+
+# ----------- Outbox poller metrics (poller process) -----------
+
+POLL_BATCH_SIZE = REGISTRY.histogram("outbox_poll_batch_size", "Events fetched per outbox poll.", buckets=COUNT_BUCKETS)
+DISPATCH_LATENCY = REGISTRY.histogram("outbox_dispatch_duration_seconds", "Handler dispatch latency per event type.", ("event_type",))
+DISPATCH_FAILURES = REGISTRY.counter("outbox_dispatch_failures_total", "Failed dispatches per event type.", ("event_type",))
+OUTBOX_BACKLOG = REGISTRY.gauge("outbox_backlog_events", "Unpublished outbox events still eligible for dispatch.")
+OUTBOX_OLDEST_AGE = REGISTRY.gauge("outbox_oldest_unpublished_age_seconds", "Age of the oldest unpublished outbox event.")
+INVENTORY_LOCK_WAIT = REGISTRY.histogram("inventory_lock_wait_seconds", "Time to lock the inventory rows of one deduction/restoration.", ("handler",))
+
+
+# ----------- Per-request DB statistics -----------
+
+class QueryStats:
+    """
+    DB statements and time accumulated inside one request (or any instrumented block).
+    Blocks may nest (e.g. a trace span inside a request); statements count towards every
+    enclosing block through 'parent'. With capture=True the SQL text of each statement is
+    kept in 'statements' as well (tests and query budgets; off in production paths).
+    """
+    __slots__ = ("count", "seconds", "parent", "statements")
+
+    def __init__(self, parent: Optional["QueryStats"] = None, capture: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.parent = parent
+        self.statements: Optional[List[str]] = [] if capture else None
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_in_query: ContextVar[bool] = ContextVar("in_query", default=False)
+
+_INSTRUMENTED_METHODS = (
+    "execute_insert",
+    "execute_query",
+    "execute_query_dict",
+    "execute_many",
+    "execute_script",
+)
+
+
+def _instrument(method, operation: str):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        # Backends delegate between these methods; only the outermost call is counted
+        if _in_query.get():
+            return await method(self, *args, **kwargs)
+        token = _in_query.set(True)
+        start = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_query.reset(token)
+            observe_query(operation, elapsed, args[0] if args and isinstance(args[0], str) else None)
+
+    wrapper.__metrics_instrumented__ = True
+    return wrapper
+
+
+def observe_query(operation: str, elapsed: float, sql: Optional[str] = None):
+    """Records one DB statement in the global metrics and every active QueryStats block."""
+    DB_QUERIES.inc(operation)
+    DB_QUERY_TIME.observe(elapsed, operation)
+    stats = _query_stats.get()
+    while stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(sql or f"<{operation}>")
+        stats = stats.parent
+
+
+def _all_subclasses(cls) -> List[type]:
+    found = []
+    for sub in cls.__subclasses__():
+        found.append(sub)
+        found.extend(_all_subclasses(sub))
+    return found
+
+
+def install_db_instrumentation():
+    """
+    Wraps the execute_* methods of every loaded Tortoise client class so each statement is
+    counted and timed. Safe to call more than once; call after Tortoise.init so the backend
+    classes are imported.
+    """
+    for cls in [BaseDBAsyncClient] + _all_subclasses(BaseDBAsyncClient):
+        for name in _INSTRUMENTED_METHODS:
+            method = cls.__dict__.get(name)
+            if method is None or getattr(method, "__metrics_instrumented__", False):
+                continue
+            setattr(cls, name, _instrument(method, name.replace("execute_", "")))
+
+
+def start_query_stats(capture: bool = False) -> Tuple[QueryStats, object]:
+    """
+    Begins collecting DB statistics for the current context. Returns (stats, token).
+    'capture' also keeps the SQL text of every statement.
+    """
+    stats = QueryStats(_query_stats.get(), capture)
+    return stats, _query_stats.set(stats)
+
+
+def stop_query_stats(token: object):
+    _query_stats.reset(token)
+
+
+# ----------- ASGI middleware (API process) -----------
+
+def route_template(scope) -> str:
+    """
+    Full path template of the matched route (e.g. '/api/v1/orders/{order_id}'). Templates keep
+    label cardinality bounded; unmatched paths share one label. Routes inside an included
+    router only know their own path, so the prefixed one is taken from FastAPI's route context.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", "<unmatched>")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status codes and the number and
+    total time of DB statements issued while serving each request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats, token = start_query_stats()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            stop_query_stats(token)
+            route_path = route_template(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route_path, str(status_code))
+            HTTP_LATENCY.observe(elapsed, method, route_path)
+            HTTP_DB_QUERIES.observe(stats.count, method, route_path)
+            HTTP_DB_TIME.observe(stats.seconds, method, route_path)
+
+
+# ----------- Standalone /metrics endpoint (non-HTTP processes, e.g. the poller) -----------
+
+async def _handle_metrics_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass  # Drain headers
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            body = REGISTRY.render().encode()
+            head = f"HTTP/1.1 200 OK\r\nContent-Type: {PROMETHEUS_CONTENT_TYPE}\r\n"
+        else:
+            body = b"Not Found\n"
+            head = "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str, port: int) -> asyncio.AbstractServer:
+    """Starts a minimal HTTP server exposing GET /metrics for processes without an API."""
+    return await asyncio.start_server(_handle_metrics_connection, host, port)
@@ -0,0 +1,111 @@
+"""
+Versioned schema migrations.
+
+Migrations are modules named 'mNNNN_<name>.py' in app/migrations, each with an
+'async def upgrade(conn)'. They are applied in order, each in its own transaction, by the
+one-shot command 'python -m app.cli.migrate'; the applied versions are recorded in the
+'schema_migrations' table. App processes only compare that table with the newest
+migration on disk at startup (one SELECT) instead of introspecting or creating tables.
+"""
+import importlib
+import logging
+import os
+import pkgutil
+import re
+from typing import List, Tuple
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+
+log = logging.getLogger("migrations")
+
+MIGRATIONS_PACKAGE = "app.migrations"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+_MIGRATION_NAME = re.compile(r"^m(\d{4})_(\w+)$")
+
+# Arbitrary key serializing concurrent migrate runs on Postgres
+_PG_MIGRATION_LOCK_KEY = 724_365_001
+
+_CREATE_VERSION_TABLE = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version INT NOT NULL PRIMARY KEY, "
+    "name VARCHAR(255) NOT NULL, "
+    "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+)
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised at startup when the database schema is older than this build expects."""
+
+
+def available_migrations() -> List[Tuple[int, str]]:
+    """(version, name) of every migration module on disk, in order. Does not import them."""
+    found = []
+    for info in pkgutil.iter_modules([MIGRATIONS_DIR]):
+        match = _MIGRATION_NAME.match(info.name)
+        if match:
+            found.append((int(match.group(1)), match.group(2)))
+    return sorted(found)
+
+
+def latest_version() -> int:
+    migrations = available_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+async def current_version(conn: BaseDBAsyncClient) -> int:
+    """Highest applied migration version (0 for a database that was never migrated)."""
+    try:
+        rows = await conn.execute_query_dict("SELECT MAX(version) AS version FROM schema_migrations")
+    except OperationalError:
+        return 0  # No schema_migrations table yet
+    return (rows[0]["version"] or 0) if rows else 0
+
+
+async def check_schema_version(conn: BaseDBAsyncClient = None):
+    """
+    Cheap startup check: fails fast if migrations are pending. A database ahead of the code
+    (e.g. during a rolling deploy after the new release migrated) is accepted.
+    """
+    conn = conn or connections.get("default")
+    applied, expected = await current_version(conn), latest_version()
+    if applied < expected:
+        raise SchemaVersionError(
+            f"Database schema is at version {applied} but this build needs {expected}. "
+            f"Run 'python -m app.cli.migrate' first."
+        )
+    if applied > expected:
+        log.warning(f"Database schema version {applied} is newer than this build ({expected}).")
+
+
+async def migrate(target: int = None, connection_name: str = "default") -> List[int]:
+    """
+    Applies pending migrations up to 'target' (default: all) to one database (run it once
+    per shard alias). Returns the versions applied.
+    """
+    conn = connections.get(connection_name)
+    await conn.execute_script(_CREATE_VERSION_TABLE)
+    is_postgres = conn.capabilities.dialect == "postgres"
+
+    applied = []
+    for version, name in available_migrations():
+        if target is not None and version > target:
+            break
+        if version <= await current_version(conn):
+            continue
+        module = importlib.import_module(f"{MIGRATIONS_PACKAGE}.m{version:04d}_{name}")
+        async with in_transaction(connection_name) as tx:
+            if is_postgres:
+                # Serializes concurrent runs; re-check once we hold the lock
+                await tx.execute_query(f"SELECT pg_advisory_xact_lock({_PG_MIGRATION_LOCK_KEY})")
+                if version <= await current_version(tx):
+                    continue
+            log.info(f"Applying migration {version:04d}_{name}...")
+            await module.upgrade(tx)
+            # Values are an int and a \w+ name from the module file name
+            await tx.execute_script(f"INSERT INTO schema_migrations (version, name) VALUES ({version}, '{name}')")
+        applied.append(version)
+    return applied
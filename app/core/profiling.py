@@ -0,0 +1,223 @@
+"""
+Event-loop lag monitor and on-demand sampling profiler (API and poller processes).
+
+- Lag: a heartbeat task sleeps LOOP_MONITOR_INTERVAL and records how late it wakes up
+  ('event_loop_lag_seconds'). A late heartbeat only says that something blocked the loop,
+  not what, because by then the blocking code has already returned. So a watchdog thread
+  checks the heartbeat, and when it is LOOP_STALL_THRESHOLD overdue, it logs the loop
+  thread's stack and task while the stall is still in progress.
+- Profile: for a bounded time, a background thread samples the loop thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds. The counts are written in collapsed-stack format (one
+  'outer;...;inner count' line per distinct stack), which flamegraph.pl, speedscope and
+  inferno read as is. Frames in the selector's select() are the loop waiting for I/O.
+  The API captures a profile via POST /api/v1/admin/profile; the poller captures one on
+  SIGUSR1.
+
+With no profile running, the cost is the heartbeat (LOOP_MONITOR_INTERVAL) and a watchdog
+wake-up that compares two floats. Sampling costs one stack walk per sample and only
+happens during a capture.
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.config import (
+    LOOP_MONITOR_INTERVAL, LOOP_STALL_THRESHOLD, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_SIGNAL_SECONDS
+)
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+log = logging.getLogger("profiling")
+
+# Innermost frames kept in a logged stall stack
+_STALL_STACK_DEPTH = 40
+# Minimum seconds between two logged stall stacks (every stall is still counted)
+_STALL_LOG_GAP = 1.0
+
+
+class ProfileInProgress(RuntimeError):
+    """Raised when a profile is requested while this process is already capturing one."""
+
+
+# ----------- Lag monitor -----------
+
+class _StallWatchdog(threading.Thread):
+    """Logs the loop thread's stack once per stall, from outside the (blocked) loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, loop_thread: int, interval: float, threshold: float):
+        super().__init__(name="loop-stall-watchdog", daemon=True)
+        self.loop = loop
+        self.loop_thread = loop_thread
+        self.threshold = threshold
+        self.check_every = max(min(interval, threshold) / 2, 0.005)
+        self.due = time.monotonic() + interval  # When the heartbeat should next run (set by it)
+        self._stopped = threading.Event()
+        self._reported_due = 0.0
+        self._last_log = 0.0
+
+    def run(self):
+        while not self._stopped.wait(self.check_every):
+            due = self.due
+            now = time.monotonic()
+            overdue = now - due
+            if overdue < self.threshold or due == self._reported_due:
+                continue
+            self._reported_due = due
+            if now - self._last_log < _STALL_LOG_GAP:
+                continue
+            self._last_log = now
+            self._log_stack(overdue)
+
+    def _log_stack(self, overdue: float):
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame, limit=_STALL_STACK_DEPTH))
+        del frame
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        running = f"task {task.get_name()} ({task.get_coro().__qualname__})" if task else "a callback (no task)"
+        log.warning("Event loop blocked for %.3fs so far in %s:\n%s", overdue, running, stack)
+
+    def stop(self):
+        self._stopped.set()
+
+
+async def run_loop_monitor(interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_STALL_THRESHOLD):
+    """
+    Background loop recording event-loop lag and logging the stack of stalls longer than
+    'threshold' seconds (API lifespan / poller). Runs until cancelled.
+    """
+    if interval <= 0:
+        return
+    watchdog = _StallWatchdog(asyncio.get_running_loop(), threading.get_ident(), interval, threshold)
+    watchdog.start()
+    try:
+        while True:
+            due = time.monotonic() + interval
+            watchdog.due = due
+            await asyncio.sleep(interval)
+            lag = max(time.monotonic() - due, 0.0)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= threshold:
+                EVENT_LOOP_STALLS.inc()
+    finally:
+        watchdog.stop()
+
+
+# ----------- Sampling profiler -----------
+
+_profile_lock = threading.Lock()
+_signal_tasks: Set[asyncio.Task] = set()
+
+
+def _frame_label(code) -> str:
+    # The function's first line rather than the current one: one flame graph node per function
+    path = code.co_filename
+    if "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[-1]
+    elif path.startswith(os.getcwd()):
+        path = os.path.relpath(path)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def sample_stacks(
+    thread_id: int,
+    seconds: float,
+    interval: float = PROFILE_SAMPLE_INTERVAL,
+    stop: Optional[threading.Event] = None,
+) -> Tuple[Dict[str, int], int]:
+    """
+    Samples the stack of thread 'thread_id' every 'interval' seconds for 'seconds' or until
+    'stop' is set (call from another thread). Returns ({collapsed stack: samples}, total samples).
+    """
+    stop = stop or threading.Event()
+    stacks: Dict[str, int] = {}
+    labels: Dict[Any, str] = {}
+    samples = 0
+    next_at = time.monotonic()
+    deadline = next_at + seconds
+    while next_at < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break  # Thread gone
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = _frame_label(code)
+            parts.append(label)
+            frame = frame.f_back
+        key = ";".join(reversed(parts))
+        stacks[key] = stacks.get(key, 0) + 1
+        samples += 1
+        next_at += interval
+        if stop.wait(max(next_at - time.monotonic(), 0.0)):
+            break
+    return stacks, samples
+
+
+def _profile_to_file(
+    thread_id: int, seconds: float, interval: float, directory: str, role: str, stop: threading.Event
+) -> Dict[str, Any]:
+    stacks, samples = sample_stacks(thread_id, seconds, interval, stop)
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(directory, f"{role}-{os.getpid()}-{stamp}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {count}\n")
+    return {"path": path, "seconds": seconds, "samples": samples, "stacks": len(stacks)}
+
+
+async def capture_profile(
+    seconds: float,
+    role: str,
+    interval: float = PROFILE_SAMPLE_INTERVAL,
+    directory: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Profiles this event loop's thread for 'seconds' and writes the collapsed stacks to
+    '<directory (PROFILE_DIR)>/<role>-<pid>-<UTC time>.folded'. Returns the path, samples and distinct
+    stacks. One capture at a time per process (ProfileInProgress otherwise); cancelling it
+    stops the sampling thread, which still writes what it collected.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileInProgress("A profile is already being captured in this process.")
+    stop = threading.Event()
+    try:
+        return await asyncio.to_thread(
+            _profile_to_file, threading.get_ident(), seconds, interval, directory or PROFILE_DIR, role, stop
+        )
+    finally:
+        stop.set()
+        _profile_lock.release()
+
+
+async def _profile_on_signal(role: str, seconds: float):
+    try:
+        result = await capture_profile(seconds, role)
+        log.warning("Profile written to %s (%s samples over %ss)", result["path"], result["samples"], seconds)
+    except ProfileInProgress as e:
+        log.warning("SIGUSR1 ignored: %s", e)
+    except Exception as e:
+        log.error(f"Profile capture failed: {e}")
+
+
+def install_profile_signal(role: str, seconds: float = PROFILE_SIGNAL_SECONDS):
+    """Captures a 'seconds' profile into PROFILE_DIR whenever this process receives SIGUSR1."""
+    def on_signal():
+        task = asyncio.ensure_future(_profile_on_signal(role, seconds))
+        _signal_tasks.add(task)
+        task.add_done_callback(_signal_tasks.discard)
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_signal)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.schemas.response import _rid
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it does not handle natively (matches Pydantic's JSON mode)."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Serializes content to JSON bytes with orjson (UUIDs, enums and datetimes natively, Decimals as strings)."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson. Used as the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def envelope(data: Any = None, request_id: Optional[str] = None) -> Dict[str, Any]:
+    """Builds the standard success envelope as plain JSON types (e.g. for storing a response)."""
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    return {"success": True, "request_id": request_id or _rid(), "data": data}
+
+
+def success_response(data: Any = None, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Returns the standard success envelope, serializing the payload exactly once.
+
+    Pydantic payloads are dumped straight to JSON by their Rust serializer and everything
+    else goes through orjson; the envelope is assembled around the bytes. Returning a
+    Response skips FastAPI's response_model re-validation, which stays for the OpenAPI docs.
+    """
+    if isinstance(data, BaseModel):
+        payload = data.__pydantic_serializer__.to_json(data)
+    else:
+        payload = dumps(data)
+    body = b'{"success":true,"request_id":"' + _rid().encode() + b'","data":' + payload + b"}"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
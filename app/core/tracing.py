@@ -0,0 +1,195 @@
+"""
+Lightweight end-to-end tracing across the API and the outbox consumers.
+
+A trace starts at the HTTP request (its id is the response 'request_id'), travels inside
+every OutboxEvent's 'trace_context', and is continued by the poller for each dispatched
+event. Each hop records spans with DB time, queue wait and handler time; spans are
+buffered in memory and appended as JSON lines to TRACE_EXPORT_PATH (a local collector
+file) by a background task. 'python -m app.cli.trace_report' turns that file into a
+stage-by-stage latency breakdown.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.core.config import TRACE_EXPORT_PATH, TRACE_FLUSH_INTERVAL, TRACE_SAMPLE_RATE
+from app.core.metrics import route_template, start_query_stats, stop_query_stats
+
+log = logging.getLogger("tracing")
+
+# Header clients may send to continue an existing trace
+TRACE_HEADER = "x-request-id"
+_TRACE_HEADER_BYTES = TRACE_HEADER.encode()
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+
+_current: ContextVar[Optional[TraceContext]] = ContextVar("trace_context", default=None)
+_buffer: List[Dict[str, Any]] = []
+
+
+def new_id(length: int = 32) -> str:
+    return uuid.uuid4().hex[:length]
+
+
+def current_trace() -> Optional[TraceContext]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    ctx = _current.get()
+    return ctx.trace_id if ctx else None
+
+
+def outbox_trace_context() -> Optional[Dict[str, Any]]:
+    """Trace context stored on an OutboxEvent created in the current context."""
+    ctx = _current.get()
+    if ctx is None:
+        return None
+    return {"trace_id": ctx.trace_id, "parent_span_id": ctx.span_id, "sampled": ctx.sampled, "emitted_at": time.time()}
+
+
+def record_span(ctx: TraceContext, span_id: str, name: str, start: float, duration: float, parent_id: Optional[str] = None, **attrs):
+    """Buffers one finished span for export (dropped if the trace is not sampled)."""
+    if not ctx.sampled or not TRACE_EXPORT_PATH:
+        return
+    _buffer.append({
+        "trace_id": ctx.trace_id,
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "name": name,
+        "start": start,
+        "duration": duration,
+        **attrs,
+    })
+
+
+class ActiveSpan:
+    """A span in progress; its name and attributes may be refined before it ends."""
+    __slots__ = ("ctx", "name", "attrs")
+
+    def __init__(self, ctx: TraceContext, name: str, attrs: Dict[str, Any]):
+        self.ctx = ctx
+        self.name = name
+        self.attrs = attrs
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, sampled: Optional[bool] = None, **attrs):
+    """
+    Runs a block as a span: sets the trace context (so events emitted inside carry it),
+    measures wall time and the DB time/statements issued inside, then records the span.
+    Starts a new trace when there is no current one and no trace_id is given.
+    """
+    parent = _current.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else new_id()
+        parent_id = parent_id or (parent.span_id if parent else None)
+    if sampled is None:
+        sampled = parent.sampled if parent else random.random() < TRACE_SAMPLE_RATE
+
+    active = ActiveSpan(TraceContext(trace_id=trace_id, span_id=new_id(16), sampled=sampled), name, attrs)
+    token = _current.set(active.ctx)
+    stats, stats_token = start_query_stats()
+    start_wall, start = time.time(), time.perf_counter()
+    try:
+        yield active
+    finally:
+        duration = time.perf_counter() - start
+        stop_query_stats(stats_token)
+        _current.reset(token)
+        record_span(active.ctx, active.ctx.span_id, active.name, start_wall, duration, parent_id,
+                    db_seconds=stats.seconds, db_queries=stats.count, **active.attrs)
+
+
+@contextmanager
+def consume_event(event_type: str, event_id: Any, trace_context: Optional[Dict[str, Any]], created_at: Optional[float] = None):
+    """
+    Continues the trace carried by an OutboxEvent around its handler: records the queue
+    wait (emit -> dispatch) as its own span, then the handler span with its DB time.
+    """
+    tc = trace_context or {}
+    emitted_at = tc.get("emitted_at", created_at)
+    with span(f"handle {event_type}", trace_id=tc.get("trace_id"), parent_id=tc.get("parent_span_id"),
+              sampled=tc.get("sampled"), event_type=event_type, event_id=str(event_id)) as active:
+        if emitted_at is not None:
+            wait = max(time.time() - emitted_at, 0.0)
+            record_span(active.ctx, new_id(16), f"queue {event_type}", emitted_at, wait,
+                        tc.get("parent_span_id"), event_type=event_type, event_id=str(event_id))
+        yield active
+
+
+# ----------- ASGI middleware (API process) -----------
+
+class TracingMiddleware:
+    """
+    Starts a trace per HTTP request (or continues the one named by an X-Request-ID header)
+    and records its span. The trace id is also the response's 'request_id'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope.get("headers", ()):
+            if key == _TRACE_HEADER_BYTES:
+                incoming = value.decode("latin-1")[:64]
+                break
+
+        with span(f"http {scope['method']}", trace_id=incoming or new_id()) as active:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # Name the span after the route template once routing has happened
+                active.name = f"http {scope['method']} {route_template(scope)}"
+
+
+# ----------- Exporter -----------
+
+def _write_lines(path: str, lines: List[str]):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+async def flush_spans():
+    """Appends buffered spans to the collector file without blocking the event loop."""
+    if not _buffer or not TRACE_EXPORT_PATH:
+        return
+    spans = _buffer[:]
+    del _buffer[:len(spans)]
+    lines = [json.dumps(s, separators=(",", ":")) + "\n" for s in spans]
+    await asyncio.get_running_loop().run_in_executor(None, _write_lines, TRACE_EXPORT_PATH, lines)
+
+
+async def run_trace_exporter():
+    """Background loop flushing spans every TRACE_FLUSH_INTERVAL seconds (API lifespan / poller)."""
+    if not TRACE_EXPORT_PATH:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(TRACE_EXPORT_PATH)), exist_ok=True)
+    try:
+        while True:
+            await asyncio.sleep(TRACE_FLUSH_INTERVAL)
+            try:
+                await flush_spans()
+            except Exception as e:
+                log.error(f"Trace export failed: {e}")
+    finally:
+        await flush_spans()
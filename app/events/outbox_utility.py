@@ -1,8 +1,42 @@
-from typing import Dict, Any
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
 from app.models.outbox import OutboxEvent
+from app.core.config import OUTBOX_PARTITIONS, OUTBOX_PAYLOAD_ENCODING
+from app.events.payload_codec import encode_payload
+from app.core.tracing import outbox_trace_context
 from uuid import UUID
 from tortoise.exceptions import DoesNotExist
 
+def partition_key(aggregate_id: Optional[UUID]) -> int:
+    """
+    Hash bucket of an aggregate in [0, OUTBOX_PARTITIONS). All events of one aggregate share
+    a bucket, so the single poller owning it sees them in order.
+
+    The whole id is hashed: ids minted on a shard carry the shard index in fixed bits
+    (shard_directory.shard_uuid), so bucketing on raw bits would put all of a shard's
+    aggregates in one bucket and on one poller.
+    """
+    if aggregate_id is None:
+        return 0
+    aggregate_id = aggregate_id if isinstance(aggregate_id, UUID) else UUID(str(aggregate_id))
+    return zlib.crc32(aggregate_id.bytes) % OUTBOX_PARTITIONS
+
+def partition_range(worker_index: int, worker_count: int) -> Tuple[int, int]:
+    """[start, end) of the buckets owned by poller 'worker_index' of 'worker_count'. Ranges are disjoint and cover all buckets."""
+    if not 0 <= worker_index < worker_count:
+        raise ValueError(f"Poller index {worker_index} is outside 0..{worker_count - 1}.")
+    return (
+        OUTBOX_PARTITIONS * worker_index // worker_count,
+        OUTBOX_PARTITIONS * (worker_index + 1) // worker_count,
+    )
+
+def payload_columns(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The payload / payload_bin column values for an event, per OUTBOX_PAYLOAD_ENCODING."""
+    if OUTBOX_PAYLOAD_ENCODING == "json":
+        return {"payload": payload, "payload_bin": None}
+    return {"payload": None, "payload_bin": encode_payload(payload)}
+
+
 async def create_outbox_event(
     aggregate_type: str,
     aggregate_id: UUID,
@@ -14,13 +48,44 @@ async def create_outbox_event(
     Creates a new Outbox event record using the provided database connection (transaction).
     
     CRITICAL: Passing 'conn' ensures the event is created atomically with the business data.
+    The current trace context is stored with the event so consumers continue the trace.
     """
     await OutboxEvent.create(
         aggregate_type=aggregate_type,
         aggregate_id=aggregate_id,
         event_type=event_type,
-        payload=payload,
+        **payload_columns(payload),
         published=False,
         attempts=0,
+        trace_context=outbox_trace_context(),
+        partition_key=partition_key(aggregate_id),
         using_db=conn 
-    )
\ No newline at end of file
+    )
+
+async def create_outbox_events_bulk(events: List[Dict[str, Any]], conn: Any = None) -> None:
+    """
+    Creates many Outbox event records with a single multi-row INSERT.
+
+    Each entry carries the same keys as create_outbox_event (aggregate_type, aggregate_id,
+    event_type, payload). Pass 'conn' to keep the events atomic with the business data.
+    """
+    if not events:
+        return
+
+    trace_context = outbox_trace_context()
+    await OutboxEvent.bulk_create(
+        [
+            OutboxEvent(
+                aggregate_type=event["aggregate_type"],
+                aggregate_id=event.get("aggregate_id"),
+                event_type=event["event_type"],
+                **payload_columns(event["payload"]),
+                published=False,
+                attempts=0,
+                trace_context=trace_context,
+                partition_key=partition_key(event.get("aggregate_id")),
+            )
+            for event in events
+        ],
+        using_db=conn
+    )
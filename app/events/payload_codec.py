@@ -0,0 +1,290 @@
+"""
+Compact binary encoding of outbox event payloads ('outbox_events.payload_bin').
+
+Payloads are small JSON-like documents dominated by UUID strings and the same few keys
+repeated per line item. Format version 1:
+
+- 1 header byte: the format version in the low 7 bits, 0x80 when the body is
+  zlib-compressed (only above OUTBOX_PAYLOAD_COMPRESS_THRESHOLD bytes, and only if smaller).
+- The body is one tagged value. Canonical UUID strings are stored as their 16 raw bytes
+  (and decoded back to the same string), ints 0..63 take one byte, other ints are zigzag
+  varints, and dict keys from the version's key table take one byte.
+
+Decoding gives back exactly the document that was encoded: same keys, same strings (ids
+stay strings), same numbers. A new key table or tag means a new version; decoders keep
+reading every older version. LazyPayload defers decoding until a handler reads a field.
+"""
+import json
+import re
+import struct
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple, Union
+from uuid import UUID
+
+from app.core.config import OUTBOX_PAYLOAD_COMPRESS_THRESHOLD
+
+VERSION = 1
+_COMPRESSED = 0x80
+
+# Tags
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _UUID, _LIST, _DICT = range(9)
+_SMALL_INT = 0x40  # 0x40..0x7F: ints 0..63
+_SMALL_INT_MAX = 0x3F
+
+# Version 1 key table: keys of the payloads this service emits (append-only within a version)
+_KEYS_V1 = (
+    "order_id", "restaurant_id", "user_id", "placed_at", "items", "menu_item_id", "quantity",
+    "unit_price", "total_amount", "reason", "old_status", "new_status", "available_qty",
+    "threshold", "triggered_by_order_id", "delta", "source",
+)
+_KEY_INDEX_V1 = {key: i for i, key in enumerate(_KEYS_V1)}
+_KEY_INLINE = 0xFF  # Followed by the key as a string
+
+_DOUBLE = struct.Struct("<d")
+
+Encoded = Union[bytes, bytearray, memoryview]
+
+
+class PayloadDecodeError(ValueError):
+    """Raised for a payload_bin value this build cannot read (unknown version, corrupt body)."""
+
+
+# ----------- Encoding -----------
+
+def _varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+# Only the canonical (lowercase, hyphenated) form round-trips byte for byte
+_CANONICAL_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def _encode_str(out: bytearray, value: str):
+    data = value.encode()
+    _varint(out, len(data))
+    out += data
+
+
+def _encode(out: bytearray, value: Any):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if 0 <= value <= _SMALL_INT_MAX:
+            out.append(_SMALL_INT + value)
+        else:
+            out.append(_INT)
+            _varint(out, value * 2 if value >= 0 else -value * 2 - 1)  # Zigzag: small negatives stay short
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        if len(value) == 36 and _CANONICAL_UUID.fullmatch(value):
+            out.append(_UUID)
+            out += bytes.fromhex(value.replace("-", ""))
+        else:
+            out.append(_STR)
+            _encode_str(out, value)
+    elif isinstance(value, UUID):
+        # Same document as the JSON encoding, where a UUID object is written as its string
+        out.append(_UUID)
+        out += value.bytes
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _varint(out, len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, Mapping):
+        out.append(_DICT)
+        _varint(out, len(value))
+        for key, item in value.items():
+            index = _KEY_INDEX_V1.get(key)
+            if index is None:
+                out.append(_KEY_INLINE)
+                _encode_str(out, str(key))
+            else:
+                out.append(index)
+            _encode(out, item)
+    else:
+        # Decimals, datetimes and the like: their JSON (string) form
+        out.append(_STR)
+        _encode_str(out, str(value))
+
+
+def encode_payload(payload: Dict[str, Any], compress_threshold: int = OUTBOX_PAYLOAD_COMPRESS_THRESHOLD) -> bytes:
+    """Encodes a payload document as format version 1, compressed when large enough to pay off."""
+    body = bytearray()
+    _encode(body, payload)
+    if compress_threshold and len(body) > compress_threshold:
+        compressed = zlib.compress(bytes(body), 1)
+        if len(compressed) < len(body):
+            return bytes((VERSION | _COMPRESSED,)) + compressed
+    return bytes((VERSION,)) + bytes(body)
+
+
+# ----------- Decoding -----------
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+# Formatting a UUID string costs more than the rest of its decoding, and the same ids
+# (restaurants, hot menu items, an order across its events) recur event after event
+_UUID_STRINGS: Dict[bytes, str] = {}
+_UUID_STRINGS_MAX = 65536
+
+
+def _uuid_str(raw: bytes) -> str:
+    text = _UUID_STRINGS.get(raw)
+    if text is None:
+        if len(_UUID_STRINGS) >= _UUID_STRINGS_MAX:
+            _UUID_STRINGS.clear()
+        h = raw.hex()
+        text = _UUID_STRINGS[raw] = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return text
+
+
+def _decode(buf: bytes, pos: int) -> Tuple[Any, int]:
+    """Value at 'pos' and the position after it. Scalars inside containers are read inline."""
+    tag = buf[pos]
+    pos += 1
+    if tag == _DICT:
+        count = buf[pos]
+        pos += 1
+        if count > 0x7F:
+            count, pos = _read_varint(buf, pos - 1)
+        result = {}
+        for _ in range(count):
+            index = buf[pos]
+            if index == _KEY_INLINE:
+                size, pos = _read_varint(buf, pos + 1)
+                key = buf[pos:pos + size].decode()
+                pos += size
+            else:
+                key = _KEYS_V1[index]
+                pos += 1
+            tag = buf[pos]
+            if tag == _UUID:
+                result[key] = _uuid_str(buf[pos + 1:pos + 17])
+                pos += 17
+            elif tag >= _SMALL_INT:
+                result[key] = tag - _SMALL_INT
+                pos += 1
+            elif tag == _STR and buf[pos + 1] < 0x80:
+                end = pos + 2 + buf[pos + 1]
+                result[key] = buf[pos + 2:end].decode()
+                pos = end
+            else:
+                result[key], pos = _decode(buf, pos)
+        return result, pos
+    if tag == _LIST:
+        count, pos = _read_varint(buf, pos)
+        items: List[Any] = []
+        for _ in range(count):
+            item, pos = _decode(buf, pos)
+            items.append(item)
+        return items, pos
+    if tag >= _SMALL_INT:
+        return tag - _SMALL_INT, pos
+    if tag == _STR:
+        size, pos = _read_varint(buf, pos)
+        end = pos + size
+        return buf[pos:end].decode(), end
+    if tag == _UUID:
+        end = pos + 16
+        return _uuid_str(buf[pos:end]), end
+    if tag == _INT:
+        value, pos = _read_varint(buf, pos)
+        return (value >> 1) ^ -(value & 1), pos
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(buf, pos)[0], pos + 8
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    raise PayloadDecodeError(f"Unknown payload tag {tag:#x} at byte {pos - 1}")
+
+
+def decode_payload(data: Encoded) -> Dict[str, Any]:
+    """Decodes a payload_bin value of any supported format version."""
+    buf = data if isinstance(data, bytes) else bytes(data)
+    if not buf:
+        raise PayloadDecodeError("Empty payload")
+    header = buf[0]
+    if header & ~_COMPRESSED != VERSION:
+        raise PayloadDecodeError(f"Unsupported payload format version {header & ~_COMPRESSED}")
+    start = 1
+    if header & _COMPRESSED:
+        buf, start = zlib.decompress(buf[1:]), 0
+    try:
+        value, end = _decode(buf, start)
+    except (IndexError, UnicodeDecodeError) as e:
+        raise PayloadDecodeError(f"Corrupt payload: {e}") from e
+    if end != len(buf):
+        raise PayloadDecodeError("Trailing bytes after payload")
+    return value
+
+
+def decode_stored(payload: Any, payload_bin: Any) -> Dict[str, Any]:
+    """The payload of a stored event, from whichever column holds it (JSON text is parsed)."""
+    if payload_bin is not None:
+        return decode_payload(payload_bin)
+    return json.loads(payload) if isinstance(payload, (str, bytes)) else payload
+
+
+class LazyPayload(Mapping):
+    """
+    Read-only payload that is decoded (binary) or parsed (JSON text) on first access, so an
+    event whose handler never reads its payload costs no decoding.
+    """
+    __slots__ = ("_payload", "_payload_bin", "_data")
+
+    def __init__(self, payload: Any = None, payload_bin: Any = None):
+        self._payload = payload
+        self._payload_bin = payload_bin
+        self._data = None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = decode_stored(self._payload, self._payload_bin)
+            self._payload = self._payload_bin = None
+        return self._data
+
+    @property
+    def decoded(self) -> bool:
+        return self._data is not None
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"LazyPayload({self.data!r})" if self.decoded else "LazyPayload(<not decoded>)"
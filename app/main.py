@@ -1,30 +1,44 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, status
-from fastapi.exceptions import RequestValidationError,HTTPException
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response, status
 from app.core.db import init_db, close_db
 from app.api.v1.orders import router as orders_router
 from app.api.v1.inventory import router as inventory_router
+from app.api.v1.restaurants import router as restaurants_router
+from app.api.v1.analytics import router as analytics_router
+from app.api.v1.admin import router as admin_router
 from app.core.config import PROJECT_NAME, VERSION
-from app.core.exception_handlers import (
-    http_exception_handler,
-    setup_exception_handlers,
-    validation_exception_handler,
-    generic_exception_handler
-)
+from app.core.responses import ORJSONResponse
+from app.core.metrics import MetricsMiddleware, REGISTRY, PROMETHEUS_CONTENT_TYPE
+from app.core.logs import setup_logging, shutdown_logging
+from app.core.tracing import TracingMiddleware, run_trace_exporter
+from app.core.profiling import run_loop_monitor
+from app.services.idempotency_service import run_idempotency_cleanup
+from app.core.exception_handlers import setup_exception_handlers
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles startup and shutdown events."""
+    setup_logging() # Queue-based: log writes happen off the event loop
     print(f"Starting {PROJECT_NAME} v{VERSION}...")
-    await init_db() # Connect to DB and generate schemas
+    await init_db() # Connect to DB and check the schema version (migrations run separately)
+    cleanup_task = asyncio.create_task(run_idempotency_cleanup()) # Purge expired Idempotency-Keys
+    trace_task = asyncio.create_task(run_trace_exporter()) # Flush spans to TRACE_EXPORT_PATH
+    monitor_task = asyncio.create_task(run_loop_monitor()) # Event-loop lag; logs the stack of stalls
     yield 
+    for task in (cleanup_task, trace_task, monitor_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await close_db()
     print(f"{PROJECT_NAME} stopped.")
+    shutdown_logging()
 
 app = FastAPI(
     title=PROJECT_NAME,
     version=VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     # Configure API documentation and paths
     docs_url="/docs",
     redoc_url="/redoc"
@@ -33,11 +47,24 @@ app = FastAPI(
 # Include routers for modular API structure
 app.include_router(orders_router, prefix="/api/v1/orders", tags=["Order Management"])
 app.include_router(inventory_router, prefix="/api/v1/inventory", tags=["Inventory Utilities"])
+app.include_router(restaurants_router, prefix="/api/v1/restaurants", tags=["Restaurant Menus"])
+app.include_router(analytics_router, prefix="/api/v1/analytics", tags=["Sales Analytics"])
+app.include_router(admin_router, prefix="/api/v1/admin", tags=["Admin"])
 
 
 setup_exception_handlers(app)
 
+# Per-route latency, status codes and DB statements per request (exposed on /metrics)
+app.add_middleware(MetricsMiddleware)
+# Outermost: starts the trace whose id becomes the response request_id and rides on outbox events
+app.add_middleware(TracingMiddleware)
+
 @app.get("/health", status_code=status.HTTP_200_OK)
 async def health_check():
     """Simple health check endpoint."""
-    return {"status": "ok", "app_name": PROJECT_NAME}
\ No newline at end of file
+    return {"status": "ok", "app_name": PROJECT_NAME}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text-format metrics for this API process."""
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
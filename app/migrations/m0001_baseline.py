@@ -0,0 +1,135 @@
+"""
+Baseline schema: every table as of the introduction of versioned migrations, frozen as
+explicit DDL. It must never change; later schema changes go in their own migrations.
+
+Created with IF NOT EXISTS, so databases previously bootstrapped by generate_schemas()
+(which produced this same schema) adopt the baseline without changes.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Column types per dialect, as generate_schemas() produced them
+_TYPES = {
+    "postgres": {
+        "uuid": "UUID", "bool": "BOOL", "timestamp": "TIMESTAMPTZ", "json": "JSONB", "float": "DOUBLE PRECISION",
+        "price": "DECIMAL(12,2)", "total": "DECIMAL(14,2)",
+    },
+    "sqlite": {
+        "uuid": "CHAR(36)", "bool": "INT", "timestamp": "TIMESTAMP", "json": "JSON", "float": "REAL",
+        "price": "VARCHAR(40)", "total": "VARCHAR(40)",
+    },
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    id {uuid} NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    is_active {bool} NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_restaurants_is_acti_efedc2 ON restaurants (is_active);
+CREATE TABLE IF NOT EXISTS menu_items (
+    id {uuid} NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    price {price} NOT NULL,
+    is_active {bool} NOT NULL,
+    restaurant_id {uuid} NOT NULL REFERENCES restaurants (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_menu_items_restaur_c78d57 ON menu_items (restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_menu_items_is_acti_7ba4dd ON menu_items (is_active);
+CREATE INDEX IF NOT EXISTS idx_menu_items_restaur_fc9080 ON menu_items (restaurant_id, is_active);
+CREATE TABLE IF NOT EXISTS orders (
+    id {uuid} NOT NULL PRIMARY KEY,
+    user_id VARCHAR(64) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    total_amount {total} NOT NULL,
+    created_at {timestamp} NOT NULL,
+    updated_at {timestamp} NOT NULL,
+    restaurant_id {uuid} NOT NULL REFERENCES restaurants (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_orders_restaur_b66b41 ON orders (restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_33ec6d ON orders (status);
+CREATE INDEX IF NOT EXISTS idx_orders_user_id_f00b6a ON orders (user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_created_cdc9e7 ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_updated_68a8f1 ON orders (updated_at);
+CREATE INDEX IF NOT EXISTS idx_orders_status_c63842 ON orders (status, created_at);
+CREATE TABLE IF NOT EXISTS order_items (
+    id {uuid} NOT NULL PRIMARY KEY,
+    quantity INT NOT NULL,
+    unit_price {price} NOT NULL,
+    line_total {total} NOT NULL,
+    menu_item_id {uuid} NOT NULL REFERENCES menu_items (id) ON DELETE CASCADE,
+    order_id {uuid} NOT NULL REFERENCES orders (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_i_3cb419 ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_menu_it_055ebf ON order_items (menu_item_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_i_29ea29 ON order_items (order_id, menu_item_id);
+CREATE TABLE IF NOT EXISTS inventory (
+    id {uuid} NOT NULL PRIMARY KEY,
+    available_qty INT NOT NULL,
+    threshold_qty INT NOT NULL,
+    updated_at {timestamp} NOT NULL,
+    menu_item_id {uuid} NOT NULL UNIQUE REFERENCES menu_items (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_menu_it_95cd83 ON inventory (menu_item_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_updated_8285e1 ON inventory (updated_at);
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id {uuid} NOT NULL PRIMARY KEY,
+    aggregate_type VARCHAR(64) NOT NULL,
+    aggregate_id {uuid},
+    event_type VARCHAR(128) NOT NULL,
+    payload {json} NOT NULL,
+    published {bool} NOT NULL,
+    attempts INT NOT NULL,
+    trace_context {json},
+    created_at {timestamp} NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_even_publish_1a001e ON outbox_events (published);
+CREATE INDEX IF NOT EXISTS idx_outbox_even_created_a91cde ON outbox_events (created_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_even_aggrega_f17fe7 ON outbox_events (aggregate_type, aggregate_id);
+CREATE INDEX IF NOT EXISTS idx_outbox_even_event_t_a8360f ON outbox_events (event_type);
+CREATE INDEX IF NOT EXISTS idx_outbox_even_publish_df7681 ON outbox_events (published, created_at);
+CREATE TABLE IF NOT EXISTS processed_events (
+    id {uuid} NOT NULL PRIMARY KEY,
+    event_id VARCHAR(128) NOT NULL UNIQUE,
+    created_at {timestamp} NOT NULL
+);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    id {uuid} NOT NULL PRIMARY KEY,
+    key VARCHAR(255) NOT NULL UNIQUE,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INT,
+    response_body {json},
+    created_at {timestamp} NOT NULL,
+    expires_at {timestamp} NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires_ae52bb ON idempotency_keys (expires_at);
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id {uuid} NOT NULL PRIMARY KEY,
+    user_id VARCHAR(64) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    total_amount {total} NOT NULL,
+    created_at {timestamp} NOT NULL,
+    updated_at {timestamp} NOT NULL,
+    archived_at {timestamp} NOT NULL,
+    restaurant_id {uuid} NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_arch_user_id_edb464 ON orders_archive (user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_arch_created_abec08 ON orders_archive (created_at);
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    id {uuid} NOT NULL PRIMARY KEY,
+    quantity INT NOT NULL,
+    unit_price {price} NOT NULL,
+    line_total {total} NOT NULL,
+    menu_item_id {uuid} NOT NULL,
+    order_id {uuid} NOT NULL REFERENCES orders_archive (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_i_5e7d43 ON order_items_archive (order_id);
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key VARCHAR(255) NOT NULL PRIMARY KEY,
+    tokens {float} NOT NULL,
+    updated_at {float} NOT NULL
+);
+"""
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    await conn.execute_script(_SCHEMA.format(**_TYPES[conn.capabilities.dialect]))
@@ -0,0 +1,15 @@
+"""
+Outbox partitioning: 'partition_key' (hash bucket of aggregate_id) on outbox_events, plus
+the index each poller uses to read its own bucket range.
+
+Existing rows get bucket 0, so they are dispatched by the poller owning the first range.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    await conn.execute_script("ALTER TABLE outbox_events ADD COLUMN partition_key SMALLINT NOT NULL DEFAULT 0")
+    await conn.execute_script(
+        "CREATE INDEX idx_outbox_events_partition_pending "
+        "ON outbox_events (partition_key, published, created_at)"
+    )
@@ -0,0 +1,43 @@
+"""
+Inventory ledger: the append-only 'inventory_movements' table, plus the partial index the
+readers and the compactor use to find the movements not yet folded into 'inventory'.
+
+Existing stock levels stay in 'inventory' as the snapshot, so no data is moved.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+_CREATE_TABLE = {
+    "postgres": (
+        "CREATE TABLE inventory_movements ("
+        "id BIGSERIAL NOT NULL PRIMARY KEY, "
+        "event_id VARCHAR(128) NOT NULL, "
+        "menu_item_id UUID NOT NULL, "
+        "order_id UUID, "
+        "qty INT NOT NULL, "
+        "reason VARCHAR(64) NOT NULL, "
+        "compacted BOOL NOT NULL DEFAULT FALSE, "
+        "created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "CONSTRAINT uid_inventory_m_event_i_182e90 UNIQUE (event_id, menu_item_id))"
+    ),
+    "sqlite": (
+        "CREATE TABLE inventory_movements ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, "
+        "event_id VARCHAR(128) NOT NULL, "
+        "menu_item_id CHAR(36) NOT NULL, "
+        "order_id CHAR(36), "
+        "qty INT NOT NULL, "
+        "reason VARCHAR(64) NOT NULL, "
+        "compacted INT NOT NULL DEFAULT 0, "
+        "created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "CONSTRAINT uid_inventory_m_event_i_182e90 UNIQUE (event_id, menu_item_id))"
+    ),
+}
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    await conn.execute_script(_CREATE_TABLE[conn.capabilities.dialect])
+    # Only uncompacted movements are ever looked up by item; compacted ones are history
+    await conn.execute_script(
+        "CREATE INDEX idx_inventory_movements_pending "
+        "ON inventory_movements (menu_item_id) WHERE compacted = FALSE"
+    )
@@ -0,0 +1,48 @@
+"""
+Sales rollups: hourly counters per restaurant ('sales_hourly_restaurants') and per menu
+item ('sales_hourly_menu_items'), maintained by the inventory consumer.
+
+Counting starts with the orders deducted after this migration; earlier orders are not
+backfilled.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# Column types per dialect: (timestamp, money, primary key, uuid)
+_TYPES = {
+    "postgres": ("TIMESTAMPTZ", "DECIMAL(14,2)", "BIGSERIAL NOT NULL PRIMARY KEY", "UUID"),
+    "sqlite": ("TIMESTAMP", "VARCHAR(40)", "INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL", "CHAR(36)"),
+}
+
+
+def _counters(timestamp: str, money: str) -> str:
+    return (
+        f"hour {timestamp} NOT NULL, "
+        "orders INT NOT NULL DEFAULT 0, "
+        "units INT NOT NULL DEFAULT 0, "
+        f"revenue {money} NOT NULL DEFAULT 0, "
+        "cancelled_orders INT NOT NULL DEFAULT 0, "
+        "cancelled_units INT NOT NULL DEFAULT 0, "
+        f"cancelled_revenue {money} NOT NULL DEFAULT 0, "
+    )
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    timestamp, money, primary_key, uuid = _TYPES[conn.capabilities.dialect]
+    await conn.execute_script(
+        "CREATE TABLE sales_hourly_restaurants ("
+        + _counters(timestamp, money)
+        + f"id {primary_key}, "
+        f"restaurant_id {uuid} NOT NULL, "
+        "CONSTRAINT uid_sales_hourl_restaur_7d4adb UNIQUE (restaurant_id, hour))"
+    )
+    await conn.execute_script(
+        "CREATE TABLE sales_hourly_menu_items ("
+        + _counters(timestamp, money)
+        + f"id {primary_key}, "
+        f"menu_item_id {uuid} NOT NULL, "
+        f"restaurant_id {uuid} NOT NULL, "
+        "CONSTRAINT uid_sales_hourl_menu_it_d9aaec UNIQUE (menu_item_id, hour))"
+    )
+    await conn.execute_script(
+        "CREATE INDEX idx_sales_hourl_restaur_9b6143 ON sales_hourly_menu_items (restaurant_id, hour)"
+    )
@@ -0,0 +1,27 @@
+"""
+Shard directory: 'restaurant_shards' maps a restaurant to the database shard holding its
+data. Only shard 0's table is used; the other shards get it too, so every shard has the
+same schema and version.
+
+Nothing is moved: restaurants without an entry stay on shard 0.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+_CREATE_TABLE = {
+    "postgres": (
+        "CREATE TABLE restaurant_shards ("
+        "restaurant_id UUID NOT NULL PRIMARY KEY, "
+        "shard INT NOT NULL, "
+        "created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ),
+    "sqlite": (
+        "CREATE TABLE restaurant_shards ("
+        "restaurant_id CHAR(36) NOT NULL PRIMARY KEY, "
+        "shard INT NOT NULL, "
+        "created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ),
+}
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    await conn.execute_script(_CREATE_TABLE[conn.capabilities.dialect])
@@ -0,0 +1,45 @@
+"""
+Compact outbox payloads: 'payload_bin' (binary encoding, app.events.payload_codec) on
+outbox_events, and 'payload' becomes nullable since an event fills one of the two.
+
+Existing events keep their JSON payload and are read as before. SQLite cannot drop a NOT
+NULL constraint in place, so there the table is rebuilt with its indexes.
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+_COLUMNS = "id, aggregate_type, aggregate_id, event_type, payload, published, attempts, trace_context, created_at, partition_key"
+
+_SQLITE_REBUILD = f"""
+CREATE TABLE outbox_events_new (
+    id CHAR(36) NOT NULL PRIMARY KEY,
+    aggregate_type VARCHAR(64) NOT NULL,
+    aggregate_id CHAR(36),
+    event_type VARCHAR(128) NOT NULL,
+    payload JSON,
+    published INT NOT NULL,
+    attempts INT NOT NULL,
+    trace_context JSON,
+    created_at TIMESTAMP NOT NULL,
+    partition_key SMALLINT NOT NULL DEFAULT 0,
+    payload_bin BLOB
+);
+INSERT INTO outbox_events_new ({_COLUMNS}) SELECT {_COLUMNS} FROM outbox_events;
+DROP TABLE outbox_events;
+ALTER TABLE outbox_events_new RENAME TO outbox_events;
+CREATE INDEX idx_outbox_even_publish_1a001e ON outbox_events (published);
+CREATE INDEX idx_outbox_even_created_a91cde ON outbox_events (created_at);
+CREATE INDEX idx_outbox_even_aggrega_f17fe7 ON outbox_events (aggregate_type, aggregate_id);
+CREATE INDEX idx_outbox_even_event_t_a8360f ON outbox_events (event_type);
+CREATE INDEX idx_outbox_even_publish_df7681 ON outbox_events (published, created_at);
+CREATE INDEX idx_outbox_events_partition_pending ON outbox_events (partition_key, published, created_at);
+"""
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    if conn.capabilities.dialect == "postgres":
+        await conn.execute_script(
+            "ALTER TABLE outbox_events ADD COLUMN payload_bin BYTEA; "
+            "ALTER TABLE outbox_events ALTER COLUMN payload DROP NOT NULL"
+        )
+    else:
+        await conn.execute_script(_SQLITE_REBUILD)
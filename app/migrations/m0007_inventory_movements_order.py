@@ -0,0 +1,11 @@
+"""
+Index on inventory_movements.order_id: a cancellation looks up whether its order's
+placement took stock, and the ledger keeps every movement (compacted ones included).
+"""
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+async def upgrade(conn: BaseDBAsyncClient):
+    await conn.execute_script(
+        "CREATE INDEX idx_inventory_movements_order ON inventory_movements (order_id) WHERE order_id IS NOT NULL"
+    )
@@ -1,17 +1,30 @@
 # app/models/__init__.py
-from .inventory import Inventory
+from .archive import ArchivedOrder, ArchivedOrderItem
+from .idempotency import IdempotencyKey
+from .inventory import Inventory, InventoryMovement
 from .order import Order, OrderItem, OrderStatus,Restaurant, MenuItem
 from .outbox import OutboxEvent
 from .processed_event import ProcessedEvent
+from .rate_limit import RateLimitBucket
+from .sales import MenuItemSalesHourly, RestaurantSalesHourly
+from .shard import RestaurantShard
 
 # Export all models
 __all__ = [
+    "ArchivedOrder",
+    "ArchivedOrderItem",
+    "IdempotencyKey",
     "Inventory",
+    "InventoryMovement",
     "Order", 
     "OrderItem",
     "OrderStatus",
     "OutboxEvent", 
     "ProcessedEvent",
+    "RateLimitBucket",
     "Restaurant",
-    "MenuItem"
+    "RestaurantShard",
+    "MenuItem",
+    "MenuItemSalesHourly",
+    "RestaurantSalesHourly",
 ]
\ No newline at end of file
@@ -0,0 +1,40 @@
+from tortoise import fields, models
+from app.models.order import OrderStatus
+
+
+class ArchivedOrder(models.Model):
+    """
+    Cold storage for finalized (DELIVERED / CANCELLED) orders moved out of 'orders'
+    by the archiver. Same columns as Order, but only the indexes needed for lookups.
+    """
+    id = fields.UUIDField(primary_key=True) # Keeps the original order id
+    user_id = fields.CharField(max_length=64)
+    restaurant = fields.ForeignKeyField("models.Restaurant", related_name="archived_orders", db_constraint=False)
+    status = fields.CharEnumField(OrderStatus)
+    total_amount = fields.DecimalField(max_digits=14, decimal_places=2)
+    created_at = fields.DatetimeField()
+    updated_at = fields.DatetimeField()
+    archived_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "orders_archive"
+        indexes = [
+            ("user_id",),     # User order history
+            ("created_at",),  # Time-based queries
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    """Line items of an ArchivedOrder (cold copy of 'order_items')."""
+    id = fields.UUIDField(primary_key=True) # Keeps the original order item id
+    order = fields.ForeignKeyField("models.ArchivedOrder", related_name="items")
+    menu_item = fields.ForeignKeyField("models.MenuItem", related_name="archived_order_items", db_constraint=False)
+    quantity = fields.IntField()
+    unit_price = fields.DecimalField(max_digits=12, decimal_places=2)
+    line_total = fields.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        table = "order_items_archive"
+        indexes = [
+            ("order_id",),  # Order line items
+        ]
@@ -0,0 +1,23 @@
+from tortoise import fields, models
+import uuid
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stores the response of a request made with an 'Idempotency-Key' header, so client
+    retries replay the original response instead of re-running the write.
+    A row with an empty response_body is a claim held by a request still in progress.
+    """
+    id = fields.UUIDField(primary_key=True, default=uuid.uuid4)
+    key = fields.CharField(max_length=255, unique=True) # Scoped as '<user_id>:<header value>'
+    request_hash = fields.CharField(max_length=64) # Fingerprint of the request body
+    status_code = fields.IntField(null=True)
+    response_body = fields.JSONField(null=True) # Null while the first request is in progress
+    created_at = fields.DatetimeField(auto_now_add=True)
+    expires_at = fields.DatetimeField()
+
+    class Meta:
+        table = "idempotency_keys"
+        indexes = [
+            ("expires_at",),  # TTL cleanup
+        ]
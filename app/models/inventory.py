@@ -15,4 +15,27 @@ class Inventory(models.Model):
         indexes = [
             ("menu_item_id",),  # Fast menu item lookups
             ("updated_at",),    # For recent updates
-        ]
\ No newline at end of file
+        ]
+
+class InventoryMovement(models.Model):
+    """
+    Append-only stock ledger: one signed row per menu item per event that moved its stock
+    (negative for deductions, positive for restorations). Current stock is the Inventory row
+    (the snapshot) plus the sum of the movements not yet compacted into it.
+
+    (event_id, menu_item_id) is unique, so re-applying an event inserts nothing: the ledger
+    is also the inventory consumers' idempotency record.
+    """
+    id = fields.BigIntField(primary_key=True)
+    event_id = fields.CharField(max_length=128)
+    # No FK: inserts must not touch (or lock) the inventory/menu rows
+    menu_item_id = fields.UUIDField()
+    order_id = fields.UUIDField(null=True)
+    qty = fields.IntField()
+    reason = fields.CharField(max_length=64)  # Event type that caused the movement
+    compacted = fields.BooleanField(default=False)  # Folded into Inventory.available_qty
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "inventory_movements"
+        unique_together = (("event_id", "menu_item_id"),)
@@ -1,6 +1,9 @@
 from tortoise import fields, models
+from typing import Any, Dict
 import uuid
 
+from app.events.payload_codec import decode_stored
+
 
 class OutboxEvent(models.Model):
     """
@@ -11,9 +14,12 @@ class OutboxEvent(models.Model):
     aggregate_type = fields.CharField(max_length=64) # e.g., 'order', 'restaurant'
     aggregate_id = fields.UUIDField(null=True) # ID of the entity that generated the event
     event_type = fields.CharField(max_length=128) # e.g., 'order.placed.v1'
-    payload = fields.JSONField() # The actual event data
+    payload = fields.JSONField(null=True) # The actual event data, as JSON (OUTBOX_PAYLOAD_ENCODING=json and events before migration 0006)
+    payload_bin = fields.BinaryField(null=True) # ... or in the compact binary encoding (app.events.payload_codec)
     published = fields.BooleanField(default=False)
     attempts = fields.IntField(default=0)
+    trace_context = fields.JSONField(null=True) # Trace id / parent span / emit time of the producing hop
+    partition_key = fields.SmallIntField(default=0) # Hash bucket of aggregate_id; each poller owns a range (index added by migration 0002)
     created_at = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
@@ -24,4 +30,9 @@ class OutboxEvent(models.Model):
             ("aggregate_type", "aggregate_id"),      # Aggregate lookups
             ("event_type",),                         # Event type filtering
             ("published", "created_at"),             # Composite: polling optimization
-        ]
\ No newline at end of file
+        ]
+
+    @property
+    def decoded_payload(self) -> Dict[str, Any]:
+        """The event data, whichever column it is stored in."""
+        return decode_stored(self.payload, self.payload_bin)
\ No newline at end of file
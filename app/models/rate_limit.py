@@ -0,0 +1,14 @@
+from tortoise import fields, models
+
+
+class RateLimitBucket(models.Model):
+    """
+    Token-bucket state shared by all API processes (ADMISSION_SHARED_LIMITS mode).
+    One row per limited key, e.g. 'user:<user_id>' or 'restaurant:<restaurant_id>'.
+    """
+    key = fields.CharField(max_length=255, primary_key=True)
+    tokens = fields.FloatField() # Tokens left as of updated_at
+    updated_at = fields.FloatField() # Unix time of the last refill/take (wall clock, shared by processes)
+
+    class Meta:
+        table = "rate_limit_buckets"
@@ -0,0 +1,40 @@
+from tortoise import fields, models
+
+
+class _SalesRollup(models.Model):
+    """
+    Hourly sales counters, maintained incrementally by the inventory consumer. Sales are
+    counted once an order's stock is deducted and corrected by the 'cancelled_*' columns
+    when it is cancelled, both in the UTC hour the order was placed.
+    """
+    hour = fields.DatetimeField()  # Start of the hour (UTC)
+    orders = fields.IntField(default=0)
+    units = fields.IntField(default=0)
+    revenue = fields.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cancelled_orders = fields.IntField(default=0)
+    cancelled_units = fields.IntField(default=0)
+    cancelled_revenue = fields.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class RestaurantSalesHourly(_SalesRollup):
+    id = fields.BigIntField(primary_key=True)
+    restaurant_id = fields.UUIDField()
+
+    class Meta:
+        table = "sales_hourly_restaurants"
+        unique_together = (("restaurant_id", "hour"),)
+
+
+class MenuItemSalesHourly(_SalesRollup):
+    """Per-item counters; 'orders' counts the orders containing the item."""
+    id = fields.BigIntField(primary_key=True)
+    menu_item_id = fields.UUIDField()
+    restaurant_id = fields.UUIDField()
+
+    class Meta:
+        table = "sales_hourly_menu_items"
+        unique_together = (("menu_item_id", "hour"),)
+        indexes = [("restaurant_id", "hour")]  # Popularity by restaurant over a time range
@@ -0,0 +1,15 @@
+from tortoise import fields, models
+
+
+class RestaurantShard(models.Model):
+    """
+    Shard directory: which database shard holds a restaurant's menu, stock, orders and
+    outbox. Lives on shard 0 only. Restaurants without an entry predate sharding and stay
+    on shard 0.
+    """
+    restaurant_id = fields.UUIDField(primary_key=True)
+    shard = fields.IntField() # Index into app.core.db.shard_aliases()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "restaurant_shards"
@@ -47,3 +47,38 @@ class OrderDetailResponse(BaseModel):
     items: List[OrderItemResponse]
     created_at: str
 
+class BatchOrderResult(BaseModel):
+    """Per-order outcome inside a batch placement response."""
+    index: int  # Position of the order in the submitted array
+    success: bool
+    order_id: Optional[uuid.UUID] = None
+    status: Optional[OrderStatus] = None
+    total_amount: Optional[Decimal] = None
+    error: Optional[str] = None
+
+class BatchOrderResponse(BaseModel):
+    """Response schema for a batch order placement (202 Accepted, partial failures allowed)."""
+    accepted: int
+    rejected: int
+    results: List[BatchOrderResult]
+
+class OrderStatusBulkItem(BaseModel):
+    """Schema for a single transition inside a bulk status update."""
+    order_id: uuid.UUID
+    status: OrderStatus
+
+class BulkStatusUpdateResult(BaseModel):
+    """Per-transition outcome inside a bulk status update response."""
+    index: int  # Position of the transition in the submitted array
+    order_id: uuid.UUID
+    accepted: bool
+    old_status: Optional[OrderStatus] = None
+    new_status: Optional[OrderStatus] = None
+    reason: Optional[str] = None  # Rejection reason
+
+class BulkStatusUpdateResponse(BaseModel):
+    """Response schema for a bulk status update."""
+    accepted: int
+    rejected: int
+    results: List[BulkStatusUpdateResult]
+
@@ -3,8 +3,11 @@ from typing import Any, Optional
 import uuid
 from datetime import datetime
 
+from app.core.tracing import current_trace_id
+
 def _rid():
-    return uuid.uuid4().hex
+    # The request id is the trace id, so a response can be looked up in the trace export
+    return current_trace_id() or uuid.uuid4().hex
 
 class SuccessResponse(BaseModel):
     """Simple success response wrapper with just data, success, and request_id"""
@@ -0,0 +1,211 @@
+"""
+Process supervisor: runs the API and the outbox poller on every core of one box.
+
+    python -m app.serve [--api-workers 4] [--pollers 2] [--host 0.0.0.0] [--port 8000]
+
+- API workers are uvicorn processes accepting on one listening socket opened here and
+  inherited by each child ('uvicorn --fd'), so the kernel spreads connections across them.
+- Poller workers each own a disjoint range of outbox partitions (hash buckets of
+  aggregate_id, see app.events.outbox_utility), so no event is dispatched twice and events
+  of one order stay in order. With DATABASE_SHARD_URLS, every shard gets its own set of
+  '--pollers' workers.
+- The environment is captured once at startup; every worker, including restarts, gets
+  the same configuration plus its own slot (poller index, metrics port, trace file).
+- Crashed workers are restarted with exponential backoff.
+- SIGTERM / SIGINT drains: children get SIGTERM (uvicorn finishes in-flight requests, the
+  poller finishes its current batch) and are killed only after SERVE_DRAIN_TIMEOUT.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.core.config import (
+    DB_SHARD_URLS,
+    POLLER_METRICS_PORT,
+    SERVE_API_WORKERS,
+    SERVE_DRAIN_TIMEOUT,
+    SERVE_POLLER_WORKERS,
+    SERVE_RESTART_BACKOFF_MAX,
+    TRACE_EXPORT_PATH,
+)
+from app.core.logs import setup_logging
+from app.events.outbox_utility import partition_range
+
+log = logging.getLogger("serve")
+
+# A worker that stayed up this long is considered healthy again (backoff resets)
+_STABLE_AFTER = 30.0
+_RESTART_BACKOFF_MIN = 0.5
+_SUPERVISE_INTERVAL = 0.2
+
+
+@dataclass
+class WorkerSpec:
+    name: str
+    argv: List[str]
+    env: Dict[str, str]
+    pass_fds: tuple = ()
+
+
+@dataclass
+class _Worker:
+    spec: WorkerSpec
+    process: Optional[subprocess.Popen] = None
+    started_at: float = 0.0
+    failures: int = 0  # Consecutive short-lived runs
+    restart_at: Optional[float] = None
+    restarts: int = 0
+
+
+def _per_worker_path(path: str, name: str) -> str:
+    """'traces/api.jsonl' -> 'traces/api-<name>.jsonl': one span file per process, no interleaved writes."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{name}{ext}"
+
+
+def build_specs(api_workers: int, pollers: int, listen_fd: Optional[int], env: Dict[str, str], shards: int = 1) -> List[WorkerSpec]:
+    """Command line and pinned environment of every worker slot ('pollers' per shard)."""
+    specs = []
+    for i in range(api_workers):
+        worker_env = dict(env)
+        if TRACE_EXPORT_PATH:
+            worker_env["TRACE_EXPORT_PATH"] = _per_worker_path(TRACE_EXPORT_PATH, f"api-{i}")
+        specs.append(WorkerSpec(
+            name=f"api-{i}",
+            argv=[
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--fd", str(listen_fd),
+                "--timeout-graceful-shutdown", str(int(SERVE_DRAIN_TIMEOUT)),
+            ],
+            env=worker_env,
+            pass_fds=(listen_fd,),
+        ))
+    for shard in range(shards):
+        for i in range(pollers):
+            slot = shard * pollers + i
+            name = f"poller-{slot}" if shards > 1 else f"poller-{i}"
+            start, end = partition_range(i, pollers)
+            worker_env = dict(env, POLLER_WORKER_INDEX=str(i), POLLER_WORKER_COUNT=str(pollers), POLLER_SHARD_INDEX=str(shard))
+            worker_env["POLLER_METRICS_PORT"] = str(POLLER_METRICS_PORT + slot if POLLER_METRICS_PORT else 0)
+            if TRACE_EXPORT_PATH:
+                worker_env["TRACE_EXPORT_PATH"] = _per_worker_path(TRACE_EXPORT_PATH, name)
+            specs.append(WorkerSpec(
+                name=f"{name} [{f'shard {shard}, ' if shards > 1 else ''}partitions {start}-{end - 1}]",
+                argv=[sys.executable, "-m", "app.consumers.outbox_poller"],
+                env=worker_env,
+            ))
+    return specs
+
+
+class Supervisor:
+    """Starts every worker, restarts the ones that exit, and drains all of them on shutdown."""
+
+    def __init__(
+        self,
+        specs: List[WorkerSpec],
+        drain_timeout: float = SERVE_DRAIN_TIMEOUT,
+        backoff_max: float = SERVE_RESTART_BACKOFF_MAX,
+        backoff_min: float = _RESTART_BACKOFF_MIN,
+    ):
+        self.workers = [_Worker(spec) for spec in specs]
+        self.drain_timeout = drain_timeout
+        self.backoff_max = backoff_max
+        self.backoff_min = backoff_min
+        self.stopping = False
+
+    def _start(self, worker: _Worker):
+        worker.process = subprocess.Popen(
+            worker.spec.argv,
+            env=worker.spec.env,
+            pass_fds=worker.spec.pass_fds,
+            start_new_session=True,  # Terminal Ctrl-C reaches only the supervisor, which drains in order
+        )
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        log.info("Started %s (pid %s)", worker.spec.name, worker.process.pid)
+
+    def request_stop(self, *_):
+        self.stopping = True
+
+    def check(self):
+        """One supervision pass: notices exits and (re)starts workers whose backoff has elapsed."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is not None:
+                code = worker.process.returncode
+                worker.failures = 1 if now - worker.started_at >= _STABLE_AFTER else worker.failures + 1
+                delay = min(self.backoff_min * 2 ** (worker.failures - 1), self.backoff_max)
+                log.error("%s (pid %s) exited with code %s; restarting in %.1fs", worker.spec.name, worker.process.pid, code, delay)
+                worker.process = None
+                worker.restart_at = now + delay
+                worker.restarts += 1
+            if worker.process is None and (worker.restart_at is None or now >= worker.restart_at):
+                self._start(worker)
+
+    def drain(self):
+        """SIGTERM to every worker, then SIGKILL whatever is still running after the drain timeout."""
+        running = [w.process for w in self.workers if w.process is not None and w.process.poll() is None]
+        log.info("Draining %s workers (timeout %.0fs)...", len(running), self.drain_timeout)
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + self.drain_timeout
+        for process in running:
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                log.error("pid %s did not exit within the drain timeout; killing it", process.pid)
+                process.kill()
+                process.wait()
+
+    def run(self):
+        """Supervises until SIGTERM / SIGINT, then drains."""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        while not self.stopping:
+            self.check()
+            time.sleep(_SUPERVISE_INTERVAL)
+        self.drain()
+
+
+def _listen(host: str, port: int) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(args: argparse.Namespace):
+    setup_logging()
+    env = dict(os.environ)  # Pinned: restarts reuse exactly this configuration
+    sock = _listen(args.host, args.port) if args.api_workers else None
+    shards = len(DB_SHARD_URLS) + 1
+    specs = build_specs(args.api_workers, args.pollers, sock.fileno() if sock else None, env, shards)
+    log.info("Serving on %s:%s with %s API workers and %s pollers per shard (%s shards)", args.host, args.port, args.api_workers, args.pollers, shards)
+
+    supervisor = Supervisor(specs)
+    try:
+        supervisor.run()
+    finally:
+        if sock:
+            sock.close()
+    log.info("All workers stopped.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run API and outbox poller worker processes under one supervisor.")
+    parser.add_argument("--api-workers", type=int, default=SERVE_API_WORKERS)
+    parser.add_argument("--pollers", type=int, default=SERVE_POLLER_WORKERS, help="Outbox pollers per shard.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
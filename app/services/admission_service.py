@@ -0,0 +1,236 @@
+"""
+Admission control for order placement.
+
+New orders are admitted only while the API can still serve them quickly: a global cap on
+in-flight placement transactions, an outbox backlog watermark, and token buckets per user
+and per restaurant. Rejected requests get 429 with a Retry-After hint instead of queueing
+behind inventory locks, so latency for admitted orders stays bounded under overload.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from app.core.config import (
+    ADMISSION_BACKLOG_HIGH_WATERMARK,
+    ADMISSION_BACKLOG_REFRESH,
+    ADMISSION_BUCKET_CACHE_SIZE,
+    ADMISSION_MAX_INFLIGHT,
+    ADMISSION_RESTAURANT_BURST,
+    ADMISSION_RESTAURANT_RATE,
+    ADMISSION_SHARED_LIMITS,
+    ADMISSION_USER_BURST,
+    ADMISSION_USER_RATE,
+    MAX_ATTEMPTS,
+)
+from app.core.db import PRIMARY, shard_aliases
+from app.core.metrics import ADMISSION_INFLIGHT, ADMISSION_REJECTIONS
+from app.models.outbox import OutboxEvent
+from app.models.rate_limit import RateLimitBucket
+
+log = logging.getLogger("admission")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed. Carries the reason and seconds until a retry may succeed."""
+
+    def __init__(self, reason: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.message = message
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value (whole seconds, at least 1)."""
+        return str(max(math.ceil(self.retry_after), 1))
+
+
+class TokenBucket:
+    """Classic token bucket: 'rate' tokens per second, holding at most 'burst'."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, tokens: Optional[float] = None, updated: float = 0.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst if tokens is None else tokens
+        self.updated = updated
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, cost: float = 1.0) -> float:
+        """Seconds until 'cost' tokens are available (0.0 if they are now)."""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, now: float, cost: float = 1.0):
+        self._refill(now)
+        self.tokens -= cost
+
+
+# (reason, bucket key, rate, burst)
+_Limit = Tuple[str, str, float, float]
+
+
+class AdmissionController:
+    """
+    Decides whether an order placement may start. Checks run cheapest first: the in-flight
+    cap, the (periodically refreshed) outbox backlog, then the rate limits.
+
+    Token buckets live in process (per API worker) by default. With 'shared' they are rows
+    in 'rate_limit_buckets', updated under a row lock, so limits hold across all workers at
+    the cost of one short transaction per admitted order. The in-flight cap is always per
+    process: it bounds this worker's DB connections and lock queue.
+    """
+
+    def __init__(
+        self,
+        user_rate: float = ADMISSION_USER_RATE,
+        user_burst: float = ADMISSION_USER_BURST,
+        restaurant_rate: float = ADMISSION_RESTAURANT_RATE,
+        restaurant_burst: float = ADMISSION_RESTAURANT_BURST,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        backlog_high_watermark: int = ADMISSION_BACKLOG_HIGH_WATERMARK,
+        backlog_refresh: float = ADMISSION_BACKLOG_REFRESH,
+        shared: bool = ADMISSION_SHARED_LIMITS,
+        max_buckets: int = ADMISSION_BUCKET_CACHE_SIZE,
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.restaurant_rate = restaurant_rate
+        self.restaurant_burst = restaurant_burst
+        self.max_inflight = max_inflight
+        self.backlog_high_watermark = backlog_high_watermark
+        self.backlog_refresh = backlog_refresh
+        self.shared = shared
+        self.max_buckets = max_buckets
+        self.inflight = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._backlog = 0
+        self._backlog_checked = float("-inf")
+
+    # ----------- Checks -----------
+
+    def _reject(self, reason: str, retry_after: float, message: str):
+        ADMISSION_REJECTIONS.inc(reason)
+        raise AdmissionRejected(reason, retry_after, message)
+
+    async def _outbox_backlog(self) -> int:
+        """
+        Unpublished outbox events, re-read at most every 'backlog_refresh' seconds. With
+        shards, the deepest shard's backlog (each shard has its own pollers).
+        """
+        now = time.monotonic()
+        if now - self._backlog_checked >= self.backlog_refresh:
+            self._backlog_checked = now  # Concurrent requests keep using the previous value meanwhile
+            try:
+                backlogs = []
+                for alias in shard_aliases():
+                    pending = OutboxEvent.filter(published=False, attempts__lt=MAX_ATTEMPTS)
+                    backlogs.append(await pending.using_db(connections.get(alias)).count())
+                self._backlog = max(backlogs)
+            except Exception as e:
+                log.error(f"Admission: outbox backlog check failed, keeping last value: {e}")
+        return self._backlog
+
+    def _limits(self, user_id: Optional[str], restaurant_id: Optional[str]) -> List[_Limit]:
+        limits = []
+        if restaurant_id and self.restaurant_rate > 0:
+            limits.append(("restaurant_rate", f"restaurant:{restaurant_id}", self.restaurant_rate, self.restaurant_burst))
+        if user_id and self.user_rate > 0:
+            limits.append(("user_rate", f"user:{user_id}", self.user_rate, self.user_burst))
+        return limits
+
+    def _take_local(self, limits: List[_Limit]) -> Optional[Tuple[str, float]]:
+        """Takes one token from every bucket, or none if any is empty. Returns (reason, wait) on rejection."""
+        now = time.monotonic()
+        buckets = []
+        for reason, key, rate, burst in limits:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst, updated=now)
+            self._buckets.move_to_end(key)
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                return reason, wait
+            buckets.append(bucket)
+
+        for bucket in buckets:
+            bucket.take(now)
+        # Evicted buckets are idle ones (least recently used); they restart full
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return None
+
+    async def _take_shared(self, limits: List[_Limit]) -> Optional[Tuple[str, float]]:
+        """Same as _take_local against the 'rate_limit_buckets' table, in one transaction."""
+        now = time.time()
+        by_key = {key: (reason, rate, burst) for reason, key, rate, burst in limits}
+        keys = sorted(by_key)  # Fixed lock order across processes
+        async with in_transaction(PRIMARY) as conn:
+            rows = await RateLimitBucket.filter(key__in=keys).select_for_update().using_db(conn)
+            if len(rows) < len(keys):
+                found = {r.key for r in rows}
+                await RateLimitBucket.bulk_create(
+                    [RateLimitBucket(key=k, tokens=by_key[k][2], updated_at=now) for k in keys if k not in found],
+                    ignore_conflicts=True,
+                    using_db=conn
+                )
+                rows = await RateLimitBucket.filter(key__in=keys).select_for_update().using_db(conn)
+
+            buckets = {}
+            for row in rows:
+                reason, rate, burst = by_key[row.key]
+                bucket = TokenBucket(rate, burst, tokens=row.tokens, updated=row.updated_at)
+                wait = bucket.wait_time(now)
+                if wait > 0:
+                    return reason, wait
+                buckets[row.key] = bucket
+
+            for key in keys:
+                buckets[key].take(now)
+                await RateLimitBucket.filter(key=key).using_db(conn).update(tokens=buckets[key].tokens, updated_at=now)
+        return None
+
+    # ----------- Public API -----------
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str] = None, restaurant_id: Optional[str] = None):
+        """
+        Admits one placement for the duration of the block, or raises AdmissionRejected.
+        Without user_id / restaurant_id only the global checks apply (e.g. partner batches).
+        """
+        if self.max_inflight and self.inflight >= self.max_inflight:
+            self._reject("inflight", 1.0, "Too many orders are being placed right now. Please retry shortly.")
+
+        # Hold the slot while checking, so concurrent requests cannot all slip past the cap
+        self.inflight += 1
+        ADMISSION_INFLIGHT.set(self.inflight)
+        try:
+            if self.backlog_high_watermark and await self._outbox_backlog() >= self.backlog_high_watermark:
+                self._reject("backlog", self.backlog_refresh, "Order processing is backlogged. Please retry shortly.")
+
+            limits = self._limits(user_id, restaurant_id)
+            if limits:
+                limited = await self._take_shared(limits) if self.shared else self._take_local(limits)
+                if limited:
+                    reason, wait = limited
+                    self._reject(reason, wait, "Order rate limit exceeded. Please retry later.")
+            yield
+        finally:
+            self.inflight -= 1
+            ADMISSION_INFLIGHT.set(self.inflight)
+
+
+# Shared per-process controller used by the API
+admission = AdmissionController()
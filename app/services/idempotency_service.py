@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
+
+from app.core.config import (
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_CLAIM_LEASE_SECONDS,
+    IDEMPOTENCY_CLEANUP_INTERVAL,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+from app.models.idempotency import IdempotencyKey
+
+log = logging.getLogger("idempotency")
+
+# How often a duplicate polls the DB while another process holds the key
+_DB_POLL_INTERVAL = 0.05
+
+
+class IdempotencyError(Exception):
+    """Raised when an Idempotency-Key cannot be honoured. Carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def request_fingerprint(body: Any) -> str:
+    """Stable hash of a JSON-serializable request body, used to detect key reuse with a different request."""
+    encoded = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Keyed response store for idempotent writes.
+
+    A hot in-process LRU sits in front of the 'idempotency_keys' table. Concurrent duplicates
+    inside one process wait on the first request's future; duplicates in other processes see
+    the DB claim row and wait for its response to be written. Only successful responses are
+    stored: if the first request fails, its claim is released and the next attempt runs again.
+
+    A claim only holds the key for a short lease ('claim_lease_seconds'), renewed in the
+    background while its request runs; storing the response extends the row to the full TTL.
+    The order and the response row cannot share a transaction (orders live on the
+    restaurant's shard, keys on shard 0), so if the process dies between the two, the claim
+    is stale once its lease runs out and a retry takes it over and runs the request again,
+    instead of getting 409 until the TTL expires. Each claim is its own row, and a request
+    only ever releases or completes its own row (by id): a holder whose lease lapsed cannot
+    delete or overwrite the claim that took over.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = IDEMPOTENCY_CACHE_SIZE,
+        ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+        claim_lease_seconds: float = IDEMPOTENCY_CLAIM_LEASE_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.claim_lease_seconds = claim_lease_seconds
+        self._cache: "OrderedDict[str, Tuple[float, str, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    # ----------- In-process LRU -----------
+
+    def _cache_get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, request_hash, body = entry
+        if expires <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return request_hash, body
+
+    def _cache_put(self, key: str, request_hash: str, body: Dict) -> None:
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, request_hash, body)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _check_hash(stored_hash: str, request_hash: str) -> None:
+        if stored_hash != request_hash:
+            raise IdempotencyError(422, "Idempotency-Key was already used with a different request.")
+
+    # ----------- Public API -----------
+
+    async def run(
+        self,
+        key: str,
+        request_hash: str,
+        operation: Callable[[], Awaitable[Dict]],
+        status_code: int = 202
+    ) -> Tuple[Dict, bool]:
+        """
+        Runs 'operation' at most once per key and returns (response_body, replayed).
+        'operation' must return a JSON-serializable response body.
+        """
+        while True:
+            cached = self._cache_get(key)
+            if cached:
+                self._check_hash(cached[0], request_hash)
+                return cached[1], True
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            # Concurrent duplicate in this process: wait for the first request instead of racing
+            try:
+                await asyncio.shield(pending)
+            except Exception:
+                pass  # First request failed and released the key; loop and try to claim it
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body, replayed = await self._run_claimed(key, request_hash, operation, status_code)
+            future.set_result(body)
+            return body, replayed
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so unawaited failures are not logged
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_claimed(self, key: str, request_hash: str, operation: Callable[[], Awaitable[Dict]], status_code: int) -> Tuple[Dict, bool]:
+        stored, claim_id = await self._wait_for_stored(key, request_hash)
+        if stored is not None:
+            return stored, True
+
+        renewal = asyncio.create_task(self._renew_claim(claim_id))
+        try:
+            try:
+                body = await operation()
+            finally:
+                renewal.cancel()
+        except BaseException:
+            # Release the claim so a retry can run the request again
+            await IdempotencyKey.filter(id=claim_id, response_body__isnull=True).delete()
+            raise
+
+        completed = await IdempotencyKey.filter(id=claim_id).update(
+            status_code=status_code, response_body=body, expires_at=timezone.now() + timedelta(seconds=self.ttl_seconds)
+        )
+        if not completed:
+            log.warning("Idempotency claim for key %s was taken over before its response was stored.", key)
+        self._cache_put(key, request_hash, body)
+        return body, False
+
+    async def _renew_claim(self, claim_id: UUID):
+        """Keeps extending the claim's lease while its request runs (cancelled when it ends)."""
+        while True:
+            await asyncio.sleep(self.claim_lease_seconds / 3)
+            try:
+                renewed = await IdempotencyKey.filter(id=claim_id, response_body__isnull=True).update(
+                    expires_at=timezone.now() + timedelta(seconds=self.claim_lease_seconds)
+                )
+            except Exception as e:
+                log.warning("Idempotency claim renewal failed: %s", e)
+                continue
+            if not renewed:
+                log.warning("Idempotency claim %s lapsed and was taken over while its request was running.", claim_id)
+                return
+
+    async def _wait_for_stored(self, key: str, request_hash: str) -> Tuple[Optional[Dict], Optional[UUID]]:
+        """
+        Returns (stored response, None) for 'key', or (None, claim id) once this request holds
+        the DB claim. Waits (bounded) while another process is still running the first request.
+        """
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            now = timezone.now()
+            row = await IdempotencyKey.filter(key=key, expires_at__gt=now).first()
+            if row is None:
+                # Free key, expired response or stale claim: drop the old row and try to claim it
+                await IdempotencyKey.filter(key=key, expires_at__lte=now).delete()
+                try:
+                    claim = await IdempotencyKey.create(
+                        key=key,
+                        request_hash=request_hash,
+                        expires_at=now + timedelta(seconds=self.claim_lease_seconds)
+                    )
+                    return None, claim.id
+                except IntegrityError:
+                    continue  # Another process claimed it first
+
+            self._check_hash(row.request_hash, request_hash)
+            if row.response_body is not None:
+                self._cache_put(key, request_hash, row.response_body)
+                return row.response_body, None
+
+            if time.monotonic() >= deadline:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed.")
+            await asyncio.sleep(_DB_POLL_INTERVAL)
+
+    async def purge_expired(self) -> int:
+        """Deletes expired keys from the DB. Returns the number of rows removed."""
+        return await IdempotencyKey.filter(expires_at__lte=timezone.now()).delete()
+
+
+# Shared per-process store used by the API
+idempotency_store = IdempotencyStore()
+
+
+async def run_idempotency_cleanup():
+    """Background loop that purges expired idempotency keys (started from the API lifespan)."""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_CLEANUP_INTERVAL)
+        try:
+            removed = await idempotency_store.purge_expired()
+            if removed:
+                log.info(f"Purged {removed} expired idempotency keys.")
+        except Exception as e:
+            log.error(f"Idempotency cleanup failed: {e}")
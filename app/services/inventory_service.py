@@ -0,0 +1,351 @@
+import csv
+import json
+from collections import deque
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from tortoise import timezone
+
+from app.core.config import INVENTORY_IMPORT_CHUNK_SIZE
+from app.core.db import mark_written, shard_transaction, use_shard
+from app.core.hot_queries import claim_movements, pending_movements
+from app.events.outbox_utility import create_outbox_events_bulk
+from app.models.inventory import Inventory
+from app.models.order import MenuItem, Restaurant
+from app.schemas.inventory import InventoryItemRequest
+from app.services.shard_directory import group_by_shard, shard_directory, shard_of, shard_uuid
+
+# Supported streaming formats for bulk imports
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Cap on per-row errors echoed back in an import summary
+MAX_REPORTED_ERRORS = 100
+
+
+# ----------- Incremental Parsing -----------
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a stream of byte chunks into decoded text lines without buffering the whole body."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+class _CsvFeed:
+    """Lines handed to one csv.reader as they stream in, so quoted fields may span lines."""
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    feed = _CsvFeed()
+    reader = csv.reader(feed)
+    header: Optional[List[str]] = None
+    line_no = 0
+    start: Optional[int] = None  # First line of the record being collected
+    quotes = 0
+
+    async for line in lines:
+        line_no += 1
+        if start is None:
+            if not line.strip():
+                continue
+            start = line_no
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # Inside a quoted field: the record goes on on the next line
+        values = next(reader)
+        record_line, start, quotes = start, None, 0
+
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield {"_line": record_line, "_error": f"Expected {len(header)} columns, got {len(values)}"}
+            continue
+        record = {k: v.strip() for k, v in zip(header, values) if v.strip() != ""}
+        record["_line"] = record_line
+        yield record
+
+    if start is not None:
+        yield {"_line": start, "_error": "Unterminated quoted field"}
+
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            yield {"_line": line_no, "_error": f"Invalid JSON: {e}"}
+            continue
+        record["_line"] = line_no
+        yield record
+
+
+def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parses CSV (with a header row) or NDJSON lines into dict records as they stream in.
+    CSV goes through one csv.reader, so a quoted field may contain newlines; '_line' is the
+    record's first line. Yields {"_line": n, "_error": "..."} for records that cannot be parsed.
+    """
+    return _iter_ndjson(lines) if fmt == "ndjson" else _iter_csv(lines)
+
+
+class _ImportSummary:
+    """Accumulates row counts and a bounded list of per-row errors."""
+
+    def __init__(self):
+        self.rows = 0
+        self.applied = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line: Any, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self, applied_key: str) -> Dict[str, Any]:
+        return {"rows": self.rows, applied_key: self.applied, "rejected": self.rejected, "errors": self.errors}
+
+
+def _restock_event(inventory: Inventory, delta: Optional[int], source: str, pending: int = 0) -> Dict[str, Any]:
+    """
+    Builds the single restore-type event emitted per affected item.
+    'delta' is None for catalog imports, which set stock to an absolute level.
+    'pending' is the item's uncompacted ledger sum, so the event carries the effective stock.
+    """
+    return {
+        "aggregate_type": "inventory",
+        "aggregate_id": inventory.id,
+        "event_type": "inventory.restocked.v1",
+        "payload": {
+            "menu_item_id": str(inventory.menu_item_id),
+            "delta": delta,
+            "available_qty": inventory.available_qty + pending,
+            "source": source,
+        },
+    }
+
+
+# ----------- Restaurants -----------
+
+async def create_restaurant(name: str, is_active: bool = True) -> Restaurant:
+    """Creates a restaurant on the shard the directory places it on."""
+    restaurant_id = uuid4()
+    with use_shard(await shard_directory.place(restaurant_id)):
+        return await Restaurant.create(id=restaurant_id, name=name, is_active=is_active)
+
+
+# ----------- Catalog Import -----------
+
+async def import_catalog(
+    restaurant_id: UUID,
+    records: AsyncIterator[Dict[str, Any]],
+    chunk_size: int = INVENTORY_IMPORT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Upserts menu items and their stock for one restaurant from a record stream.
+
+    Rows carry the InventoryItemRequest fields plus an optional 'menu_item_id' (upsert key).
+    Each chunk is written with multi-row upserts in one short transaction, and every
+    item gets exactly one 'inventory.restocked.v1' event. New items get ids minted on the
+    restaurant's shard; an upsert key minted on another shard, or naming another
+    restaurant's item, is rejected.
+    """
+    alias = await shard_directory.shard_for(restaurant_id)
+    with use_shard(alias):
+        restaurant = await Restaurant.get_or_none(id=restaurant_id)
+    if not restaurant:
+        raise ValueError(f"Restaurant with ID {restaurant_id} not found.")
+
+    summary = _ImportSummary()
+    seen: set = set()
+    chunk: List[Dict[str, Any]] = []
+
+    async for record in records:
+        line = record.pop("_line", None)
+        summary.rows += 1
+        if "_error" in record:
+            summary.reject(line, record["_error"])
+            continue
+        try:
+            menu_item_id = UUID(str(record.pop("menu_item_id"))) if record.get("menu_item_id") else shard_uuid(alias)
+            item = InventoryItemRequest(**record)
+        except (ValueError, ValidationError) as e:
+            summary.reject(line, str(e))
+            continue
+        if shard_of(menu_item_id) != alias:
+            summary.reject(line, f"Menu item {menu_item_id} belongs to another shard than the restaurant.")
+            continue
+
+        if menu_item_id in seen:
+            summary.reject(line, f"Duplicate menu item {menu_item_id} in import.")
+            continue
+        seen.add(menu_item_id)
+
+        chunk.append({"id": menu_item_id, "item": item, "line": line})
+        if len(chunk) >= chunk_size:
+            summary.applied += await _upsert_catalog_chunk(alias, restaurant.id, chunk, summary)
+            chunk = []
+
+    if chunk:
+        summary.applied += await _upsert_catalog_chunk(alias, restaurant.id, chunk, summary)
+
+    return summary.as_dict("upserted")
+
+
+async def _upsert_catalog_chunk(alias: str, restaurant_id: UUID, chunk: List[Dict[str, Any]], summary: _ImportSummary) -> int:
+    async with shard_transaction(alias) as conn:
+        # Upsert keys are caller-supplied: an id owned by another restaurant must not be taken over
+        owners = dict(await MenuItem.filter(id__in=[row["id"] for row in chunk]).using_db(conn).values_list("id", "restaurant_id"))
+        foreign = {mid for mid, owner in owners.items() if owner != restaurant_id}
+        for row in chunk:
+            if row["id"] in foreign:
+                summary.reject(row["line"], f"Menu item {row['id']} belongs to another restaurant.")
+        chunk = [row for row in chunk if row["id"] not in foreign]
+        if not chunk:
+            return 0
+
+        await MenuItem.bulk_create(
+            [
+                MenuItem(
+                    id=row["id"],
+                    restaurant_id=restaurant_id,
+                    name=row["item"].name,
+                    price=Decimal(str(row["item"].price)),
+                    is_active=row["item"].is_active
+                )
+                for row in chunk
+            ],
+            on_conflict=["id"],
+            update_fields=["name", "price", "is_active"],
+            using_db=conn
+        )
+
+        await Inventory.bulk_create(
+            [
+                Inventory(
+                    id=uuid4(),
+                    menu_item_id=row["id"],
+                    available_qty=row["item"].initial_qty,
+                    threshold_qty=row["item"].threshold_qty
+                )
+                for row in chunk
+            ],
+            on_conflict=["menu_item_id"],
+            update_fields=["available_qty", "threshold_qty", "updated_at"],
+            using_db=conn
+        )
+
+        # An import sets an absolute level: movements recorded before it are superseded, so
+        # mark them compacted without folding them in (the upsert holds the rows' locks)
+        await claim_movements([row["id"] for row in chunk], conn)
+
+        # Re-read ids: rows that already existed keep their original inventory id
+        inventories = await Inventory.filter(menu_item_id__in=[row["id"] for row in chunk]).using_db(conn)
+        await create_outbox_events_bulk(
+            [_restock_event(inv, None, "catalog_import") for inv in inventories],
+            conn=conn
+        )
+    mark_written(*(f"inventory:{row['id']}" for row in chunk))
+    return len(chunk)
+
+
+# ----------- Stock Restock -----------
+
+async def apply_restock(
+    records: AsyncIterator[Dict[str, Any]],
+    chunk_size: int = INVENTORY_IMPORT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Applies stock deltas ('menu_item_id', 'delta') from a record stream.
+
+    Deltas are summed per item while streaming, so an item listed several times still gets
+    one write and exactly one 'inventory.restocked.v1' event. Items are then locked and
+    updated in chunks (in menu_item_id order, per shard) with one bulk UPDATE per chunk.
+    """
+    summary = _ImportSummary()
+    deltas: Dict[UUID, int] = {}
+
+    async for record in records:
+        line = record.pop("_line", None)
+        summary.rows += 1
+        if "_error" in record:
+            summary.reject(line, record["_error"])
+            continue
+        try:
+            menu_item_id = UUID(str(record["menu_item_id"]))
+            delta = int(Decimal(str(record["delta"])))
+        except (KeyError, ValueError, InvalidOperation) as e:
+            summary.reject(line, f"Invalid restock row: {e!r}")
+            continue
+        deltas[menu_item_id] = deltas.get(menu_item_id, 0) + delta
+
+    for alias, ordered_ids in group_by_shard(sorted(deltas)).items():
+        for start in range(0, len(ordered_ids), chunk_size):
+            ids = ordered_ids[start:start + chunk_size]
+            summary.applied += await _apply_restock_chunk(alias, {mid: deltas[mid] for mid in ids}, summary)
+
+    return summary.as_dict("restocked")
+
+
+async def _apply_restock_chunk(alias: str, deltas: Dict[UUID, int], summary: _ImportSummary) -> int:
+    async with shard_transaction(alias) as conn:
+        locked = await (
+            Inventory.filter(menu_item_id__in=list(deltas))
+            .order_by("menu_item_id")
+            .using_db(conn)
+            .select_for_update()
+        )
+        inv_map = {inv.menu_item_id: inv for inv in locked}
+        # Effective stock adds the ledger movements not compacted into the rows yet (read
+        # after the locks, like the inventory consumer does)
+        pending = await pending_movements(list(inv_map), conn)
+
+        now = timezone.now()
+        updated = []
+        for menu_item_id, delta in deltas.items():
+            inv = inv_map.get(menu_item_id)
+            if not inv:
+                summary.reject(str(menu_item_id), "Inventory not found for item.")
+                continue
+            available = inv.available_qty + pending.get(str(menu_item_id), 0)
+            if available + delta < 0:
+                summary.reject(str(menu_item_id), f"Delta {delta} would make stock negative ({available} available).")
+                continue
+            inv.available_qty += delta
+            inv.updated_at = now
+            updated.append((inv, delta))
+
+        if updated:
+            await Inventory.bulk_update([inv for inv, _ in updated], fields=["available_qty", "updated_at"], using_db=conn)
+            await create_outbox_events_bulk(
+                [_restock_event(inv, delta, "restock", pending.get(str(inv.menu_item_id), 0)) for inv, delta in updated],
+                conn=conn
+            )
+    mark_written(*(f"inventory:{inv.menu_item_id}" for inv, _ in updated))
+    return len(updated)
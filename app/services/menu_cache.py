@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+from uuid import UUID
+
+from app.core.config import MENU_CATALOG_TTL, MENU_GZIP_MIN_BYTES
+from app.models.order import MenuItem, Restaurant
+from app.services.stock_snapshot import ShardedStockSnapshot, StockSnapshot, stock_snapshot
+
+
+@dataclass(frozen=True)
+class MenuBlob:
+    """A restaurant menu serialized once and served as-is until its inputs change."""
+    etag: str
+    body: bytes
+    gzip_body: Optional[bytes]  # Only set when the body is large enough to be worth compressing
+    stock_version: int
+    built_at: float  # time.monotonic() of the build
+
+
+class MenuCache:
+    """
+    Pre-serialized, ETag-versioned menus keyed by restaurant.
+
+    A menu is rebuilt only when the restaurant's stock bucket version (from the stock
+    snapshot) moves, when it is invalidated after a local catalog write, or when it is
+    older than MENU_CATALOG_TTL (catalog writes made by other processes).
+    """
+
+    def __init__(self, snapshot: Union[StockSnapshot, ShardedStockSnapshot] = stock_snapshot, catalog_ttl: float = MENU_CATALOG_TTL):
+        self.snapshot = snapshot
+        self.catalog_ttl = catalog_ttl
+        self._blobs: Dict[UUID, MenuBlob] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    def invalidate(self, restaurant_id: UUID):
+        """Drops the cached menu after a catalog change made through this process."""
+        self._blobs.pop(restaurant_id, None)
+
+    def _is_current(self, blob: Optional[MenuBlob], stock_version: int) -> bool:
+        return (
+            blob is not None
+            and blob.stock_version == stock_version
+            and time.monotonic() - blob.built_at <= self.catalog_ttl
+        )
+
+    async def get(self, restaurant_id: UUID) -> Optional[MenuBlob]:
+        """Returns the current menu blob, rebuilding it if needed. None if the restaurant is unknown or inactive."""
+        stock_version = await self.snapshot.restaurant_version(restaurant_id)
+        blob = self._blobs.get(restaurant_id)
+        if self._is_current(blob, stock_version):
+            return blob
+
+        lock = self._locks.setdefault(restaurant_id, asyncio.Lock())
+        async with lock:
+            # A concurrent request may have rebuilt it while we waited (single flight)
+            blob = self._blobs.get(restaurant_id)
+            if self._is_current(blob, stock_version):
+                return blob
+            blob = await self._build(restaurant_id, stock_version)
+            if blob is None:
+                self._blobs.pop(restaurant_id, None)
+            else:
+                self._blobs[restaurant_id] = blob
+            return blob
+
+    async def _build(self, restaurant_id: UUID, stock_version: int) -> Optional[MenuBlob]:
+        restaurant = await Restaurant.get_or_none(id=restaurant_id)
+        if not restaurant or not restaurant.is_active:
+            return None
+
+        menu_items = await MenuItem.filter(restaurant_id=restaurant_id, is_active=True).order_by("name").values("id", "name", "price")
+        items = []
+        for m in menu_items:
+            available, low_stock = self.snapshot.bucket(m["id"]) or (False, False)
+            items.append({
+                "menu_item_id": str(m["id"]),
+                "name": m["name"],
+                "price": str(m["price"]),
+                "available": available,
+                "low_stock": low_stock,
+            })
+
+        document = {
+            "success": True,
+            "data": {
+                "restaurant_id": str(restaurant.id),
+                "name": restaurant.name,
+                "items": items,
+            },
+        }
+        body = json.dumps(document, separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+        # Same content as the previous build: keep the old blob (and its compressed copy)
+        previous = self._blobs.get(restaurant_id)
+        if previous is not None and previous.etag == etag:
+            return MenuBlob(etag, previous.body, previous.gzip_body, stock_version, time.monotonic())
+
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= MENU_GZIP_MIN_BYTES else None
+        return MenuBlob(etag, body, gzip_body, stock_version, time.monotonic())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+# Shared per-process menu cache used by the API
+menu_cache = MenuCache()
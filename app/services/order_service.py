@@ -1,62 +1,84 @@
-from tortoise.transactions import in_transaction
-from typing import List, Dict, Optional
+import logging
+from tortoise import timezone
+from typing import List, Dict, Optional, Tuple, Union
 from decimal import Decimal
 from app.models.order import Order, OrderItem, MenuItem, Restaurant, OrderStatus 
-from app.events.outbox_utility import create_outbox_event
+from app.models.archive import ArchivedOrder
+from app.events.outbox_utility import create_outbox_event, create_outbox_events_bulk
+from app.core.db import mark_written, shard_transaction, use_shard
+from app.core.hot_queries import MenuRow, fetch_order_menu
+from app.services.shard_directory import group_by_shard, shard_directory, shard_of, shard_uuid
+from tortoise.backends.base.client import BaseDBAsyncClient
 from uuid import UUID
 
+log = logging.getLogger("order_service")
+
+# Orders in these states can no longer change status
+FINAL_STATUSES = (OrderStatus.CANCELLED, OrderStatus.DELIVERED)
+
+# Anything with 'id' and 'price': ORM rows (batch path) or hot-path records (single orders)
+MenuLike = Union[MenuItem, MenuRow]
+
+def _price_order_lines(items: List[Dict], menu_map: Dict[str, MenuLike]) -> Tuple[List[Tuple[MenuLike, int, Decimal]], Decimal]:
+    """
+    Validates requested lines against the active menu and prices them.
+    Returns (menu_item, quantity, line_total) tuples plus the order total.
+    """
+    lines = []
+    total = Decimal("0")
+
+    for it in items:
+        mid_str = str(it["menu_item_id"])
+        qty = int(it["quantity"])
+        menu = menu_map.get(mid_str)
+
+        if not menu:
+            raise ValueError(f"Menu item {mid_str} not found or inactive.")
+
+        line_total = (menu.price * qty)
+        total += line_total
+        lines.append((menu, qty, line_total))
+
+    return lines, total
+
+def _event_line(menu_item_id: UUID, quantity: int, unit_price: Decimal) -> Dict:
+    """An order line as carried by order events (priced, so the sales rollups need no lookup)."""
+    return {"menu_item_id": str(menu_item_id), "quantity": quantity, "unit_price": str(unit_price)}
+
 async def place_order(user_id: str, restaurant_id: UUID, items: List[Dict]) -> Order:
     """
-    FAST PATH: Creates Order/OrderItem and the OutboxEvent atomically.
+    FAST PATH: Creates Order/OrderItem and the OutboxEvent atomically, on the restaurant's shard.
     Delegates slow, complex work (Inventory deduction) to the consumer/worker.
     """
-    async with in_transaction() as conn:
+    async with shard_transaction(await shard_directory.shard_for(restaurant_id)) as conn:
         # Input validation and existence check
+        # Restaurant and its requested active menu items in one prepared statement
         menu_item_ids = [UUID(it["menu_item_id"]) for it in items]
-        menu_items = await MenuItem.filter(id__in=menu_item_ids, restaurant_id=restaurant_id, is_active=True).using_db(conn)
-        menu_map = {str(m.id): m for m in menu_items}
-        
-        restaurant = await Restaurant.get_or_none(id=restaurant_id).using_db(conn)
-        if not restaurant or not restaurant.is_active:
+        restaurant_active, menu_map = await fetch_order_menu(UUID(str(restaurant_id)), menu_item_ids, conn)
+        if not restaurant_active:
              raise ValueError("Restaurant not found or is inactive.")
 
-        # 1. Create the Order header
+        lines, total = _price_order_lines(items, menu_map)
+
+        # 1. Create the Order header (total is known up front, so no second UPDATE)
         order = await Order.create(
+            id=shard_uuid(),
             user_id=user_id, 
-            restaurant=restaurant, 
+            restaurant_id=restaurant_id, 
             status=OrderStatus.PLACED, 
-            total_amount=Decimal("0"), 
+            total_amount=total, 
             using_db=conn
         )
 
-        total = Decimal("0")
-        event_items_payload = [] 
-
-        for it in items:
-            mid_str = str(it["menu_item_id"])
-            qty = int(it["quantity"])
-            menu = menu_map.get(mid_str)
-
-            if not menu:
-                raise ValueError(f"Menu item {mid_str} not found or inactive.")
-            
-            line_total = (menu.price * qty)
-            total += line_total
-
-            # 2. Create Order Item line
-            await OrderItem.create(
-                order=order, 
-                menu_item=menu, 
-                quantity=qty, 
-                unit_price=menu.price, 
-                line_total=line_total, 
-                using_db=conn
-            )
-            
-            event_items_payload.append({"menu_item_id": mid_str, "quantity": qty})
-
-        order.total_amount = total
-        await order.save(using_db=conn)
+        # 2. Create all Order Item lines with a single multi-row INSERT
+        await OrderItem.bulk_create(
+            [
+                OrderItem(order=order, menu_item_id=menu.id, quantity=qty, unit_price=menu.price, line_total=line_total)
+                for menu, qty, line_total in lines
+            ],
+            using_db=conn
+        )
+        event_items_payload = [_event_line(menu.id, qty, menu.price) for menu, qty, _ in lines]
 
         # 3. ATOMIC EVENT: Trigger Inventory Deduction (handled by consumer)
         await create_outbox_event(
@@ -66,24 +88,164 @@ async def place_order(user_id: str, restaurant_id: UUID, items: List[Dict]) -> O
             payload={
                 "order_id": str(order.id),
                 "restaurant_id": str(restaurant_id),
+                "placed_at": order.created_at.isoformat(),
                 "items": event_items_payload,
             },
             conn=conn
         )
 
+    mark_written(f"order:{order.id}")
     return order
 
-async def get_order_by_id(order_id: UUID) -> Optional[Order]:
-    """Fetches order details with items, including the menu item name/price."""
-    # Pre-fetch related entities to minimize DB queries (N+1 avoidance)
-    return await Order.get_or_none(id=order_id).prefetch_related('items', 'items__menu_item')
+async def place_orders_batch(user_id: str, orders: List[Dict]) -> List[Dict]:
+    """
+    BATCH FAST PATH: Places many orders in one transaction per shard for aggregator partners.
+
+    All referenced restaurants and menu items are validated with one query each, and the
+    valid orders, their lines and their 'order.placed.v1' events are written with multi-row
+    INSERTs. Invalid orders are rejected individually (partial failure) and reported back
+    at their original index. When the restaurants span several shards, a shard that fails
+    only rejects its own orders.
+    """
+    shards = await shard_directory.shards_for(o["restaurant_id"] for o in orders)
+    by_shard: Dict[str, List[Tuple[int, Dict]]] = {}
+    for index, data in enumerate(orders):
+        by_shard.setdefault(shards[UUID(str(data["restaurant_id"]))], []).append((index, data))
+
+    results: List[Dict] = []
+    for alias, indexed in by_shard.items():
+        try:
+            results.extend(await _place_orders_on_shard(alias, user_id, indexed))
+        except Exception as e:
+            if len(by_shard) == 1:
+                raise
+            log.error(f"Batch placement failed on shard {alias}: {e}")
+            results.extend({"index": index, "success": False, "error": "Temporarily unavailable, please retry."} for index, _ in indexed)
+    return sorted(results, key=lambda r: r["index"])
+
+async def _place_orders_on_shard(alias: str, user_id: str, indexed: List[Tuple[int, Dict]]) -> List[Dict]:
+    """Places the (index, order) pairs whose restaurants live on 'alias', in one transaction."""
+    results: List[Dict] = []
+
+    async with shard_transaction(alias) as conn:
+        orders = [data for _, data in indexed]
+        restaurant_ids = {UUID(str(o["restaurant_id"])) for o in orders}
+        menu_item_ids = {UUID(str(it["menu_item_id"])) for o in orders for it in o["items"]}
+
+        restaurants = await Restaurant.filter(id__in=restaurant_ids, is_active=True).using_db(conn)
+        menu_items = await MenuItem.filter(id__in=menu_item_ids, is_active=True).using_db(conn) if menu_item_ids else []
+
+        active_restaurant_ids = {str(r.id) for r in restaurants}
+        menus_by_restaurant: Dict[str, Dict[str, MenuItem]] = {}
+        for m in menu_items:
+            menus_by_restaurant.setdefault(str(m.restaurant_id), {})[str(m.id)] = m
+
+        new_orders, new_items, new_events = [], [], []
+        placed_at = timezone.now()  # Set explicitly: the events carry it before the rows are written
+
+        for index, data in indexed:
+            restaurant_id = str(data["restaurant_id"])
+            try:
+                if not data["items"]:
+                    raise ValueError("Order must contain items.")
+                if restaurant_id not in active_restaurant_ids:
+                    raise ValueError("Restaurant not found or is inactive.")
+                lines, total = _price_order_lines(data["items"], menus_by_restaurant.get(restaurant_id, {}))
+            except ValueError as e:
+                results.append({"index": index, "success": False, "error": str(e)})
+                continue
+
+            order = Order(
+                id=shard_uuid(),
+                user_id=user_id,
+                restaurant_id=UUID(restaurant_id),
+                status=OrderStatus.PLACED,
+                total_amount=total,
+                created_at=placed_at
+            )
+            new_orders.append(order)
+            new_items.extend(
+                OrderItem(order_id=order.id, menu_item_id=menu.id, quantity=qty, unit_price=menu.price, line_total=line_total)
+                for menu, qty, line_total in lines
+            )
+            new_events.append({
+                "aggregate_type": "order",
+                "aggregate_id": order.id,
+                "event_type": "order.placed.v1",
+                "payload": {
+                    "order_id": str(order.id),
+                    "restaurant_id": restaurant_id,
+                    "placed_at": placed_at.isoformat(),
+                    "items": [_event_line(menu.id, qty, menu.price) for menu, qty, _ in lines],
+                },
+            })
+            results.append({
+                "index": index,
+                "success": True,
+                "order_id": order.id,
+                "status": order.status,
+                "total_amount": total,
+            })
+
+        if new_orders:
+            await Order.bulk_create(new_orders, using_db=conn)
+            await OrderItem.bulk_create(new_items, using_db=conn)
+            await create_outbox_events_bulk(new_events, conn=conn)
+
+    mark_written(*(f"order:{order.id}" for order in new_orders))
+    return results
+
+async def get_order_by_id(order_id: UUID, conn: Optional[BaseDBAsyncClient] = None) -> Optional[Union[Order, ArchivedOrder]]:
+    """
+    Fetches order details with items, including the menu item name/price.
+    Falls back to the archive tables for finalized orders moved to cold storage.
+    Pass 'conn' to read from a specific connection (e.g. the read replica).
+    """
+    with use_shard(shard_of(order_id)):
+        # Pre-fetch related entities to minimize DB queries (N+1 avoidance)
+        order = await Order.get_or_none(id=order_id).using_db(conn).prefetch_related('items', 'items__menu_item')
+        if order:
+            return order
+        return await ArchivedOrder.get_or_none(id=order_id).using_db(conn).prefetch_related('items', 'items__menu_item')
+
+def _cancellation_payload(order: Order, items: List[OrderItem]) -> Dict:
+    """What the inventory consumer needs to restore the stock and correct the sales rollups."""
+    return {
+        "restaurant_id": str(order.restaurant_id),
+        "placed_at": order.created_at.isoformat(),
+        "items": [_event_line(item.menu_item_id, item.quantity, item.unit_price) for item in items],
+    }
+
+def _status_change_event(order: Order, old_status: OrderStatus, new_status: OrderStatus, items: List[OrderItem]) -> Dict:
+    """Builds the outbox event (type + payload) emitted for an order status transition."""
+    # Default event type based on status (e.g., order.status.preparing.v1)
+    event_type = f"order.status.{new_status.value.lower()}.v1"
+    
+    payload = {
+        "order_id": str(order.id),
+        "old_status": old_status,
+        "new_status": new_status.value,
+        "user_id": order.user_id,
+    }
+
+    # If the new status is CANCELLED, switch to the specific compensation event
+    if new_status == OrderStatus.CANCELLED:
+        event_type = "order.cancelled.v1" 
+        payload.update(_cancellation_payload(order, items))
+
+    return {
+        "aggregate_type": "order",
+        "aggregate_id": order.id,
+        "event_type": event_type,
+        "payload": payload,
+    }
 
 async def update_order_status(order_id: UUID, new_status: OrderStatus) -> Order:
     """
     Updates order status, enforces state machine rules, and emits specific events.
     """
-    # Use the Tortoise in_transaction context manager for atomicity
-    async with in_transaction() as conn:
+    # One transaction on the shard the order was created on, for atomicity
+    async with shard_transaction(shard_of(order_id)) as conn:
         order = await Order.get_or_none(id=order_id).prefetch_related('items').using_db(conn)
         
         if not order:
@@ -91,7 +253,7 @@ async def update_order_status(order_id: UUID, new_status: OrderStatus) -> Order:
         
         # --- 1. CRITICAL STATE MACHINE VALIDATION ---
         # Block status updates if the order is in a final, irreversible state.
-        if order.status in [OrderStatus.CANCELLED, OrderStatus.DELIVERED]:
+        if order.status in FINAL_STATUSES:
             # This prevents invalid transitions like CANCELLED -> OUT_FOR_DELIVERY 
             raise ValueError(f"Order is already in a final state: {order.status}. Status cannot be updated.")
             
@@ -100,44 +262,88 @@ async def update_order_status(order_id: UUID, new_status: OrderStatus) -> Order:
         await order.save(using_db=conn) # Save the status update
 
         # --- 2. DYNAMIC EVENT EMISSION & COMPENSATION LOGIC ---
-        
-        # Default event type based on status (e.g., order.status.preparing.v1)
-        event_type = f"order.status.{new_status.value.lower()}.v1"
-        
-        payload = {
-            "order_id": str(order.id),
-            "old_status": old_status,
-            "new_status": new_status.value,
-            "user_id": order.user_id,
-        }
-
-        # If the new status is CANCELLED, switch to the specific compensation event
-        if new_status == OrderStatus.CANCELLED:
-            event_type = "order.cancelled.v1" 
-            # Items must be fetched for the payload (handled by prefetch_related above)
-            payload["items"] = [
-                {"menu_item_id": str(item.menu_item_id), "quantity": item.quantity} 
-                for item in order.items
-            ]
-
-        # ATOMIC EVENT EMISSION
+        # Items for the cancellation payload are handled by prefetch_related above.
         # This insertion happens in the same DB transaction as the order.save()
-        await create_outbox_event(
-            aggregate_type="order",
-            aggregate_id=order.id,
-            event_type=event_type,
-            payload=payload,
-            conn=conn
-        )
+        await create_outbox_event(conn=conn, **_status_change_event(order, old_status, new_status, order.items))
         
+    mark_written(f"order:{order.id}")
     return order
 
+async def update_order_statuses_bulk(updates: List[Tuple[UUID, OrderStatus]]) -> List[Dict]:
+    """
+    Applies many (order_id, status) transitions in one transaction per shard (fleet/kitchen callbacks).
+
+    Orders are locked and validated with one query, accepted transitions are applied with one
+    set-based UPDATE per target status, and all matching events are emitted with a single
+    multi-row INSERT. Every transition gets an accept/reject result at its original index.
+    """
+    by_shard = group_by_shard(range(len(updates)), key=lambda index: updates[index][0])
+    results: List[Dict] = []
+    for alias, indexes in by_shard.items():
+        results.extend(await _update_statuses_on_shard(alias, [(index, *updates[index]) for index in indexes]))
+    return sorted(results, key=lambda r: r["index"])
+
+async def _update_statuses_on_shard(alias: str, updates: List[Tuple[int, UUID, OrderStatus]]) -> List[Dict]:
+    """Applies the (index, order_id, status) transitions of orders on 'alias', in one transaction."""
+    results: List[Dict] = []
+
+    async with shard_transaction(alias) as conn:
+        order_ids = {order_id for _, order_id, _ in updates}
+        orders = await Order.filter(id__in=order_ids).using_db(conn).select_for_update()
+        order_map = {o.id: o for o in orders}
+
+        # Line items are only needed for the compensation payload of cancellations
+        cancel_ids = {order_id for _, order_id, new_status in updates if new_status == OrderStatus.CANCELLED and order_id in order_map}
+        items_by_order: Dict[UUID, List[OrderItem]] = {}
+        if cancel_ids:
+            for item in await OrderItem.filter(order_id__in=cancel_ids).using_db(conn):
+                items_by_order.setdefault(item.order_id, []).append(item)
+
+        events = []
+        for index, order_id, new_status in updates:
+            order = order_map.get(order_id)
+            if not order:
+                results.append({"index": index, "order_id": order_id, "accepted": False, "reason": "Order not found"})
+                continue
+
+            # Same state machine rule as the single update; repeated ids in one batch
+            # are validated against the state left by the previous transition.
+            if order.status in FINAL_STATUSES:
+                results.append({
+                    "index": index,
+                    "order_id": order_id,
+                    "accepted": False,
+                    "old_status": order.status,
+                    "reason": f"Order is already in a final state: {order.status}. Status cannot be updated."
+                })
+                continue
+
+            old_status = order.status
+            order.status = new_status
+            events.append(_status_change_event(order, old_status, new_status, items_by_order.get(order_id, [])))
+            results.append({"index": index, "order_id": order_id, "accepted": True, "old_status": old_status, "new_status": new_status})
+
+        # Set-based write: one UPDATE per distinct final status instead of one per order
+        touched = {r["order_id"] for r in results if r["accepted"]}
+        ids_by_status: Dict[OrderStatus, List[UUID]] = {}
+        for order_id in touched:
+            ids_by_status.setdefault(order_map[order_id].status, []).append(order_id)
+
+        now = timezone.now()
+        for new_status, ids in ids_by_status.items():
+            await Order.filter(id__in=ids).using_db(conn).update(status=new_status, updated_at=now)
+
+        await create_outbox_events_bulk(events, conn=conn)
+
+    mark_written(*(f"order:{order_id}" for order_id in touched))
+    return results
+
 
 async def cancel_order(order_id: UUID) -> Order:
     """
     Cancels an order and triggers an event to restore inventory.
     """
-    async with in_transaction() as conn:
+    async with shard_transaction(shard_of(order_id)) as conn:
         # Prefetch items so we know what to restore
         order = await Order.get_or_none(id=order_id).prefetch_related('items').using_db(conn)
         if not order:
@@ -150,21 +356,17 @@ async def cancel_order(order_id: UUID) -> Order:
         order.status = OrderStatus.CANCELLED
         await order.save(using_db=conn)
 
-        # Prepare payload for inventory restoration based on order items
-        items_payload = [
-            {"menu_item_id": str(item.menu_item_id), "quantity": item.quantity}
-            for item in order.items
-        ]
-
-        # ATOMIC EVENT: Trigger Inventory Restoration (handled by consumer)
+        # ATOMIC EVENT: Trigger Inventory Restoration (handled by consumer), with the
+        # order items it restores
         await create_outbox_event(
             aggregate_type="order",
             aggregate_id=order.id,
             event_type="order.cancelled.v1",
             payload={
                 "order_id": str(order.id),
-                "items": items_payload
+                **_cancellation_payload(order, order.items)
             },
             conn=conn
         )
+    mark_written(f"order:{order.id}")
     return order
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Hourly sales rollups: maintained from the order events the inventory consumer handles,
+read by the analytics API.
+
+An order is counted as a sale (orders, units, revenue) once its stock is deducted, and
+corrected (cancelled_orders, cancelled_units, cancelled_revenue) when it is cancelled. Both
+land in the UTC hour the order was placed, so the net figures of an hour only change while
+its orders are still being cancelled. Orders rejected for lack of stock are never counted.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.functions import Sum
+
+from app.core.hot_queries import add_sales
+from app.models.order import MenuItem, OrderItem
+from app.models.sales import MenuItemSalesHourly, RestaurantSalesHourly
+
+log = logging.getLogger("sales_service")
+
+_CENTS = Decimal("0.01")
+_COUNTERS = ("orders", "units", "revenue", "cancelled_orders", "cancelled_units", "cancelled_revenue")
+
+# (menu_item_id, quantity, unit_price) of one order line
+SaleLine = Tuple[UUID, int, Decimal]
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Start of the UTC hour containing 'moment'."""
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _money(value: Any) -> Decimal:
+    # SQLite sums decimals as floats; Postgres returns Decimals already
+    return Decimal(str(value or 0)).quantize(_CENTS)
+
+
+# ----------- Maintenance (inventory consumer) -----------
+
+async def _order_sale(payload: Dict[str, Any], conn: BaseDBAsyncClient) -> Optional[Tuple[UUID, datetime, List[SaleLine]]]:
+    """
+    Restaurant, placement time and priced lines of the order an event is about. Taken from
+    the payload; events written before payloads carried prices are looked up instead.
+    """
+    items = payload.get("items", [])
+    if "placed_at" in payload and "restaurant_id" in payload and all("unit_price" in item for item in items):
+        lines = [(UUID(item["menu_item_id"]), int(item["quantity"]), Decimal(item["unit_price"])) for item in items]
+        return UUID(payload["restaurant_id"]), datetime.fromisoformat(payload["placed_at"]), lines
+
+    rows = await (
+        OrderItem.filter(order_id=UUID(payload["order_id"]))
+        .using_db(conn)
+        .values("menu_item_id", "quantity", "unit_price", "order__restaurant_id", "order__created_at")
+    )
+    if not rows:
+        return None
+    lines = [(row["menu_item_id"], row["quantity"], row["unit_price"]) for row in rows]
+    return rows[0]["order__restaurant_id"], rows[0]["order__created_at"], lines
+
+
+async def _add_order(payload: Dict[str, Any], cancelled: bool, conn: BaseDBAsyncClient):
+    sale = await _order_sale(payload, conn)
+    if sale is None:
+        log.warning("Sales rollup skipped: order %s not found.", payload.get("order_id"))
+        return
+    restaurant_id, placed_at, lines = sale
+    hour = hour_bucket(placed_at)
+
+    per_item: Dict[UUID, List] = {}
+    for menu_item_id, quantity, unit_price in lines:
+        totals = per_item.setdefault(menu_item_id, [0, Decimal("0")])
+        totals[0] += quantity
+        totals[1] += unit_price * quantity
+
+    def counters(units: int, revenue: Decimal) -> Tuple[int, int, Decimal, int, int, Decimal]:
+        return (0, 0, Decimal("0"), 1, units, revenue) if cancelled else (1, units, revenue, 0, 0, Decimal("0"))
+
+    units = sum(qty for qty, _ in per_item.values())
+    revenue = sum((amount for _, amount in per_item.values()), Decimal("0"))
+    await add_sales(
+        [(restaurant_id, hour, *counters(units, revenue))],
+        [(menu_item_id, restaurant_id, hour, *counters(qty, amount)) for menu_item_id, (qty, amount) in per_item.items()],
+        conn
+    )
+
+
+async def record_order_sale(payload: Dict[str, Any], conn: BaseDBAsyncClient):
+    """Counts an 'order.placed.v1' order whose stock was just deducted (same transaction)."""
+    await _add_order(payload, cancelled=False, conn=conn)
+
+
+async def record_order_cancellation(payload: Dict[str, Any], conn: BaseDBAsyncClient):
+    """Applies the correction for an 'order.cancelled.v1' order whose stock was just restored (same transaction)."""
+    await _add_order(payload, cancelled=True, conn=conn)
+
+
+# ----------- Reports (analytics API) -----------
+
+def _with_net(row: Dict[str, Any]) -> Dict[str, Any]:
+    row["revenue"] = _money(row["revenue"])
+    row["cancelled_revenue"] = _money(row["cancelled_revenue"])
+    row["net_orders"] = row["orders"] - row["cancelled_orders"]
+    row["net_units"] = row["units"] - row["cancelled_units"]
+    row["net_revenue"] = row["revenue"] - row["cancelled_revenue"]
+    return row
+
+
+async def restaurant_sales(
+    restaurant_id: UUID,
+    start: datetime,
+    end: datetime,
+    granularity: str = "hour",
+    conn: Optional[BaseDBAsyncClient] = None
+) -> Dict[str, Any]:
+    """Sales of a restaurant per hour or per (UTC) day in [start, end), plus the window totals."""
+    rows = await (
+        RestaurantSalesHourly.filter(restaurant_id=restaurant_id, hour__gte=hour_bucket(start), hour__lt=end)
+        .order_by("hour")
+        .using_db(conn)
+        .values("hour", *_COUNTERS)
+    )
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    totals = dict.fromkeys(_COUNTERS, 0)
+    for row in rows:
+        hour = hour_bucket(row["hour"])
+        key = hour.replace(hour=0) if granularity == "day" else hour
+        bucket = buckets.setdefault(key, dict.fromkeys(_COUNTERS, 0))
+        for name in _COUNTERS:
+            value = _money(row[name]) if name.endswith("revenue") else row[name]
+            bucket[name] += value
+            totals[name] += value
+
+    return {
+        "restaurant_id": restaurant_id,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "buckets": [_with_net({"start": key, **bucket}) for key, bucket in buckets.items()],
+        "totals": _with_net(totals),
+    }
+
+
+async def item_popularity(
+    restaurant_id: UUID,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    conn: Optional[BaseDBAsyncClient] = None
+) -> List[Dict[str, Any]]:
+    """The restaurant's menu items ranked by net units sold in [start, end) (ties by net revenue)."""
+    rows = await (
+        MenuItemSalesHourly.filter(restaurant_id=restaurant_id, hour__gte=hour_bucket(start), hour__lt=end)
+        .annotate(**{f"sum_{name}": Sum(name) for name in _COUNTERS})
+        .group_by("menu_item_id")
+        .using_db(conn)
+        .values("menu_item_id", *(f"sum_{name}" for name in _COUNTERS))
+    )
+    ranked = sorted(
+        (_with_net({"menu_item_id": row["menu_item_id"], **{name: row[f"sum_{name}"] or 0 for name in _COUNTERS}}) for row in rows),
+        key=lambda item: (item["net_units"], item["net_revenue"]),
+        reverse=True,
+    )[:limit]
+
+    names = dict(await MenuItem.filter(id__in=[item["menu_item_id"] for item in ranked]).using_db(conn).values_list("id", "name")) if ranked else {}
+    for item in ranked:
+        item["name"] = names.get(item["menu_item_id"])
+    return ranked
+
+
+def default_window(start: Optional[datetime], end: Optional[datetime], hours: int) -> Tuple[datetime, datetime]:
+    """Fills in a missing end (now) and start ('hours' before the end); naive times are UTC."""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=hours)
+    return tuple(t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (start, end))
@@ -0,0 +1,130 @@
+"""
+Shard directory: maps restaurants to database shards, and order / menu item ids to the
+shard they were created on.
+
+Everything an order touches (menu, stock, the order itself, its outbox events and sales
+rollups) is scoped to one restaurant, so a restaurant's data lives together on one shard
+and every transaction stays on one database. Shard 0 is DATABASE_URL; it also holds this
+directory and the tables keyed by user or request (app.core.db.GLOBAL_TABLES).
+
+- Restaurants are placed when they are created (hash of the id over the shards) and found
+  through the 'restaurant_shards' table, cached in process. Restaurants without an entry
+  predate sharding and live on shard 0.
+- Order and menu item ids minted on a shard carry it: they are version-8 UUIDs (RFC 9562
+  custom layout) with the shard index in the low 16 bits, so requests by id need no
+  lookup. Any other id (uuid4, minted before sharding) belongs to shard 0.
+
+With a single database none of this issues a query and ids stay plain uuid4.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar, Union
+from uuid import UUID, uuid4
+
+from app.core.config import SHARD_DIRECTORY_CACHE_SIZE
+from app.core.db import PRIMARY, current_shard, shard_aliases
+from app.models.shard import RestaurantShard
+
+_SHARD_BITS = 0xFFFF
+_VERSION_BITS = 0xF << 76
+_SHARDED_VERSION = 8
+
+IdLike = Union[UUID, str]
+T = TypeVar("T")
+
+
+def shard_uuid(alias: Optional[str] = None) -> UUID:
+    """New id for a row created on 'alias' (default: the current shard)."""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return uuid4()
+    index = aliases.index(alias or current_shard())
+    # Keeps uuid4's random bits and RFC variant; only the version and the low bits change
+    value = (uuid4().int & ~(_VERSION_BITS | _SHARD_BITS)) | (_SHARDED_VERSION << 76) | index
+    return UUID(int=value)
+
+
+def shard_of(entity_id: IdLike) -> str:
+    """Shard alias an order or menu item id was minted on (PRIMARY for ids from before sharding)."""
+    entity_id = entity_id if isinstance(entity_id, UUID) else UUID(str(entity_id))
+    if entity_id.version == _SHARDED_VERSION:
+        aliases = shard_aliases()
+        index = entity_id.int & _SHARD_BITS
+        if index < len(aliases):
+            return aliases[index]
+    return PRIMARY
+
+
+def group_by_shard(items: Iterable[T], key: Optional[Callable[[T], IdLike]] = None) -> Dict[str, List[T]]:
+    """
+    Groups order / menu item ids (or items whose 'key' is one) by shard alias, keeping
+    their original order within each shard.
+    """
+    groups: Dict[str, List[T]] = {}
+    for item in items:
+        groups.setdefault(shard_of(key(item) if key else item), []).append(item)
+    return groups
+
+
+class ShardDirectory:
+    """
+    Restaurant -> shard alias, read from 'restaurant_shards' (shard 0) and kept in a
+    bounded in-process LRU. Entries only change when a restaurant is placed, so they are
+    cached without expiry; unknown restaurants are not cached (another process may place
+    them a moment later).
+    """
+
+    def __init__(self, max_entries: int = SHARD_DIRECTORY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[UUID, int]" = OrderedDict()
+
+    def _remember(self, restaurant_id: UUID, index: int):
+        self._cache[restaurant_id] = index
+        self._cache.move_to_end(restaurant_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _alias(aliases: List[str], index: Optional[int]) -> str:
+        return aliases[index] if index is not None and index < len(aliases) else PRIMARY
+
+    async def shard_for(self, restaurant_id: IdLike) -> str:
+        """Shard alias holding the restaurant's data."""
+        return (await self.shards_for([restaurant_id]))[UUID(str(restaurant_id))]
+
+    async def shards_for(self, restaurant_ids: Iterable[IdLike]) -> Dict[UUID, str]:
+        """Shard alias of each restaurant; the ones not cached are looked up with one query."""
+        aliases = shard_aliases()
+        ids = {UUID(str(rid)) for rid in restaurant_ids}
+        if len(aliases) == 1:
+            return dict.fromkeys(ids, PRIMARY)
+
+        indexes: Dict[UUID, Optional[int]] = {}
+        missing = []
+        for rid in ids:
+            if rid in self._cache:
+                self._cache.move_to_end(rid)
+                indexes[rid] = self._cache[rid]
+            else:
+                missing.append(rid)
+        if missing:
+            for rid, index in await RestaurantShard.filter(restaurant_id__in=missing).values_list("restaurant_id", "shard"):
+                self._remember(rid, index)
+                indexes[rid] = index
+        return {rid: self._alias(aliases, indexes.get(rid)) for rid in ids}
+
+    async def place(self, restaurant_id: UUID) -> str:
+        """Assigns a new restaurant to a shard (spread by id) and records it. Returns its alias."""
+        aliases = shard_aliases()
+        if len(aliases) == 1:
+            return PRIMARY
+        row, _ = await RestaurantShard.get_or_create(restaurant_id=restaurant_id, defaults={"shard": restaurant_id.int % len(aliases)})
+        self._remember(restaurant_id, row.shard)
+        return self._alias(aliases, row.shard)
+
+    def clear(self):
+        """Forgets every cached entry (e.g. after restaurants were moved between shards)."""
+        self._cache.clear()
+
+
+# Shared per-process directory
+shard_directory = ShardDirectory()
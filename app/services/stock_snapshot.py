@@ -0,0 +1,189 @@
+import asyncio
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import STOCK_SNAPSHOT_MAX_STALENESS, STOCK_SNAPSHOT_OVERLAP
+from app.core.db import current_shard
+from app.core.hot_queries import StockRow, all_pending_movements, fetch_stock_for_items, fetch_stock_for_restaurant
+from app.models.inventory import Inventory
+
+# Columns read for every snapshot entry (menu item's restaurant comes through the FK join)
+_SNAPSHOT_FIELDS = ("menu_item_id", "available_qty", "threshold_qty", "updated_at", "menu_item__restaurant_id")
+
+
+def _entry(menu_item_id: UUID, available_qty: int, updated_at) -> Dict[str, Any]:
+    """Shapes an item's stock like InventoryResponse so reads need no further work."""
+    return {
+        "menu_item_id": menu_item_id,
+        "available_qty": available_qty,
+        "updated_at": str(updated_at),
+    }
+
+
+def _stock_entry(row: StockRow) -> Dict[str, Any]:
+    return _entry(row.menu_item_id, row.available_qty, row.updated_at)
+
+
+def stock_bucket(available_qty: int, threshold_qty: int) -> Tuple[bool, bool]:
+    """Coarse availability of an item: (available, low_stock). Menus only change when this does."""
+    return available_qty > 0, available_qty <= threshold_qty
+
+
+class StockSnapshot:
+    """
+    In-process copy of stock levels for multi-item reads.
+
+    The first read loads every Inventory row. Later reads refresh incrementally from
+    Inventory.updated_at (indexed) once the snapshot is older than 'max_staleness' seconds,
+    so a reader never sees data older than that bound. The incremental query re-reads an
+    'overlap' window behind the watermark to pick up transactions that committed late.
+    Each refresh also sums the ledger movements not yet compacted into those rows (one
+    grouped query over the pending set), so entries carry the effective stock.
+
+    Each restaurant also has a stock version that is bumped only when one of its items
+    changes availability bucket, so derived views (the menu) rebuild only when needed.
+    """
+
+    def __init__(self, max_staleness: float = STOCK_SNAPSHOT_MAX_STALENESS, overlap: float = STOCK_SNAPSHOT_OVERLAP):
+        self.max_staleness = max_staleness
+        self.overlap = timedelta(seconds=overlap)
+        self._base: Dict[UUID, Dict[str, Any]] = {}  # Inventory rows as last read
+        self._pending: Dict[UUID, Tuple[int, Any]] = {}  # (sum, latest) of uncompacted movements per item
+        self._by_item: Dict[UUID, Dict[str, Any]] = {}
+        self._by_restaurant: Dict[UUID, Dict[UUID, Dict[str, Any]]] = {}
+        self._buckets: Dict[UUID, Tuple[bool, bool]] = {}
+        self._versions: Dict[UUID, int] = {}
+        self._watermark = None  # Max updated_at seen so far
+        self._refreshed_at: Optional[float] = None  # time.monotonic() of the last refresh
+        self._lock = asyncio.Lock()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the last refresh (None before the first load)."""
+        return None if self._refreshed_at is None else time.monotonic() - self._refreshed_at
+
+    async def _ensure_fresh(self):
+        if self._refreshed_at is not None and self.age <= self.max_staleness:
+            return
+        async with self._lock:
+            # Another reader may have refreshed while we waited (single flight)
+            if self._refreshed_at is not None and self.age <= self.max_staleness:
+                return
+            await self.refresh()
+
+    async def refresh(self):
+        """Loads rows changed since the watermark (or everything on first use) into the snapshot."""
+        started = time.monotonic()
+        query = Inventory.all()
+        if self._watermark is not None:
+            query = Inventory.filter(updated_at__gte=self._watermark - self.overlap)
+
+        changed = set()
+        for row in await query.values(*_SNAPSHOT_FIELDS):
+            self._base[row["menu_item_id"]] = row
+            changed.add(row["menu_item_id"])
+            if self._watermark is None or row["updated_at"] > self._watermark:
+                self._watermark = row["updated_at"]
+
+        # Items whose pending movements changed, including ones just compacted away. A
+        # compaction committing between the two queries is corrected by the next refresh
+        # (the compacted rows' updated_at falls inside the overlap window).
+        pending = await all_pending_movements()
+        for menu_item_id in changed | set(pending) | set(self._pending):
+            row = self._base.get(menu_item_id)
+            if row is not None:
+                self._apply(row, pending.get(menu_item_id))
+        self._pending = pending
+
+        self._refreshed_at = started
+
+    def _apply(self, row: Dict[str, Any], pending: Optional[Tuple[int, Any]]):
+        """Stores the effective stock of one item and bumps its restaurant's version on a bucket change."""
+        available_qty, updated_at = row["available_qty"], row["updated_at"]
+        if pending is not None:
+            available_qty += pending[0]
+            updated_at = max(updated_at, pending[1])
+        entry = _entry(row["menu_item_id"], available_qty, updated_at)
+        restaurant_id = row["menu_item__restaurant_id"]
+        self._by_item[row["menu_item_id"]] = entry
+        self._by_restaurant.setdefault(restaurant_id, {})[row["menu_item_id"]] = entry
+
+        bucket = stock_bucket(available_qty, row["threshold_qty"])
+        if self._buckets.get(row["menu_item_id"]) != bucket:
+            self._buckets[row["menu_item_id"]] = bucket
+            self._versions[restaurant_id] = self._versions.get(restaurant_id, 0) + 1
+
+    def invalidate(self):
+        """Forces the next read to refresh (e.g. right after a local write)."""
+        self._refreshed_at = None
+
+    async def for_restaurant(self, restaurant_id: UUID) -> List[Dict[str, Any]]:
+        await self._ensure_fresh()
+        return list(self._by_restaurant.get(restaurant_id, {}).values())
+
+    async def restaurant_version(self, restaurant_id: UUID) -> int:
+        """Current stock-bucket version of a restaurant (0 if it has no stock rows)."""
+        await self._ensure_fresh()
+        return self._versions.get(restaurant_id, 0)
+
+    def bucket(self, menu_item_id: UUID) -> Optional[Tuple[bool, bool]]:
+        """Last known (available, low_stock) bucket of an item, without refreshing."""
+        return self._buckets.get(menu_item_id)
+
+    async def for_items(self, menu_item_ids: Iterable[UUID]) -> List[Dict[str, Any]]:
+        await self._ensure_fresh()
+        return [self._by_item[mid] for mid in menu_item_ids if mid in self._by_item]
+
+
+class ShardedStockSnapshot:
+    """
+    One StockSnapshot per database shard, chosen by the current shard (app.core.db.use_shard)
+    on every call, so each shard keeps its own watermark and restaurant versions. With a
+    single database this is one StockSnapshot.
+    """
+
+    def __init__(self, max_staleness: float = STOCK_SNAPSHOT_MAX_STALENESS, overlap: float = STOCK_SNAPSHOT_OVERLAP):
+        self.max_staleness = max_staleness
+        self.overlap = overlap
+        self._shards: Dict[str, StockSnapshot] = {}
+
+    def shard(self, alias: Optional[str] = None) -> StockSnapshot:
+        """The snapshot of 'alias' (default: the current shard), created on first use."""
+        alias = alias or current_shard()
+        snapshot = self._shards.get(alias)
+        if snapshot is None:
+            snapshot = self._shards[alias] = StockSnapshot(self.max_staleness, self.overlap)
+        return snapshot
+
+    def invalidate(self):
+        """Forces the next read of every shard's snapshot to refresh."""
+        for snapshot in self._shards.values():
+            snapshot.invalidate()
+
+    async def for_restaurant(self, restaurant_id: UUID) -> List[Dict[str, Any]]:
+        return await self.shard().for_restaurant(restaurant_id)
+
+    async def restaurant_version(self, restaurant_id: UUID) -> int:
+        return await self.shard().restaurant_version(restaurant_id)
+
+    def bucket(self, menu_item_id: UUID) -> Optional[Tuple[bool, bool]]:
+        return self.shard().bucket(menu_item_id)
+
+    async def for_items(self, menu_item_ids: Iterable[UUID]) -> List[Dict[str, Any]]:
+        return await self.shard().for_items(menu_item_ids)
+
+
+# ----------- Strongly consistent reads (bypass the snapshot) -----------
+
+async def read_stock_for_restaurant(restaurant_id: UUID) -> List[Dict[str, Any]]:
+    return [_stock_entry(row) for row in await fetch_stock_for_restaurant(restaurant_id)]
+
+
+async def read_stock_for_items(menu_item_ids: List[UUID]) -> List[Dict[str, Any]]:
+    return [_stock_entry(row) for row in await fetch_stock_for_items(menu_item_ids)]
+
+
+# Shared per-process snapshot used by the API (one per shard)
+stock_snapshot = ShardedStockSnapshot()
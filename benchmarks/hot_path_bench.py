@@ -0,0 +1,129 @@
+"""
+Benchmark: CPU per order spent in the hot statements, Tortoise ORM vs the raw fast path.
+
+Each simulated order runs the per-order statements of placement and inventory deduction:
+the menu/restaurant lookup, the idempotency check, locking the inventory rows and taking
+the stock out, polling the outbox and marking an event published. The ORM variant is the
+query code these call sites used before app.core.hot_queries (ProcessedEvent check, row
+updates); the raw variant is the current one (ledger check, pending sum, ledger insert).
+Reports process CPU time (time.process_time) and wall time per order, median over rounds.
+
+Uses a temporary SQLite file by default; pass --db-url to run against Postgres (migrated,
+e.g. 'python -m app.cli.migrate') to include asyncpg's prepared-statement reuse.
+
+    python -m benchmarks.hot_path_bench [--orders 500] [--items 3] [--rounds 5] [--db-url postgres://...]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from tortoise import Tortoise, timezone
+from tortoise.transactions import in_transaction
+
+from app.core import hot_queries
+from app.core.db import MODELS_MODULES, PRIMARY
+from app.core.migrations import migrate
+from app.models import Inventory, MenuItem, OutboxEvent, ProcessedEvent, Restaurant
+
+
+async def _seed(items: int, events: int):
+    restaurant = await Restaurant.create(id=uuid4(), name="Bench Kitchen")
+    menu = [
+        await MenuItem.create(id=uuid4(), restaurant=restaurant, name=f"Item {i}", price=Decimal("4.75"))
+        for i in range(items)
+    ]
+    for m in menu:
+        await Inventory.create(menu_item=m, available_qty=10_000_000, threshold_qty=0)
+    await OutboxEvent.bulk_create([
+        OutboxEvent(aggregate_type="order", aggregate_id=uuid4(), event_type="bench.v1", payload={"n": i}, attempts=0)
+        for i in range(events)
+    ])
+    return restaurant.id, [m.id for m in menu]
+
+
+async def _orm_order(restaurant_id, menu_item_ids):
+    async with in_transaction(PRIMARY) as conn:
+        menu_items = await MenuItem.filter(id__in=menu_item_ids, restaurant_id=restaurant_id, is_active=True).using_db(conn)
+        menu_map = {str(m.id): m for m in menu_items}
+        restaurant = await Restaurant.get_or_none(id=restaurant_id).using_db(conn)
+        assert restaurant.is_active and len(menu_map) == len(menu_item_ids)
+
+    await ProcessedEvent.filter(event_id=str(uuid4())).exists()
+    async with in_transaction(PRIMARY) as conn:
+        locked = await Inventory.filter(menu_item_id__in=menu_item_ids).using_db(conn).select_for_update()
+        for inv in locked:
+            inv.available_qty -= 1
+            await inv.save(update_fields=["available_qty", "updated_at"], using_db=conn)
+
+    events = await OutboxEvent.filter(published=False, attempts__lt=5).limit(10).order_by("created_at")
+    event = events[0]
+    event.published = True
+    await event.save(update_fields=["published"])
+
+
+async def _raw_order(restaurant_id, menu_item_ids):
+    async with in_transaction(PRIMARY) as conn:
+        active, menu_map = await hot_queries.fetch_order_menu(restaurant_id, menu_item_ids, conn)
+        assert active and len(menu_map) == len(menu_item_ids)
+
+    event_id = str(uuid4())
+    async with in_transaction(PRIMARY) as conn:
+        locked = await hot_queries.lock_inventory(menu_item_ids, conn)
+        assert not await hot_queries.movements_recorded(event_id, conn)
+        pending = await hot_queries.pending_movements(menu_item_ids, conn)
+        assert all(inv.available_qty + pending.get(mid, 0) >= 1 for mid, inv in locked.items())
+        await hot_queries.record_movements(event_id, None, {mid: -1 for mid in locked}, "order.placed.v1", timezone.now(), conn)
+
+    events = await hot_queries.fetch_pending_events(5, 10)
+    await hot_queries.mark_event_published(events[0].id)
+
+
+async def _round(fn, orders: int, restaurant_id, menu_item_ids):
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(orders):
+        await fn(restaurant_id, menu_item_ids)
+    return (time.process_time() - cpu) / orders, (time.perf_counter() - wall) / orders
+
+
+async def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite://{os.path.join(tmp, 'hot_path.db')}"
+        await Tortoise.init(db_url=db_url, modules={"models": MODELS_MODULES})
+        try:
+            await migrate()
+            # One outbox event consumed per order, plus the warm-up orders
+            restaurant_id, menu_item_ids = await _seed(args.items, events=2 * (args.orders * args.rounds + 20))
+            await _round(_orm_order, 20, restaurant_id, menu_item_ids)  # Warm up both paths
+            await _round(_raw_order, 20, restaurant_id, menu_item_ids)
+
+            results = {"orm": [], "raw": []}
+            for _ in range(args.rounds):  # Interleaved so drift affects both equally
+                results["orm"].append(await _round(_orm_order, args.orders, restaurant_id, menu_item_ids))
+                results["raw"].append(await _round(_raw_order, args.orders, restaurant_id, menu_item_ids))
+        finally:
+            await Tortoise.close_connections()
+
+    print(f"{args.orders} orders x {args.rounds} rounds, {args.items} items per order")
+    print(f"{'path':<6} {'cpu us/order':>14} {'wall us/order':>14}")
+    for path, samples in results.items():
+        cpu = statistics.median(s[0] for s in samples) * 1e6
+        wall = statistics.median(s[1] for s in samples) * 1e6
+        print(f"{path:<6} {cpu:>14.1f} {wall:>14.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare CPU per order of the ORM and raw hot-query paths.")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=3, help="Menu items per order.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--db-url", help="Database to run against (default: temporary SQLite file).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,64 @@
+"""
+API and outbox poller in one process, for the SQLite quick mode of benchmarks.load_bench.
+
+A SQLite file serializes writers across processes ('database is locked'), so instead of
+'python -m app.serve' the quick mode runs uvicorn and the poll loop on one event loop and
+one connection. Configuration comes from the environment, as for the real services.
+SIGTERM stops the poll loop and shuts uvicorn down (lifespan closes the DB).
+
+    DATABASE_URL=sqlite:///tmp/load.db python -m benchmarks.load_server [--port 8766] [--poll-interval 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import uvicorn
+
+from app.consumers.inventory_compactor import compact_inventory
+from app.consumers.outbox_poller import poll_outbox_for_new_events, update_backlog_metrics
+from app.core.config import BATCH_SIZE, INVENTORY_COMPACT_INTERVAL, OUTBOX_STATS_INTERVAL
+from app.main import app
+
+log = logging.getLogger("load_server")
+
+
+async def _poll(server: uvicorn.Server, interval: float):
+    """
+    The poller's main loop (with poller worker 0's ledger compaction), sharing the API's ORM
+    connection; runs until uvicorn exits.
+    """
+    while not server.started and not server.should_exit:
+        await asyncio.sleep(0.05)
+    stats_due = compact_due = 0.0
+    while not server.should_exit:
+        fetched = 0
+        try:
+            fetched = await poll_outbox_for_new_events()
+            if time.monotonic() >= stats_due:
+                await update_backlog_metrics()
+                stats_due = time.monotonic() + OUTBOX_STATS_INTERVAL
+            if INVENTORY_COMPACT_INTERVAL > 0 and time.monotonic() >= compact_due:
+                await compact_inventory()
+                compact_due = time.monotonic() + INVENTORY_COMPACT_INTERVAL
+        except Exception as e:
+            log.error("Poll loop encountered a DB error: %s", e)
+        if fetched < BATCH_SIZE:
+            await asyncio.sleep(interval)
+
+
+async def main(args: argparse.Namespace):
+    config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    server = uvicorn.Server(config)
+    await asyncio.gather(server.serve(), _poll(server, args.poll_interval))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the API and the outbox poller in one process.")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Seconds between polls when idle.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,107 @@
+"""
+Benchmark: event-loop time per outbox event spent on logging.
+
+Each simulated event logs the INFO lines the poller and inventory consumer emit per
+order.placed event. Variants:
+
+- legacy: basicConfig-style StreamHandler writing on the loop thread, eager f-strings
+- queue: app.core.logs (QueueHandler + JSON in a listener thread), lazy %-formatting
+- queue+sampled: same with LOG_SAMPLING=bench=0.1
+
+The sink is a stream whose write() takes --sink-latency-us (simulating a slow stdout
+pipe, e.g. a busy container log driver); 0 means an in-memory sink. Reports mean and p99
+loop time per event in microseconds, and records dropped because the queue was full
+(the writer fell behind by more than LOG_QUEUE_SIZE records).
+
+    python -m benchmarks.logging_bench [--events 20000] [--sink-latency-us 0,50]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import time
+from uuid import uuid4
+
+from app.core.logs import setup_logging, shutdown_logging
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class SlowSink(io.TextIOBase):
+    """Discards output but blocks each write for 'latency' seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def write(self, s: str) -> int:
+        if self.latency:
+            end = time.perf_counter() + self.latency
+            while time.perf_counter() < end:
+                pass
+        return len(s)
+
+
+def _legacy_event(log: logging.Logger, event_id, order_id):
+    log.info(f"Poller DISPATCHING: order.placed.v1 (ID: {event_id.hex[:8]}...)")
+    log.info(f"\n--- Worker: DEDUCTING for Order {order_id} ---")
+    log.info(f"SUCCESS: Inventory deducted for Order {order_id}")
+
+
+def _lazy_event(log: logging.Logger, event_id, order_id):
+    log.info("Poller DISPATCHING: %s (ID: %s)", "order.placed.v1", event_id)
+    log.info("Worker: DEDUCTING for Order %s", order_id)
+    log.info("SUCCESS: Inventory deducted for Order %s", order_id)
+
+
+async def _run(emit, events: int):
+    log = logging.getLogger("bench")
+    samples = []
+    for _ in range(events):
+        event_id, order_id = uuid4(), uuid4()
+        start = time.perf_counter()
+        emit(log, event_id, order_id)
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0)  # Let other tasks (and the listener thread) run, as the poller does
+    samples.sort()
+    return statistics.fmean(samples) * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def _legacy_setup(sink):
+    root = logging.getLogger()
+    root.handlers.clear()
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(_TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+async def main(args: argparse.Namespace):
+    print(f"{args.events} events, 3 INFO lines per event")
+    print(f"{'variant':<16} {'sink us/write':>13} {'mean us/event':>14} {'p99 us/event':>13} {'queue drops':>12}")
+    for latency_us in (float(v) for v in args.sink_latency_us.split(",")):
+        sink = SlowSink(latency_us / 1e6)
+        variants = [
+            ("legacy", lambda: _legacy_setup(sink), _legacy_event),
+            ("queue", lambda: setup_logging("INFO", "json", "", 0, stream=sink), _lazy_event),
+            ("queue+sampled", lambda: setup_logging("INFO", "json", "bench=0.1", 0, stream=sink), _lazy_event),
+        ]
+        for name, setup, emit in variants:
+            dropped = LOG_RECORDS_DROPPED.value("bench", "queue_full")
+            setup()
+            mean, p99 = await _run(emit, args.events)
+            shutdown_logging()
+            dropped = LOG_RECORDS_DROPPED.value("bench", "queue_full") - dropped
+            print(f"{name:<16} {latency_us:>13.0f} {mean:>14.1f} {p99:>13.1f} {dropped:>12.0f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure event-loop time per event spent on logging.")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--sink-latency-us", default="0,50", help="Comma-separated per-write sink latencies to test.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,70 @@
+"""
+Benchmark: overhead of the event-loop lag monitor and of a running sampling profile.
+
+A CPU-bound asyncio workload (tasks that each yield --yields times and do a little work
+between yields) is timed with nothing running, with the lag monitor at its default
+LOOP_MONITOR_INTERVAL, and with the monitor plus a profile capture at
+PROFILE_SAMPLE_INTERVAL. Best of --repeat runs each.
+
+    python -m benchmarks.loop_monitor_bench [--tasks 2000] [--yields 200] [--repeat 5]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from contextlib import suppress
+
+from app.core.config import LOOP_MONITOR_INTERVAL, PROFILE_SAMPLE_INTERVAL
+from app.core.profiling import capture_profile, run_loop_monitor
+
+
+async def _worker(yields: int):
+    for i in range(yields):
+        sum(range(50))
+        await asyncio.sleep(0)
+
+
+async def _workload(tasks: int, yields: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(yields) for _ in range(tasks)))
+    return time.perf_counter() - started
+
+
+async def _run(mode: str, tasks: int, yields: int, profile_dir: str) -> float:
+    background = []
+    if mode != "off":
+        background.append(asyncio.create_task(run_loop_monitor()))
+    if mode == "monitor + profile":
+        background.append(asyncio.create_task(capture_profile(3600, "bench", directory=profile_dir)))
+    await asyncio.sleep(0.05)
+    try:
+        return await _workload(tasks, yields)
+    finally:
+        for task in background:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=2000, help="Concurrent tasks per run.")
+    parser.add_argument("--yields", type=int, default=200, help="Loop iterations per task.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode (best is reported).")
+    args = parser.parse_args()
+
+    print(f"monitor interval {LOOP_MONITOR_INTERVAL}s, profile sample interval {PROFILE_SAMPLE_INTERVAL}s")
+    print(f"{'mode':<20} {'seconds':>8} {'steps/s':>12} {'overhead':>9}")
+    modes = ("off", "monitor", "monitor + profile")
+    best = {mode: float("inf") for mode in modes}
+    with tempfile.TemporaryDirectory() as profile_dir:
+        for _ in range(args.repeat):
+            for mode in modes:  # Interleaved, so drift in machine load hits every mode alike
+                best[mode] = min(best[mode], asyncio.run(_run(mode, args.tasks, args.yields, profile_dir)))
+    for mode in modes:
+        steps = args.tasks * args.yields / best[mode]
+        print(f"{mode:<20} {best[mode]:>8.3f} {steps:>12,.0f} {(best[mode] / best['off'] - 1) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
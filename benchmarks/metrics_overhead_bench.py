@@ -0,0 +1,90 @@
+"""
+Benchmark: cost of the metrics instrumentation itself.
+
+Measures (1) a bare histogram observe / counter increment, (2) MetricsMiddleware per
+request on a trivial ASGI route called in-process, and (3) the DB statement wrapper on
+an in-memory SQLite 'SELECT 1'. No server or Postgres needed.
+
+    python -m benchmarks.metrics_overhead_bench [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+import timeit
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from tortoise import Tortoise, connections
+
+from app.core.db import MODELS_MODULES
+from app.core.metrics import Counter, Histogram, MetricsMiddleware, install_db_instrumentation
+
+
+def _make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping", response_class=PlainTextResponse)
+    async def ping():
+        return "ok"
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _drive(app, n: int) -> float:
+    """Calls the ASGI app n times in-process and returns microseconds per request."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # Warm-up (route compilation, lazy imports)
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def _query_cost(n: int) -> float:
+    conn = connections.get("default")
+    start = time.perf_counter()
+    for _ in range(n):
+        await conn.execute_query("SELECT 1")
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(requests: int):
+    hist = Histogram("bench_seconds", "bench", ("route",))
+    counter = Counter("bench_total", "bench", ("route",))
+    observe = min(timeit.repeat(lambda: hist.observe(0.012, "/ping"), number=200000, repeat=3)) / 200000 * 1e9
+    inc = min(timeit.repeat(lambda: counter.inc("/ping"), number=200000, repeat=3)) / 200000 * 1e9
+    print(f"histogram.observe            {observe:8.0f} ns")
+    print(f"counter.inc                  {inc:8.0f} ns")
+
+    bare = await _drive(_make_app(False), requests)
+    instrumented = await _drive(_make_app(True), requests)
+    print(f"request without middleware   {bare:8.1f} us")
+    print(f"request with middleware      {instrumented:8.1f} us  (+{instrumented - bare:.1f} us)")
+
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": MODELS_MODULES})
+    plain_q = await _query_cost(requests)
+    install_db_instrumentation()
+    wrapped_q = await _query_cost(requests)
+    await Tortoise.close_connections()
+    print(f"SELECT 1 without wrapper     {plain_q:8.1f} us")
+    print(f"SELECT 1 with wrapper        {wrapped_q:8.1f} us  (+{wrapped_q - plain_q:.1f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000, help="Requests / statements per measurement.")
+    asyncio.run(main(parser.parse_args().requests))
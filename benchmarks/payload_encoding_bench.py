@@ -0,0 +1,131 @@
+"""
+Benchmark: outbox payload encodings (JSON vs the compact binary format).
+
+1. Per event type: stored bytes and CPU per encode / decode. JSON is what the JSON column
+   holds (compact separators, as written by the driver) and what the poll parsed before.
+2. Outbox size: --events events of a realistic mix (placements with 1-5 lines, deduction
+   results, status changes, cancellations) written in each encoding to a temporary SQLite
+   file; reports payload bytes and the database file size after VACUUM.
+3. Poll: wall time of fetch_pending_events over that outbox, with and without reading
+   every payload (lazy decoding skips the decode for payloads no handler reads).
+
+    python -m benchmarks.payload_encoding_bench [--number 20000] [--events 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
+from unittest.mock import patch
+from uuid import uuid4
+
+from tortoise import Tortoise, connections
+
+from app.core.db import MODELS_MODULES
+from app.core.hot_queries import fetch_pending_events
+from app.core.migrations import migrate
+from app.events import outbox_utility
+from app.events.payload_codec import decode_payload, encode_payload
+
+_RESTAURANTS = [str(uuid4()) for _ in range(20)]
+_MENU = [str(uuid4()) for _ in range(200)]
+
+
+def _placed(rng: random.Random, lines: int) -> dict:
+    return {
+        "order_id": str(uuid4()),
+        "restaurant_id": rng.choice(_RESTAURANTS),
+        "placed_at": "2024-05-01T12:30:00.123456+00:00",
+        "items": [{"menu_item_id": rng.choice(_MENU), "quantity": rng.randint(1, 3), "unit_price": "5.50"} for _ in range(lines)],
+    }
+
+
+def _event(rng: random.Random) -> tuple:
+    """(event type, payload) drawn from the mix one order produces."""
+    kind = rng.random()
+    if kind < 0.35:
+        return "order.placed.v1", _placed(rng, rng.randint(1, 5))
+    if kind < 0.7:
+        return "inventory.deducted.success.v1", {"order_id": str(uuid4())}
+    if kind < 0.9:
+        return "order.status.preparing.v1", {"order_id": str(uuid4()), "old_status": "PLACED", "new_status": "PREPARING", "user_id": "user-42"}
+    cancelled = _placed(rng, rng.randint(1, 3))
+    return "order.cancelled.v1", {**cancelled, "old_status": "PREPARING", "new_status": "CANCELLED", "user_id": "user-42"}
+
+
+def _us(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def _codec_table(number: int):
+    rng = random.Random(1)
+    samples = {
+        "order.placed.v1 (1 line)": _placed(rng, 1),
+        "order.placed.v1 (5 lines)": _placed(rng, 5),
+        "inventory.deducted.success.v1": {"order_id": str(uuid4())},
+        "order.status.*.v1": {"order_id": str(uuid4()), "old_status": "PLACED", "new_status": "PREPARING", "user_id": "user-42"},
+    }
+    print(f"{'payload':<31} {'json B':>7} {'bin B':>6} {'json enc us':>12} {'bin enc us':>11} {'json dec us':>12} {'bin dec us':>11}")
+    for name, payload in samples.items():
+        text = json.dumps(payload, separators=(",", ":"))
+        encoded = encode_payload(payload)
+        print(
+            f"{name:<31} {len(text):>7} {len(encoded):>6} "
+            f"{_us(lambda: json.dumps(payload, separators=(',', ':')), number):>12.2f} {_us(lambda: encode_payload(payload), number):>11.2f} "
+            f"{_us(lambda: json.loads(text), number):>12.2f} {_us(lambda: decode_payload(encoded), number):>11.2f}"
+        )
+
+
+async def _outbox(path: str, encoding: str, events: list) -> dict:
+    await Tortoise.init(db_url=f"sqlite://{path}", modules={"models": MODELS_MODULES})
+    try:
+        await migrate()
+        with patch.object(outbox_utility, "OUTBOX_PAYLOAD_ENCODING", encoding):
+            for start in range(0, len(events), 500):
+                await outbox_utility.create_outbox_events_bulk([
+                    {"aggregate_type": "order", "aggregate_id": uuid4(), "event_type": event_type, "payload": payload}
+                    for event_type, payload in events[start:start + 500]
+                ])
+        conn = connections.get("default")
+        _, rows = await conn.execute_query("SELECT COALESCE(SUM(LENGTH(payload)), 0) + COALESCE(SUM(LENGTH(payload_bin)), 0) FROM outbox_events")
+        await conn.execute_script("VACUUM")
+
+        timings = {}
+        for touch in (False, True):
+            started = time.perf_counter()
+            for event in await fetch_pending_events(max_attempts=5, limit=len(events)):
+                if touch:
+                    event.payload.get("order_id")
+            timings[touch] = time.perf_counter() - started
+    finally:
+        await Tortoise.close_connections()
+    return {"payload_bytes": rows[0][0], "file_bytes": os.path.getsize(path), "poll": timings[False], "poll_read": timings[True]}
+
+
+async def _storage(count: int):
+    rng = random.Random(7)
+    events = [_event(rng) for _ in range(count)]
+    print(f"\n{count} events: {'payload MB':>11} {'file MB':>8} {'poll ms':>8} {'poll+read ms':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for encoding in ("json", "binary"):
+            result = await _outbox(os.path.join(tmp, f"{encoding}.db"), encoding, events)
+            print(
+                f"{encoding:<{len(str(count)) + 8}} {result['payload_bytes'] / 1e6:>11.2f} {result['file_bytes'] / 1e6:>8.2f} "
+                f"{result['poll'] * 1000:>8.1f} {result['poll_read'] * 1000:>13.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per codec measurement.")
+    parser.add_argument("--events", type=int, default=20000, help="Outbox events written per encoding.")
+    args = parser.parse_args()
+    _codec_table(args.number)
+    asyncio.run(_storage(args.events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Microbenchmark: response serialization cost per endpoint payload.
+
+Compares the previous path (payload model -> .model_dump() -> SuccessResponse -> FastAPI
+response_model validation -> json-mode dump -> stdlib json) with success_response(), which
+serializes the typed payload once. No database or server is needed.
+
+    python -m benchmarks.serialization_bench [--number 20000]
+"""
+import argparse
+import json
+import timeit
+from decimal import Decimal
+from uuid import uuid4
+
+from app.core.responses import success_response
+from app.schemas.inventory import InventoryResponse
+from app.schemas.order import OrderDetailResponse, OrderPlacementResponse, BatchOrderResponse
+from app.schemas.response import SuccessResponse
+
+
+def _legacy(model) -> bytes:
+    """What every handler + FastAPI did before: dump, wrap, re-validate, re-dump, json.dumps."""
+    response = SuccessResponse(data=model.model_dump())
+    content = SuccessResponse.model_validate(response).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _fast(model) -> bytes:
+    return success_response(model).body
+
+
+def _payloads():
+    placement = OrderPlacementResponse(
+        order_id=uuid4(), status="PLACED", total_amount=Decimal("25.98"), message="Order Accepted and is being processed."
+    )
+    detail = OrderDetailResponse(
+        id=uuid4(), status="PREPARING", total_amount=Decimal("125.40"), created_at="2024-01-01 12:00:00+00:00",
+        items=[{"name": f"Item {i}", "quantity": 2, "price": "10.45"} for i in range(6)]
+    )
+    inventory = InventoryResponse(menu_item_id=uuid4(), available_qty=42, updated_at="2024-01-01 12:00:00+00:00")
+    batch = BatchOrderResponse(
+        accepted=200, rejected=0,
+        results=[{"index": i, "success": True, "order_id": uuid4(), "status": "PLACED", "total_amount": Decimal("12.50")} for i in range(200)]
+    )
+    return {
+        "POST /orders": placement,
+        "GET /orders/{id}": detail,
+        "GET /inventory/{id}": inventory,
+        "POST /orders:batch (200)": batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per measurement (batch payload uses 1/50).")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<26} {'legacy us/req':>14} {'fast us/req':>12} {'speedup':>8}")
+    for name, model in _payloads().items():
+        # Same data on both paths (request_id aside)
+        assert json.loads(_legacy(model))["data"] == json.loads(_fast(model))["data"]
+        number = max(args.number // 50, 1) if "batch" in name else args.number
+        legacy = min(timeit.repeat(lambda: _legacy(model), number=number, repeat=3)) / number * 1e6
+        fast = min(timeit.repeat(lambda: _fast(model), number=number, repeat=3)) / number * 1e6
+        print(f"{name:<26} {legacy:>14.2f} {fast:>12.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: order placement throughput against the number of shards.
+
+For each shard count it creates --restaurants restaurants through the shard directory (so
+they spread over the shards), then places --orders orders with --concurrency placements in
+flight, spread uniformly over the restaurants, and drains every shard's outbox with one
+poller per shard running concurrently. Reports orders/sec for placement and for
+placement plus the poller's inventory deduction.
+
+By default every shard is a fresh SQLite file in a temporary directory (one writer per
+file, so SQLite shows the effect of splitting the write lock). Pass --db-urls with one
+Postgres database per shard (migrations are applied; data is not cleaned up) to measure
+real servers; runs use the first 1, 2, ... of them.
+
+    python -m benchmarks.shard_bench [--shards 1,2,4] [--orders 2000] [--concurrency 32]
+        [--db-urls postgres://.../shard0,postgres://.../shard1,...]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from typing import List, Tuple
+
+from tortoise import Tortoise
+
+from app.consumers.outbox_poller import poll_outbox_for_new_events
+from app.core.db import shard_aliases, tortoise_config, use_shard
+from app.core.migrations import migrate
+from app.models import Inventory, MenuItem
+from app.services.inventory_service import create_restaurant
+from app.services.order_service import place_order
+from app.services.shard_directory import shard_directory, shard_uuid
+
+
+async def _seed(restaurants: int) -> List[Tuple[str, str]]:
+    """(restaurant id, menu item id) per restaurant, each created on the restaurant's shard."""
+    menu = []
+    for i in range(restaurants):
+        restaurant = await create_restaurant(f"Kitchen {i}")
+        with use_shard(await shard_directory.shard_for(restaurant.id)):
+            item = await MenuItem.create(id=shard_uuid(), restaurant=restaurant, name="Thali", price=Decimal("4.00"))
+            await Inventory.create(menu_item=item, available_qty=10_000_000, threshold_qty=0)
+        menu.append((str(restaurant.id), str(item.id)))
+    return menu
+
+
+async def _place(args: argparse.Namespace, menu: List[Tuple[str, str]]) -> float:
+    """Seconds to place every order."""
+    rng = random.Random(args.seed)
+    picks = iter([rng.choice(menu) for _ in range(args.orders)])
+
+    async def worker():
+        for restaurant_id, item_id in picks:
+            await place_order("bench-user", restaurant_id, [{"menu_item_id": item_id, "quantity": 1}])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return time.perf_counter() - started
+
+
+async def _drain() -> float:
+    """Seconds until every shard's outbox is empty, one poller per shard."""
+    async def poller(alias: str):
+        with use_shard(alias):
+            while await poll_outbox_for_new_events():
+                pass
+
+    started = time.perf_counter()
+    await asyncio.gather(*(poller(alias) for alias in shard_aliases()))
+    return time.perf_counter() - started
+
+
+async def _run(args: argparse.Namespace, urls: List[str]) -> Tuple[float, float]:
+    """Placement and end-to-end orders/sec on the shards at 'urls'."""
+    await Tortoise.init(config=tortoise_config(urls[0], "", urls[1:]))
+    try:
+        for alias in shard_aliases():
+            await migrate(connection_name=alias)
+        shard_directory.clear()
+        menu = await _seed(args.restaurants)
+        placing = await _place(args, menu)
+        draining = await _drain()
+    finally:
+        await Tortoise.close_connections()
+    return args.orders / placing, args.orders / (placing + draining)
+
+
+async def main(args: argparse.Namespace) -> int:
+    counts = [int(n) for n in args.shards.split(",")]
+    given = [u for u in args.db_urls.split(",") if u] if args.db_urls else []
+    if given and max(counts) > len(given):
+        print(f"--shards needs up to {max(counts)} databases, --db-urls has {len(given)}")
+        return 1
+
+    print(f"{args.orders} orders over {args.restaurants} restaurants, {args.concurrency} in flight")
+    print(f"{'shards':>6} {'placed/sec':>12} {'end-to-end/sec':>15} {'speedup':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in counts:
+            urls = given[:count] or [f"sqlite://{os.path.join(tmp, f'run{count}-shard{i}.db')}" for i in range(count)]
+            placed, end_to_end = await _run(args, urls)
+            baseline = baseline or placed
+            print(f"{count:>6} {placed:>12.0f} {end_to_end:>15.0f} {placed / baseline:>7.2f}x")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Order placement throughput against the number of shards.")
+    parser.add_argument("--shards", default="1,2,4", help="Comma-separated shard counts to run.")
+    parser.add_argument("--db-urls", default="", help="Comma-separated database URLs, one per shard (default: temporary SQLite files).")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--restaurants", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
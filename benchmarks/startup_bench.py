@@ -0,0 +1,85 @@
+"""
+Benchmark: cold-start cost of the API and poller processes.
+
+Measures (1) module import time of 'app.main' and 'app.consumers.outbox_poller' in fresh
+interpreters, and (2) the DB part of startup: Tortoise.init followed by either the legacy
+generate_schemas() or the schema-version check used now. Uses a temporary SQLite file by
+default; pass --db-url to measure against Postgres (run 'python -m app.cli.migrate' on it first).
+
+    python -m benchmarks.startup_bench [--runs 10] [--db-url postgres://...]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tortoise import Tortoise
+
+from app.core.db import MODELS_MODULES
+from app.core.migrations import check_schema_version, migrate
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def _import_time(module: str, runs: int) -> float:
+    """Median milliseconds to import 'module' in a fresh interpreter (bytecode already cached)."""
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)  # Warm .pyc cache
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET.format(module=module)],
+            check=True, capture_output=True, text=True
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(samples)
+
+
+async def _db_startup(db_url: str, runs: int, legacy: bool) -> float:
+    """Median milliseconds for Tortoise.init plus the schema step, connection closed between runs."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await Tortoise.init(db_url=db_url, modules={"models": MODELS_MODULES})
+        if legacy:
+            await Tortoise.generate_schemas()
+        else:
+            await check_schema_version()
+        samples.append((time.perf_counter() - start) * 1000)
+        await Tortoise.close_connections()
+    return statistics.median(samples)
+
+
+async def _prepare(db_url: str):
+    await Tortoise.init(db_url=db_url, modules={"models": MODELS_MODULES})
+    await migrate()
+    await Tortoise.close_connections()
+
+
+async def main(args: argparse.Namespace):
+    print(f"{'step':<45} {'median ms':>10}")
+    for module in ("app.main", "app.consumers.outbox_poller"):
+        print(f"{'import ' + module:<45} {_import_time(module, args.runs):>10.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite://{os.path.join(tmp, 'startup.db')}"
+        await _prepare(db_url)
+        legacy = await _db_startup(db_url, args.runs, legacy=True)
+        current = await _db_startup(db_url, args.runs, legacy=False)
+
+    print(f"{'init_db with generate_schemas (legacy)':<45} {legacy:>10.1f}")
+    print(f"{'init_db with schema version check':<45} {current:>10.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure API / poller cold-start time.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--db-url", help="Database to measure init_db against (default: temporary SQLite file).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
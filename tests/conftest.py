@@ -0,0 +1,13 @@
+import pytest_asyncio
+from tortoise import Tortoise
+
+from app.core.db import MODELS_MODULES
+
+
+@pytest_asyncio.fixture
+async def db():
+    """In-memory SQLite database with all models, for service-level tests."""
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": MODELS_MODULES})
+    await Tortoise.generate_schemas()
+    yield
+    await Tortoise.close_connections()
@@ -0,0 +1,80 @@
+"""
+Query-budget helpers for tests: capture the SQL issued inside a block and fail with the
+statements (and a diff against a smaller input) when a budget is exceeded.
+
+    with capture_queries() as captured:
+        await client.get(f"/api/v1/orders/{order_id}")
+    assert_within_budget("GET /api/v1/orders/{order_id}", captured, budget=3)
+
+Budgets are functions of the input size n (line items, orders in a batch, ...). A constant
+function enforces "O(1) statements regardless of n"; check_budget runs a scenario at two
+sizes so an N+1 shows up as the extra statements of the larger run.
+"""
+import difflib
+import re
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Optional, Sequence
+
+import pytest
+
+from app.core.metrics import QueryStats, install_db_instrumentation, start_query_stats, stop_query_stats
+
+# A budget maps the input size of a scenario to the statements it may issue
+Budget = Callable[[int], int]
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"(?:\?|\$\d+|%s)(?:\s*,\s*(?:\?|\$\d+|%s))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Counts and records every statement issued in this context (Tortoise and raw fast path)."""
+    install_db_instrumentation()
+    stats, token = start_query_stats(capture=True)
+    try:
+        yield stats
+    finally:
+        stop_query_stats(token)
+
+
+def normalize(sql: str) -> str:
+    """Statement shape without literals or placeholder-list lengths, for diffing runs of different sizes."""
+    sql = _LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("?, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _listing(statements: Sequence[str]) -> str:
+    return "\n".join(f"  {i:>3}. {normalize(sql)}" for i, sql in enumerate(statements, 1))
+
+
+def assert_within_budget(label: str, captured: QueryStats, budget: int, baseline: Optional[QueryStats] = None):
+    """Fails with the captured statements (and a diff against 'baseline', if given) when over budget."""
+    if captured.count <= budget:
+        return
+    message = [f"{label}: {captured.count} statements, budget {budget}", _listing(captured.statements)]
+    if baseline is not None:
+        diff = difflib.unified_diff(
+            [normalize(s) for s in baseline.statements],
+            [normalize(s) for s in captured.statements],
+            fromfile=f"{baseline.count} statements (smaller input)",
+            tofile=f"{captured.count} statements",
+            lineterm="",
+        )
+        message.append("\n".join(diff))
+    pytest.fail("\n".join(message), pytrace=False)
+
+
+async def check_budget(label: str, budget: Budget, run: Callable[[int], Awaitable[QueryStats]], sizes: Sequence[int] = (1, 5)):
+    """
+    Checks a scenario at each input size. 'run(n)' sets up an input of size n, makes the
+    measured call inside capture_queries and returns the captured stats; a failure at a
+    larger size is shown as a diff against the previous size.
+    """
+    previous: Optional[QueryStats] = None
+    for n in sizes:
+        captured = await run(n)
+        assert_within_budget(f"{label} (n={n})", captured, budget(n), baseline=previous)
+        previous = captured
+
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.events.outbox_utility import create_outbox_event
+from app.models import RateLimitBucket
+from app.services.admission_service import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def _controller(**overrides) -> AdmissionController:
+    settings = dict(
+        user_rate=1.0, user_burst=2, restaurant_rate=100.0, restaurant_burst=100,
+        max_inflight=10, backlog_high_watermark=0, backlog_refresh=0.0, shared=False,
+    )
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+async def _admit(controller: AdmissionController, user_id="u1", restaurant_id="r1"):
+    async with controller.admit(user_id=user_id, restaurant_id=restaurant_id):
+        pass
+
+
+class TestTokenBucket:
+
+    def test_refills_at_rate_up_to_burst(self):
+        """Test tokens are spent, refilled over time and capped at the burst"""
+        bucket = TokenBucket(rate=2.0, burst=2, updated=0.0)
+        bucket.take(0.0)
+        bucket.take(0.0)
+        assert bucket.wait_time(0.0) == pytest.approx(0.5)
+        assert bucket.wait_time(0.5) == 0.0
+        assert bucket.wait_time(100.0) == 0.0
+        assert bucket.tokens == 2
+
+
+class TestAdmissionController:
+
+    @pytest.mark.asyncio
+    async def test_user_limit_rejects_after_burst(self):
+        """Test a user past their burst is rejected with a retry hint while others are admitted"""
+        controller = _controller()
+        await _admit(controller)
+        await _admit(controller)
+        with pytest.raises(AdmissionRejected) as exc:
+            await _admit(controller)
+        assert exc.value.reason == "user_rate"
+        assert exc.value.retry_after_header == "1"
+        await _admit(controller, user_id="u2")
+
+    @pytest.mark.asyncio
+    async def test_rejected_restaurant_limit_spends_no_user_token(self):
+        """Test a request rejected by one bucket does not consume the others"""
+        controller = _controller(restaurant_rate=1.0, restaurant_burst=1)
+        await _admit(controller, user_id="u1")
+        with pytest.raises(AdmissionRejected) as exc:
+            await _admit(controller, user_id="u2")
+        assert exc.value.reason == "restaurant_rate"
+        assert "user:u2" not in controller._buckets
+
+    @pytest.mark.asyncio
+    async def test_inflight_cap(self):
+        """Test the concurrency cap sheds requests beyond the limit and frees slots on exit"""
+        controller = _controller(max_inflight=1, user_rate=0)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await _admit(controller)
+        assert exc.value.reason == "inflight"
+
+        release.set()
+        await holder
+        assert controller.inflight == 0
+        await _admit(controller)
+
+    @pytest.mark.asyncio
+    async def test_backlog_watermark(self, db):
+        """Test new orders are shed once the outbox backlog reaches the watermark"""
+        controller = _controller(backlog_high_watermark=2, user_rate=0)
+        await create_outbox_event("order", uuid4(), "order.placed.v1", {})
+        await _admit(controller)
+
+        await create_outbox_event("order", uuid4(), "order.placed.v1", {})
+        with pytest.raises(AdmissionRejected) as exc:
+            await _admit(controller)
+        assert exc.value.reason == "backlog"
+
+    @pytest.mark.asyncio
+    async def test_shared_buckets_in_db(self, db):
+        """Test shared mode keeps bucket state in the DB for every API process"""
+        first, second = _controller(shared=True), _controller(shared=True)
+        await _admit(first)
+        await _admit(second)
+        with pytest.raises(AdmissionRejected):
+            await _admit(first)
+        assert (await RateLimitBucket.get(key="user:u1")).tokens < 1
+
+
+class TestAdmissionRoute:
+
+    def test_rejected_order_returns_429_with_retry_after(self):
+        """Test the placement endpoint maps a rejection to 429 and Retry-After"""
+        client = TestClient(app)
+        order = {"restaurant_id": str(uuid4()), "items": [{"menu_item_id": str(uuid4()), "quantity": 1}]}
+        with patch("app.api.v1.orders.admission", _controller(max_inflight=1)) as controller:
+            controller.inflight = 1
+            response = client.post("/api/v1/orders", json=order)
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["success"] is False
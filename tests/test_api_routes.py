@@ -52,4 +52,43 @@ class TestOrderRoutes:
             mock_get_order.return_value = mock_order
             
             response = client.get(f"/api/v1/orders/{uuid4()}")
-            assert response.status_code == 200
\ No newline at end of file
+            assert response.status_code == 200
+
+class TestBatchOrderRoutes:
+    def test_create_orders_batch_partial_failure(self, client):
+        """Test batch placement reports per-order results"""
+        with patch('app.api.v1.orders.place_orders_batch') as mock_batch:
+            mock_batch.return_value = [
+                {"index": 0, "success": True, "order_id": uuid4(), "status": "PLACED", "total_amount": "12.50"},
+                {"index": 1, "success": False, "error": "Restaurant not found or is inactive."},
+            ]
+            order = {"restaurant_id": str(uuid4()), "items": [{"menu_item_id": str(uuid4()), "quantity": 1}]}
+
+            response = client.post("/api/v1/orders:batch", json=[order, order])
+            assert response.status_code == 202
+            data = response.json()["data"]
+            assert data["accepted"] == 1
+            assert data["rejected"] == 1
+            assert data["results"][1]["error"] == "Restaurant not found or is inactive."
+
+    def test_create_orders_batch_too_large(self, client):
+        """Test the configured batch size limit"""
+        order = {"restaurant_id": str(uuid4()), "items": [{"menu_item_id": str(uuid4()), "quantity": 1}]}
+        with patch('app.api.v1.orders.ORDER_BATCH_MAX_SIZE', 1):
+            response = client.post("/api/v1/orders:batch", json=[order, order])
+            assert response.status_code == 400
+
+
+class TestInventoryRoutes:
+    def test_multi_get_from_snapshot(self, client):
+        """Test restaurant stock is served from the snapshot"""
+        item = {"menu_item_id": str(uuid4()), "available_qty": 5, "updated_at": "2023-10-27 10:30:00+00:00"}
+        with patch('app.api.v1.inventory.stock_snapshot.for_restaurant', new=AsyncMock(return_value=[item])):
+            response = client.get(f"/api/v1/inventory?restaurant_id={uuid4()}")
+            assert response.status_code == 200
+            assert response.json()["data"]["items"][0]["available_qty"] == 5
+
+    def test_multi_get_requires_one_selector(self, client):
+        """Test restaurant_id and menu_item_ids are mutually exclusive"""
+        response = client.get("/api/v1/inventory")
+        assert response.status_code == 400
@@ -1,14 +1,28 @@
+import asyncio
 import pytest
+import random
 import sys
 import os
+from decimal import Decimal
 from unittest.mock import patch, AsyncMock
-from uuid import uuid4
+from uuid import UUID, uuid4
 from fastapi.testclient import TestClient
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from app.main import app
+from app.consumers.inventory_compactor import compact_inventory
 from app.consumers.inventory_consumer import handle_order_placed, handle_order_cancelled
+from app.core.hot_queries import InventoryRow
+from app.core.metrics import DB_LOCK_CONFLICTS
+from app.models import Inventory, InventoryMovement, MenuItem, OutboxEvent, Restaurant
+from app.services.stock_snapshot import read_stock_for_items
+from tortoise.exceptions import OperationalError
+
+
+class _Deadlock(Exception):
+    """Stands in for asyncpg's DeadlockDetectedError."""
+    sqlstate = "40P01"
 
 
 @pytest.fixture
@@ -20,84 +34,162 @@ class TestConsumers:
     @pytest.mark.asyncio
     async def test_inventory_deduction(self):
         """Test inventory deduction on order placement"""
+        menu_item_id = uuid4()
+        inv = InventoryRow(uuid4(), menu_item_id, available_qty=10, threshold_qty=0)
         with patch('app.consumers.inventory_consumer.in_transaction'):
-            with patch('app.consumers.inventory_consumer.ProcessedEvent.filter') as mock_processed:
-                mock_processed.exists.return_value = False
-                
-                with patch('app.consumers.inventory_consumer.Inventory.filter') as mock_inv_filter:
-                    mock_inv = AsyncMock()
-                    mock_inv.menu_item_id = uuid4()
-                    mock_inv.available_qty = 10
-                    async def save_async(): return mock_inv
-                    mock_inv.save = save_async
-                    
-                    mock_inv_query = AsyncMock()
-                    mock_inv_query.using_db.return_value = mock_inv_query
-                    mock_inv_query.select_for_update.return_value = [mock_inv]
-                    mock_inv_filter.return_value = mock_inv_query
-                    
-                    with patch('app.consumers.inventory_consumer.ProcessedEvent.create'):
-                        with patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
-                            
-                            await handle_order_placed({
-                                "order_id": str(uuid4()),
-                                "items": [{"menu_item_id": str(uuid4()), "quantity": 2}]
-                            }, uuid4())
-                            
-                            mock_outbox.assert_called()
-                            print("✅ 3. Inventory deduction works")
+            with patch('app.consumers.inventory_consumer.movements_recorded', AsyncMock(return_value=False)), \
+                    patch('app.consumers.inventory_consumer.order_cancelled', AsyncMock(return_value=False)):
+                with patch('app.consumers.inventory_consumer.lock_inventory', AsyncMock(return_value={str(menu_item_id): inv})):
+                    with patch('app.consumers.inventory_consumer.pending_movements', AsyncMock(return_value={str(menu_item_id): -3})):
+                        with patch('app.consumers.inventory_consumer.record_movements', AsyncMock()) as mock_record:
+                            with patch('app.consumers.inventory_consumer.record_order_sale', AsyncMock()) as mock_sale, \
+                                    patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
+                                
+                                await handle_order_placed({
+                                    "order_id": str(uuid4()),
+                                    "items": [{"menu_item_id": str(menu_item_id), "quantity": 2}]
+                                }, uuid4())
+                                
+                                mock_outbox.assert_called()
+                                mock_sale.assert_awaited_once()
+                                assert mock_record.call_args.args[2] == {str(menu_item_id): -2}
+                                assert inv.available_qty == 5  # 10 in the snapshot, 3 already pending, 2 now
+                                print("✅ 3. Inventory deduction works")
     
     @pytest.mark.asyncio
     async def test_inventory_restoration(self):
         """Test inventory restoration on order cancellation"""
-        with patch('app.consumers.inventory_consumer.in_transaction'):
-            with patch('app.consumers.inventory_consumer.ProcessedEvent.filter') as mock_processed:
-                mock_processed.exists.return_value = False
+        menu_item_id = uuid4()
+        with patch('app.consumers.inventory_consumer.in_transaction'), \
+                patch('app.consumers.inventory_consumer.record_movements', AsyncMock(return_value=1)) as mock_record:
+            with patch('app.consumers.inventory_consumer.lock_inventory', AsyncMock()) as mock_lock, \
+                    patch('app.consumers.inventory_consumer.order_deducted', AsyncMock(return_value=True)), \
+                    patch('app.consumers.inventory_consumer.record_order_cancellation', AsyncMock()) as mock_correction:
+                
+                await handle_order_cancelled({
+                    "order_id": str(uuid4()),
+                    "items": [{"menu_item_id": str(menu_item_id), "quantity": 2}]
+                }, uuid4())
                 
-                with patch('app.consumers.inventory_consumer.Inventory.filter') as mock_inv_filter:
-                    mock_inv = AsyncMock()
-                    mock_inv.menu_item_id = uuid4()
-                    mock_inv.available_qty = 5
-                    async def save_async(): return mock_inv
-                    mock_inv.save = save_async
-                    
-                    mock_inv_query = AsyncMock()
-                    mock_inv_query.using_db.return_value = mock_inv_query
-                    mock_inv_query.select_for_update.return_value = [mock_inv]
-                    mock_inv_filter.return_value = mock_inv_query
-                    
-                    with patch('app.consumers.inventory_consumer.ProcessedEvent.create'):
-                        
-                        await handle_order_cancelled({
-                            "order_id": str(uuid4()),
-                            "items": [{"menu_item_id": str(uuid4()), "quantity": 2}]
-                        }, uuid4())
-                        
-                        print("✅ 4. Inventory restoration works")
+                assert mock_record.call_args.args[2] == {str(menu_item_id): 2}
+                mock_lock.assert_awaited_once()  # Same rows as the deduction, so the two serialize
+                mock_correction.assert_awaited_once()
+                print("✅ 4. Inventory restoration works")
     
     @pytest.mark.asyncio
     async def test_error_handling(self):
         """Test error handling for insufficient inventory"""
+        menu_item_id = uuid4()
+        inv = InventoryRow(uuid4(), menu_item_id, available_qty=6, threshold_qty=0)
         with patch('app.consumers.inventory_consumer.in_transaction'):
-            with patch('app.consumers.inventory_consumer.ProcessedEvent.filter') as mock_processed:
-                mock_processed.exists.return_value = False
-                
-                with patch('app.consumers.inventory_consumer.Inventory.filter') as mock_inv_filter:
-                    mock_inv = AsyncMock()
-                    mock_inv.menu_item_id = uuid4()
-                    mock_inv.available_qty = 1  # Low stock
-                    
-                    mock_inv_query = AsyncMock()
-                    mock_inv_query.using_db.return_value = mock_inv_query
-                    mock_inv_query.select_for_update.return_value = [mock_inv]
-                    mock_inv_filter.return_value = mock_inv_query
-                    
-                    with patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
-                        
-                        await handle_order_placed({
-                            "order_id": str(uuid4()),
-                            "items": [{"menu_item_id": str(uuid4()), "quantity": 5}]  # Request 5
-                        }, uuid4())
-                        
-                        mock_outbox.assert_called()
-                        print("✅ 5. Error handling works")
\ No newline at end of file
+            with patch('app.consumers.inventory_consumer.movements_recorded', AsyncMock(return_value=False)), \
+                    patch('app.consumers.inventory_consumer.order_cancelled', AsyncMock(return_value=False)):
+                with patch('app.consumers.inventory_consumer.lock_inventory', AsyncMock(return_value={str(menu_item_id): inv})):
+                    # Only 1 left once the pending ledger movements are counted
+                    with patch('app.consumers.inventory_consumer.pending_movements', AsyncMock(return_value={str(menu_item_id): -5})):
+                        with patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
+                            
+                            await handle_order_placed({
+                                "order_id": str(uuid4()),
+                                "items": [{"menu_item_id": str(menu_item_id), "quantity": 5}]  # Request 5
+                            }, uuid4())
+                            
+                            assert mock_outbox.call_args.kwargs["event_type"] == "order.cancellation.required.v1"
+                            print("✅ 5. Error handling works")
+
+    @pytest.mark.asyncio
+    async def test_deduction_retried_after_deadlock(self):
+        """Test a deduction aborted by a deadlock is re-run and succeeds without cancelling the order"""
+        menu_item_id = uuid4()
+        inv = InventoryRow(uuid4(), menu_item_id, available_qty=10, threshold_qty=0)
+        lock = AsyncMock(side_effect=[OperationalError(_Deadlock("deadlock detected")), {str(menu_item_id): inv}])
+        retried = DB_LOCK_CONFLICTS.value("inventory_deduct", "retried")
+        with patch('app.consumers.inventory_consumer.in_transaction'), \
+                patch('app.consumers.inventory_consumer.movements_recorded', AsyncMock(return_value=False)), \
+                patch('app.consumers.inventory_consumer.order_cancelled', AsyncMock(return_value=False)), \
+                patch('app.consumers.inventory_consumer.lock_inventory', lock), \
+                patch('app.consumers.inventory_consumer.pending_movements', AsyncMock(return_value={})), \
+                patch('app.consumers.inventory_consumer.record_movements', AsyncMock()), \
+                patch('app.consumers.inventory_consumer.record_order_sale', AsyncMock()), \
+                patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
+            await handle_order_placed({
+                "order_id": str(uuid4()),
+                "items": [{"menu_item_id": str(menu_item_id), "quantity": 2}]
+            }, uuid4())
+
+        assert lock.await_count == 2
+        assert inv.available_qty == 8
+        assert [c.kwargs["event_type"] for c in mock_outbox.call_args_list] == ["inventory.deducted.success.v1"]
+        assert DB_LOCK_CONFLICTS.value("inventory_deduct", "retried") == retried + 1
+
+    @pytest.mark.asyncio
+    async def test_persistent_conflict_left_to_poller_retry(self):
+        """Test a deduction still deadlocking after the retries is re-raised, not turned into a cancellation"""
+        lock = AsyncMock(side_effect=OperationalError(_Deadlock("deadlock detected")))
+        with patch('app.consumers.inventory_consumer.in_transaction'), \
+                patch('app.consumers.inventory_consumer.lock_inventory', lock), \
+                patch('app.core.db.asyncio.sleep', AsyncMock()), \
+                patch('app.consumers.inventory_consumer.create_outbox_event') as mock_outbox:
+            with pytest.raises(OperationalError):
+                await handle_order_placed({
+                    "order_id": str(uuid4()),
+                    "items": [{"menu_item_id": str(uuid4()), "quantity": 1}]
+                }, uuid4())
+
+        assert lock.await_count == 4  # First attempt + DB_CONFLICT_RETRIES
+        mock_outbox.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redelivered_events_move_stock_once(self, db):
+        """Test a placement and a cancellation delivered twice each are applied once, via the ledger"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Busy Kitchen")
+        item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Wrap", price=Decimal("5.00"))
+        await Inventory.create(menu_item=item, available_qty=10, threshold_qty=0)
+        order = {"order_id": str(uuid4()), "items": [{"menu_item_id": str(item.id), "quantity": 3}]}
+        placed_id, cancelled_id = uuid4(), uuid4()
+
+        for _ in range(2):
+            await handle_order_placed(order, placed_id)
+        assert (await read_stock_for_items([item.id]))[0]["available_qty"] == 7
+        for _ in range(2):
+            await handle_order_cancelled(order, cancelled_id)
+
+        assert (await read_stock_for_items([item.id]))[0]["available_qty"] == 10
+        assert await InventoryMovement.all().count() == 2
+        assert await OutboxEvent.filter(event_type="inventory.deducted.success.v1").count() == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_deductions_and_restorations_conserve_stock(self, db):
+        """Test overlapping concurrent deductions and restorations leave exactly the expected stock"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Busy Kitchen")
+        items = []
+        for i in range(4):
+            item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name=f"Item {i}", price=Decimal("5.00"))
+            await Inventory.create(menu_item=item, available_qty=200, threshold_qty=0)
+            items.append(str(item.id))
+
+        rng = random.Random(7)
+        orders = []
+        for _ in range(60):
+            picked = rng.sample(items, 3)  # Overlapping item sets, in random order
+            orders.append({"order_id": str(uuid4()), "items": [{"menu_item_id": m, "quantity": 2} for m in picked]})
+        placed = [(order, uuid4()) for order in orders]
+        cancelled = [(order, uuid4()) for order in orders[::3]]
+
+        await asyncio.gather(*(handle_order_placed(order, event_id) for order, event_id in placed))
+        await asyncio.gather(*(handle_order_cancelled(order, event_id) for order, event_id in cancelled))
+
+        applied = await InventoryMovement.all().distinct().values_list("event_id", flat=True)
+        assert len(applied) == len(placed) + len(cancelled)
+        expected = {}
+        for item in items:
+            deducted = sum(2 for order in orders if any(line["menu_item_id"] == item for line in order["items"]))
+            restored = sum(2 for order, _ in cancelled if any(line["menu_item_id"] == item for line in order["items"]))
+            expected[item] = 200 - deducted + restored
+        stock = await read_stock_for_items([UUID(item) for item in items])
+        assert {str(row["menu_item_id"]): row["available_qty"] for row in stock} == expected
+
+        # Folding the ledger into the inventory rows keeps the same totals
+        await compact_inventory()
+        compacted = await Inventory.filter(menu_item_id__in=items).values_list("menu_item_id", "available_qty")
+        assert {str(menu_item_id): qty for menu_item_id, qty in compacted} == expected
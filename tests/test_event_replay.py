@@ -0,0 +1,123 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.consumers.event_replay import ReplayCheckpoint, ReplaySelection, replay_events
+from app.core.config import MAX_ATTEMPTS
+from app.events.outbox_utility import create_outbox_event
+from app.models import Inventory, MenuItem, OutboxEvent, Restaurant
+from app.services.order_service import place_order
+from app.services.stock_snapshot import read_stock_for_items
+
+
+def _everything() -> ReplaySelection:
+    return ReplaySelection(until=datetime.now(timezone.utc))
+
+
+async def _events(aggregates: int, per_aggregate: int):
+    """Interleaved status events of several orders; returns the event ids in creation order per aggregate."""
+    ids = [uuid4() for _ in range(aggregates)]
+    for step in range(per_aggregate):
+        for aggregate_id in ids:
+            await create_outbox_event("order", aggregate_id, "order.status_changed.v1", {"order_id": str(aggregate_id), "step": step})
+    expected = {}
+    for event in await OutboxEvent.all().order_by("created_at", "id"):
+        expected.setdefault(event.aggregate_id, []).append(event.id)
+    return expected
+
+
+class _Recorder:
+    """Stands in for the dispatcher: records (aggregate, event) in dispatch order, yielding in between."""
+
+    def __init__(self, stop_after: int = 0, stop: asyncio.Event = None):
+        self.dispatched = []
+        self.stop_after = stop_after
+        self.stop = stop
+
+    async def __call__(self, event):
+        await asyncio.sleep(0.001 * (hash(event.id) % 3))
+        self.dispatched.append((event.aggregate_id, event.id))
+        if self.stop is not None and len(self.dispatched) == self.stop_after:
+            self.stop.set()
+
+
+class TestEventReplay:
+
+    @pytest.mark.asyncio
+    async def test_exhausted_events_are_redispatched_through_the_handlers(self, db):
+        """Test a placement that ran out of attempts deducts stock and is marked published on replay"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Biryani", price=Decimal("5.50"))
+        await Inventory.create(menu_item=item, available_qty=10, threshold_qty=0)
+        order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(item.id), "quantity": 2}])
+        await OutboxEvent.filter(aggregate_id=order.id).update(attempts=MAX_ATTEMPTS)
+        await create_outbox_event("order", uuid4(), "order.status_changed.v1", {})
+        await OutboxEvent.filter(event_type="order.status_changed.v1").update(published=True)
+
+        selection = ReplaySelection(until=datetime.now(timezone.utc), unpublished_only=True)
+        summary = await replay_events(selection)
+
+        assert (summary["matched"], summary["replayed"], summary["failed"]) == (1, 1, 0)
+        assert summary["by_type"] == {"order.placed.v1": 1}
+        assert (await read_stock_for_items([item.id]))[0]["available_qty"] == 8
+        assert await OutboxEvent.filter(aggregate_id=order.id, event_type="order.placed.v1", published=True).exists()
+        assert await OutboxEvent.filter(event_type="inventory.deducted.success.v1").exists()
+
+    @pytest.mark.asyncio
+    async def test_parallel_lanes_keep_each_aggregate_in_order(self, db):
+        """Test every event is dispatched once and events of one aggregate in creation order"""
+        expected = await _events(aggregates=6, per_aggregate=5)
+        recorder = _Recorder()
+
+        with patch("app.consumers.event_replay.mock_dispatch_event", recorder):
+            summary = await replay_events(_everything(), parallelism=4, fetch_size=7)
+
+        assert summary["replayed"] == 30
+        dispatched = {}
+        for aggregate_id, event_id in recorder.dispatched:
+            dispatched.setdefault(aggregate_id, []).append(event_id)
+        assert dispatched == expected
+        assert not await OutboxEvent.filter(published=False).exists()
+
+    @pytest.mark.asyncio
+    async def test_filters_and_dry_run(self, db):
+        """Test type and aggregate filters narrow the selection and a dry run dispatches nothing"""
+        expected = await _events(aggregates=3, per_aggregate=2)
+        target = next(iter(expected))
+        await create_outbox_event("order", target, "order.cancelled.v1", {})
+        recorder = _Recorder()
+
+        with patch("app.consumers.event_replay.mock_dispatch_event", recorder):
+            preview = await replay_events(ReplaySelection(until=datetime.now(timezone.utc), aggregate_ids=(target,)), dry_run=True)
+            by_type = await replay_events(ReplaySelection(until=datetime.now(timezone.utc), event_types=("order.cancelled.v1",)))
+
+        assert preview["matched"] == 3 and preview["replayed"] == 0
+        assert preview["by_type"] == {"order.status_changed.v1": 2, "order.cancelled.v1": 1}
+        assert by_type["matched"] == 1
+        assert recorder.dispatched == [(target, (await OutboxEvent.get(event_type="order.cancelled.v1")).id)]
+        assert await OutboxEvent.filter(published=True).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_interrupted_run_resumes_from_checkpoint(self, db, tmp_path):
+        """Test a stopped run saves its position and the resumed run dispatches only the rest"""
+        expected = await _events(aggregates=4, per_aggregate=5)
+        path = str(tmp_path / "replay.json")
+        stop = asyncio.Event()
+        first = _Recorder(stop_after=5, stop=stop)
+
+        with patch("app.consumers.event_replay.mock_dispatch_event", first):
+            await replay_events(_everything(), parallelism=1, fetch_size=5, checkpoint=ReplayCheckpoint(path, _everything()), stop=stop)
+        assert len(first.dispatched) == 5
+        with open(path) as f:
+            assert json.load(f)["positions"]["default"]["id"] == str(first.dispatched[-1][1])
+
+        resumed = _Recorder()
+        with patch("app.consumers.event_replay.mock_dispatch_event", resumed):
+            await replay_events(_everything(), checkpoint=ReplayCheckpoint.load(path))
+
+        replayed = [event_id for _, event_id in first.dispatched + resumed.dispatched]
+        assert sorted(replayed) == sorted(e for events in expected.values() for e in events)
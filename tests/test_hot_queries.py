@@ -0,0 +1,132 @@
+import sqlite3
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+from tortoise import connections, timezone
+
+from app.core import hot_queries
+from app.core.metrics import DB_QUERIES, start_query_stats, stop_query_stats
+from app.events.outbox_utility import create_outbox_event
+from app.models import Inventory, MenuItem, OutboxEvent, ProcessedEvent, Restaurant
+
+
+async def _menu():
+    restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+    burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+    fries = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Fries", price=Decimal("2.25"), is_active=False)
+    return restaurant, burger, fries
+
+
+class TestHotQueries:
+
+    @pytest.mark.asyncio
+    async def test_order_menu_lookup(self, db):
+        """Test one query returns restaurant state and only its active requested items"""
+        restaurant, burger, fries = await _menu()
+        other = await MenuItem.create(id=uuid4(), restaurant=await Restaurant.create(id=uuid4(), name="Other"), name="Pizza", price=Decimal("9"))
+
+        active, menu = await hot_queries.fetch_order_menu(restaurant.id, [burger.id, fries.id, other.id])
+        assert active is True
+        assert list(menu) == [str(burger.id)]
+        assert menu[str(burger.id)].id == burger.id
+        assert menu[str(burger.id)].price == Decimal("5.50")
+
+        assert await hot_queries.fetch_order_menu(uuid4(), [burger.id]) == (None, {})
+        restaurant.is_active = False
+        await restaurant.save()
+        assert (await hot_queries.fetch_order_menu(restaurant.id, [burger.id]))[0] is False
+
+    @pytest.mark.asyncio
+    async def test_lock_and_save_inventory(self, db):
+        """Test locked rows come back keyed by menu item and batched saves persist"""
+        _, burger, fries = await _menu()
+        burger_inv = await Inventory.create(menu_item=burger, available_qty=50, threshold_qty=5)
+        await Inventory.create(menu_item=fries, available_qty=7)
+
+        conn = connections.get("default")
+        locked = await hot_queries.lock_inventory([burger.id, fries.id], conn)
+        assert set(locked) == {str(burger.id), str(fries.id)}
+        row = locked[str(burger.id)]
+        assert (row.id, row.menu_item_id, row.available_qty, row.threshold_qty) == (burger_inv.id, burger.id, 50, 5)
+
+        for row in locked.values():
+            row.available_qty -= 3
+        now = timezone.now()
+        await hot_queries.save_inventory_levels(list(locked.values()), now, conn)
+
+        burger_inv = await Inventory.get(menu_item_id=burger.id)
+        assert burger_inv.available_qty == 47
+        assert burger_inv.updated_at == now
+        assert (await Inventory.get(menu_item_id=fries.id)).available_qty == 4
+
+    @pytest.mark.asyncio
+    async def test_outbox_poll_cycle(self, db):
+        """Test pending events decode like ORM rows and publish / retry updates apply"""
+        await create_outbox_event("order", uuid4(), "order.placed.v1", {"items": [{"quantity": 2}]})
+        await create_outbox_event("order", uuid4(), "order.cancelled.v1", {})
+        first, second = await OutboxEvent.all().order_by("created_at")
+
+        pending = await hot_queries.fetch_pending_events(max_attempts=5, limit=10)
+        assert [e.id for e in pending] == [first.id, second.id]
+        assert pending[0].event_type == "order.placed.v1"
+        assert pending[0].payload == {"items": [{"quantity": 2}]}
+        assert pending[0].created_at == first.created_at
+
+        await hot_queries.mark_event_published(first.id)
+        await hot_queries.increment_event_attempts(second.id)
+        assert (await OutboxEvent.get(id=first.id)).published is True
+        assert (await OutboxEvent.get(id=second.id)).attempts == 1
+        assert await hot_queries.fetch_pending_events(max_attempts=1, limit=10) == []
+
+    @pytest.mark.asyncio
+    async def test_ledger_check_is_instrumented(self, db):
+        """Test the ledger idempotency check works and still counts towards query stats"""
+        _, burger, _ = await _menu()
+        await hot_queries.record_movements("evt-1", None, {str(burger.id): -2}, "order.placed.v1", timezone.now())
+        before = DB_QUERIES.value("query")
+        stats, token = start_query_stats()
+        try:
+            assert await hot_queries.movements_recorded("evt-1") is True
+            assert await hot_queries.movements_recorded("evt-2") is False
+        finally:
+            stop_query_stats(token)
+        assert stats.count == 2
+        assert DB_QUERIES.value("query") == before + 2
+
+    @pytest.mark.asyncio
+    async def test_processed_event_check_and_insert(self, db):
+        """Test the order status consumer's processed-event row is written and found, and a duplicate is refused"""
+        conn = connections.get("default")
+        await hot_queries.record_processed_event("evt-1", timezone.now(), conn)
+
+        assert await hot_queries.event_processed("evt-1") is True
+        assert await hot_queries.event_processed("evt-2") is False
+        assert (await ProcessedEvent.get(event_id="evt-1")).created_at is not None
+        with pytest.raises(sqlite3.IntegrityError):  # Raw driver error: the handler's transaction rolls back
+            await hot_queries.record_processed_event("evt-1", timezone.now(), conn)
+
+    @pytest.mark.asyncio
+    async def test_ledger_movements_and_effective_stock(self, db):
+        """Test movements are idempotent per event and item, and stock reads add the pending sum"""
+        restaurant, burger, fries = await _menu()
+        await Inventory.create(menu_item=burger, available_qty=50, threshold_qty=5)
+        await Inventory.create(menu_item=fries, available_qty=7)
+        order_id = uuid4()
+        for _ in range(2):
+            await hot_queries.record_movements("evt-1", order_id, {str(burger.id): -3, str(fries.id): -1}, "order.placed.v1", timezone.now())
+        await hot_queries.record_movements("evt-2", order_id, {str(burger.id): 1}, "order.cancelled.v1", timezone.now())
+
+        conn = connections.get("default")
+        assert await hot_queries.pending_movements([burger.id, fries.id], conn) == {str(burger.id): -2, str(fries.id): -1}
+        assert {mid: qty for mid, (qty, _) in (await hot_queries.all_pending_movements()).items()} == {burger.id: -2, fries.id: -1}
+
+        stock = {row.menu_item_id: row for row in await hot_queries.fetch_stock_for_restaurant(restaurant.id)}
+        assert (stock[burger.id].available_qty, stock[fries.id].available_qty) == (48, 6)
+        assert stock[burger.id].restaurant_id == restaurant.id
+        assert [row.available_qty for row in await hot_queries.fetch_stock_for_items([burger.id])] == [48]
+
+        # Claiming marks the movements compacted: nothing is pending afterwards
+        assert await hot_queries.fetch_pending_items(10, conn) != []
+        assert await hot_queries.claim_movements([burger.id, fries.id], conn) == {str(burger.id): -2, str(fries.id): -1}
+        assert await hot_queries.fetch_pending_items(10, conn) == []
+        assert [row.available_qty for row in await hot_queries.fetch_stock_for_items([burger.id])] == [50]
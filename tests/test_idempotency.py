@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from app.models import IdempotencyKey
+from app.services.idempotency_service import IdempotencyStore, IdempotencyError, request_fingerprint
+
+
+class TestIdempotencyStore:
+
+    @pytest.mark.asyncio
+    async def test_repeated_key_replays_stored_response(self, db):
+        """Test a retry returns the original response without re-running the write"""
+        store = IdempotencyStore()
+        calls = []
+
+        async def place():
+            calls.append(1)
+            return {"success": True, "data": {"order_id": "abc"}}
+
+        request_hash = request_fingerprint({"items": [1]})
+        first, replayed_first = await store.run("user-1:key-1", request_hash, place)
+        # A fresh store only has the DB row to go on
+        second, replayed_second = await IdempotencyStore().run("user-1:key-1", request_hash, place)
+
+        assert first == second
+        assert (replayed_first, replayed_second) == (False, True)
+        assert len(calls) == 1
+        assert (await IdempotencyKey.get(key="user-1:key-1")).status_code == 202
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_wait_for_first_request(self, db):
+        """Test concurrent duplicates share one execution"""
+        store = IdempotencyStore()
+        calls = []
+
+        async def place():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"order_id": "abc"}
+
+        results = await asyncio.gather(*[store.run("user-1:key-2", "h", place) for _ in range(5)])
+
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results].count(False) == 1
+
+    @pytest.mark.asyncio
+    async def test_key_reuse_with_different_request_is_rejected(self, db):
+        """Test reusing a key for a different body returns 422"""
+        store = IdempotencyStore()
+
+        async def place():
+            return {"order_id": "abc"}
+
+        await store.run("user-1:key-3", "hash-a", place)
+        with pytest.raises(IdempotencyError) as exc:
+            await store.run("user-1:key-3", "hash-b", place)
+        assert exc.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_failed_request_releases_key(self, db):
+        """Test a failed first attempt does not block the retry"""
+        store = IdempotencyStore()
+
+        async def fail():
+            raise ValueError("Restaurant not found or is inactive.")
+
+        async def place():
+            return {"order_id": "abc"}
+
+        with pytest.raises(ValueError):
+            await store.run("user-1:key-4", "h", fail)
+        body, replayed = await store.run("user-1:key-4", "h", place)
+        assert body == {"order_id": "abc"} and replayed is False
+
+    @pytest.mark.asyncio
+    async def test_stale_claim_is_taken_over_after_its_lease(self, db):
+        """Test a claim left without a response (its holder died) is taken over once its lease ends"""
+        calls = []
+
+        async def place():
+            calls.append(1)
+            return {"order_id": "abc"}
+
+        crashed = IdempotencyStore(claim_lease_seconds=0.05)
+        stored, claim_id = await crashed._wait_for_stored("user-1:key-5", "h")  # Claimed, then the process dies
+        assert stored is None and claim_id is not None
+        with pytest.raises(IdempotencyError) as exc:
+            with patch("app.services.idempotency_service.IDEMPOTENCY_WAIT_SECONDS", 0):
+                await IdempotencyStore().run("user-1:key-5", "h", place)
+        assert exc.value.status_code == 409  # Lease still running
+
+        await asyncio.sleep(0.06)
+        body, replayed = await IdempotencyStore().run("user-1:key-5", "h", place)
+
+        assert body == {"order_id": "abc"} and replayed is False and len(calls) == 1
+        row = await IdempotencyKey.get(key="user-1:key-5")
+        assert row.expires_at - row.created_at > timedelta(hours=23)  # The stored response keeps the full TTL
+
+    @pytest.mark.asyncio
+    async def test_slow_request_keeps_its_claim(self, db):
+        """Test a request running longer than the lease renews its claim, so a retry waits instead of re-running it"""
+        calls = []
+
+        async def slow_place():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return {"order_id": "abc"}
+
+        first = asyncio.create_task(IdempotencyStore(claim_lease_seconds=0.05).run("user-1:key-6", "h", slow_place))
+        await asyncio.sleep(0.1)  # Well past the first lease
+        body, replayed = await IdempotencyStore(claim_lease_seconds=0.05).run("user-1:key-6", "h", slow_place)
+
+        assert await first == ({"order_id": "abc"}, False)
+        assert body == {"order_id": "abc"} and replayed is True and len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_lapsed_holder_cannot_touch_the_claim_that_took_over(self, db):
+        """Test a holder whose lease lapsed neither overwrites nor releases the new holder's claim"""
+        taken_over = asyncio.Event()
+
+        async def place(order_id):
+            await taken_over.wait()
+            if order_id is None:
+                raise RuntimeError("Order placement failed")
+            return {"order_id": order_id}
+
+        lapsed = IdempotencyStore(claim_lease_seconds=0.05)
+        with patch.object(IdempotencyStore, "_renew_claim", AsyncMock()):  # Renewal stalled, e.g. a blocked loop
+            succeeded = asyncio.create_task(lapsed.run("user-1:key-7", "h", lambda: place("first")))
+            failed = asyncio.create_task(lapsed.run("user-1:key-8", "h", lambda: place(None)))
+            await asyncio.sleep(0.06)
+        current = IdempotencyStore()
+        claims = [(await current._wait_for_stored(key, "h"))[1] for key in ("user-1:key-7", "user-1:key-8")]
+        taken_over.set()
+        assert (await succeeded)[0] == {"order_id": "first"}
+        with pytest.raises(RuntimeError):
+            await failed
+
+        rows = await IdempotencyKey.filter(key__in=["user-1:key-7", "user-1:key-8"]).order_by("key")
+        assert [(row.id, row.response_body) for row in rows] == [(claims[0], None), (claims[1], None)]
@@ -0,0 +1,53 @@
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+from tortoise import timezone
+
+from app.consumers.inventory_compactor import compact_inventory
+from app.core.hot_queries import all_pending_movements, record_movements
+from app.models import Inventory, InventoryMovement, MenuItem, Restaurant
+from app.services.inventory_service import apply_restock
+from app.services.stock_snapshot import read_stock_for_items
+
+
+async def _records(rows):
+    for row in rows:
+        yield dict(row)
+
+
+class TestInventoryCompactor:
+
+    @pytest.mark.asyncio
+    async def test_compaction_folds_movements_into_rows(self, db):
+        """Test pending movements move into the inventory rows in batches, keeping stock and history"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        items = []
+        for i in range(3):
+            item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name=f"Item {i}", price=Decimal("5.00"))
+            await Inventory.create(menu_item=item, available_qty=20, threshold_qty=0)
+            items.append(item.id)
+        await record_movements("evt-1", uuid4(), {str(mid): -4 for mid in items}, "order.placed.v1", timezone.now())
+        await record_movements("evt-2", uuid4(), {str(items[0]): 1}, "order.cancelled.v1", timezone.now())
+        before = {row["menu_item_id"]: row["available_qty"] for row in await read_stock_for_items(items)}
+
+        assert await compact_inventory(batch_size=2) == 3
+        assert await all_pending_movements() == {}
+        rows = await Inventory.filter(menu_item_id__in=items).values_list("menu_item_id", "available_qty")
+        assert dict(rows) == before == {items[0]: 17, items[1]: 16, items[2]: 16}
+        assert await InventoryMovement.filter(compacted=True).count() == 4  # Kept as history
+        assert await compact_inventory() == 0
+
+    @pytest.mark.asyncio
+    async def test_restock_checks_effective_stock(self, db):
+        """Test a restock delta is validated against the snapshot plus the pending movements"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.00"))
+        await Inventory.create(menu_item=item, available_qty=10, threshold_qty=0)
+        await record_movements("evt-1", uuid4(), {str(item.id): -8}, "order.placed.v1", timezone.now())
+
+        summary = await apply_restock(_records([{"menu_item_id": str(item.id), "delta": -5}]))
+        assert summary["rejected"] == 1
+
+        await apply_restock(_records([{"menu_item_id": str(item.id), "delta": 5}]))
+        await compact_inventory()
+        assert (await Inventory.get(menu_item_id=item.id)).available_qty == 7
@@ -0,0 +1,100 @@
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models import Inventory, InventoryMovement, MenuItem, OutboxEvent, Restaurant
+from app.services.inventory_service import iter_lines, iter_records, import_catalog, apply_restock
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class TestInventoryImport:
+
+    @pytest.mark.asyncio
+    async def test_csv_catalog_import_upserts_in_chunks(self, db):
+        """Test streamed CSV rows (split across chunks) become menu items, stock and one event each"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        existing = uuid4()
+        body = (
+            b"menu_item_id,name,price,initial_qty,threshold_qty\n"
+            + f"{existing},Burger,5.50,10,2\n".encode()
+            + b",Fries,2.00,20,5\nbad,row\n,Shake,3.25,15,3\n"
+        )
+        records = iter_records(iter_lines(_chunks(body[:40], body[40:90], body[90:])), "csv")
+
+        summary = await import_catalog(restaurant.id, records, chunk_size=2)
+
+        assert summary["upserted"] == 3
+        assert summary["rejected"] == 1
+        assert await MenuItem.filter(restaurant_id=restaurant.id).count() == 3
+        assert (await Inventory.get(menu_item_id=existing)).available_qty == 10
+        assert await OutboxEvent.filter(event_type="inventory.restocked.v1").count() == 3
+
+        # Re-importing the same id updates in place
+        again = iter_records(iter_lines(_chunks(b'{"menu_item_id": "%s", "name": "Burger", "price": 6, "initial_qty": 4}\n' % str(existing).encode())), "ndjson")
+        await import_catalog(restaurant.id, again)
+        assert (await MenuItem.get(id=existing)).price == Decimal("6.00")
+        assert (await Inventory.get(menu_item_id=existing)).available_qty == 4
+
+    @pytest.mark.asyncio
+    async def test_restock_sums_deltas_per_item(self, db):
+        """Test repeated rows collapse into one write and one event per item"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        await Inventory.create(menu_item=burger, available_qty=3)
+        lines = (
+            f'{{"menu_item_id": "{burger.id}", "delta": 5}}\n'
+            f'{{"menu_item_id": "{burger.id}", "delta": 2}}\n'
+            f'{{"menu_item_id": "{uuid4()}", "delta": 1}}\n'
+        ).encode()
+
+        summary = await apply_restock(iter_records(iter_lines(_chunks(lines)), "ndjson"))
+
+        assert summary["restocked"] == 1
+        assert summary["rejected"] == 1
+        assert (await Inventory.get(menu_item_id=burger.id)).available_qty == 10
+        events = await OutboxEvent.filter(event_type="inventory.restocked.v1")
+        assert len(events) == 1 and events[0].decoded_payload["delta"] == 7
+
+    @pytest.mark.asyncio
+    async def test_catalog_import_cannot_take_over_another_restaurants_item(self, db):
+        """Test an upsert key naming another restaurant's item is rejected and leaves that item untouched"""
+        mine = await Restaurant.create(id=uuid4(), name="Biryani House")
+        theirs = await Restaurant.create(id=uuid4(), name="Burger Barn")
+        burger = await MenuItem.create(id=uuid4(), restaurant=theirs, name="Burger", price=Decimal("5.50"))
+        await Inventory.create(menu_item=burger, available_qty=50)
+        await InventoryMovement.create(event_id="e-1", menu_item_id=burger.id, qty=-2, reason="order.placed.v1")
+        body = (
+            f'{{"menu_item_id": "{burger.id}", "name": "pwned", "price": 0.01, "initial_qty": 0, "is_active": false}}\n'
+            '{"name": "Shake", "price": 3.25, "initial_qty": 15}\n'
+        ).encode()
+
+        summary = await import_catalog(mine.id, iter_records(iter_lines(_chunks(body)), "ndjson"))
+
+        assert summary["upserted"] == 1 and summary["rejected"] == 1
+        assert summary["errors"] == [{"line": 1, "error": f"Menu item {burger.id} belongs to another restaurant."}]
+        burger = await MenuItem.get(id=burger.id)
+        assert (burger.name, burger.price, burger.is_active, burger.restaurant_id) == ("Burger", Decimal("5.50"), True, theirs.id)
+        assert (await Inventory.get(menu_item_id=burger.id)).available_qty == 50
+        assert await InventoryMovement.filter(menu_item_id=burger.id, compacted=False).count() == 1
+        assert await OutboxEvent.filter(event_type="inventory.restocked.v1").count() == 1
+
+    @pytest.mark.asyncio
+    async def test_csv_quoted_fields_may_span_lines(self, db):
+        """Test a quoted CSV field containing a newline stays one record, wherever the chunks split"""
+        body = (
+            b'name,price,initial_qty\n'
+            b'"Paneer Tikka\nHalf plate, spicy",5.50,10\n'
+            b'Fries,2.00,20\n'
+            b'"Unterminated,1.00,1\n'
+        )
+        records = [r async for r in iter_records(iter_lines(_chunks(body[:30], body[30:])), "csv")]
+
+        assert records == [
+            {"name": "Paneer Tikka\nHalf plate, spicy", "price": "5.50", "initial_qty": "10", "_line": 2},
+            {"name": "Fries", "price": "2.00", "initial_qty": "20", "_line": 4},
+            {"_line": 5, "_error": "Unterminated quoted field"},
+        ]
@@ -0,0 +1,79 @@
+import io
+import json
+import logging
+import pytest
+from unittest.mock import patch
+
+import app.core.tracing as tracing
+from app.core.logs import SamplingFilter, setup_logging, shutdown_logging
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+
+@pytest.fixture
+def log_stream():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def _records(stream: io.StringIO):
+    shutdown_logging()  # Drains the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class _Counted:
+    formatted = 0
+
+    def __str__(self):
+        _Counted.formatted += 1
+        return "counted"
+
+
+class TestLogging:
+
+    def test_json_records_written_off_thread_with_trace_id(self, log_stream):
+        """Test records come out as JSON lines carrying the active trace id"""
+        setup_logging(level="INFO", fmt="json", sampling="", rate_limit=0, stream=log_stream)
+        with tracing.span("job") as span:
+            logging.getLogger("orders_api").info("Order %s placed", "o-1")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("orders_api").exception("failed")
+
+        placed, failed = _records(log_stream)
+        assert placed["message"] == "Order o-1 placed"
+        assert placed["logger"] == "orders_api" and placed["level"] == "INFO"
+        assert placed["trace_id"] == span.ctx.trace_id
+        assert "ValueError: boom" in failed["exception"]
+
+    def test_sampling_keeps_one_in_n_and_all_warnings(self, log_stream):
+        """Test a sampled logger keeps every 10th info line, never formats the rest, and keeps warnings"""
+        setup_logging(level="INFO", fmt="json", sampling="outbox_poller=0.1", rate_limit=0, stream=log_stream)
+        log = logging.getLogger("outbox_poller")
+        _Counted.formatted = 0
+        dropped = LOG_RECORDS_DROPPED.value("outbox_poller", "sampled")
+        for _ in range(30):
+            log.info("dispatch %s", _Counted())
+        log.warning("stuck")
+
+        messages = [r["message"] for r in _records(log_stream)]
+        assert messages == ["dispatch counted"] * 3 + ["stuck"]
+        assert _Counted.formatted == 3
+        assert LOG_RECORDS_DROPPED.value("outbox_poller", "sampled") == dropped + 27
+
+    def test_rate_limit_per_logger(self):
+        """Test each logger passes at most rate_limit info records per second"""
+        limiter = SamplingFilter({}, rate_limit=5)
+        record = lambda name, level=logging.INFO: logging.LogRecord(name, level, __file__, 1, "x", None, None)
+        with patch("app.core.logs.time") as clock:
+            clock.monotonic.return_value = 100.0
+            assert sum(limiter.filter(record("a")) for _ in range(20)) == 5
+            assert limiter.filter(record("b"))
+            assert limiter.filter(record("a", logging.ERROR))
+            clock.monotonic.return_value = 101.0
+            assert limiter.filter(record("a"))
@@ -0,0 +1,42 @@
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models import Inventory, MenuItem, Restaurant
+from app.services.menu_cache import MenuCache, etag_matches
+from app.services.stock_snapshot import StockSnapshot
+
+
+class TestMenuCache:
+
+    @pytest.mark.asyncio
+    async def test_menu_rebuilds_only_when_stock_bucket_changes(self, db):
+        """Test the blob is reused across stock changes that keep the bucket, and rebuilt otherwise"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Retired", price=Decimal("1.00"), is_active=False)
+        inv = await Inventory.create(menu_item=burger, available_qty=50, threshold_qty=5)
+
+        snapshot = StockSnapshot(max_staleness=0)
+        cache = MenuCache(snapshot=snapshot, catalog_ttl=60)
+        first = await cache.get(restaurant.id)
+        assert b'"name":"Burger"' in first.body and b"Retired" not in first.body
+
+        inv.available_qty = 40  # Same bucket: still available, not low
+        await inv.save(update_fields=["available_qty", "updated_at"])
+        assert await cache.get(restaurant.id) is first
+
+        inv.available_qty = 0  # Sold out: bucket changes, menu is rebuilt with a new ETag
+        await inv.save(update_fields=["available_qty", "updated_at"])
+        rebuilt = await cache.get(restaurant.id)
+        assert rebuilt.etag != first.etag
+        assert b'"available":false' in rebuilt.body
+
+        assert await cache.get(uuid4()) is None
+
+    def test_etag_matching(self):
+        """Test If-None-Match lists, weak validators and wildcard"""
+        assert etag_matches('"a", W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
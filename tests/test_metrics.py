@@ -0,0 +1,53 @@
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.metrics import (
+    Histogram, HTTP_REQUESTS, OUTBOX_BACKLOG, install_db_instrumentation, start_query_stats, stop_query_stats
+)
+from app.consumers.outbox_poller import update_backlog_metrics
+from app.events.outbox_utility import create_outbox_event
+from app.models import OutboxEvent
+
+
+class TestMetrics:
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test Prometheus histogram exposition"""
+        hist = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+        hist.observe(0.05, "/a")
+        hist.observe(0.5, "/a")
+        hist.observe(5, "/a")
+        text = "\n".join(hist.render())
+
+        assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+        assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{route="/a"} 3' in text
+
+    def test_middleware_records_route_templates(self):
+        """Test requests are labelled by route template and /metrics serves text format"""
+        client = TestClient(app)
+        before = HTTP_REQUESTS.value("GET", "/health", "200")
+        client.get("/health")
+        assert HTTP_REQUESTS.value("GET", "/health", "200") == before + 1
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/health"}' in response.text
+
+    @pytest.mark.asyncio
+    async def test_query_stats_and_backlog_metrics(self, db):
+        """Test DB statements are counted per block and the poller gauges read the outbox"""
+        install_db_instrumentation()
+        stats, token = start_query_stats()
+        await create_outbox_event("order", uuid4(), "order.placed.v1", {"order_id": "x"})
+        await OutboxEvent.all().count()
+        stop_query_stats(token)
+        assert stats.count == 2
+        assert stats.seconds > 0
+
+        await update_backlog_metrics()
+        assert OUTBOX_BACKLOG.value() == 1
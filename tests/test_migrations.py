@@ -0,0 +1,107 @@
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise, connections
+
+from app.core.db import MODELS_MODULES
+from app.core.migrations import (
+    SchemaVersionError, available_migrations, check_schema_version, current_version, latest_version, migrate
+)
+from app.models import OutboxEvent, Restaurant
+
+
+@pytest_asyncio.fixture
+async def empty_db():
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": MODELS_MODULES})
+    yield connections.get("default")
+    await Tortoise.close_connections()
+
+
+async def _columns(conn, table: str) -> dict:
+    """{column: nullable} of 'table' (empty when it does not exist)."""
+    rows = await conn.execute_query_dict(f"PRAGMA table_info({table})")
+    return {row["name"]: not row["notnull"] and not row["pk"] for row in rows}
+
+
+async def _indexes(conn, table: str) -> set:
+    rows = await conn.execute_query_dict(f"PRAGMA index_list({table})")
+    return {row["name"] for row in rows if row["origin"] == "c"}
+
+
+class TestMigrations:
+
+    @pytest.mark.asyncio
+    async def test_startup_check_requires_migrations(self, empty_db):
+        """Test app startup refuses an unmigrated database instead of creating tables"""
+        with pytest.raises(SchemaVersionError):
+            await check_schema_version()
+
+    @pytest.mark.asyncio
+    async def test_migrate_applies_pending_once(self, empty_db):
+        """Test migrate creates the schema, records the version and is a no-op when re-run"""
+        assert await migrate() == [version for version, _ in available_migrations()]
+        assert await current_version(empty_db) == latest_version()
+        assert await migrate() == []
+
+        await check_schema_version()
+        await Restaurant.create(name="Biryani House")
+        assert await Restaurant.all().count() == 1
+
+    @pytest.mark.asyncio
+    async def test_migrated_schema_matches_models(self, empty_db):
+        """Test the frozen baseline plus every later migration yields the models' columns and nullability"""
+        await migrate()
+        for model in Tortoise.apps["models"].values():
+            meta = model._meta
+            expected = {column: meta.fields_map[name].null for name, column in meta.fields_db_projection.items()}
+            assert await _columns(empty_db, meta.db_table) == expected, meta.db_table
+
+    @pytest.mark.asyncio
+    async def test_partition_migration_upgrades_older_schema(self, empty_db):
+        """Test a baseline database gains the outbox partition column and its index on migrate"""
+        await migrate(target=1)
+        assert "partition_key" not in await _columns(empty_db, "outbox_events")
+
+        await migrate()
+        assert "partition_key" in await _columns(empty_db, "outbox_events")
+        assert "idx_outbox_events_partition_pending" in await _indexes(empty_db, "outbox_events")
+
+    @pytest.mark.asyncio
+    async def test_ledger_migration_upgrades_older_schema(self, empty_db):
+        """Test a database migrated before the inventory ledger gains its table on migrate"""
+        await migrate(target=2)
+        assert not await _columns(empty_db, "inventory_movements")
+
+        await migrate()
+        assert "compacted" in await _columns(empty_db, "inventory_movements")
+        assert {"idx_inventory_movements_pending", "idx_inventory_movements_order"} <= await _indexes(empty_db, "inventory_movements")
+
+    @pytest.mark.asyncio
+    async def test_sales_rollup_migration_upgrades_older_schema(self, empty_db):
+        """Test a database migrated before the sales rollups gains both tables and their upsert keys"""
+        await migrate(target=3)
+        assert not await _columns(empty_db, "sales_hourly_menu_items")
+
+        await migrate()
+        for table in ("sales_hourly_restaurants", "sales_hourly_menu_items"):
+            assert "cancelled_revenue" in await _columns(empty_db, table)
+        rows = await empty_db.execute_query_dict("PRAGMA index_list(sales_hourly_menu_items)")
+        assert "idx_sales_hourl_restaur_9b6143" in {row["name"] for row in rows}
+        assert any(row["unique"] and row["origin"] == "u" for row in rows)  # SQLite names it sqlite_autoindex_*
+
+    @pytest.mark.asyncio
+    async def test_payload_encoding_migration_upgrades_older_schema(self, empty_db):
+        """Test an outbox with a required JSON payload gains payload_bin, keeping its rows and indexes"""
+        await migrate(target=5)
+        assert (await _columns(empty_db, "outbox_events"))["payload"] is False
+        indexes = await _indexes(empty_db, "outbox_events")
+        await empty_db.execute_query(
+            "INSERT INTO outbox_events (id, aggregate_type, event_type, payload, published, attempts, partition_key, created_at) "
+            "VALUES ('6f1c2f8e-0000-4000-8000-000000000001', 'order', 'order.placed.v1', '{\"order_id\": \"x\"}', 0, 0, 7, '2024-01-01 00:00:00+00:00')"
+        )
+
+        await migrate()
+        columns = await _columns(empty_db, "outbox_events")
+        assert columns["payload"] is True and columns["payload_bin"] is True
+        assert await _indexes(empty_db, "outbox_events") == indexes
+        event = await OutboxEvent.get(event_type="order.placed.v1")
+        assert event.decoded_payload == {"order_id": "x"} and event.payload_bin is None and event.partition_key == 7
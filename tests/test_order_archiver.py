@@ -0,0 +1,38 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+from tortoise import timezone
+
+from app.models import Order, OrderItem, OrderStatus, Restaurant, MenuItem, ArchivedOrder, ArchivedOrderItem
+from app.consumers.order_archiver import archive_finalized_orders
+from app.services.order_service import place_order, get_order_by_id
+
+
+class TestOrderArchiver:
+
+    @pytest.mark.asyncio
+    async def test_archives_old_finalized_orders_in_chunks(self, db):
+        """Test only old finalized orders move, with their items, and reads fall back to the archive"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        items = [{"menu_item_id": str(burger.id), "quantity": 2}]
+
+        orders = [await place_order("user-1", str(restaurant.id), items) for _ in range(5)]
+        old = timezone.now() - timedelta(days=40)
+        # Orders 0-2 finalized long ago, 3 finalized recently, 4 still live but old
+        await Order.filter(id__in=[o.id for o in orders[:3]]).update(status=OrderStatus.DELIVERED, updated_at=old)
+        await Order.filter(id=orders[3].id).update(status=OrderStatus.CANCELLED)
+        await Order.filter(id=orders[4].id).update(updated_at=old)
+
+        moved = await archive_finalized_orders(older_than_days=30, chunk_size=2, pause=0)
+
+        assert moved == 3
+        assert await Order.all().count() == 2
+        assert await OrderItem.all().count() == 2
+        assert await ArchivedOrder.all().count() == 3
+        assert await ArchivedOrderItem.all().count() == 3
+
+        archived = await get_order_by_id(orders[0].id)
+        assert archived.status == OrderStatus.DELIVERED
+        assert archived.items[0].menu_item.name == "Burger"
@@ -0,0 +1,87 @@
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+
+from app.models import Order, OrderItem, OrderStatus, OutboxEvent, Restaurant, MenuItem
+from app.services.order_service import place_order, place_orders_batch, update_order_statuses_bulk
+
+
+async def _seed_menu():
+    restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+    burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+    fries = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Fries", price=Decimal("2.00"))
+    return restaurant, burger, fries
+
+
+class TestPlaceOrder:
+
+    @pytest.mark.asyncio
+    async def test_place_order_writes_order_items_and_event(self, db):
+        """Test single placement prices lines and emits order.placed.v1"""
+        restaurant, burger, fries = await _seed_menu()
+
+        order = await place_order("user-1", str(restaurant.id), [
+            {"menu_item_id": str(burger.id), "quantity": 2},
+            {"menu_item_id": str(fries.id), "quantity": 1},
+        ])
+
+        assert order.total_amount == Decimal("13.00")
+        assert await OrderItem.filter(order_id=order.id).count() == 2
+        event = await OutboxEvent.get(aggregate_id=order.id)
+        assert event.event_type == "order.placed.v1"
+        assert len(event.decoded_payload["items"]) == 2
+
+
+class TestPlaceOrdersBatch:
+
+    @pytest.mark.asyncio
+    async def test_batch_partial_failure(self, db):
+        """Test valid orders are written while invalid ones are rejected at their index"""
+        restaurant, burger, fries = await _seed_menu()
+        other = await Restaurant.create(id=uuid4(), name="Closed", is_active=False)
+
+        results = await place_orders_batch("partner-1", [
+            {"restaurant_id": str(restaurant.id), "items": [{"menu_item_id": str(burger.id), "quantity": 1}]},
+            {"restaurant_id": str(other.id), "items": [{"menu_item_id": str(burger.id), "quantity": 1}]},
+            {"restaurant_id": str(restaurant.id), "items": [{"menu_item_id": str(uuid4()), "quantity": 1}]},
+            {"restaurant_id": str(restaurant.id), "items": [{"menu_item_id": str(fries.id), "quantity": 3}]},
+        ])
+
+        assert [r["success"] for r in results] == [True, False, False, True]
+        assert results[1]["error"] == "Restaurant not found or is inactive."
+        assert results[3]["total_amount"] == Decimal("6.00")
+        assert await Order.all().count() == 2
+        assert await OrderItem.all().count() == 2
+        assert await OutboxEvent.filter(event_type="order.placed.v1").count() == 2
+
+
+class TestBulkStatusUpdate:
+
+    @pytest.mark.asyncio
+    async def test_bulk_update_accepts_and_rejects(self, db):
+        """Test set-based transitions, final-state rejection and cancellation payloads"""
+        restaurant, burger, _ = await _seed_menu()
+        items = [{"menu_item_id": str(burger.id), "quantity": 2}]
+        first = await place_order("user-1", str(restaurant.id), items)
+        second = await place_order("user-1", str(restaurant.id), items)
+        delivered = await place_order("user-1", str(restaurant.id), items)
+        await Order.filter(id=delivered.id).update(status=OrderStatus.DELIVERED)
+        missing = uuid4()
+
+        results = await update_order_statuses_bulk([
+            (first.id, OrderStatus.OUT_FOR_DELIVERY),
+            (second.id, OrderStatus.CANCELLED),
+            (delivered.id, OrderStatus.OUT_FOR_DELIVERY),
+            (missing, OrderStatus.DELIVERED),
+            (first.id, OrderStatus.DELIVERED),
+        ])
+
+        assert [r["accepted"] for r in results] == [True, True, False, False, True]
+        assert results[3]["reason"] == "Order not found"
+        assert (await Order.get(id=first.id)).status == OrderStatus.DELIVERED
+        assert (await Order.get(id=second.id)).status == OrderStatus.CANCELLED
+
+        cancelled = await OutboxEvent.get(aggregate_id=second.id, event_type="order.cancelled.v1")
+        assert cancelled.decoded_payload["items"] == [{**items[0], "unit_price": str(burger.price)}]
+        assert cancelled.decoded_payload["restaurant_id"] == str(restaurant.id)
+        assert await OutboxEvent.filter(aggregate_id=first.id, event_type__startswith="order.status.").count() == 2
@@ -0,0 +1,93 @@
+import json
+import pytest
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.core import hot_queries
+from app.events import outbox_utility
+from app.events.outbox_utility import create_outbox_event
+from app.events.payload_codec import LazyPayload, PayloadDecodeError, decode_payload, encode_payload
+from app.models import OutboxEvent
+
+
+def _placed(lines: int = 3) -> dict:
+    return {
+        "order_id": str(uuid4()),
+        "restaurant_id": str(uuid4()),
+        "placed_at": "2024-05-01T12:30:00.123456+00:00",
+        "items": [{"menu_item_id": str(uuid4()), "quantity": 2, "unit_price": "5.50"} for _ in range(lines)],
+    }
+
+
+class TestPayloadCodec:
+
+    def test_round_trip_is_exact_and_smaller_than_json(self):
+        """Test order payloads decode to the same document at well under their JSON size"""
+        payload = _placed()
+        encoded = encode_payload(payload)
+        assert decode_payload(encoded) == payload
+        assert len(encoded) < len(json.dumps(payload)) / 2
+
+    def test_values_outside_the_fast_paths_round_trip(self):
+        """Test unknown keys, non-canonical ids, big and negative numbers and nesting keep their form"""
+        payload = {
+            "custom key": [None, True, False, -1, 64, 2 ** 70, -(2 ** 70), 1.25, "", "naïve"],
+            "upper_id": str(uuid4()).upper(),
+            "nested": {"deep": [{}, []]},
+            "reason": "Insufficient inventory: " + str(uuid4()),
+        }
+        assert decode_payload(encode_payload(payload)) == payload
+
+    def test_large_payloads_are_compressed(self):
+        """Test the body is compressed above the threshold and still decodes"""
+        payload = {"reason": "out of stock " * 100}
+        compressed = encode_payload(payload, compress_threshold=512)
+        assert compressed[0] & 0x80 and len(compressed) < 200
+        assert encode_payload(payload, compress_threshold=0)[0] == 1
+        assert decode_payload(compressed) == payload
+
+    def test_unknown_versions_and_corrupt_bodies_are_rejected(self):
+        """Test a payload from a newer format or a truncated one raises instead of misreading"""
+        encoded = encode_payload(_placed())
+        with pytest.raises(PayloadDecodeError):
+            decode_payload(bytes((2,)) + encoded[1:])
+        with pytest.raises(PayloadDecodeError):
+            decode_payload(encoded[:-5])
+
+    def test_lazy_payload_decodes_on_first_read(self):
+        """Test nothing is decoded until a field is read, and JSON text is parsed the same way"""
+        payload = _placed(1)
+        lazy = LazyPayload(payload_bin=encode_payload(payload))
+        assert not lazy.decoded
+        assert lazy.get("order_id") == payload["order_id"] and lazy.decoded
+        assert LazyPayload(json.dumps(payload)) == payload
+
+
+class TestStoredPayloads:
+
+    @pytest.mark.asyncio
+    async def test_events_are_stored_binary_and_polled_lazily(self, db):
+        """Test new events fill payload_bin only and the poll decodes them on access"""
+        payload = _placed()
+        await create_outbox_event("order", uuid4(), "order.placed.v1", payload)
+        row = await OutboxEvent.get(event_type="order.placed.v1")
+        assert row.payload is None and row.payload_bin is not None
+        assert row.decoded_payload == payload
+
+        pending, = await hot_queries.fetch_pending_events(max_attempts=5, limit=10)
+        assert not pending.payload.decoded
+        assert pending.payload["items"] == payload["items"]
+
+    @pytest.mark.asyncio
+    async def test_json_encoding_stays_readable(self, db):
+        """Test OUTBOX_PAYLOAD_ENCODING=json writes the JSON column, read through the same path"""
+        payload = _placed(1)
+        with patch.object(outbox_utility, "OUTBOX_PAYLOAD_ENCODING", "json"):
+            await outbox_utility.create_outbox_events_bulk([
+                {"aggregate_type": "order", "aggregate_id": uuid4(), "event_type": "order.placed.v1", "payload": payload}
+            ])
+        row = await OutboxEvent.get(event_type="order.placed.v1")
+        assert row.payload == payload and row.payload_bin is None
+
+        pending, = await hot_queries.fetch_pending_events(max_attempts=5, limit=10)
+        assert pending.payload == payload
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import suppress
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from app.core.profiling import ProfileInProgress, capture_profile, run_loop_monitor, sample_stacks
+from app.main import app
+
+
+def _blocking_handler(seconds: float):
+    time.sleep(seconds)  # Stands in for CPU-bound or blocking work on the loop
+
+
+def _busy_spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestLoopMonitor:
+
+    @pytest.mark.asyncio
+    async def test_stall_logs_the_blocking_stack_and_task(self, caplog):
+        """Test a blocked loop is logged, while blocked, with the blocking function and its task"""
+        lags, stalls = EVENT_LOOP_LAG.count(), EVENT_LOOP_STALLS.value()
+        monitor = asyncio.create_task(run_loop_monitor(interval=0.01, threshold=0.1))
+        await asyncio.sleep(0.05)
+
+        async def handle_event():
+            _blocking_handler(0.4)
+
+        with caplog.at_level(logging.WARNING, logger="profiling"):
+            await asyncio.create_task(handle_event(), name="dispatch-42")
+            await asyncio.sleep(0.05)
+        monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await monitor
+
+        [record] = [r for r in caplog.records if r.name == "profiling"]
+        message = record.getMessage()
+        assert "Event loop blocked" in message
+        assert "task dispatch-42 (TestLoopMonitor.test_stall_logs_the_blocking_stack_and_task.<locals>.handle_event)" in message
+        assert "_blocking_handler" in message
+        assert EVENT_LOOP_STALLS.value() == stalls + 1
+        assert EVENT_LOOP_LAG.count() > lags + 3
+
+
+class TestProfiler:
+
+    def test_samples_collapse_into_flamegraph_lines(self):
+        """Test the sampler attributes samples to the running function, root frame first"""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_spin, args=(stop,))
+        worker.start()
+        try:
+            stacks, samples = sample_stacks(worker.ident, seconds=0.2, interval=0.002)
+        finally:
+            stop.set()
+            worker.join()
+
+        assert samples > 20 and sum(stacks.values()) == samples
+        busy = [stack for stack in stacks if "_busy_spin (tests/test_profiling.py:" in stack]
+        assert sum(stacks[stack] for stack in busy) >= samples * 0.9
+        assert all(stack.split(";")[0].startswith("Thread._bootstrap ") for stack in busy)
+
+    @pytest.mark.asyncio
+    async def test_capture_writes_folded_file_one_at_a_time(self, tmp_path):
+        """Test a capture profiles the loop into a folded file and a concurrent one is refused"""
+        async def blocking_work():
+            await asyncio.sleep(0.05)
+            _blocking_handler(0.1)
+
+        work = asyncio.create_task(blocking_work())
+        capture = asyncio.create_task(capture_profile(0.3, "poller-0-0", interval=0.002, directory=str(tmp_path)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProfileInProgress):
+            await capture_profile(0.1, "poller-0-0", directory=str(tmp_path))
+        result, _ = await asyncio.gather(capture, work)
+
+        lines = open(result["path"]).read().splitlines()
+        first_line = _blocking_handler.__code__.co_firstlineno
+        assert result["path"].startswith(str(tmp_path / "poller-0-0-"))
+        assert len(lines) == result["stacks"]
+        counts = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+        assert sum(counts.values()) == result["samples"]
+        assert sum(n for stack, n in counts.items() if stack.endswith(f";_blocking_handler (tests/test_profiling.py:{first_line})")) > 10
+
+
+class TestAdminProfileRoute:
+
+    def test_disabled_without_token_and_forbidden_with_wrong_one(self):
+        """Test the profile endpoint does not exist without ADMIN_TOKEN and rejects a wrong token"""
+        client = TestClient(app)
+        assert client.post("/api/v1/admin/profile").status_code == 404
+        with patch("app.api.v1.admin.ADMIN_TOKEN", "s3cret"):
+            assert client.post("/api/v1/admin/profile").status_code == 403
+            assert client.post("/api/v1/admin/profile", headers={"X-Admin-Token": "nope"}).status_code == 403
+
+    def test_profile_with_token(self, tmp_path):
+        """Test an admin request returns the written profile's path and sample count"""
+        client = TestClient(app)
+        with patch("app.api.v1.admin.ADMIN_TOKEN", "s3cret"), patch("app.api.v1.admin.capture_profile") as capture:
+            capture.return_value = {"path": str(tmp_path / "api-1.folded"), "seconds": 0.5, "samples": 100, "stacks": 3}
+            response = client.post("/api/v1/admin/profile?seconds=0.5", headers={"X-Admin-Token": "s3cret"})
+            too_long = client.post("/api/v1/admin/profile?seconds=3600", headers={"X-Admin-Token": "s3cret"})
+
+        assert response.status_code == 200
+        assert response.json()["data"]["samples"] == 100
+        capture.assert_called_once_with(0.5, "api")
+        assert too_long.status_code == 422
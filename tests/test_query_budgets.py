@@ -0,0 +1,334 @@
+import inspect
+import math
+import re
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List, Tuple
+from unittest.mock import patch
+from uuid import uuid4
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.consumers import outbox_poller
+from app.consumers.outbox_poller import mock_dispatch_event
+from app.core.config import INVENTORY_IMPORT_CHUNK_SIZE
+from app.core.hot_queries import PendingEvent, fetch_pending_events, mark_event_published
+from app.main import app
+from app.models import Inventory, MenuItem, MenuItemSalesHourly, Order, OrderStatus, Restaurant, RestaurantSalesHourly
+from app.services.admission_service import admission
+from app.services.menu_cache import menu_cache
+from app.services.order_service import cancel_order, place_order
+from app.services.sales_service import hour_bucket
+from app.services.stock_snapshot import stock_snapshot
+from tests.query_budget import capture_queries, check_budget
+
+# Statements each API route may issue, as a function of the scenario's input size n (line
+# items, orders, transitions or import rows). Constant budgets mean O(1) statements in n.
+# Caches (menu, stock snapshot) are measured cold; periodic work amortized over many
+# requests (the admission backlog refresh) is left out.
+ROUTE_BUDGETS = {
+    ("POST", "/api/v1/orders/"): lambda n: 4,
+    ("POST", "/api/v1/orders:batch"): lambda n: 5,
+    # One UPDATE per distinct target status, so bounded by the number of statuses
+    ("PATCH", "/api/v1/orders/status:batch"): lambda n: 3 + min(n, len(OrderStatus)),
+    ("GET", "/api/v1/orders/{order_id}"): lambda n: 3,
+    ("PATCH", "/api/v1/orders/{order_id}/status"): lambda n: 4,
+    ("POST", "/api/v1/orders/{order_id}/cancel"): lambda n: 4,
+    ("GET", "/api/v1/inventory"): lambda n: 2,  # Snapshot refresh: inventory rows + pending ledger sums
+    ("GET", "/api/v1/inventory/{menu_item_id}"): lambda n: 1,
+    ("POST", "/api/v1/inventory/add/{restaurant_id}/item"): lambda n: 3,
+    ("POST", "/api/v1/inventory/add/restaurant"): lambda n: 1,
+    # Per chunk: ownership check of the upsert keys, two upserts, ledger claim, re-read, events
+    ("POST", "/api/v1/inventory/import/{restaurant_id}/catalog"): lambda n: 1 + 6 * math.ceil(n / INVENTORY_IMPORT_CHUNK_SIZE),
+    ("POST", "/api/v1/inventory/restock"): lambda n: 4 * math.ceil(n / INVENTORY_IMPORT_CHUNK_SIZE),
+    ("GET", "/api/v1/restaurants/{restaurant_id}/menu"): lambda n: 4,
+    ("GET", "/api/v1/analytics/restaurants/{restaurant_id}/sales"): lambda n: 1,
+    ("GET", "/api/v1/analytics/restaurants/{restaurant_id}/items"): lambda n: 2,  # Ranking + item names
+    ("GET", "/health"): lambda n: 0,
+    ("GET", "/metrics"): lambda n: 0,
+    ("POST", "/api/v1/admin/profile"): lambda n: 0,
+}
+
+# Statements each outbox event handler may issue (n = line items of the order). A deduction
+# that takes items down to their threshold adds one alert event per such item; the
+# scenarios keep stock above it.
+HANDLER_BUDGETS = {
+    "order.placed.v1": lambda n: 8,  # Incl. the cancellation check and the two sales rollup upserts
+    "inventory.deducted.success.v1": lambda n: 4,
+    "order.cancellation.required.v1": lambda n: 4,
+    "order.cancelled.v1": lambda n: 5,  # Inventory locks, deduction check, ledger insert + sales rollup corrections
+    "order.status_changed.v1": lambda n: 0,
+    "inventory.low_stock_alert.v1": lambda n: 0,
+    "inventory.restocked.v1": lambda n: 0,
+}
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    stock_snapshot.invalidate()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        # The backlog refresh runs at most once per ADMISSION_BACKLOG_REFRESH, not per request
+        with patch.object(admission, "backlog_high_watermark", 0):
+            yield http
+
+
+async def _menu(n: int, stock: int = 100) -> Tuple[Restaurant, List[MenuItem]]:
+    restaurant = await Restaurant.create(id=uuid4(), name="Budget Bistro")
+    items = []
+    for i in range(n):
+        item = await MenuItem.create(id=uuid4(), restaurant=restaurant, name=f"Dish {i}", price=Decimal("4.00"))
+        await Inventory.create(menu_item=item, available_qty=stock, threshold_qty=0)
+        items.append(item)
+    return restaurant, items
+
+
+async def _order(n: int) -> Order:
+    restaurant, items = await _menu(n)
+    return await place_order("budget-user", str(restaurant.id), [{"menu_item_id": str(i.id), "quantity": 1} for i in items])
+
+
+def _lines(items: List[MenuItem]) -> List[dict]:
+    return [{"menu_item_id": str(i.id), "quantity": 1} for i in items]
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, expected: int, **kwargs):
+    with capture_queries() as captured:
+        response = await client.request(method, url, **kwargs)
+    assert response.status_code == expected, response.text
+    return captured
+
+
+class TestRouteBudgets:
+
+    def test_every_route_has_a_budget(self):
+        """Test each API route declares a query budget"""
+        routes = {(method.upper(), path) for path, operations in app.openapi()["paths"].items() for method in operations}
+        routes.add(("GET", "/metrics"))  # Left out of the OpenAPI schema
+        assert routes == set(ROUTE_BUDGETS)
+
+    @pytest.mark.asyncio
+    async def test_place_order(self, client):
+        """Test single placement stays O(1) in line items"""
+        async def run(n):
+            restaurant, items = await _menu(n)
+            body = {"restaurant_id": str(restaurant.id), "items": _lines(items)}
+            return await _request(client, "POST", "/api/v1/orders/", 202, json=body)
+        await check_budget("POST /api/v1/orders/", ROUTE_BUDGETS[("POST", "/api/v1/orders/")], run)
+
+    @pytest.mark.asyncio
+    async def test_place_orders_batch(self, client):
+        """Test batch placement stays O(1) in the number of orders"""
+        async def run(n):
+            restaurant, items = await _menu(2)
+            body = [{"restaurant_id": str(restaurant.id), "items": _lines(items)} for _ in range(n)]
+            return await _request(client, "POST", "/api/v1/orders:batch", 202, json=body)
+        await check_budget("POST /api/v1/orders:batch", ROUTE_BUDGETS[("POST", "/api/v1/orders:batch")], run)
+
+    @pytest.mark.asyncio
+    async def test_bulk_status_update(self, client):
+        """Test bulk transitions stay O(1) in the number of orders, including cancellations"""
+        async def run(n):
+            orders = [await _order(2) for _ in range(n)]
+            body = [
+                {"order_id": str(o.id), "status": "CANCELLED" if i % 2 else "PREPARING"}
+                for i, o in enumerate(orders)
+            ]
+            return await _request(client, "PATCH", "/api/v1/orders/status:batch", 200, json=body)
+        await check_budget("PATCH /api/v1/orders/status:batch", ROUTE_BUDGETS[("PATCH", "/api/v1/orders/status:batch")], run)
+
+    @pytest.mark.asyncio
+    async def test_get_order(self, client):
+        """Test order detail stays O(1) in line items"""
+        async def run(n):
+            order = await _order(n)
+            return await _request(client, "GET", f"/api/v1/orders/{order.id}", 200)
+        await check_budget("GET /api/v1/orders/{order_id}", ROUTE_BUDGETS[("GET", "/api/v1/orders/{order_id}")], run)
+
+    @pytest.mark.asyncio
+    async def test_update_status(self, client):
+        """Test a status transition stays O(1) in line items"""
+        async def run(n):
+            order = await _order(n)
+            return await _request(client, "PATCH", f"/api/v1/orders/{order.id}/status", 200, json={"status": "PREPARING"})
+        await check_budget("PATCH /api/v1/orders/{order_id}/status", ROUTE_BUDGETS[("PATCH", "/api/v1/orders/{order_id}/status")], run)
+
+    @pytest.mark.asyncio
+    async def test_cancel_order(self, client):
+        """Test cancellation stays O(1) in line items"""
+        async def run(n):
+            order = await _order(n)
+            return await _request(client, "POST", f"/api/v1/orders/{order.id}/cancel", 200)
+        await check_budget("POST /api/v1/orders/{order_id}/cancel", ROUTE_BUDGETS[("POST", "/api/v1/orders/{order_id}/cancel")], run)
+
+    @pytest.mark.asyncio
+    async def test_inventory_multi_get(self, client):
+        """Test restaurant and multi-item stock reads stay O(1) in items (cold snapshot)"""
+        budget = ROUTE_BUDGETS[("GET", "/api/v1/inventory")]
+
+        async def by_restaurant(n):
+            restaurant, _ = await _menu(n)
+            stock_snapshot.invalidate()
+            return await _request(client, "GET", "/api/v1/inventory", 200, params={"restaurant_id": str(restaurant.id)})
+
+        async def by_items(n):
+            _, items = await _menu(n)
+            stock_snapshot.invalidate()
+            return await _request(client, "GET", "/api/v1/inventory", 200, params={"menu_item_ids": [str(i.id) for i in items]})
+
+        await check_budget("GET /api/v1/inventory?restaurant_id", budget, by_restaurant)
+        await check_budget("GET /api/v1/inventory?menu_item_ids", budget, by_items)
+
+    @pytest.mark.asyncio
+    async def test_inventory_single_get(self, client):
+        """Test single-item stock read"""
+        async def run(n):
+            _, items = await _menu(1)
+            return await _request(client, "GET", f"/api/v1/inventory/{items[0].id}", 200)
+        await check_budget("GET /api/v1/inventory/{menu_item_id}", ROUTE_BUDGETS[("GET", "/api/v1/inventory/{menu_item_id}")], run)
+
+    @pytest.mark.asyncio
+    async def test_add_item_and_restaurant(self, client):
+        """Test catalog writes"""
+        async def add_restaurant(n):
+            return await _request(client, "POST", "/api/v1/inventory/add/restaurant", 201, json={"name": "New Place"})
+
+        async def add_item(n):
+            restaurant, _ = await _menu(0)
+            body = {"name": "Dosa", "price": 3.5, "initial_qty": 10}
+            return await _request(client, "POST", f"/api/v1/inventory/add/{restaurant.id}/item", 201, json=body)
+
+        await check_budget("POST /api/v1/inventory/add/restaurant", ROUTE_BUDGETS[("POST", "/api/v1/inventory/add/restaurant")], add_restaurant)
+        await check_budget("POST /api/v1/inventory/add/{restaurant_id}/item", ROUTE_BUDGETS[("POST", "/api/v1/inventory/add/{restaurant_id}/item")], add_item)
+
+    @pytest.mark.asyncio
+    async def test_catalog_import_and_restock(self, client):
+        """Test imports and restocks cost a fixed number of statements per chunk"""
+        async def import_catalog(n):
+            restaurant, _ = await _menu(0)
+            rows = "\n".join(f'{{"name": "Item {i}", "price": 2.5, "initial_qty": 5}}' for i in range(n))
+            return await _request(
+                client, "POST", f"/api/v1/inventory/import/{restaurant.id}/catalog", 200,
+                content=rows, headers={"content-type": "application/x-ndjson"},
+            )
+
+        async def restock(n):
+            _, items = await _menu(n)
+            rows = "\n".join(f'{{"menu_item_id": "{i.id}", "delta": 3}}' for i in items)
+            return await _request(client, "POST", "/api/v1/inventory/restock", 200, content=rows, headers={"content-type": "application/x-ndjson"})
+
+        await check_budget("POST /api/v1/inventory/import/{restaurant_id}/catalog", ROUTE_BUDGETS[("POST", "/api/v1/inventory/import/{restaurant_id}/catalog")], import_catalog)
+        await check_budget("POST /api/v1/inventory/restock", ROUTE_BUDGETS[("POST", "/api/v1/inventory/restock")], restock)
+
+    @pytest.mark.asyncio
+    async def test_restaurant_menu(self, client):
+        """Test a cold menu build stays O(1) in menu items"""
+        async def run(n):
+            restaurant, _ = await _menu(n)
+            menu_cache.invalidate(restaurant.id)
+            stock_snapshot.invalidate()
+            return await _request(client, "GET", f"/api/v1/restaurants/{restaurant.id}/menu", 200)
+        await check_budget("GET /api/v1/restaurants/{restaurant_id}/menu", ROUTE_BUDGETS[("GET", "/api/v1/restaurants/{restaurant_id}/menu")], run)
+
+    @pytest.mark.asyncio
+    async def test_sales_analytics(self, client):
+        """Test sales buckets and the item ranking stay O(1) in hours and menu items"""
+        async def seed(n):
+            restaurant, items = await _menu(n)
+            now = hour_bucket(datetime.now(timezone.utc))
+            for i, item in enumerate(items):
+                hour = now - timedelta(hours=i)
+                await RestaurantSalesHourly.create(restaurant_id=restaurant.id, hour=hour, orders=1, units=2, revenue=Decimal("8.00"))
+                await MenuItemSalesHourly.create(menu_item_id=item.id, restaurant_id=restaurant.id, hour=hour, orders=1, units=2, revenue=Decimal("8.00"))
+            return restaurant
+
+        async def sales(n):
+            restaurant = await seed(n)
+            return await _request(client, "GET", f"/api/v1/analytics/restaurants/{restaurant.id}/sales", 200)
+
+        async def items(n):
+            restaurant = await seed(n)
+            return await _request(client, "GET", f"/api/v1/analytics/restaurants/{restaurant.id}/items", 200)
+
+        await check_budget("GET /api/v1/analytics/restaurants/{restaurant_id}/sales", ROUTE_BUDGETS[("GET", "/api/v1/analytics/restaurants/{restaurant_id}/sales")], sales)
+        await check_budget("GET /api/v1/analytics/restaurants/{restaurant_id}/items", ROUTE_BUDGETS[("GET", "/api/v1/analytics/restaurants/{restaurant_id}/items")], items)
+
+    @pytest.mark.asyncio
+    async def test_health_and_metrics(self, client):
+        """Test health and metrics never touch the database"""
+        for path in ("/health", "/metrics"):
+            async def run(n, path=path):
+                return await _request(client, "GET", path, 200)
+            await check_budget(f"GET {path}", ROUTE_BUDGETS[("GET", path)], run)
+
+    @pytest.mark.asyncio
+    async def test_admin_profile(self, client, tmp_path):
+        """Test capturing a profile never touches the database"""
+        async def run(n):
+            return await _request(client, "POST", "/api/v1/admin/profile?seconds=0.05", 200, headers={"X-Admin-Token": "t"})
+
+        with patch("app.api.v1.admin.ADMIN_TOKEN", "t"), patch("app.core.profiling.PROFILE_DIR", str(tmp_path)):
+            await check_budget("POST /api/v1/admin/profile", ROUTE_BUDGETS[("POST", "/api/v1/admin/profile")], run)
+
+
+async def _dispatch_captured(event_type: str):
+    """Dispatches the pending event of 'event_type' (created by the scenario) and captures its statements."""
+    event = next(e for e in await fetch_pending_events(100, 100) if e.event_type == event_type)
+    with capture_queries() as captured:
+        await mock_dispatch_event(event)
+    await mark_event_published(event.id)
+    return captured
+
+
+class TestHandlerBudgets:
+
+    def test_every_dispatched_event_type_has_a_budget(self):
+        """Test each event type the poller routes declares a query budget"""
+        routed = set(re.findall(r'event_type == "([\w.]+)"', inspect.getsource(outbox_poller.mock_dispatch_event)))
+        assert routed == set(HANDLER_BUDGETS)
+
+    @pytest.mark.asyncio
+    async def test_order_placed_and_inventory_success(self, db):
+        """Test deduction and the PREPARING transition stay O(1) in line items"""
+        async def deduct(n):
+            await _order(n)
+            return await _dispatch_captured("order.placed.v1")
+
+        async def prepare(n):
+            await _order(n)
+            await _dispatch_captured("order.placed.v1")
+            return await _dispatch_captured("inventory.deducted.success.v1")
+
+        await check_budget("order.placed.v1", HANDLER_BUDGETS["order.placed.v1"], deduct)
+        await check_budget("inventory.deducted.success.v1", HANDLER_BUDGETS["inventory.deducted.success.v1"], prepare)
+
+    @pytest.mark.asyncio
+    async def test_cancellation_handlers(self, db):
+        """Test auto-cancellation and stock restoration stay O(1) in line items"""
+        async def cancellation_required(n):
+            restaurant, items = await _menu(n, stock=0)
+            await place_order("budget-user", str(restaurant.id), _lines(items))
+            await _dispatch_captured("order.placed.v1")  # Out of stock
+            return await _dispatch_captured("order.cancellation.required.v1")
+
+        async def restore(n):
+            order = await _order(n)
+            await _dispatch_captured("order.placed.v1")
+            await cancel_order(order.id)
+            return await _dispatch_captured("order.cancelled.v1")
+
+        await check_budget("order.cancellation.required.v1", HANDLER_BUDGETS["order.cancellation.required.v1"], cancellation_required)
+        await check_budget("order.cancelled.v1", HANDLER_BUDGETS["order.cancelled.v1"], restore)
+
+    @pytest.mark.asyncio
+    async def test_notification_handlers(self, db):
+        """Test notification-only events never touch the database"""
+        for event_type in ("order.status_changed.v1", "inventory.low_stock_alert.v1", "inventory.restocked.v1"):
+            async def run(n, event_type=event_type):
+                payload = {"order_id": str(uuid4()), "menu_item_id": str(uuid4()), "new_status": "PREPARING", "available_qty": n}
+                with capture_queries() as captured:
+                    await mock_dispatch_event(PendingEvent(uuid4(), event_type, payload, 0, None, None))
+                return captured
+            await check_budget(event_type, HANDLER_BUDGETS[event_type], run)
@@ -0,0 +1,67 @@
+import pytest
+import pytest_asyncio
+from decimal import Decimal
+from uuid import uuid4
+from tortoise import Tortoise, connections
+
+import app.core.db as db_module
+from app.core.db import REPLICA, mark_written, read_connection, tortoise_config
+from app.models import MenuItem, Restaurant
+from app.services.order_service import get_order_by_id, place_order
+
+
+@pytest_asyncio.fixture
+async def replicated_db(tmp_path):
+    """One SQLite file behind a primary and a replica alias (stand-in for a streaming replica)."""
+    path = tmp_path / "orders.db"
+    await Tortoise.init(config=tortoise_config(f"sqlite://{path}", f"sqlite://{path}"))
+    await Tortoise.generate_schemas()
+    db_module._recent_writes.clear()
+    yield
+    db_module._recent_writes.clear()
+    await Tortoise.close_connections()
+
+
+class TestConnectionConfig:
+
+    def test_pool_settings_applied_to_postgres_only(self):
+        """Test pool settings are added to Postgres aliases while URL parameters win"""
+        config = tortoise_config("postgres://u:p@primary:5432/db?maxsize=50", "postgres://u:p@replica:5432/db")
+        primary = config["connections"]["default"]["credentials"]
+        replica = config["connections"][REPLICA]["credentials"]
+
+        assert primary["maxsize"] == "50"
+        assert replica["maxsize"] == db_module.DB_POOL_MAX_SIZE
+        assert replica["host"] == "replica"
+        assert "command_timeout" in replica and "statement_cache_size" in replica
+        assert "maxsize" not in tortoise_config("sqlite://:memory:", "")["connections"]["default"]["credentials"]
+        assert REPLICA not in tortoise_config("sqlite://:memory:", "")["connections"]
+
+
+class TestReadRouting:
+
+    @pytest.mark.asyncio
+    async def test_reads_use_replica_except_after_local_write(self, replicated_db):
+        """Test GET reads go to the replica, but stay on the primary right after a write or when consistent"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(burger.id), "quantity": 1}])
+
+        assert read_connection(f"order:{order.id}") is None
+        assert read_connection(f"order:{uuid4()}") is connections.get(REPLICA)
+        assert read_connection(f"order:{uuid4()}", consistent=True) is None
+
+        db_module._recent_writes.clear()  # Window elapsed
+        conn = read_connection(f"order:{order.id}")
+        assert conn is connections.get(REPLICA)
+        fetched = await get_order_by_id(order.id, conn=conn)
+        assert fetched.id == order.id and len(fetched.items) == 1
+
+    def test_write_marks_expire_in_order(self, monkeypatch):
+        """Test expired read-after-write marks are pruned from the front"""
+        db_module._recent_writes.clear()
+        monkeypatch.setattr(db_module, "DB_READ_AFTER_WRITE_WINDOW", -1)
+        mark_written("order:a", "order:b")
+        monkeypatch.setattr(db_module, "DB_READ_AFTER_WRITE_WINDOW", 60)
+        mark_written("order:c")
+        assert list(db_module._recent_writes) == ["order:c"]
@@ -0,0 +1,26 @@
+import json
+from decimal import Decimal
+from uuid import uuid4
+
+from app.core.responses import success_response
+from app.schemas.order import OrderPlacementResponse
+from app.schemas.response import SuccessResponse
+
+
+def test_success_response_matches_legacy_envelope():
+    """Test the single-pass envelope serializes like SuccessResponse + model_dump did"""
+    model = OrderPlacementResponse(order_id=uuid4(), status="PLACED", total_amount=Decimal("25.90"), message="ok")
+
+    fast = json.loads(success_response(model, status_code=202).body)
+    legacy = SuccessResponse(data=model.model_dump()).model_dump(mode="json")
+
+    assert fast["data"] == legacy["data"]
+    assert fast["success"] is True and len(fast["request_id"]) == 32
+    assert fast["data"]["total_amount"] == "25.90"
+
+
+def test_success_response_plain_dict():
+    """Test non-model payloads (UUIDs, Decimals) go through orjson"""
+    item_id = uuid4()
+    body = json.loads(success_response({"menu_item_id": item_id, "price": Decimal("2.50")}).body)
+    assert body["data"] == {"menu_item_id": str(item_id), "price": "2.50"}
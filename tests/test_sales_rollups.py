@@ -0,0 +1,147 @@
+import httpx
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+from tortoise.exceptions import OperationalError
+
+from app.consumers.inventory_consumer import handle_order_cancelled, handle_order_placed
+from app.consumers.outbox_poller import poll_outbox_for_new_events
+from app.main import app
+from app.models import Inventory, InventoryMovement, MenuItem, MenuItemSalesHourly, Order, OrderStatus, OutboxEvent, Restaurant, RestaurantSalesHourly
+from app.services.order_service import cancel_order, place_order
+from app.services.sales_service import hour_bucket
+from app.services.stock_snapshot import read_stock_for_items
+
+
+class _Deadlock(Exception):
+    """Stands in for asyncpg's DeadlockDetectedError."""
+    sqlstate = "40P01"
+
+
+async def _menu():
+    restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+    biryani = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Biryani", price=Decimal("5.50"))
+    raita = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Raita", price=Decimal("1.25"))
+    await Inventory.create(menu_item=biryani, available_qty=100, threshold_qty=0)
+    await Inventory.create(menu_item=raita, available_qty=2, threshold_qty=0)
+    return restaurant, biryani, raita
+
+
+async def _drain():
+    while await poll_outbox_for_new_events():
+        pass
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+class TestSalesRollups:
+
+    @pytest.mark.asyncio
+    async def test_rollups_count_deducted_orders_and_correct_cancellations(self, db):
+        """Test sales are counted on deduction, rejected orders never, and a cancellation once"""
+        restaurant, biryani, raita = await _menu()
+        first = await place_order("user-1", str(restaurant.id), [
+            {"menu_item_id": str(biryani.id), "quantity": 2}, {"menu_item_id": str(raita.id), "quantity": 1}
+        ])
+        await place_order("user-2", str(restaurant.id), [{"menu_item_id": str(biryani.id), "quantity": 1}])
+        await place_order("user-3", str(restaurant.id), [{"menu_item_id": str(raita.id), "quantity": 5}])  # Out of stock
+        await _drain()
+
+        await cancel_order(first.id)
+        await _drain()
+        cancelled = await OutboxEvent.get(aggregate_id=first.id, event_type="order.cancelled.v1")
+        await handle_order_cancelled(cancelled.decoded_payload, cancelled.id)  # Redelivered
+
+        row = await RestaurantSalesHourly.get(restaurant_id=restaurant.id)
+        assert row.hour == hour_bucket(first.created_at)
+        assert (row.orders, row.units, row.revenue) == (2, 4, Decimal("17.75"))
+        assert (row.cancelled_orders, row.cancelled_units, row.cancelled_revenue) == (1, 3, Decimal("12.25"))
+
+        items = {r.menu_item_id: r for r in await MenuItemSalesHourly.filter(restaurant_id=restaurant.id)}
+        assert (items[biryani.id].orders, items[biryani.id].units, items[biryani.id].cancelled_units) == (2, 3, 2)
+        assert (items[raita.id].units, items[raita.id].revenue, items[raita.id].cancelled_revenue) == (1, Decimal("1.25"), Decimal("1.25"))
+
+    @pytest.mark.asyncio
+    async def test_cancel_before_failed_deduction_restores_and_corrects_nothing(self, db):
+        """Test cancelling an order whose deduction then fails leaves stock and rollups untouched"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        thali = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Thali", price=Decimal("5.00"))
+        await Inventory.create(menu_item=thali, available_qty=0, threshold_qty=0)
+        order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(thali.id), "quantity": 3}])
+
+        await cancel_order(order.id)  # Still PLACED: its order.placed.v1 is dispatched first and fails
+        await _drain()
+
+        assert await RestaurantSalesHourly.filter(restaurant_id=restaurant.id).count() == 0
+        assert await MenuItemSalesHourly.filter(restaurant_id=restaurant.id).count() == 0
+        assert (await read_stock_for_items([thali.id]))[0]["available_qty"] == 0
+        movements = await InventoryMovement.filter(order_id=order.id).values_list("reason", "qty")
+        assert movements == [("order.cancelled.v1", 0)]  # The marker a retried deduction respects
+
+    @pytest.mark.asyncio
+    async def test_deduction_retried_after_cancellation_takes_nothing(self, db):
+        """Test a deduction that failed, then was overtaken by the cancellation, takes no stock when retried"""
+        restaurant, biryani, _ = await _menu()
+        order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(biryani.id), "quantity": 3}])
+        placed = await OutboxEvent.get(aggregate_id=order.id, event_type="order.placed.v1")
+        conflict = AsyncMock(side_effect=OperationalError(_Deadlock("deadlock detected")))
+        with patch("app.consumers.inventory_consumer.lock_inventory", conflict), patch("app.core.db.asyncio.sleep", AsyncMock()):
+            with pytest.raises(OperationalError):
+                await handle_order_placed(placed.decoded_payload, placed.id)  # Left to the poller's retry
+
+        await cancel_order(order.id)
+        cancelled = await OutboxEvent.get(aggregate_id=order.id, event_type="order.cancelled.v1")
+        await handle_order_cancelled(cancelled.decoded_payload, cancelled.id)
+        await _drain()  # Retries the placement
+
+        assert (await read_stock_for_items([biryani.id]))[0]["available_qty"] == 100
+        assert await RestaurantSalesHourly.filter(restaurant_id=restaurant.id).count() == 0
+        assert not await OutboxEvent.exists(aggregate_id=order.id, event_type="inventory.deducted.success.v1")
+        assert (await Order.get(id=order.id)).status == OrderStatus.CANCELLED
+
+    @pytest.mark.asyncio
+    async def test_events_without_prices_are_looked_up(self, db):
+        """Test an order.placed.v1 payload from before priced events still lands in the rollups"""
+        restaurant, biryani, _ = await _menu()
+        order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(biryani.id), "quantity": 3}])
+        legacy = {"order_id": str(order.id), "items": [{"menu_item_id": str(biryani.id), "quantity": 3}]}
+
+        await handle_order_placed(legacy, uuid4())
+
+        row = await MenuItemSalesHourly.get(menu_item_id=biryani.id)
+        assert (row.orders, row.units, row.revenue, row.restaurant_id) == (1, 3, Decimal("16.50"), restaurant.id)
+
+    @pytest.mark.asyncio
+    async def test_analytics_endpoints(self, client):
+        """Test hourly/daily sales buckets, the item ranking and window validation"""
+        restaurant, biryani, raita = await _menu()
+        for qty in (1, 2):
+            await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(biryani.id), "quantity": qty}])
+        order = await place_order("user-2", str(restaurant.id), [{"menu_item_id": str(raita.id), "quantity": 1}])
+        await _drain()
+        # Move one order's rollups to the previous day, as if it was placed then
+        earlier = hour_bucket(order.created_at) - timedelta(days=1)
+        await RestaurantSalesHourly.create(restaurant_id=restaurant.id, hour=earlier, orders=1, units=4, revenue=Decimal("5.00"))
+
+        start = (earlier - timedelta(hours=1)).isoformat()
+        response = await client.get(f"/api/v1/analytics/restaurants/{restaurant.id}/sales", params={"start": start, "granularity": "day"})
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [b["orders"] for b in data["buckets"]] == [1, 3]
+        assert data["totals"]["net_units"] == 8
+        assert Decimal(data["totals"]["net_revenue"]) == Decimal("22.75")
+
+        response = await client.get(f"/api/v1/analytics/restaurants/{restaurant.id}/items", params={"limit": 1})
+        assert [(i["name"], i["net_units"]) for i in response.json()["data"]["items"]] == [("Biryani", 3)]
+
+        now = datetime.now(timezone.utc)
+        bad = {"start": now.isoformat(), "end": (now - timedelta(hours=1)).isoformat()}
+        assert (await client.get(f"/api/v1/analytics/restaurants/{restaurant.id}/sales", params=bad)).status_code == 400
@@ -0,0 +1,84 @@
+import sys
+import time
+import pytest
+from uuid import uuid4
+
+from app.core.config import OUTBOX_PARTITIONS
+from app.core.hot_queries import fetch_pending_events
+from app.events.outbox_utility import create_outbox_event, partition_key, partition_range
+from app.models import OutboxEvent
+from app.serve import Supervisor, WorkerSpec, build_specs
+
+
+def _python(code: str) -> WorkerSpec:
+    return WorkerSpec(name="test", argv=[sys.executable, "-c", code], env={})
+
+
+class TestOutboxPartitions:
+
+    def test_ranges_are_disjoint_and_cover_all_buckets(self):
+        """Test every bucket is owned by exactly one poller for any worker count"""
+        for count in (1, 3, 7):
+            owned = [b for i in range(count) for b in range(*partition_range(i, count))]
+            assert owned == list(range(OUTBOX_PARTITIONS))
+        with pytest.raises(ValueError):
+            partition_range(2, 2)
+
+    @pytest.mark.asyncio
+    async def test_poller_only_sees_its_partitions(self, db):
+        """Test two pollers split the pending events without overlap"""
+        for _ in range(20):
+            await create_outbox_event("order", uuid4(), "order.placed.v1", {})
+
+        first = await fetch_pending_events(5, 100, partition_range(0, 2))
+        second = await fetch_pending_events(5, 100, partition_range(1, 2))
+        assert len(first) + len(second) == 20
+        assert not {e.id for e in first} & {e.id for e in second}
+        for row in await OutboxEvent.filter(id__in=[e.id for e in first]):
+            assert row.partition_key == partition_key(row.aggregate_id) < OUTBOX_PARTITIONS // 2
+
+
+class TestSupervisor:
+
+    def test_specs_pin_environment_per_slot(self):
+        """Test API workers share the socket and pollers get their own index and metrics port"""
+        specs = build_specs(2, 2, listen_fd=5, env={"DATABASE_URL": "postgres://db"})
+        api, poller = specs[0], specs[3]
+        assert api.pass_fds == (5,) and "--fd" in api.argv
+        assert poller.env["POLLER_WORKER_INDEX"] == "1" and poller.env["POLLER_WORKER_COUNT"] == "2"
+        assert specs[2].env["POLLER_METRICS_PORT"] != poller.env["POLLER_METRICS_PORT"]
+        assert all(s.env["DATABASE_URL"] == "postgres://db" for s in specs)
+
+    def test_each_shard_gets_its_own_pollers(self):
+        """Test pollers are started per shard, each covering all partitions of its shard"""
+        pollers = build_specs(1, 2, listen_fd=None, env={}, shards=3)[1:]
+        assert [p.env["POLLER_SHARD_INDEX"] for p in pollers] == ["0", "0", "1", "1", "2", "2"]
+        assert [p.env["POLLER_WORKER_INDEX"] for p in pollers] == ["0", "1"] * 3
+        assert len({p.name for p in pollers}) == 6
+
+    def test_crashed_worker_is_restarted_with_backoff(self):
+        """Test a worker that exits is started again after its backoff"""
+        supervisor = Supervisor([_python("raise SystemExit(3)")], backoff_min=0.05, backoff_max=1.0)
+        supervisor.check()
+        worker = supervisor.workers[0]
+        worker.process.wait()
+
+        supervisor.check()
+        assert worker.process is None and worker.restarts == 1
+        time.sleep(0.06)
+        supervisor.check()
+        assert worker.process is not None
+        worker.process.wait()
+
+    def test_drain_terminates_then_kills_stragglers(self):
+        """Test drain sends SIGTERM and kills a worker ignoring it once the timeout passes"""
+        graceful = _python("import time; time.sleep(60)")
+        stubborn = _python("import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)")
+        supervisor = Supervisor([graceful, stubborn], drain_timeout=0.5)
+        supervisor.check()
+        time.sleep(0.3)  # Let the stubborn worker install its handler
+
+        started = time.monotonic()
+        supervisor.drain()
+        assert time.monotonic() - started < 5
+        assert all(w.process.poll() is not None for w in supervisor.workers)
@@ -0,0 +1,170 @@
+import pytest
+import pytest_asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+from tortoise import Tortoise, connections
+
+from app.consumers.outbox_poller import poll_outbox_for_new_events
+from app.core.db import GLOBAL_TABLES, PRIMARY, ShardRouter, shard_aliases, tortoise_config, use_shard
+from app.core.migrations import migrate
+from app.events.outbox_utility import partition_key, partition_range
+from app.models import IdempotencyKey, Inventory, MenuItem, Order, OrderStatus, OutboxEvent, Restaurant, RestaurantShard
+from app.services.inventory_service import create_restaurant
+from app.services.order_service import cancel_order, get_order_by_id, place_order, place_orders_batch, update_order_statuses_bulk
+from app.services.shard_directory import shard_directory, shard_of, shard_uuid
+from app.services.stock_snapshot import read_stock_for_items
+from tests.query_budget import capture_queries
+
+
+@pytest_asyncio.fixture
+async def shards():
+    """Two in-memory SQLite shards, migrated, with an empty directory cache."""
+    await Tortoise.init(config=tortoise_config("sqlite://:memory:", "", ["sqlite://:memory:"]))
+    for alias in shard_aliases():
+        await migrate(connection_name=alias)
+    shard_directory.clear()
+    yield shard_aliases()
+    shard_directory.clear()
+    await Tortoise.close_connections()
+
+
+async def _restaurant_on(alias: str, name: str = "Biryani House") -> Restaurant:
+    """Creates restaurants until one is placed on 'alias', with a stocked menu item."""
+    while True:
+        restaurant = await create_restaurant(name)
+        if await shard_directory.shard_for(restaurant.id) == alias:
+            break
+    with use_shard(alias):
+        item = await MenuItem.create(id=shard_uuid(), restaurant=restaurant, name="Biryani", price=Decimal("5.50"))
+        await Inventory.create(menu_item=item, available_qty=100, threshold_qty=0)
+    restaurant.item = item
+    return restaurant
+
+
+def _line(restaurant: Restaurant, quantity: int = 1) -> list:
+    return [{"menu_item_id": str(restaurant.item.id), "quantity": quantity}]
+
+
+class TestShardIds:
+
+    @pytest.mark.asyncio
+    async def test_ids_carry_their_shard(self, shards):
+        """Test ids minted on a shard resolve back to it, and older uuid4 ids to shard 0"""
+        for alias in shards:
+            assert shard_of(shard_uuid(alias)) == alias
+            assert shard_of(str(shard_uuid(alias))) == alias
+        assert shard_of(uuid4()) == PRIMARY
+
+    @pytest.mark.asyncio
+    async def test_sharded_ids_spread_over_pollers(self, shards):
+        """Test ids minted on one shard spread over every poller's partitions and every replay lane"""
+        for alias in shards:
+            keys = [partition_key(shard_uuid(alias)) for _ in range(1000)]
+            per_poller = [sum(start <= k < end for k in keys) for start, end in (partition_range(i, 4) for i in range(4))]
+            assert min(per_poller) > 150, per_poller
+            assert len({k % 16 for k in keys}) == 16
+
+    @pytest.mark.asyncio
+    async def test_single_database_keeps_plain_uuid4(self, db):
+        """Test an unsharded deployment mints uuid4 ids and never reads the directory"""
+        assert shard_uuid().version == 4
+        with capture_queries() as captured:
+            assert await shard_directory.shard_for(uuid4()) == PRIMARY
+        assert captured.count == 0
+
+
+class TestShardDirectory:
+
+    @pytest.mark.asyncio
+    async def test_restaurants_are_placed_and_lookups_cached(self, shards):
+        """Test restaurants land on the shard their directory entry names, looked up once"""
+        placed = [await create_restaurant(f"Kitchen {i}") for i in range(8)]
+        assert {await shard_directory.shard_for(r.id) for r in placed} == set(shards)
+        for restaurant in placed:
+            alias = await shard_directory.shard_for(restaurant.id)
+            with use_shard(alias):
+                assert await Restaurant.filter(id=restaurant.id).exists()
+
+        shard_directory.clear()
+        with capture_queries() as captured:
+            await shard_directory.shards_for([r.id for r in placed])
+            await shard_directory.shard_for(placed[0].id)
+        assert captured.count == 1
+
+    @pytest.mark.asyncio
+    async def test_restaurant_without_entry_lives_on_shard_zero(self, shards):
+        """Test restaurants from before sharding resolve to shard 0 and are not cached"""
+        legacy = await Restaurant.create(id=uuid4(), name="Legacy")
+        assert await shard_directory.shard_for(legacy.id) == PRIMARY
+        await RestaurantShard.create(restaurant_id=legacy.id, shard=1)
+        assert await shard_directory.shard_for(legacy.id) == shards[1]
+
+    @pytest.mark.asyncio
+    async def test_global_tables_stay_on_shard_zero(self, shards):
+        """Test the router leaves directory, idempotency and rate-limit tables on the default connection"""
+        router = ShardRouter()
+        with use_shard(shards[1]):
+            assert router.db_for_write(Order) == shards[1]
+            for model in (RestaurantShard, IdempotencyKey):
+                assert model._meta.db_table in GLOBAL_TABLES
+                assert router.db_for_write(model) is None
+                assert router.db_for_read(model) is None
+
+
+class TestShardedOrders:
+
+    @pytest.mark.asyncio
+    async def test_orders_are_written_to_the_restaurant_shard(self, shards):
+        """Test placement, reads and status changes by id all run on the owning shard"""
+        remote = await _restaurant_on(shards[1])
+        order = await place_order("user-1", str(remote.id), _line(remote, 2))
+
+        assert shard_of(order.id) == shards[1]
+        assert await Order.all().using_db(connections.get(PRIMARY)).count() == 0
+        assert await Order.all().using_db(connections.get(shards[1])).count() == 1
+        assert (await get_order_by_id(order.id)).total_amount == Decimal("11.00")
+
+        cancelled = await cancel_order(order.id)
+        assert cancelled.status == OrderStatus.CANCELLED
+        with use_shard(shards[1]):
+            assert await OutboxEvent.filter(aggregate_id=order.id, event_type="order.cancelled.v1").exists()
+
+    @pytest.mark.asyncio
+    async def test_batch_and_bulk_status_span_shards(self, shards):
+        """Test a batch is split by shard and results keep the caller's order"""
+        local = await _restaurant_on(shards[0], "Local")
+        remote = await _restaurant_on(shards[1], "Remote")
+
+        results = await place_orders_batch("partner-1", [
+            {"restaurant_id": str(remote.id), "items": _line(remote)},
+            {"restaurant_id": str(local.id), "items": _line(local)},
+            {"restaurant_id": str(uuid4()), "items": _line(local)},
+            {"restaurant_id": str(remote.id), "items": _line(remote, 3)},
+        ])
+
+        assert [r["success"] for r in results] == [True, True, False, True]
+        assert [shard_of(results[i]["order_id"]) for i in (0, 1, 3)] == [shards[1], shards[0], shards[1]]
+        assert results[3]["total_amount"] == Decimal("16.50")
+
+        updates = await update_order_statuses_bulk([
+            (results[3]["order_id"], OrderStatus.PREPARING),
+            (results[1]["order_id"], OrderStatus.PREPARING),
+        ])
+        assert [u["accepted"] for u in updates] == [True, True]
+        assert [u["order_id"] for u in updates] == [results[3]["order_id"], results[1]["order_id"]]
+
+    @pytest.mark.asyncio
+    async def test_poller_dispatches_only_its_shard(self, shards):
+        """Test a poller bound to a shard drains that shard's outbox and leaves the others alone"""
+        local = await _restaurant_on(shards[0], "Local")
+        remote = await _restaurant_on(shards[1], "Remote")
+        await place_order("user-1", str(local.id), _line(local))
+        await place_order("user-2", str(remote.id), _line(remote))
+
+        with use_shard(shards[1]):
+            while await poll_outbox_for_new_events():
+                pass
+            assert not await OutboxEvent.filter(published=False).exists()
+            assert (await read_stock_for_items([remote.item.id]))[0]["available_qty"] == 99
+        assert await OutboxEvent.filter(published=False).values_list("event_type", flat=True) == ["order.placed.v1"]
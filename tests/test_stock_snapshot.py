@@ -0,0 +1,55 @@
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+from tortoise import timezone
+
+from app.consumers.inventory_compactor import compact_inventory
+from app.core.hot_queries import record_movements
+from app.models import Inventory, MenuItem, Restaurant
+from app.services.stock_snapshot import StockSnapshot, read_stock_for_restaurant
+
+
+class TestStockSnapshot:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_serves_within_staleness_and_refreshes_incrementally(self, db):
+        """Test reads hit the snapshot until the staleness bound passes, then pick up changes"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        fries = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Fries", price=Decimal("2.00"))
+        inv = await Inventory.create(menu_item=burger, available_qty=10)
+        await Inventory.create(menu_item=fries, available_qty=4)
+
+        snapshot = StockSnapshot(max_staleness=60)
+        menu = await snapshot.for_restaurant(restaurant.id)
+        assert {i["menu_item_id"]: i["available_qty"] for i in menu} == {burger.id: 10, fries.id: 4}
+
+        inv.available_qty = 7
+        await inv.save(update_fields=["available_qty", "updated_at"])
+        # Still within the staleness bound: served from memory
+        assert (await snapshot.for_items([burger.id]))[0]["available_qty"] == 10
+
+        snapshot.invalidate()
+        assert (await snapshot.for_items([burger.id]))[0]["available_qty"] == 7
+        assert len(await read_stock_for_restaurant(restaurant.id)) == 2
+
+    @pytest.mark.asyncio
+    async def test_snapshot_adds_ledger_movements_across_compaction(self, db):
+        """Test entries include uncompacted movements and compaction does not count them twice"""
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        await Inventory.create(menu_item=burger, available_qty=10, threshold_qty=2)
+
+        snapshot = StockSnapshot(max_staleness=60)
+        version = await snapshot.restaurant_version(restaurant.id)
+        await record_movements("evt-1", uuid4(), {str(burger.id): -9}, "order.placed.v1", timezone.now())
+
+        snapshot.invalidate()
+        assert (await snapshot.for_items([burger.id]))[0]["available_qty"] == 1
+        assert await snapshot.restaurant_version(restaurant.id) == version + 1  # Now low on stock
+        assert snapshot.bucket(burger.id) == (True, True)
+
+        await compact_inventory()
+        snapshot.invalidate()
+        assert (await snapshot.for_items([burger.id]))[0]["available_qty"] == 1
+        assert await snapshot.restaurant_version(restaurant.id) == version + 1
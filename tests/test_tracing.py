@@ -0,0 +1,64 @@
+import json
+import pytest
+from decimal import Decimal
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+import app.core.tracing as tracing
+from app.main import app
+from app.cli.trace_report import END_TO_END_STAGE, summarize
+from app.consumers.outbox_poller import poll_outbox_for_new_events
+from app.core.metrics import install_db_instrumentation
+from app.models import Inventory, MenuItem, Order, OrderStatus, OutboxEvent, Restaurant
+from app.services.order_service import place_order
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_PATH", str(path))
+    tracing._buffer.clear()
+    yield path
+    tracing._buffer.clear()
+
+
+class TestTracing:
+
+    def test_request_id_is_trace_id(self, trace_file):
+        """Test the response request_id continues an incoming X-Request-ID and is traced"""
+        client = TestClient(app)
+        response = client.get(f"/api/v1/orders/{uuid4()}", headers={"X-Request-ID": "trace-abc"})
+        assert response.json()["request_id"] == "trace-abc"
+
+        names = [s["name"] for s in tracing._buffer if s["trace_id"] == "trace-abc"]
+        assert names == ["http GET /api/v1/orders/{order_id}"]
+
+    @pytest.mark.asyncio
+    async def test_trace_follows_order_to_preparing(self, db, trace_file):
+        """Test one trace spans placement, queue waits and handlers up to PREPARING"""
+        install_db_instrumentation()
+        restaurant = await Restaurant.create(id=uuid4(), name="Biryani House")
+        burger = await MenuItem.create(id=uuid4(), restaurant=restaurant, name="Burger", price=Decimal("5.50"))
+        await Inventory.create(menu_item=burger, available_qty=50)
+
+        with tracing.span("http POST /api/v1/orders/") as root:
+            order = await place_order("user-1", str(restaurant.id), [{"menu_item_id": str(burger.id), "quantity": 2}])
+
+        placed = await OutboxEvent.get(aggregate_id=order.id, event_type="order.placed.v1")
+        assert placed.trace_context["trace_id"] == root.ctx.trace_id
+
+        await poll_outbox_for_new_events()  # order.placed -> inventory.deducted.success
+        await poll_outbox_for_new_events()  # inventory.deducted.success -> PREPARING
+        assert (await Order.get(id=order.id)).status == OrderStatus.PREPARING
+
+        await tracing.flush_spans()
+        spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+        assert {s["trace_id"] for s in spans} == {root.ctx.trace_id}
+        names = {s["name"] for s in spans}
+        assert {"queue order.placed.v1", "handle order.placed.v1", "handle inventory.deducted.success.v1"} <= names
+
+        root_span = next(s for s in spans if s["span_id"] == root.ctx.span_id)
+        assert root_span["db_queries"] > 0
+
+        report = summarize(spans)
+        assert report[END_TO_END_STAGE]["count"] == 1